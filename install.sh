@@ -82,7 +82,11 @@ After=network.target bluetooth.target mosquitto.service
 Wants=mosquitto.service
 
 [Service]
-Type=simple
+# 起動完了（READY=1）と、制御ループ・シリアルへの書き込み・OSCの受信が進んでいる間のハートビート（WATCHDOG=1）を
+# コントローラーが通知する。uv run の子プロセスから通知するため NotifyAccess=all とする
+Type=notify
+NotifyAccess=all
+WatchdogSec=5
 User=$USER
 WorkingDirectory=$SCRIPT_DIR
 ExecStart=$HOME_DIR/.local/bin/uv run -- whill-ctrl --serial-port $SERIAL_PORT --mqtt-broker $MQTT_HOST --mqtt-port $MQTT_PORT --osc-ip $OSC_IP --osc-port $OSC_PORT $MOCK_OPTION
@@ -6,5 +6,11 @@ WHILLをOSCとMQTTの両方のプロトコルで制御するブリッジサー
 
 __version__ = "0.1.0"
 
+# open は組み込みの open を上書きしないよう、from whill_ctrl import * の対象に含めない（whill_ctrl.open で使う）
+__all__ = ["Chair", "main"]
+
+# 組み込みAPIをパッケージルートから公開
+from .api import Chair, open
+
 # エントリポイントをパッケージルートから公開
 from .core.app import main
@@ -0,0 +1,234 @@
+"""
+同じプロセスのasyncioアプリケーションからWHILLを制御するための組み込みAPI
+
+OSC・MQTTを経由せずにコントローラーを直接操作するため、シリアライズ・送信・パースの往復がない
+
+    async with whill_ctrl.open("/dev/ttyUSB0") as chair:
+        chair.set_joystick(30, 0)
+        async for telemetry in chair.telemetry():
+            ...
+"""
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from .config import get_settings
+from .controller.admission import AdmissionControl
+from .controller.controller import WHILLController
+from .controller.events import LATEST, EventBus
+from .controller.filters import SetpointFilter
+from .controller.idle import IdleMonitor
+from .controller.send_rate import AdaptiveSendRate
+from .recording.recorder import Recorder
+from .whill.factory import create_whill_device
+from .whill.faults import FaultProfile
+
+# open は組み込みの open を上書きしないよう、from whill_ctrl.api import * の対象に含めない
+__all__ = ["Chair"]
+
+
+class Chair:
+    """
+    組み込みAPIから操作するWHILL
+
+    公開するのはこのクラスのメソッドとプロパティ（filters, send_rate, admission, events）。
+    controller はコントローラーの実装そのもので、属性は予告なく変わる
+    """
+
+    # 送信元の識別子（有効期限・順序の検査と記録に使用）
+    SOURCE = "api"
+
+    def __init__(self, controller: WHILLController):
+        """
+        Args:
+            controller: 開始済みのWHILLコントローラー
+        """
+        self.controller = controller
+
+    def set_joystick(self, front: int, side: int, *, seq: int | None = None, sent_at: float | None = None) -> bool:
+        """
+        ジョイスティックの目標値を設定する
+
+        待機せずに目標値を更新し、制御ループがフィルターを通して送信する
+
+        Args:
+            front: 前後方向の値（-100～100）
+            side: 左右方向の値（-100～100）
+            seq: シーケンス番号（任意、順序が逆転した値を破棄する）
+            sent_at: 目標値の生成時刻（UNIX時刻、任意、有効期限の判定に使用）
+
+        Returns:
+            bool: 受け付けた場合はTrue
+        """
+        front = max(-100, min(100, int(front)))
+        side = max(-100, min(100, int(side)))
+        return self.controller.submit_joystick(front, side, source=self.SOURCE, seq=seq, sent_at=sent_at)
+
+    async def power_on(self) -> None:
+        """電源をオンにする"""
+        await self.controller.handle_api_command("power_on", source=self.SOURCE)
+
+    async def power_off(self) -> None:
+        """電源をオフにする"""
+        await self.controller.handle_api_command("power_off", source=self.SOURCE)
+
+    async def emergency_stop(self) -> None:
+        """緊急停止する（フィルターの状態を捨てて即座に0を送る）"""
+        await self.controller.handle_api_command("emergency_stop", source=self.SOURCE)
+
+    def configure(
+        self,
+        *,
+        control_rate: float | None = None,
+        deadzone: float = 0.0,
+        smoothing: float = 0.0,
+        slew_rate: float = 0.0,
+        keepalive: float | None = None,
+        suppress_duplicates: bool | None = None,
+    ) -> None:
+        """
+        制御ループ（フィルターチェーンと送信レート）の設定を変更する
+
+        Args:
+            control_rate: ジョイスティック送信の最大レート（Hz）、Noneで変更しない
+            deadzone: デッドゾーンの閾値、0で無効
+            smoothing: 指数平滑化の時定数（秒）、0で無効
+            slew_rate: 1秒あたりの最大変化量、0で無効
+            keepalive: 同じ値を再送する間隔（秒）、Noneで変更しない
+            suppress_duplicates: 直前に送信した値と同じ入力の送信を省略する、Noneで変更しない
+        """
+        self.controller.configure_joystick(
+            control_rate=control_rate,
+            deadzone=deadzone,
+            smoothing=smoothing,
+            slew_rate=slew_rate,
+            keepalive=keepalive,
+            suppress_duplicates=suppress_duplicates,
+        )
+
+    @property
+    def filters(self) -> SetpointFilter:
+        """ジョイスティックのフィルターチェーン（目標値・出力・各段の状態）"""
+        return self.controller.setpoint_filter
+
+    @property
+    def send_rate(self) -> AdaptiveSendRate:
+        """制御ループの送信レートの調整（リンクの容量と書き込み遅延に合わせた送信周期）"""
+        return self.controller.send_rate
+
+    @property
+    def admission(self) -> AdmissionControl:
+        """送信元ごとのアドミッション制御"""
+        return self.controller.admission
+
+    @property
+    def events(self) -> EventBus:
+        """状態の変化とテレメトリを発行するイベントバス"""
+        return self.controller.events
+
+    async def calibrate(self, frames: int | None = None) -> dict | None:
+        """
+        シリアルリンクの容量を計測し、送信レートの上限に反映する
+
+        Args:
+            frames: 書き込むフレーム数（Noneの場合は設定値）
+
+        Returns:
+            dict | None: 計測結果、切断中の場合はNone
+        """
+        return await self.controller.calibrate_link(frames)
+
+    @property
+    def connected(self) -> bool:
+        """デバイスに接続しているかどうか"""
+        return self.controller.whill.is_connected()
+
+    def status(self) -> dict:
+        """接続状態・送信済みのセットポイント・最新のテレメトリを取得する"""
+        return self.controller.snapshot()
+
+    def metrics(self) -> dict:
+        """コントローラーの統計情報（whill/ctrl/stats と同じ内容）を取得する"""
+        return self.controller.get_stats()
+
+    async def telemetry(self) -> AsyncIterator[dict]:
+        """
+        デバイスからテレメトリを読み取るたびに、状態とテレメトリを返す
+
+        Yields:
+            dict: snapshot() と同じ内容
+        """
+        controller = self.controller
+        # 利用者の処理が遅れた場合は途中のテレメトリを捨て、最新のものだけを返す
+        subscription = controller.events.telemetry.subscribe(policy=LATEST)
+        try:
+            while controller.running:
+                try:
+                    # 停止に気付けるよう、テレメトリが届かなくても定期的に起きる
+                    await asyncio.wait_for(subscription.get(), 1.0)
+                except TimeoutError:
+                    continue
+                yield controller.snapshot()
+        finally:
+            subscription.close()
+
+
+@asynccontextmanager
+async def open(
+    port: str,
+    mock: bool = False,
+    *,
+    record_path: Path | None = None,
+    faults: FaultProfile | str | None = None,
+    **options,
+) -> AsyncIterator[Chair]:
+    """
+    WHILLに接続してコントローラーを開始し、終了時に停止する
+
+    ネットワークの入力経路は作成しない。省略した設定はSettings（環境変数・設定ファイル）の値を使う
+
+    Args:
+        port: シリアルポート名
+        mock: モックWHILLを使用するかどうか
+        record_path: コマンド・遅延トレースの記録先（Noneの場合は記録しない）
+        faults: デバイスに注入する障害（ベンチマーク・障害試験用、Noneの場合は注入しない）
+        **options: WHILLControllerのキーワード引数（control_rate, slew_rate など）
+
+    Yields:
+        Chair: 操作用のオブジェクト
+    """
+    settings = get_settings()
+    kwargs = {
+        "command_deadline": settings.command_deadline,
+        "control_rate": settings.control_rate,
+        "deadzone": settings.joystick_deadzone,
+        "smoothing": settings.joystick_smoothing,
+        "slew_rate": settings.joystick_slew_rate,
+        "keepalive": settings.joystick_keepalive,
+        "suppress_duplicates": settings.joystick_suppress_duplicates,
+        "telemetry_interval": settings.telemetry_interval,
+        "send_rate": AdaptiveSendRate(
+            settings.control_rate,
+            enabled=settings.adaptive_send_rate,
+            headroom=settings.link_headroom,
+            min_rate=settings.min_send_rate,
+        ),
+        "calibration_frames": settings.link_calibration_frames,
+        "idle": IdleMonitor(
+            settings.idle_timeout,
+            telemetry_interval=settings.idle_telemetry_interval,
+            poll_interval=settings.idle_poll_interval,
+            connection_check_interval=settings.idle_connection_check_interval,
+        ),
+        **options,
+    }
+    controller = WHILLController(create_whill_device(port, mock, faults), **kwargs)
+    if record_path is not None:
+        controller.recorder = Recorder(record_path)
+    await controller.start()
+    try:
+        yield Chair(controller)
+    finally:
+        await controller.stop()
@@ -5,6 +5,7 @@
 import os
 from functools import lru_cache
 from pathlib import Path
+from typing import Any
 
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -17,12 +18,149 @@ class Settings(BaseSettings):
     mqtt_command_topic: str = Field("whill/commands/#", description="コマンド受信用トピック")
     mqtt_status_topic: str = Field("whill/status", description="状態通知用トピックのベースパス")
     mqtt_ctrl_topic: str = Field("whill/ctrl/#", description="制御コマンド受信用トピック")
+    mqtt_client_id: str | None = Field(
+        None,
+        description="MQTTクライアントID（永続セッションの識別に使用、Noneの場合はホスト名とシリアルポートから生成）",
+    )
+    mqtt_clean_session: bool = Field(False, description="Trueの場合、再接続ごとにセッションを破棄する")
+    mqtt_keepalive: int = Field(10, description="MQTTキープアライブ間隔（秒）")
+    mqtt_standby_brokers: list[str] = Field(
+        default_factory=list, description="フェイルオーバー先のスタンバイブローカー（host:port形式、優先順）"
+    )
+    mqtt_protocol_v5: bool = Field(
+        False, description="MQTT v5で接続する（トピックエイリアス・メッセージの有効期限・ユーザープロパティを使用）"
+    )
+    mqtt_topic_alias_maximum: int = Field(
+        8, description="MQTT v5で状態通知に使うトピックエイリアスの最大数（ブローカーの上限も超えない）、0で使わない"
+    )
+    mqtt_message_expiry: int = Field(
+        5, description="MQTT v5で保持しない状態通知（応答・統計など）に付ける有効期限（秒）、0で期限なし"
+    )
+    mqtt_reconnect_min_delay: float = Field(0.02, description="MQTT再接続の最小待機時間（秒）")
+    mqtt_reconnect_max_delay: float = Field(1.0, description="MQTT再接続の最大待機時間（秒）")
+    mqtt_health_check_timeout: float = Field(0.2, description="ブローカーのヘルスチェックのタイムアウト（秒）")
+    mqtt_failback_interval: float = Field(30.0, description="スタンバイ接続中にプライマリの復旧を確認する間隔（秒）")
 
     # OSC設定
     osc_ip: str = Field("0.0.0.0", description="OSCサーバーのバインドIPアドレス")
     osc_port: int = Field(5005, description="OSCサーバーのバインドポート")
+    osc_feedback_rate: float = Field(
+        10.0, description="OSCクライアントへ状態・テレメトリを送るレート（Hz）、0で送信しない"
+    )
+    osc_client_timeout: float = Field(10.0, description="この時間（秒）メッセージのないOSCクライアントへの送信をやめる")
+    osc_feedback_port: int = Field(0, description="OSCフィードバックの送信先ポート、0の場合は送信元ポートへ返す")
+    osc_batch_size: int = Field(
+        0,
+        description="1回の起床で読むOSCデータグラムの上限（2以上でまとめ読みし、送信元ごとに最新のジョイスティックだけを処理する）",
+    )
+
+    # ローカルIPC設定
+    ipc_socket_path: Path | None = Field(
+        None, description="バイナリコマンドを受け付けるUnixドメインソケットのパス（Noneの場合は開かない）"
+    )
+    ipc_shm_name: str | None = Field(
+        None, description="ジョイスティック目標値の共有メモリスロットの名前（Noneの場合は作成しない）"
+    )
+
+    # フリート設定（再起動時に適用）
+    fleet_chair_id: int | None = Field(
+        None, description="フリートフレームで自身を表すchair_id（0～65535、Noneの場合はフリートフレームを受け付けない）"
+    )
+    fleet_group: str | None = Field(
+        None, description="フリートフレームを受信するUDPマルチキャストグループ（Noneの場合はOSC・MQTTのみで受信）"
+    )
+    fleet_port: int = Field(5007, description="フリートフレームを受信するUDPポート")
+    fleet_interface: str = Field("0.0.0.0", description="マルチキャストグループに参加するインターフェースのIPアドレス")
+
+    # 入力処理設定
+    threaded_ingest: bool = Field(
+        False, description="OSC・MQTTの受信処理をそれぞれ専用スレッドのイベントループで実行する（再起動時に適用）"
+    )
+
+    # コントローラー設定
+    command_deadline: float = Field(0.5, description="ジョイスティックコマンドの有効期限（秒）、0以下で無効")
+    control_rate: float = Field(50.0, description="ジョイスティック送信の最大レート（Hz）、0以下で制限なし")
+    joystick_deadzone: float = Field(0.0, description="ジョイスティックのデッドゾーン（0～100）、0で無効")
+    joystick_smoothing: float = Field(0.0, description="ジョイスティックの指数平滑化の時定数（秒）、0で無効")
+    joystick_slew_rate: float = Field(0.0, description="ジョイスティックの1秒あたりの最大変化量、0で無効")
+    joystick_keepalive: float = Field(
+        0.0, description="入力がなくても同じジョイスティック値を再送する間隔（秒）、0で再送しない"
+    )
+    joystick_suppress_duplicates: bool = Field(
+        False,
+        description="直前に送信した値と同じジョイスティック入力の送信を省略する（無効の場合は入力ごとに送信する）",
+    )
+    adaptive_send_rate: bool = Field(
+        True, description="リンクの容量と書き込み遅延に合わせてジョイスティックの送信レートを下げる"
+    )
+    link_calibration_frames: int = Field(
+        50, description="接続時にリンクの容量を計測するために書き込むフレーム数、0で計測しない"
+    )
+    link_headroom: float = Field(0.7, description="シリアルリンクの使用率の上限（0～1）")
+    min_send_rate: float = Field(5.0, description="自動調整で下げるジョイスティックの送信レートの下限（Hz）")
+    admission_joystick_rate: float = Field(
+        200.0, description="送信元ごとのジョイスティックの最大受付レート（Hz）、0で制限しない"
+    )
+    admission_joystick_burst: float = Field(50.0, description="送信元ごとのジョイスティックのバースト許容数")
+    admission_command_rate: float = Field(
+        5.0, description="送信元ごとの個別コマンド（緊急停止を除く）の最大受付レート（Hz）、0で制限しない"
+    )
+    admission_command_burst: float = Field(5.0, description="送信元ごとの個別コマンドのバースト許容数")
+    telemetry_interval: float = Field(0.1, description="デバイスからテレメトリを読み取る間隔（秒）、0で読み取らない")
+    idle_timeout: float = Field(
+        60.0, description="コマンドが届かずに停止している時間がこれを超えたらアイドル状態へ移る（秒）、0で移らない"
+    )
+    idle_telemetry_interval: float = Field(
+        1.0, description="アイドル中のテレメトリの読み取り・OSCフィードバックの間隔（秒）"
+    )
+    idle_poll_interval: float = Field(0.2, description="アイドル中に共有メモリの目標値スロットを読み取る間隔（秒）")
+    idle_connection_check_interval: float = Field(60.0, description="アイドル中にデバイスの接続を確認する間隔（秒）")
+
+    # 稼働系・待機系の設定（再起動時に適用）
+    lease_path: Path | None = Field(
+        None, description="稼働系・待機系で共有するリースファイルのパス（Noneの場合はリースを使わない）"
+    )
+    lease_heartbeat_interval: float = Field(
+        0.05, description="稼働系がリースファイルへハートビートを書き込む間隔（秒）"
+    )
+    lease_timeout: float = Field(1.0, description="待機系が稼働系を応答なしとみなすハートビートの途絶時間（秒）")
+    standby_poll_interval: float = Field(0.02, description="待機系がリースの取得を試みる間隔（秒）")
+    standby_fence: bool = Field(True, description="待機系がハートビートの途絶えた稼働系を強制終了（SIGKILL）する")
+
+    # systemd設定（再起動時に適用）
+    watchdog_stall_timeout: float = Field(
+        2.0,
+        description="制御ループ・シリアルへの書き込み・OSCの受信がこの時間（秒）進まなければ"
+        "systemdのウォッチドッグへの通知を止める（WatchdogSec=を指定したユニットでのみ有効）",
+    )
+
+    # 診断設定
+    loop_monitor: bool = Field(True, description="イベントループの遅延モニターを有効にする")
+    slow_callback_threshold: float = Field(0.02, description="この時間（秒）以上ループを占有したコールバックを記録する")
+    loop_lag_interval: float = Field(0.1, description="イベントループの遅延を計測する間隔（秒）")
+    profile_interval: float = Field(0.005, description="プロファイル時にスタックを取得する間隔（秒）")
+    device_faults: str | None = Field(
+        None,
+        description="デバイスに注入する障害（例: seed=1,latency=lognormal:2:0.5,failure_rate=0.01）、"
+        "Noneの場合は注入しない（再起動時に適用）",
+    )
+
+    # 設定ファイルの監視
+    config_watch_interval: float = Field(1.0, description="設定ファイルの変更を確認する間隔（秒）、0で監視しない")
+
+    # 記録設定
+    record_path: Path | None = Field(None, description="コマンド・遅延トレースの記録先（Noneの場合は記録しない）")
+    telemetry_store_path: Path | None = Field(
+        None, description="テレメトリと統計を記録するディレクトリ（Noneの場合は記録しない）"
+    )
+    telemetry_store_interval: float = Field(1.0, description="テレメトリストアへ記録する間隔（秒）")
+    telemetry_store_segment_rows: int = Field(86400, description="テレメトリストアの1セグメントの行数")
+    telemetry_store_max_segments: int = Field(
+        30, description="保持するテレメトリストアのセグメント数、0で古いセグメントを削除しない"
+    )
 
     # ログ設定
+    log_level: str = Field("INFO", description="ログレベル（--debug指定時はDEBUG）")
     log_dir: Path = Field(Path("logs"), description="ログディレクトリのパス")
     log_file_pattern: str = Field("whill_ctrl_{time:YYYY-MM-DD}.log", description="ログファイル名のパターン")
 
@@ -32,6 +170,34 @@ class Settings(BaseSettings):
         os.makedirs(self.log_dir, exist_ok=True)
 
 
+# 設定ファイルから読み込んだ上書き値（環境変数より優先）
+_overrides: dict[str, Any] = {}
+
+
 @lru_cache
 def get_settings() -> Settings:
-    return Settings()
+    return Settings(**_overrides)
+
+
+def reload_settings(overrides: dict[str, Any] | None = None) -> Settings:
+    """
+    上書き値を指定して設定を読み直す
+
+    検証に失敗した場合は例外を送出し、現在の設定を維持する
+
+    Args:
+        overrides: Settingsのフィールド名をキーとする上書き値
+
+    Returns:
+        Settings: 新しい設定
+
+    Raises:
+        pydantic.ValidationError: 設定値が不正な場合
+    """
+    global _overrides
+    overrides = {k: v for k, v in (overrides or {}).items() if k in Settings.model_fields}
+    Settings(**overrides)
+
+    _overrides = overrides
+    get_settings.cache_clear()
+    return get_settings()
@@ -0,0 +1,244 @@
+"""
+送信元ごとのアドミッション制御と、制御ループに渡す目標値の調停を提供するモジュール
+
+- トークンバケット: 送信元とコマンド種別の組ごとに受け付けるレートを制限する
+- 調停: 複数の送信元のジョイスティック目標値が競合した場合は、最後に受け付けた値を適用する
+
+1つのクライアントが大量に送信しても、他のクライアントの受け付けや制御ループの遅延に影響しないようにする
+"""
+
+import math
+import time
+
+# アドミッション制御の対象外とするコマンド（安全のため常に受け付ける）
+EXEMPT_COMMANDS = frozenset({"emergency_stop"})
+
+
+class TokenBucket:
+    """トークンバケット"""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> bool:
+        """
+        トークンを1つ消費する
+
+        Args:
+            rate: 1秒あたりに補充するトークン数
+            burst: バケットの容量
+            now: 現在時刻（単調時計、秒）
+
+        Returns:
+            bool: トークンがあった場合はTrue
+        """
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class SourceStats:
+    """送信元ごとの統計"""
+
+    __slots__ = ("accepted", "throttled", "rejected", "last_seen")
+
+    def __init__(self, now: float):
+        self.accepted = 0
+        self.throttled = 0
+        self.rejected = 0
+        self.last_seen = now
+
+    def to_dict(self) -> dict:
+        return {"accepted": self.accepted, "throttled": self.throttled, "rejected": self.rejected}
+
+
+class AdmissionControl:
+    """送信元・コマンド種別ごとのトークンバケットによるアドミッション制御"""
+
+    # 送信元ごとの状態をこの数を超えて保持しない
+    MAX_SOURCES = 256
+
+    # この時間（秒）コマンドのない送信元は、上限に達したときに削除する
+    IDLE_TIMEOUT = 30.0
+
+    def __init__(
+        self,
+        joystick_rate: float = 200.0,
+        joystick_burst: float = 50.0,
+        command_rate: float = 5.0,
+        command_burst: float = 5.0,
+    ):
+        """
+        アドミッション制御を初期化
+
+        Args:
+            joystick_rate: 送信元ごとのジョイスティックの最大レート（Hz）、0以下で制限しない
+            joystick_burst: ジョイスティックのバースト許容数
+            command_rate: 送信元ごとの個別コマンド（電源など、緊急停止を除く）の最大レート（Hz）、0以下で制限しない
+            command_burst: 個別コマンドのバースト許容数
+        """
+        self.limits: dict[str, tuple[float, float]] = {}
+        self.configure(joystick_rate, joystick_burst, command_rate, command_burst)
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self.sources: dict[str, SourceStats] = {}
+
+        # 統計カウンター
+        self.throttled = 0
+        self.rejected = 0
+
+    def configure(self, joystick_rate: float, joystick_burst: float, command_rate: float, command_burst: float) -> None:
+        """
+        レート制限を変更する
+
+        Args:
+            joystick_rate: 送信元ごとのジョイスティックの最大レート（Hz）、0以下で制限しない
+            joystick_burst: ジョイスティックのバースト許容数
+            command_rate: 送信元ごとの個別コマンドの最大レート（Hz）、0以下で制限しない
+            command_burst: 個別コマンドのバースト許容数
+        """
+        self.limits = {
+            "joystick": (joystick_rate, max(1.0, joystick_burst)),
+            "command": (command_rate, max(1.0, command_burst)),
+        }
+
+    def admit(self, source: str | None, command: str, now: float | None = None) -> bool:
+        """
+        コマンドを受け付けるか判定する
+
+        Args:
+            source: 送信元の識別子（Noneの場合は "unknown" として扱う）
+            command: コマンド名
+            now: 現在時刻（単調時計、省略時はtime.monotonic()）
+
+        Returns:
+            bool: 受け付ける場合はTrue、レート制限を超えた場合はFalse
+        """
+        if now is None:
+            now = time.monotonic()
+        source = source or "unknown"
+        stats = self._source(source, now)
+        stats.last_seen = now
+
+        kind = "joystick" if command == "joystick" else "command"
+        rate, burst = self.limits[kind]
+        if rate > 0 and command not in EXEMPT_COMMANDS:
+            bucket = self._buckets.get((source, kind))
+            if bucket is None:
+                bucket = self._buckets[(source, kind)] = TokenBucket(burst, now)
+            if not bucket.take(rate, burst, now):
+                stats.throttled += 1
+                self.throttled += 1
+                return False
+
+        stats.accepted += 1
+        return True
+
+    def reject(self, source: str | None) -> None:
+        """
+        受け付けた後に破棄したコマンド（期限切れ・順序逆転）を記録する
+
+        Args:
+            source: 送信元の識別子
+        """
+        source = source or "unknown"
+        stats = self.sources.get(source)
+        if stats is not None:
+            stats.accepted -= 1
+            stats.rejected += 1
+        self.rejected += 1
+
+    def _source(self, source: str, now: float) -> SourceStats:
+        """送信元の統計を取得する（上限に達した場合は古い送信元を削除する）"""
+        stats = self.sources.get(source)
+        if stats is None:
+            if len(self.sources) >= self.MAX_SOURCES:
+                self._prune(now)
+            stats = self.sources[source] = SourceStats(now)
+        return stats
+
+    def _prune(self, now: float) -> None:
+        """しばらくコマンドのない送信元の状態を削除する（なければ最も古いものを削除する）"""
+        idle = [source for source, stats in self.sources.items() if now - stats.last_seen >= self.IDLE_TIMEOUT]
+        if not idle:
+            idle = [min(self.sources, key=lambda source: self.sources[source].last_seen)]
+        for source in idle:
+            del self.sources[source]
+            for kind in self.limits:
+                self._buckets.pop((source, kind), None)
+
+    def get_stats(self, top: int = 20) -> dict:
+        """
+        統計情報を取得する
+
+        Args:
+            top: 送信元ごとの統計に含める件数（制限・破棄の多い順）
+
+        Returns:
+            dict: 統計情報
+        """
+        ranked = sorted(
+            self.sources.items(),
+            key=lambda item: (item[1].throttled + item[1].rejected, item[1].accepted),
+            reverse=True,
+        )
+        return {
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "sources": {source: stats.to_dict() for source, stats in ranked[:top]},
+        }
+
+
+class LatestSetpoint:
+    """
+    制御ループに渡すジョイスティック目標値（最後に受け付けた値が優先）
+
+    複数の送信元が競合した場合も、送信元を順番に混ぜることはせず、最後に受け付けた1つの値だけを適用する。
+    送信元間の公平性はアドミッション制御（トークンバケット）で確保する
+    """
+
+    __slots__ = ("_pending",)
+
+    def __init__(self):
+        # (front, side, 受信時刻, 期限)、未処理の値がない場合はNone
+        self._pending: tuple[int, int, float, float] | None = None
+
+    def put(self, front: int, side: int, received_at: float, expires_at: float = math.inf) -> bool:
+        """
+        目標値を更新する（未処理の値は送信元に関係なく上書きする）
+
+        Args:
+            front: 前後方向の値
+            side: 左右方向の値
+            received_at: 受信時刻（UNIX時刻）
+            expires_at: この時刻（UNIX時刻）を過ぎたら書き込まない
+
+        Returns:
+            bool: 未処理の値を上書きした場合はTrue
+        """
+        overwritten = self._pending is not None
+        self._pending = (front, side, received_at, expires_at)
+        return overwritten
+
+    def pop(self) -> tuple[int, int, float, float] | None:
+        """
+        未処理の目標値を取り出す
+
+        Returns:
+            tuple | None: (front, side, 受信時刻, 期限)、未処理の値がない場合はNone
+        """
+        pending = self._pending
+        self._pending = None
+        return pending
+
+    def clear(self) -> None:
+        """未処理の値を破棄する"""
+        self._pending = None
+
+    def __bool__(self) -> bool:
+        return self._pending is not None
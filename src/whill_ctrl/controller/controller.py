@@ -4,27 +4,152 @@ OSCとMQTTからの入力を統合的に処理し、WHILLデバイスを制御
 """
 
 import asyncio
+import math
+import time
+from collections.abc import Callable
 
 from loguru import logger
 
+from ..diagnostics.loop_monitor import LoopMonitor
+from ..ipc.shared import SharedSetpoint
+from ..recording.recorder import (
+    COMMANDS,
+    FLAG_EXPIRED,
+    FLAG_KEEPALIVE,
+    FLAG_OUT_OF_ORDER,
+    FLAG_THROTTLED,
+    KIND_COMMAND,
+    KIND_INPUT,
+    KIND_WRITE,
+    Recorder,
+)
+from ..recording.telemetry_store import TelemetryStore
 from ..whill.interface import AbstractWHILL
+from .admission import AdmissionControl, LatestSetpoint
+from .events import EventBus
+from .filters import DuplicateSuppressor, SetpointFilter
+from .freshness import CommandFreshness
+from .idle import IdleMonitor
+from .send_rate import AdaptiveSendRate, LinkCalibration
 
 
 class WHILLController:
     """WHILLデバイスを統合的に制御するコントローラー"""
 
-    def __init__(self, whill: AbstractWHILL):
+    def __init__(
+        self,
+        whill: AbstractWHILL,
+        command_deadline: float = 0.5,
+        *,
+        control_rate: float = 50.0,
+        deadzone: float = 0.0,
+        smoothing: float = 0.0,
+        slew_rate: float = 0.0,
+        keepalive: float = 0.0,
+        suppress_duplicates: bool = False,
+        telemetry_interval: float = 0.1,
+        admission: AdmissionControl | None = None,
+        send_rate: AdaptiveSendRate | None = None,
+        calibration_frames: int = 50,
+        idle: IdleMonitor | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
         """
         WHILLコントローラーを初期化
 
         Args:
             whill: WHILLデバイスインターフェース
+            command_deadline: ジョイスティックコマンドの有効期限（秒）、0以下で無効
+            control_rate: ジョイスティック送信の最大レート（Hz）、0以下で制限なし
+            deadzone: デッドゾーンの閾値、0で無効
+            smoothing: 指数平滑化の時定数（秒）、0で無効
+            slew_rate: 1秒あたりの最大変化量、0で無効
+            keepalive: 同じ値を再送する間隔（秒）、0で再送しない
+            suppress_duplicates: 直前に送信した値と同じ入力の送信を省略する（無効の場合は入力ごとに送信する）
+            telemetry_interval: デバイスからテレメトリを読み取る間隔（秒）、0以下で読み取らない
+            admission: 送信元ごとのアドミッション制御（Noneの場合はデフォルトの制限を使用）
+            send_rate: 送信レートの自動調整（Noneの場合はcontrol_rateを上限とするデフォルトの設定を使用）
+            calibration_frames: 接続時のキャリブレーションで書き込むフレーム数、0でキャリブレーションしない
+            idle: アイドル状態の管理（Noneの場合はデフォルトの設定を使用）
+            clock: レート制限と進行状況の確認に使う単調時計（秒）。ベンチマークではイベントループの時計を渡す
         """
         self.whill = whill
+        self.clock = clock
+
+        # 期限切れ・順序逆転したジョイスティックコマンドを破棄するゲート
+        self.freshness = CommandFreshness(command_deadline)
+
+        # 送信元・コマンド種別ごとのレート制限と、制御ループに渡す目標値（最後に受け付けた値が優先）
+        self.admission = admission or AdmissionControl()
+        self.setpoint = LatestSetpoint()
+
+        # ジョイスティックのフィルターチェーンと重複送信の抑制
+        self.control_rate = control_rate
+        self.setpoint_filter = SetpointFilter(deadzone, smoothing, slew_rate)
+        self.suppressor = DuplicateSuppressor(keepalive, suppress_duplicates)
+        # リンクの容量と書き込み遅延に合わせた送信レート（control_rateを上限とする）
+        self.send_rate = send_rate or AdaptiveSendRate(control_rate)
+        self.send_rate.configure(max_rate=control_rate)
+        self.calibration_frames = calibration_frames
+        self.calibration_task = None
+        self._setpoint_event = asyncio.Event()
+        # 次の書き込みの予定時刻（前の予定時刻から送信周期ごとに進める、書き込みの遅延で周期が延びないようにする）
+        self._next_write_at = 0.0
+        # 緊急停止のたびに進める世代番号（停止前に計算した値を送らないため）
+        self._stop_generation = 0
+
+        # 誰も操作していない間のアイドル状態（キープアライブを止め、各ループの間隔を延ばす）
+        self.idle = idle or IdleMonitor()
+        self.idle_task = None
+
+        # ジョイスティック入力の統計
+        self.joystick_inputs = 0
+        self.joystick_coalesced = 0
+        # 現在の目標値の受信時刻（UNIX時刻、遅延の記録用）
+        self._target_received_at = math.nan
+
+        # コマンド・遅延トレースのレコーダー（記録する場合のみ設定）
+        self.recorder: Recorder | None = None
+        # テレメトリと統計の列指向ストア（記録する場合のみ設定、テレメトリの読み取りごとに追記する）
+        self.telemetry_store: TelemetryStore | None = None
+
+        # 状態の変化・テレメトリを利用者へ配るイベントバス
+        self.events = EventBus()
+
+        # イベントループの遅延モニター（アプリケーションが設定する）
+        self.loop_monitor: LoopMonitor | None = None
+
+        # 共有メモリの目標値スロット（IPCサーバーが設定する、送信周期ごとに読み取る）
+        self.shared_setpoint: SharedSetpoint | None = None
+        # 統計を取得するIPCサーバー（IPCサーバーが設定する）
+        self.ipc_server = None
+        # 統計を取得するフリートの受信器（アプリケーションが設定する）
+        self.fleet = None
+        # 統計を取得するOSCのまとめ読み（アプリケーションが設定する）
+        self.osc_batching = None
+        # 統計を取得するOSCのタスク（アプリケーションが設定する）
+        self.osc_tasks = None
+        # 稼働系・待機系のリース（アプリケーションが設定する）
+        self.lease = None
+        # systemdのウォッチドッグ（アプリケーションが設定する）
+        self.watchdog = None
 
         # 排他制御のためのロック
         self.command_lock = asyncio.Lock()
 
+        # 制御ループのタスク
+        self.control_task = None
+        # 制御ループが起床して処理を始めた時刻と、デバイスへの書き込みを始めた時刻（self.clock()、
+        # 処理中・書き込み中でなければNone、ウォッチドッグが停止の検出に使う）
+        self.control_busy_since: float | None = None
+        self.write_started: float | None = None
+
+        # 最新のテレメトリ（バッテリー残量、モーター速度など）と読み取りタスク
+        self.telemetry_interval = telemetry_interval
+        self.telemetry: dict = {}
+        self.telemetry_at = 0.0
+        self.telemetry_task = None
+
         # 再接続用のフラグとタスク
         self.reconnect_task = None
         self.running = False
@@ -33,9 +158,23 @@ class WHILLController:
         """コントローラーを開始する"""
         self.running = True
 
+        # 制御ループを開始
+        self.control_task = asyncio.create_task(self._control_loop())
+
         # 接続監視タスクを開始
         self.reconnect_task = asyncio.create_task(self.monitor_connection())
 
+        # リンクの容量を計測（制御ループの書き込みとはフレームごとにロックで交互に行う）
+        if self.calibration_frames > 0 and self.whill.is_connected():
+            self.calibration_task = asyncio.create_task(self.calibrate_link())
+
+        # テレメトリの読み取りを開始
+        if self.telemetry_interval > 0:
+            self.telemetry_task = asyncio.create_task(self._telemetry_loop())
+
+        # コマンドが届かない時間を監視
+        self.idle_task = asyncio.create_task(self.idle.run(self._at_rest))
+
         logger.info("WHILL controller started")
         return True
 
@@ -44,18 +183,61 @@ class WHILLController:
         self.running = False
 
         # 実行中のタスクをキャンセル
-        if self.reconnect_task:
-            self.reconnect_task.cancel()
-            try:
-                await self.reconnect_task
-            except asyncio.CancelledError:
-                pass
+        for task in (
+            self.control_task,
+            self.reconnect_task,
+            self.telemetry_task,
+            self.calibration_task,
+            self.idle_task,
+        ):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
 
         # WHILLデバイスを切断
         await self.whill.disconnect()
 
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.telemetry_store is not None:
+            self.telemetry_store.close()
+
         logger.info("WHILL controller stopped")
 
+    def configure_joystick(
+        self,
+        *,
+        control_rate: float | None = None,
+        deadzone: float = 0.0,
+        smoothing: float = 0.0,
+        slew_rate: float = 0.0,
+        keepalive: float | None = None,
+        suppress_duplicates: bool | None = None,
+    ) -> None:
+        """
+        ジョイスティックのフィルターチェーンと送信レートを変更する
+
+        Args:
+            control_rate: ジョイスティック送信の最大レート（Hz）、Noneで変更しない
+            deadzone: デッドゾーンの閾値、0で無効
+            smoothing: 指数平滑化の時定数（秒）、0で無効
+            slew_rate: 1秒あたりの最大変化量、0で無効
+            keepalive: 同じ値を再送する間隔（秒）、Noneで変更しない
+            suppress_duplicates: 直前に送信した値と同じ入力の送信を省略する、Noneで変更しない
+        """
+        if control_rate is not None:
+            self.control_rate = control_rate
+            self.send_rate.configure(max_rate=control_rate)
+        if keepalive is not None:
+            self.suppressor.keepalive = keepalive
+        if suppress_duplicates is not None:
+            self.suppressor.suppress = suppress_duplicates
+        self.setpoint_filter.configure(deadzone, smoothing, slew_rate)
+        self._setpoint_event.set()
+
     async def handle_osc_command(self, command: str, **kwargs) -> None:
         """
         OSCからのコマンドを処理する
@@ -64,8 +246,7 @@ class WHILLController:
             command: コマンド名
             **kwargs: コマンドパラメータ
         """
-        async with self.command_lock:
-            await self._execute_command(command, **kwargs)
+        await self._handle_command(command, **kwargs)
 
     async def handle_mqtt_command(self, command: str, **kwargs) -> None:
         """
@@ -75,8 +256,322 @@ class WHILLController:
             command: コマンド名
             **kwargs: コマンドパラメータ
         """
+        await self._handle_command(command, **kwargs)
+
+    async def handle_ipc_command(self, command: str, **kwargs) -> None:
+        """
+        ローカルIPCからのコマンドを処理する
+
+        Args:
+            command: コマンド名
+            **kwargs: コマンドパラメータ
+        """
+        await self._handle_command(command, **kwargs)
+
+    async def handle_api_command(self, command: str, **kwargs) -> None:
+        """
+        組み込みAPIからのコマンドを処理する
+
+        Args:
+            command: コマンド名
+            **kwargs: コマンドパラメータ
+        """
+        await self._handle_command(command, **kwargs)
+
+    async def _handle_command(self, command: str, **kwargs) -> None:
+        """
+        コマンドを受け付ける（内部メソッド）
+
+        ジョイスティックはロックを待たずに目標値を更新して制御ループへ渡し、
+        その他のコマンドはロックを取得して順に実行する
+
+        Args:
+            command: コマンド名
+            **kwargs: コマンドパラメータ
+        """
+        if command == "joystick":
+            self.submit_joystick(**kwargs)
+            return
+
+        source = kwargs.get("source")
+        if not self.admission.admit(source, command, self.clock()):
+            logger.warning(f"Throttled {command} command from {source}")
+            if self.recorder is not None:
+                received_at = kwargs.get("received_at") or time.time()
+                self.recorder.record(
+                    KIND_COMMAND, received_at, source=source, flags=FLAG_THROTTLED, code=COMMANDS.get(command, 0)
+                )
+            return
+
+        self.idle.activity(kwargs.get("received_at"))
         async with self.command_lock:
-            await self._execute_command(command, **kwargs)
+            self.write_started = self.clock()
+            try:
+                await self._execute_command(command, **kwargs)
+            finally:
+                self.write_started = None
+        self.idle.woke()
+
+        if self.recorder is not None:
+            received_at = kwargs.get("received_at") or time.time()
+            self.recorder.record(KIND_COMMAND, received_at, time.time(), source=source, code=COMMANDS.get(command, 0))
+
+    def submit_joystick(
+        self,
+        front: int = 0,
+        side: int = 0,
+        *,
+        source: str | None = None,
+        seq: int | None = None,
+        sent_at: float | None = None,
+        received_at: float | None = None,
+    ) -> bool:
+        """
+        ジョイスティックの目標値を更新する
+
+        送信元ごとのレート制限を超えたもの、期限切れや順序が逆転したものは破棄する。受け付けた値は
+        ループが処理する前に届いた次の値で、送信元に関係なく上書きされる（最後に受け付けた値が優先）。
+        制御ループは最新の値をフィルターに通してデバイスへ送信する
+
+        Args:
+            front: 前後方向の値（-100～100）
+            side: 左右方向の値（-100～100）
+            source: 送信元の識別子
+            seq: クライアントのシーケンス番号
+            sent_at: クライアントの送信時刻（サーバー時計換算のUNIX時刻）
+            received_at: サーバーの受信時刻（UNIX時刻）
+
+        Returns:
+            bool: 受け付けた場合はTrue
+        """
+        if received_at is None:
+            received_at = time.time()
+
+        if not self.admission.admit(source, "joystick", self.clock()):
+            if self.recorder is not None:
+                self.recorder.record(
+                    KIND_INPUT, received_at, source=source, flags=FLAG_THROTTLED, front=front, side=side, seq=seq or 0
+                )
+            return False
+
+        expired = self.freshness.expired
+        if not self.freshness.admit(source, seq, sent_at, received_at):
+            self.admission.reject(source)
+            logger.debug(f"Discarded stale joystick command: front={front}, side={side}, source={source}, seq={seq}")
+            if self.recorder is not None:
+                flags = FLAG_EXPIRED if self.freshness.expired != expired else FLAG_OUT_OF_ORDER
+                self.recorder.record(
+                    KIND_INPUT, received_at, source=source, flags=flags, front=front, side=side, seq=seq or 0
+                )
+            return False
+
+        if self.recorder is not None:
+            self.recorder.record(KIND_INPUT, received_at, source=source, front=front, side=side, seq=seq or 0)
+
+        self.joystick_inputs += 1
+        self.idle.activity(received_at)
+        if self.setpoint.put(front, side, received_at, self.freshness.expires_at(sent_at, received_at)):
+            # 制御ループが前の値を処理する前に上書きされた
+            self.joystick_coalesced += 1
+        self._setpoint_event.set()
+        return True
+
+    def wake(self) -> None:
+        """制御ループを起こし、共有メモリの目標値をすぐに読み取らせる"""
+        self._setpoint_event.set()
+
+    def _poll_shared_setpoint(self) -> None:
+        """共有メモリの目標値が更新されていれば受け付ける"""
+        update = self.shared_setpoint.poll()
+        if update is not None:
+            front, side, seq, sent_at = update
+            self.submit_joystick(
+                front,
+                side,
+                source=f"shm:{self.shared_setpoint.name}",
+                seq=seq,
+                sent_at=sent_at,
+                received_at=time.time(),
+            )
+
+    async def _control_loop(self) -> None:
+        """
+        ジョイスティックの目標値をフィルターに通してデバイスへ送信するループ
+
+        新しい目標値が届くとすぐに起床し、送信レートの上限内でまとめて処理する
+        フィルターが収束するまでは送信周期ごとに、収束後はキープアライブの間隔で起床する
+        共有メモリの目標値スロットがある場合は、送信周期ごとに起床して読み取る
+        アイドル中はキープアライブを送らず、共有メモリはアイドル中の読み取り間隔で読み取る
+        """
+        loop = asyncio.get_running_loop()
+        last_run = loop.time()
+        settled = True
+
+        while self.running:
+            self.control_busy_since = None
+            rate = self.send_rate.rate
+            period = 1.0 / rate if rate > 0 else 0.02
+            idle = self.idle.idle
+            if self.shared_setpoint is not None:
+                timeout = max(period, self.idle.poll_interval) if idle else period
+            elif not settled:
+                timeout = period
+            else:
+                timeout = None if idle else self.suppressor.next_keepalive(loop.time())
+            try:
+                await asyncio.wait_for(self._setpoint_event.wait(), timeout)
+            except TimeoutError:
+                pass
+            self.control_busy_since = self.clock()
+            if self.shared_setpoint is not None:
+                self._poll_shared_setpoint()
+
+            # 送信レートの上限を超えないよう予定時刻まで待機（その間に届いた値はまとめられる）
+            if rate > 0:
+                wait = self._next_write_at - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            self._setpoint_event.clear()
+
+            # 最後に受け付けた目標値をフィルターに渡す（送信レートの待機中に期限が切れた値は渡さない）
+            pending = self.setpoint.pop()
+            if pending is not None and time.time() > pending[3]:
+                self._discard_expired(pending)
+                pending = None
+            fresh = pending is not None
+            if fresh:
+                target = self.setpoint_filter.target
+                previous = (target.front, target.side, self._target_received_at)
+                self.setpoint_filter.set_target(pending[0], pending[1])
+                self._target_received_at = pending[2]
+
+            now = loop.time()
+            # 収束後に長く待機していた場合の経過時間で、フィルターが一気に進まないようにする
+            dt = min(now - last_run, period)
+            last_run = now
+
+            generation = self._stop_generation
+            settled = self.setpoint_filter.run(dt)
+            front = int(round(self.setpoint_filter.output.front))
+            side = int(round(self.setpoint_filter.output.side))
+            repeat = front == self.suppressor.last_front and side == self.suppressor.last_side
+            if repeat and self.idle.idle:
+                continue
+            if not self.suppressor.should_send(front, side, now, fresh):
+                # 送信の必要がなければ、復帰後の処理はここで完了する
+                self.suppressor.record_suppressed()
+                self.idle.woke()
+                continue
+
+            try:
+                async with self.command_lock:
+                    # ロック待ちの間に緊急停止された場合は送信しない
+                    if generation != self._stop_generation:
+                        continue
+                    # ロック待ちの間に期限が切れた目標値は送らず、前の目標値に戻す
+                    if fresh and time.time() > pending[3]:
+                        self._discard_expired(pending)
+                        self.setpoint_filter.set_target(previous[0], previous[1])
+                        self._target_received_at = previous[2]
+                        settled = False
+                        continue
+                    write_started = loop.time()
+                    self._advance_schedule(write_started, period if rate > 0 else 0.0)
+                    self.write_started = self.clock()
+                    try:
+                        await self.whill.send_joystick(front=front, side=side)
+                    finally:
+                        self.write_started = None
+                    # 書き込めなかった値（切断中・書き込みの失敗）は送信済みとして記録しない（再接続後に送り直す）
+                    if not self.whill.is_connected():
+                        continue
+                    self.suppressor.record_sent(front, side, write_started, fresh)
+                write_done = loop.time()
+                self.send_rate.observe(write_done - write_started, write_done)
+                self.idle.woke()
+
+                if self.recorder is not None:
+                    self.recorder.record(
+                        KIND_WRITE,
+                        self._target_received_at,
+                        time.time(),
+                        flags=FLAG_KEEPALIVE if repeat and not fresh else 0,
+                        front=front,
+                        side=side,
+                        value=write_done - write_started,
+                    )
+            except Exception as e:
+                logger.error(f"Error in control loop: {e}")
+
+    def _discard_expired(self, pending: tuple[int, int, float, float]) -> None:
+        """受け付けた後、書き込む前に期限が切れた目標値を破棄する"""
+        self.freshness.expire()
+        logger.debug(
+            f"Discarded joystick setpoint that expired before the write: front={pending[0]}, side={pending[1]}"
+        )
+
+    def _advance_schedule(self, write_started: float, period: float) -> None:
+        """
+        書き込みを始めた時刻から次の書き込みの予定時刻を決める
+
+        予定時刻から1周期以内に書き込みを始めた場合は前の予定時刻から1周期進め、書き込みの遅延や起床の遅れが
+        周期に積み重ならないようにする（送信レートは 1/(周期+書き込み遅延) ではなく 1/周期 になる）。
+        アイドル後の起床や書き込みが周期より遅い場合など1周期以上遅れている場合は、遅れを取り戻すために
+        まとめて送らず、書き込みを始めた時刻から数え直す
+        """
+        deadline = self._next_write_at
+        if write_started - deadline >= period:
+            deadline = write_started
+        self._next_write_at = deadline + period
+
+    async def calibrate_link(self, frames: int | None = None) -> dict | None:
+        """
+        シリアルリンクの容量を計測し、送信レートの上限に反映する
+
+        フィルターの現在の出力（停止中は0）をフレームごとに書き込み、送信完了まで待って持続的な書き込みレートと
+        書き込み遅延を計測する。ロックはフレームごとに取得・解放するため、計測中も緊急停止や制御ループの書き込みは
+        1フレーム以上待たされない。緊急停止・切断・停止された場合は計測を中止する
+
+        Args:
+            frames: 書き込むフレーム数（Noneの場合は設定値）
+
+        Returns:
+            dict | None: 計測結果、切断中・計測を中止した場合はNone
+        """
+        frames = frames or self.calibration_frames or 50
+        loop = asyncio.get_running_loop()
+        generation = self._stop_generation
+        latencies = []
+        for _ in range(frames):
+            async with self.command_lock:
+                if generation != self._stop_generation or not self.running:
+                    logger.warning("Link calibration aborted: emergency stop or shutdown")
+                    return None
+                if not self.whill.is_connected():
+                    logger.warning("Link calibration aborted: device disconnected")
+                    return None
+                # 制御ループが次に送る値と同じ値を書き込む（古い送信済みの値は再送しない）
+                front = int(round(self.setpoint_filter.output.front))
+                side = int(round(self.setpoint_filter.output.side))
+                write_started = loop.time()
+                await self.whill.send_joystick(front=front, side=side)
+                await self.whill.drain()
+                latencies.append(loop.time() - write_started)
+        # フレームの間に制御ループが書き込んだ時間は含めない
+        elapsed = sum(latencies)
+
+        calibration = LinkCalibration(latencies, elapsed)
+        self.send_rate.apply_calibration(calibration)
+        result = {**calibration.to_dict(), "send_rate": round(self.send_rate.rate, 1)}
+        logger.info(
+            f"Link calibrated: capacity {result['capacity_hz']} Hz, write latency p50 "
+            f"{result['write_latency_p50_ms']} ms / p95 {result['write_latency_p95_ms']} ms, "
+            f"send rate {result['send_rate']} Hz"
+        )
+        if self.recorder is not None:
+            self.recorder.event("link_calibrated")
+        self.publish_state("link_calibrated")
+        return result
 
     async def _execute_command(self, command: str, **kwargs) -> None:
         """
@@ -86,19 +581,187 @@ class WHILLController:
             command: コマンド名
             **kwargs: コマンドパラメータ
         """
-        if command == "joystick":
-            front = kwargs.get("front", 0)
-            side = kwargs.get("side", 0)
-            await self.whill.send_joystick(front=front, side=side)
-
-        elif command == "power_on":
+        if command == "power_on":
             await self.whill.send_power_on()
 
         elif command == "power_off":
             await self.whill.send_power_off()
 
         elif command == "emergency_stop":
+            # フィルターの状態を捨てて即座に停止し、制御ループが古い目標値を送らないようにする
+            self._stop_generation += 1
+            self.setpoint.clear()
+            self.setpoint_filter.reset()
             await self.whill.send_emergency_stop()
+            if self.whill.is_connected():
+                self.suppressor.mark_sent(0, 0, asyncio.get_running_loop().time())
+            else:
+                # 停止を書き込めなかった場合は、再接続後に制御ループが停止の値を送り直す
+                self.suppressor.forget()
+
+    async def _telemetry_loop(self) -> None:
+        """デバイスのテレメトリを定期的に読み取る"""
+        while self.running:
+            if self.whill.is_connected():
+                telemetry = await self.whill.read_telemetry()
+                if telemetry:
+                    self.telemetry = telemetry
+                    self.telemetry_at = time.time()
+                    if self.events.telemetry.active:
+                        self.events.telemetry.publish(telemetry, self.telemetry_at)
+            store = self.telemetry_store
+            if store is not None and store.due():
+                store.append(self.telemetry_row())
+            await self.idle.sleep(self.telemetry_interval, self.idle.telemetry_interval)
+
+    def telemetry_row(self) -> dict:
+        """
+        テレメトリストアへ記録する1行を作成する
+
+        切断中はテレメトリの値を記録しない（NaNになる）
+
+        Returns:
+            dict: 時刻・接続状態・送信済みのセットポイント・テレメトリ・累積カウンター
+        """
+        connected = self.whill.is_connected()
+        return {
+            **(self.telemetry if connected else {}),
+            "t": time.time(),
+            "connected": connected,
+            "front": self.suppressor.last_front or 0,
+            "side": self.suppressor.last_side or 0,
+            "joystick_inputs": self.joystick_inputs,
+            "joystick_writes": self.suppressor.sent,
+            "expired": self.freshness.expired,
+            "throttled": self.admission.throttled,
+        }
+
+    def _at_rest(self) -> bool:
+        """車椅子が停止しているか（送信済みの値が0で、未処理の目標値がない）"""
+        return (
+            not self.suppressor.last_front
+            and not self.suppressor.last_side
+            and not self.setpoint
+            and not self._setpoint_event.is_set()
+        )
+
+    def progress_stall(self, stall_timeout: float) -> str | None:
+        """
+        制御ループとデバイスへの書き込みが進んでいるかを確認する（ウォッチドッグ用）
+
+        新しい目標値を待っている間は進んでいるとみなし、起床後の処理や書き込みが戻らない場合を停止とする
+
+        Args:
+            stall_timeout: 停止とみなす時間（秒）
+
+        Returns:
+            str | None: 停止している場合は理由、進んでいる場合はNone
+        """
+        if self.control_task is None or self.control_task.done():
+            return "control loop is not running"
+        now = self.clock()
+        started = self.write_started
+        if started is not None and now - started > stall_timeout:
+            return f"serial write pending for {now - started:.1f}s"
+        busy = self.control_busy_since
+        if busy is not None and now - busy > stall_timeout:
+            return f"control loop stuck for {now - busy:.1f}s"
+        return None
+
+    def snapshot(self) -> dict:
+        """
+        接続状態・送信済みのセットポイント・テレメトリをまとめて取得する
+
+        Returns:
+            dict: connected, mode, port, front, side と最新のテレメトリ
+        """
+        status = self.whill.get_status()
+        return {
+            "connected": status["connected"],
+            "mode": status["mode"],
+            "port": status["port"],
+            **self.send_rate.get_status(),
+            "front": self.suppressor.last_front or 0,
+            "side": self.suppressor.last_side or 0,
+            **self.telemetry,
+        }
+
+    def queue_depth(self) -> int:
+        """
+        制御経路で処理を待っている件数を取得する
+
+        イベントループの実行待ちコールバック、未送信のジョイスティック目標値、コマンドロックの待ちの合計
+
+        Returns:
+            int: 待ち件数
+        """
+        depth = len(getattr(asyncio.get_running_loop(), "_ready", ()))
+        if self._setpoint_event.is_set():
+            depth += 1
+        waiters = getattr(self.command_lock, "_waiters", None)
+        if waiters:
+            depth += len(waiters)
+        return depth
+
+    async def fetch_stats(self) -> dict:
+        """統計情報を取得する（入力スレッドのブリッジと共通の非同期インターフェース）"""
+        return self.get_stats()
+
+    def get_stats(self) -> dict:
+        """
+        コントローラーの統計情報を取得する
+
+        Returns:
+            dict: 統計情報
+        """
+        suppressor = self.suppressor
+        # フィルターを通った結果、入力1件につき1回の送信から削減できた送信回数
+        writes_saved = max(0, self.joystick_inputs - (suppressor.sent - suppressor.keepalives))
+        stats = {
+            "joystick": {
+                **self.freshness.get_stats(),
+                "inputs": self.joystick_inputs,
+                "coalesced": self.joystick_coalesced,
+                "writes": suppressor.sent,
+                "suppressed": suppressor.suppressed,
+                "keepalives": suppressor.keepalives,
+                "writes_saved": writes_saved,
+            }
+        }
+        stats["admission"] = self.admission.get_stats()
+        stats["send_rate"] = self.send_rate.get_stats()
+        stats["idle"] = self.idle.get_stats(suppressor.keepalive, self.telemetry_interval)
+        device = self.whill.get_stats()
+        if device:
+            stats["device"] = device
+        if self.loop_monitor is not None:
+            stats["loop"] = self.loop_monitor.get_stats()
+        if self.ipc_server is not None:
+            stats["ipc"] = self.ipc_server.get_stats()
+        if self.fleet is not None:
+            stats["fleet"] = self.fleet.get_stats()
+        if self.osc_batching is not None:
+            stats["osc_batching"] = self.osc_batching.get_stats()
+        if self.osc_tasks is not None:
+            stats["osc_tasks"] = self.osc_tasks.get_stats()
+        if self.telemetry_store is not None:
+            stats["telemetry_store"] = self.telemetry_store.get_stats()
+        if self.lease is not None:
+            stats["lease"] = self.lease.get_stats()
+        if self.watchdog is not None:
+            stats["watchdog"] = self.watchdog.get_stats()
+        stats["events"] = self.events.get_stats()
+        return stats
+
+    def publish_state(self, name: str) -> None:
+        """
+        デバイスとの接続・リンクの状態の変化をイベントバスへ発行する
+
+        Args:
+            name: 変化の種類
+        """
+        if self.events.state.active:
+            self.events.state.publish(name, self.whill.is_connected(), self.whill.port, time.time())
 
     async def change_port(self, new_port: str) -> bool:
         """
@@ -110,11 +773,42 @@ class WHILLController:
         Returns:
             bool: 接続成功状態
         """
+        received_at = time.time()
         async with self.command_lock:
             logger.info(f"Changing WHILL port to: {new_port}")
 
             # 接続試行
-            return await self.whill.reconnect(port=new_port)
+            success = await self.whill.reconnect(port=new_port)
+
+        if success:
+            self._resend_after_reconnect()
+            if self.calibration_frames > 0:
+                await self.calibrate_link()
+
+        if self.recorder is not None:
+            self.recorder.record(KIND_COMMAND, received_at, time.time(), code=COMMANDS["change_port"])
+        self.publish_state("port_changed")
+        return success
+
+    def seed_setpoint(self, front: int, side: int) -> None:
+        """
+        稼働系が送信済みの値から制御を再開する（待機系が引き継いだ場合）
+
+        フィルターの出力を引き継いだ値から始めて、次の制御周期でその値を送る（新しい入力が届くまで保持する）
+
+        Args:
+            front: 稼働系が送信済みの前後方向の値
+            side: 稼働系が送信済みの左右方向の値
+        """
+        self.setpoint_filter.seed(front, side)
+        self._target_received_at = time.time()
+        self._setpoint_event.set()
+        logger.info(f"Seeded the setpoint from the previous controller: front={front}, side={side}")
+
+    def _resend_after_reconnect(self) -> None:
+        """再接続後に、送信済みの値と同じでも現在の目標値を送り直す（切断前の書き込みが届いたとは限らないため）"""
+        self.suppressor.forget()
+        self._setpoint_event.set()
 
     async def monitor_connection(self) -> None:
         """WHILLデバイスの接続状態を監視し、必要に応じて再接続を試みる"""
@@ -126,21 +820,32 @@ class WHILLController:
             try:
                 # 接続状態を確認
                 if not self.whill.is_connected():
+                    if current_interval == reconnect_interval:
+                        if self.recorder is not None:
+                            self.recorder.event("device_disconnected")
+                        self.publish_state("device_disconnected")
                     logger.info(f"WHILL device disconnected, attempting to reconnect in {current_interval}s...")
                     await asyncio.sleep(current_interval)
 
                     # 再接続を試みる
                     success = await self.whill.reconnect()
 
+                    if self.recorder is not None:
+                        self.recorder.event("device_reconnected" if success else "device_reconnect_failed")
+                    self.publish_state("device_reconnected" if success else "device_reconnect_failed")
+
                     if success:
                         logger.info("Successfully reconnected to WHILL device")
+                        self._resend_after_reconnect()
+                        if self.calibration_frames > 0:
+                            await self.calibrate_link()
                         current_interval = reconnect_interval  # 成功したら間隔をリセット
                     else:
                         # 接続失敗時は間隔を増やす（指数バックオフ）
                         current_interval = min(current_interval * 2, max_interval)
                 else:
-                    # 接続中は長めの間隔でチェック
-                    await asyncio.sleep(10)
+                    # 接続中は長めの間隔でチェック（アイドル中はさらに延ばす）
+                    await self.idle.sleep(10, self.idle.connection_check_interval)
                     current_interval = reconnect_interval  # 接続中なら間隔をリセット
 
             except Exception as e:
@@ -0,0 +1,280 @@
+"""
+プロセス内のイベントバス
+
+コントローラーが状態の変化とテレメトリを種類ごとのチャンネルに発行し、
+状態通知・テレメトリの配信などの利用者はチャンネルを購読して受け取る。利用者を追加しても発行側を変更する必要はない
+（コマンドは入力経路からコントローラーを直接呼び出す。記録は漏れがあってはならないため、捨てる方針のあるバスは使わない）
+
+- イベントは __slots__ のクラスで、チャンネルが事前に作成したリングを順に再利用し、1回の発行を全購読者で共有する
+  （購読者は変更しない）。キューや購読者がまだ参照しているイベントは上書きせず、そのスロットだけ新しく作り直す。
+  リングは購読者のキューの上限より2つ多く作るため、購読者が追いついていれば発行のたびにイベントを作らない
+- 購読者ごとに上限のあるキュー（collections.deque）を持ち、あふれた場合は購読時に選んだ方針で捨てる
+  - drop_oldest: 最も古いイベントを捨てる（直近の履歴が必要な利用者）
+  - drop_newest: 新しいイベントを捨てる（古いものから順に漏れなく処理したい利用者）
+  - latest: 最新の1件だけを保持する（最新の状態だけが必要な利用者）
+- 発行は待機せず、購読者がいないチャンネルへの発行は省く（発行側で active を確認する）。
+  購読者の処理が遅れても、コマンドの経路は遅れない
+- 購読者は別スレッドのイベントループ（入力スレッド）から購読してもよい（起床は call_soon_threadsafe で行う）
+"""
+
+import asyncio
+import sys
+import threading
+from collections import deque
+from collections.abc import AsyncIterator
+
+# あふれた場合の方針
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+LATEST = "latest"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, LATEST)
+
+
+def _refcount(ring: list, index: int) -> int:
+    """リングのスロットのイベントの参照数"""
+    return sys.getrefcount(ring[index])
+
+
+# リングだけが参照しているイベントの参照数（同じ関数で測り、インタープリターによる違いを吸収する）
+_RING_ONLY = _refcount([object()], 0)
+
+
+class StateEvent:
+    """デバイスとの接続・リンクの状態の変化"""
+
+    __slots__ = ("name", "connected", "port", "at")
+
+    def __init__(self):
+        self.name = ""
+        self.connected = False
+        self.port: str | None = None
+        self.at = 0.0
+
+    def set(self, name: str, connected: bool, port: str | None, at: float) -> None:
+        """
+        Args:
+            name: 変化の種類（device_disconnected, device_reconnected, device_reconnect_failed,
+                  port_changed, link_calibrated）
+            connected: 変化後にデバイスへ接続しているかどうか
+            port: シリアルポート名
+            at: 発生時刻（UNIX時刻）
+        """
+        self.name = name
+        self.connected = connected
+        self.port = port
+        self.at = at
+
+
+class TelemetryEvent:
+    """デバイスから読み取ったテレメトリ"""
+
+    __slots__ = ("telemetry", "at")
+
+    def __init__(self):
+        self.telemetry: dict = {}
+        self.at = 0.0
+
+    def set(self, telemetry: dict, at: float) -> None:
+        """
+        Args:
+            telemetry: テレメトリ（コントローラーが保持するものと同じ辞書、変更しない）
+            at: 読み取り時刻（UNIX時刻）
+        """
+        self.telemetry = telemetry
+        self.at = at
+
+
+class Subscription[T]:
+    """チャンネルの購読（上限のあるキュー）"""
+
+    __slots__ = ("channel", "policy", "capacity", "_queue", "_loop", "_thread", "_waiter", "delivered", "dropped")
+
+    def __init__(self, channel: "Channel[T]", capacity: int, policy: str):
+        """
+        Args:
+            channel: 購読するチャンネル
+            capacity: キューの上限（latestでは1）
+            policy: あふれた場合の方針（drop_oldest, drop_newest, latest）
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown drop policy: {policy}")
+        self.channel = channel
+        self.policy = policy
+        self.capacity = 1 if policy == LATEST else max(1, capacity)
+        # drop_oldestとlatestはmaxlenで古いものが押し出される
+        self._queue: deque[T] = deque(maxlen=None if policy == DROP_NEWEST else self.capacity)
+        # 購読したスレッドのイベントループ（起床に使う）
+        self._loop = asyncio.get_running_loop()
+        self._thread = threading.get_ident()
+        self._waiter: asyncio.Future | None = None
+
+        # 統計カウンター
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, event: T) -> None:
+        """イベントをキューへ入れ、待機中であれば起こす（発行側から呼ばれる）"""
+        queue = self._queue
+        if len(queue) >= self.capacity:
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+        queue.append(event)
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if threading.get_ident() == self._thread:
+                self._wake(waiter)
+            else:
+                self._loop.call_soon_threadsafe(self._wake, waiter)
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def get_nowait(self) -> T | None:
+        """
+        キューの先頭のイベントを取り出す
+
+        Returns:
+            イベント、キューが空の場合はNone
+        """
+        try:
+            event = self._queue.popleft()
+        except IndexError:
+            return None
+        self.delivered += 1
+        return event
+
+    async def get(self) -> T:
+        """イベントが届くまで待って取り出す"""
+        while True:
+            event = self.get_nowait()
+            if event is not None:
+                return event
+            self._waiter = self._loop.create_future()
+            # 待機を登録する前に届いたイベントを取りこぼさない
+            if self._queue:
+                self._waiter = None
+                continue
+            await self._waiter
+
+    def __aiter__(self) -> AsyncIterator[T]:
+        return self._iterate()
+
+    async def _iterate(self) -> AsyncIterator[T]:
+        while True:
+            yield await self.get()
+
+    def close(self) -> None:
+        """購読をやめる"""
+        self.channel.unsubscribe(self)
+
+    def get_stats(self) -> dict:
+        return {
+            "policy": self.policy,
+            "capacity": self.capacity,
+            "queued": len(self._queue),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class Channel[T]:
+    """1種類のイベントを発行するチャンネル"""
+
+    def __init__(self, name: str, event_type: type[T]):
+        """
+        Args:
+            name: チャンネル名（統計用）
+            event_type: イベントのクラス（引数なしで作成し、set() で値を設定する）
+        """
+        self.name = name
+        self.event_type = event_type
+        # 発行中に購読が変わっても反復に影響しないよう、変更のたびに作り直すタプル
+        self._subscribers: tuple[Subscription[T], ...] = ()
+        # 購読の追加・削除は入力スレッドからも行われるため直列化する（発行はロックを取らない）
+        self._lock = threading.Lock()
+        # 再利用するイベントのリング（購読のたびに購読者のキューの上限に合わせて広げる）
+        self._ring: list[T] = []
+        self._next = 0
+
+        # 統計カウンター
+        self.published = 0
+        # 参照が残っていたため作り直したイベントの数
+        self.allocated = 0
+
+    @property
+    def active(self) -> bool:
+        """購読者がいるかどうか（いなければ発行を省く）"""
+        return bool(self._subscribers)
+
+    def subscribe(self, capacity: int = 64, policy: str = DROP_OLDEST) -> Subscription[T]:
+        """
+        チャンネルを購読する（実行中のイベントループから呼ぶ）
+
+        Args:
+            capacity: キューの上限
+            policy: あふれた場合の方針（drop_oldest, drop_newest, latest）
+
+        Returns:
+            Subscription: 購読
+        """
+        subscription = Subscription(self, capacity, policy)
+        with self._lock:
+            self._subscribers = (*self._subscribers, subscription)
+            # 処理中の1件とキューの上限まで溜まった分を参照されていても、次のスロットは空いている
+            size = subscription.capacity + 2
+            ring = self._ring
+            if len(ring) < size:
+                self._ring = ring + [self.event_type() for _ in range(size - len(ring))]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription[T]) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    def publish(self, *values) -> None:
+        """
+        リングの次のイベントに値を設定し、全購読者のキューへ入れる（待機しない）
+
+        Args:
+            *values: イベントの set() の引数
+        """
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        ring = self._ring
+        index = self._next % len(ring)
+        self._next = index + 1
+        if _refcount(ring, index) > _RING_ONLY:
+            # キューや購読者がまだ参照しているイベントは上書きせず、スロットを作り直す
+            ring[index] = self.event_type()
+            self.allocated += 1
+        event = ring[index]
+        event.set(*values)
+        self.published += 1
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def get_stats(self) -> dict:
+        subscribers = self._subscribers
+        return {
+            "published": self.published,
+            "allocated": self.allocated,
+            "subscribers": len(subscribers),
+            "dropped": sum(s.dropped for s in subscribers),
+        }
+
+
+class EventBus:
+    """コントローラーのイベントチャンネル"""
+
+    def __init__(self):
+        self.state: Channel[StateEvent] = Channel("state", StateEvent)
+        self.telemetry: Channel[TelemetryEvent] = Channel("telemetry", TelemetryEvent)
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {channel.name: channel.get_stats() for channel in (self.state, self.telemetry)}
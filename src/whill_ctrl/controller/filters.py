@@ -0,0 +1,326 @@
+"""
+ジョイスティックのセットポイントを整形するフィルターチェーン
+デッドゾーン、スルーレート制限、指数平滑化と、重複送信の抑制を提供する
+
+各ステージは __slots__ を持つ状態オブジェクトを直接書き換えるため、
+制御ループの1ステップごとにオブジェクトを生成しない
+"""
+
+import math
+
+
+class Setpoint:
+    """ジョイスティックのセットポイント（-100～100）"""
+
+    __slots__ = ("front", "side")
+
+    def __init__(self, front: float = 0.0, side: float = 0.0):
+        self.front = front
+        self.side = side
+
+
+class Deadzone:
+    """中立付近の小さな入力を0にするステージ"""
+
+    __slots__ = ("threshold",)
+
+    def __init__(self, threshold: float):
+        """
+        Args:
+            threshold: この値以下の入力を0にする
+        """
+        self.threshold = threshold
+
+    def process(self, sp: Setpoint, dt: float) -> bool:
+        """
+        セットポイントを加工する
+
+        Args:
+            sp: 加工対象のセットポイント（書き換えられる）
+            dt: 前回からの経過時間（秒）
+
+        Returns:
+            bool: 出力が収束している場合はTrue
+        """
+        if abs(sp.front) <= self.threshold:
+            sp.front = 0.0
+        if abs(sp.side) <= self.threshold:
+            sp.side = 0.0
+        return True
+
+    def reset(self, front: float = 0.0, side: float = 0.0) -> None:
+        """
+        内部状態を指定した値に戻す
+
+        Args:
+            front: 前後方向の初期値
+            side: 左右方向の初期値
+        """
+
+
+class ExponentialSmoothing:
+    """時定数に基づく指数平滑化ステージ"""
+
+    __slots__ = ("tau", "_front", "_side")
+
+    def __init__(self, tau: float):
+        """
+        Args:
+            tau: 時定数（秒）
+        """
+        self.tau = tau
+        self._front = 0.0
+        self._side = 0.0
+
+    def process(self, sp: Setpoint, dt: float) -> bool:
+        k = 1.0 - math.exp(-dt / self.tau)
+        self._front += k * (sp.front - self._front)
+        self._side += k * (sp.side - self._side)
+
+        # 整数への丸めで変化しなくなったら目標値に一致させる
+        settled = True
+        if abs(sp.front - self._front) < 0.5:
+            self._front = sp.front
+        else:
+            settled = False
+        if abs(sp.side - self._side) < 0.5:
+            self._side = sp.side
+        else:
+            settled = False
+
+        sp.front = self._front
+        sp.side = self._side
+        return settled
+
+    def reset(self, front: float = 0.0, side: float = 0.0) -> None:
+        self._front = front
+        self._side = side
+
+
+class SlewRateLimit:
+    """単位時間あたりの変化量を制限するステージ"""
+
+    __slots__ = ("rate", "_front", "_side")
+
+    def __init__(self, rate: float):
+        """
+        Args:
+            rate: 1秒あたりの最大変化量
+        """
+        self.rate = rate
+        self._front = 0.0
+        self._side = 0.0
+
+    def process(self, sp: Setpoint, dt: float) -> bool:
+        step = self.rate * dt
+        self._front += max(-step, min(step, sp.front - self._front))
+        self._side += max(-step, min(step, sp.side - self._side))
+        settled = self._front == sp.front and self._side == sp.side
+        sp.front = self._front
+        sp.side = self._side
+        return settled
+
+    def reset(self, front: float = 0.0, side: float = 0.0) -> None:
+        self._front = front
+        self._side = side
+
+
+class SetpointFilter:
+    """目標セットポイントにステージを順に適用するフィルターチェーン"""
+
+    def __init__(self, deadzone: float = 0.0, smoothing: float = 0.0, slew_rate: float = 0.0):
+        """
+        フィルターチェーンを初期化
+
+        Args:
+            deadzone: デッドゾーンの閾値、0で無効
+            smoothing: 指数平滑化の時定数（秒）、0で無効
+            slew_rate: 1秒あたりの最大変化量、0で無効
+        """
+        self.target = Setpoint()
+        self.output = Setpoint()
+        self.stages: list = []
+        self.configure(deadzone, smoothing, slew_rate)
+
+    def configure(self, deadzone: float = 0.0, smoothing: float = 0.0, slew_rate: float = 0.0) -> None:
+        """
+        ステージ構成を変更する（出力の現在値は引き継ぐ）
+
+        Args:
+            deadzone: デッドゾーンの閾値、0で無効
+            smoothing: 指数平滑化の時定数（秒）、0で無効
+            slew_rate: 1秒あたりの最大変化量、0で無効
+        """
+        stages = []
+        if deadzone > 0:
+            stages.append(Deadzone(deadzone))
+        if smoothing > 0:
+            stages.append(ExponentialSmoothing(smoothing))
+        if slew_rate > 0:
+            stages.append(SlewRateLimit(slew_rate))
+
+        # 状態を持つステージは現在の出力から開始し、設定変更で出力が跳ばないようにする
+        for stage in stages:
+            stage.reset(self.output.front, self.output.side)
+        self.stages = stages
+
+    def set_target(self, front: float, side: float) -> None:
+        """目標セットポイントを設定する"""
+        self.target.front = front
+        self.target.side = side
+
+    def run(self, dt: float) -> bool:
+        """
+        目標値にステージを適用して出力を更新する
+
+        Args:
+            dt: 前回からの経過時間（秒）
+
+        Returns:
+            bool: 出力が目標値に収束している場合はTrue
+        """
+        out = self.output
+        out.front = self.target.front
+        out.side = self.target.side
+        settled = True
+        for stage in self.stages:
+            if not stage.process(out, dt):
+                settled = False
+        return settled
+
+    def seed(self, front: float, side: float) -> None:
+        """目標値・出力・各ステージの状態を指定した値にする（待機系が稼働系の値を引き継ぐ場合）"""
+        self.set_target(front, side)
+        self.output.front = front
+        self.output.side = side
+        for stage in self.stages:
+            stage.reset(front, side)
+
+    def reset(self) -> None:
+        """目標値・出力・各ステージの状態を中立に戻す（緊急停止用）"""
+        self.target.front = self.target.side = 0.0
+        self.output.front = self.output.side = 0.0
+        for stage in self.stages:
+            stage.reset()
+
+
+class DuplicateSuppressor:
+    """
+    直前に送信した値と同じセットポイントの送信を抑制する
+
+    新しい入力のない起床（フィルターの収束待ちなど）での同じ値は常に送らない。
+    新しい入力が届いた場合の同じ値は、suppress が有効な場合だけ抑制する（無効の場合は入力ごとに送信する）
+    """
+
+    __slots__ = (
+        "keepalive",
+        "suppress",
+        "last_front",
+        "last_side",
+        "last_sent_at",
+        "sent",
+        "suppressed",
+        "keepalives",
+    )
+
+    def __init__(self, keepalive: float, suppress: bool = False):
+        """
+        Args:
+            keepalive: 同じ値でもこの間隔（秒）ごとに再送する、0で再送しない
+            suppress: 新しい入力が直前に送信した値と同じ場合も送信を省略する
+        """
+        self.keepalive = keepalive
+        self.suppress = suppress
+        self.last_front: int | None = None
+        self.last_side: int | None = None
+        self.last_sent_at = 0.0
+
+        # 統計カウンター
+        self.sent = 0
+        self.suppressed = 0
+        self.keepalives = 0
+
+    def should_send(self, front: int, side: int, now: float, fresh: bool = False) -> bool:
+        """
+        送信すべきか判定する（判定のみで、送信済みの値や統計は変更しない）
+
+        書き込みが行われなかった・失敗した値を送信済みとして扱わないよう、書き込みに成功してから
+        record_sent() で記録する
+
+        Args:
+            front: 前後方向の値
+            side: 左右方向の値
+            now: 現在時刻（単調時計、秒）
+            fresh: 新しい入力を受けて計算した値かどうか
+
+        Returns:
+            bool: 送信すべき場合はTrue
+        """
+        if self.is_repeat(front, side, fresh):
+            return self.keepalive > 0 and now - self.last_sent_at >= self.keepalive
+        return True
+
+    def is_repeat(self, front: int, side: int, fresh: bool = False) -> bool:
+        """
+        直前に送信した値の再送として扱うか（送信する場合はキープアライブになる）
+
+        Args:
+            front: 前後方向の値
+            side: 左右方向の値
+            fresh: 新しい入力を受けて計算した値かどうか
+
+        Returns:
+            bool: 再送として扱う場合はTrue
+        """
+        return front == self.last_front and side == self.last_side and (self.suppress or not fresh)
+
+    def record_sent(self, front: int, side: int, now: float, fresh: bool = False) -> None:
+        """
+        書き込みに成功した値を記録し、送信・キープアライブの回数を数える
+
+        Args:
+            front: 前後方向の値
+            side: 左右方向の値
+            now: 書き込んだ時刻（単調時計、秒）
+            fresh: 新しい入力を受けて計算した値かどうか
+        """
+        if self.is_repeat(front, side, fresh):
+            self.keepalives += 1
+        self.sent += 1
+        self.mark_sent(front, side, now)
+
+    def record_suppressed(self) -> None:
+        """送信を省略した回数を数える"""
+        self.suppressed += 1
+
+    def mark_sent(self, front: int, side: int, now: float) -> None:
+        """
+        送信した値を記録する（緊急停止などフィルターを経由しない送信にも使用）
+
+        Args:
+            front: 前後方向の値
+            side: 左右方向の値
+            now: 現在時刻（単調時計、秒）
+        """
+        self.last_front = front
+        self.last_side = side
+        self.last_sent_at = now
+
+    def forget(self) -> None:
+        """送信済みの値を忘れ、次の値を必ず送信させる（再接続後にデバイスの状態を確定させるため）"""
+        self.last_front = None
+        self.last_side = None
+
+    def next_keepalive(self, now: float) -> float | None:
+        """
+        次のキープアライブ送信までの時間を取得する
+
+        Args:
+            now: 現在時刻（単調時計、秒）
+
+        Returns:
+            float | None: 残り時間（秒）、キープアライブが無効または未送信ならNone
+        """
+        if self.keepalive <= 0 or self.last_front is None:
+            return None
+        return max(0.0, self.last_sent_at + self.keepalive - now)
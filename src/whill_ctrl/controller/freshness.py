@@ -0,0 +1,125 @@
+"""
+コマンドの鮮度を判定するモジュール
+クライアントのタイムスタンプ・シーケンス番号とサーバー側の期限から、古いセットポイントを破棄する
+"""
+
+import math
+import time
+from collections import OrderedDict
+
+
+def estimate_clock_offset(t0: float, t1: float, t2: float, t3: float) -> tuple[float, float]:
+    """
+    時刻同期ハンドシェイクの結果からクロックオフセットを推定する（NTP方式）
+
+    クライアントはこのオフセットを自身の時刻に加算し、サーバー時刻に換算したタイムスタンプを送信する
+
+    Args:
+        t0: クライアントの要求送信時刻（クライアント時計）
+        t1: サーバーの要求受信時刻（サーバー時計）
+        t2: サーバーの応答送信時刻（サーバー時計）
+        t3: クライアントの応答受信時刻（クライアント時計）
+
+    Returns:
+        tuple[float, float]: (オフセット, 往復遅延)（秒）
+    """
+    offset = ((t1 - t0) + (t2 - t3)) / 2
+    delay = (t3 - t0) - (t2 - t1)
+    return offset, delay
+
+
+class CommandFreshness:
+    """期限切れ・順序逆転したジョイスティックコマンドを判定するゲート"""
+
+    # 送信元ごとの状態をこの数を超えて保持しない（超えた場合は最も長く更新のない送信元から削除する）
+    MAX_SOURCES = 256
+
+    def __init__(self, deadline: float, reset_after: float = 5.0):
+        """
+        鮮度ゲートを初期化
+
+        Args:
+            deadline: コマンドの有効期限（秒）、0以下で期限判定を無効化
+            reset_after: この時間（秒）更新がない送信元のシーケンス番号をリセットする
+        """
+        self.deadline = deadline
+        self.reset_after = reset_after
+        # 送信元ごとの (最後のシーケンス番号, 更新時刻)、更新の古い順
+        self._last_seq: OrderedDict[str, tuple[int, float]] = OrderedDict()
+
+        # 統計カウンター
+        self.accepted = 0
+        self.expired = 0
+        self.out_of_order = 0
+
+    def admit(
+        self,
+        source: str | None,
+        seq: int | None,
+        sent_at: float | None,
+        received_at: float | None,
+        now: float | None = None,
+    ) -> bool:
+        """
+        コマンドを実行してよいか判定する
+
+        Args:
+            source: 送信元の識別子
+            seq: クライアントのシーケンス番号（任意）
+            sent_at: クライアントの送信時刻（サーバー時計換算、任意）
+            received_at: サーバーの受信時刻
+            now: 現在時刻（省略時はtime.time()）
+
+        Returns:
+            bool: 実行してよい場合はTrue
+        """
+        if now is None:
+            now = time.time()
+
+        # クライアント時刻があればそれを、なければ受信時刻を起点に経過時間を判定
+        origin = sent_at if sent_at is not None else received_at
+        if self.deadline > 0 and origin is not None and now - origin > self.deadline:
+            self.expired += 1
+            return False
+
+        if seq is not None and source is not None:
+            last = self._last_seq.get(source)
+            if last is not None and seq <= last[0] and now - last[1] < self.reset_after:
+                self.out_of_order += 1
+                return False
+            if last is None:
+                while len(self._last_seq) >= self.MAX_SOURCES:
+                    self._last_seq.popitem(last=False)
+            else:
+                self._last_seq.move_to_end(source)
+            self._last_seq[source] = (seq, now)
+
+        self.accepted += 1
+        return True
+
+    def expires_at(self, sent_at: float | None, received_at: float | None) -> float:
+        """
+        受け付けたコマンドの期限（admit() と同じ起点）
+
+        制御ループは書き込みの直前にもう一度確認し、ロックや送信レートの待機中に期限が切れた値を送らない
+
+        Args:
+            sent_at: クライアントの送信時刻（サーバー時計換算、任意）
+            received_at: サーバーの受信時刻
+
+        Returns:
+            float: 期限（UNIX時刻）、期限判定が無効な場合は無限大
+        """
+        origin = sent_at if sent_at is not None else received_at
+        if self.deadline <= 0 or origin is None:
+            return math.inf
+        return origin + self.deadline
+
+    def expire(self) -> None:
+        """受け付けた後、書き込む前に期限が切れたコマンドを数える"""
+        self.expired += 1
+        self.accepted -= 1
+
+    def get_stats(self) -> dict[str, int]:
+        """統計情報を取得する"""
+        return {"accepted": self.accepted, "expired": self.expired, "out_of_order": self.out_of_order}
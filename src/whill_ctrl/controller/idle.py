@@ -0,0 +1,194 @@
+"""
+誰も操作していない間にCPUとシリアル通信を減らすアイドル状態を管理するモジュール
+
+一定時間コマンドが届かず、車椅子が停止（送信済みの値が0）している場合にアイドル状態へ移り、
+- ジョイスティックのキープアライブを止める
+- テレメトリの読み取り・OSCフィードバック・接続確認の間隔を延ばす
+- 共有メモリの目標値スロットの読み取り間隔を延ばす
+最初のコマンドを受け付けた時点で通常の状態へ戻り、受信からデバイスへの書き込みまでの時間（復帰遅延）を計測する
+"""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
+
+from loguru import logger
+
+
+class IdleMonitor:
+    """アイドル状態の遷移と、状態ごとのCPU時間・経過時間の集計"""
+
+    def __init__(
+        self,
+        quiet_period: float = 60.0,
+        *,
+        telemetry_interval: float = 1.0,
+        poll_interval: float = 0.2,
+        connection_check_interval: float = 60.0,
+    ):
+        """
+        Args:
+            quiet_period: コマンドが届かない時間がこれを超えたらアイドル状態へ移る（秒）、0以下で移らない
+            telemetry_interval: アイドル中のテレメトリの読み取り・OSCフィードバックの間隔（秒）
+            poll_interval: アイドル中に共有メモリの目標値スロットを読み取る間隔（秒）
+            connection_check_interval: アイドル中にデバイスの接続を確認する間隔（秒）
+        """
+        self.quiet_period = quiet_period
+        self.telemetry_interval = telemetry_interval
+        self.poll_interval = poll_interval
+        self.connection_check_interval = connection_check_interval
+
+        self.idle = False
+        self.last_activity = time.monotonic()
+        self._wake_event = asyncio.Event()
+        self._wake_received_at: float | None = None
+
+        # 状態ごとの経過時間とCPU時間（秒）
+        self._state_since = time.monotonic()
+        self._cpu_since = time.process_time()
+        self.elapsed = {"active": 0.0, "idle": 0.0}
+        self.cpu = {"active": 0.0, "idle": 0.0}
+
+        # 統計カウンター
+        self.entries = 0
+        self.wakes = 0
+        self.wake_latencies: deque[float] = deque(maxlen=100)
+
+    def configure(
+        self,
+        quiet_period: float,
+        telemetry_interval: float,
+        poll_interval: float,
+        connection_check_interval: float,
+    ) -> None:
+        """
+        設定を変更する（アイドル中であれば通常の状態へ戻す）
+
+        Args:
+            quiet_period: アイドル状態へ移るまでの時間（秒）、0以下で移らない
+            telemetry_interval: アイドル中のテレメトリの読み取り・OSCフィードバックの間隔（秒）
+            poll_interval: アイドル中に共有メモリの目標値スロットを読み取る間隔（秒）
+            connection_check_interval: アイドル中にデバイスの接続を確認する間隔（秒）
+        """
+        self.quiet_period = quiet_period
+        self.telemetry_interval = telemetry_interval
+        self.poll_interval = poll_interval
+        self.connection_check_interval = connection_check_interval
+        self.activity()
+        self._wake_received_at = None
+
+    def _account(self) -> None:
+        """現在の状態で経過した時間とCPU時間を加算する"""
+        now, cpu = time.monotonic(), time.process_time()
+        state = "idle" if self.idle else "active"
+        self.elapsed[state] += now - self._state_since
+        self.cpu[state] += cpu - self._cpu_since
+        self._state_since, self._cpu_since = now, cpu
+
+    def activity(self, received_at: float | None = None) -> None:
+        """
+        コマンドを受け付けたことを記録し、アイドル中であれば通常の状態へ戻す
+
+        Args:
+            received_at: コマンドの受信時刻（UNIX時刻、復帰遅延の計測用）
+        """
+        self.last_activity = time.monotonic()
+        if not self.idle:
+            return
+        self._account()
+        self.idle = False
+        self.wakes += 1
+        self._wake_received_at = received_at if received_at is not None else time.time()
+        self._wake_event.set()
+        logger.info("Leaving idle mode")
+
+    def woke(self) -> None:
+        """復帰後の最初の書き込みが完了したことを記録する（受信からの時間を復帰遅延とする）"""
+        if self._wake_received_at is None:
+            return
+        self.wake_latencies.append(time.time() - self._wake_received_at)
+        self._wake_received_at = None
+
+    async def sleep(self, active: float, idle: float) -> None:
+        """
+        状態に応じた時間だけ待機する（アイドル中の待機は復帰時に打ち切る）
+
+        Args:
+            active: 通常の状態で待機する時間（秒）
+            idle: アイドル中に待機する時間（秒）
+        """
+        if not self.idle:
+            await asyncio.sleep(active)
+            return
+        try:
+            await asyncio.wait_for(self._wake_event.wait(), max(idle, active))
+        except TimeoutError:
+            pass
+
+    async def run(self, can_idle: Callable[[], bool]) -> None:
+        """
+        コマンドが届かない時間を監視し、アイドル状態へ移すループ
+
+        Args:
+            can_idle: アイドル状態へ移ってよいか（車椅子が停止しているか）を返す関数
+        """
+        while True:
+            if self.idle:
+                await self._wake_event.wait()
+                continue
+            if self.quiet_period <= 0:
+                await asyncio.sleep(1.0)
+                continue
+            remaining = self.last_activity + self.quiet_period - time.monotonic()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+                continue
+            if not can_idle():
+                # 停止していない間は移らない（停止するまで確認を続ける）
+                await asyncio.sleep(1.0)
+                continue
+            self._account()
+            self.idle = True
+            self.entries += 1
+            self._wake_event.clear()
+            logger.info(f"Entering idle mode after {self.quiet_period:g}s without commands")
+
+    def get_stats(self, keepalive: float = 0.0, telemetry_interval: float = 0.0) -> dict:
+        """
+        統計情報を取得する
+
+        Args:
+            keepalive: 通常の状態でのキープアライブの間隔（秒、削減した送信回数の推定用）
+            telemetry_interval: 通常の状態でのテレメトリの読み取り間隔（秒、削減した読み取り回数の推定用）
+
+        Returns:
+            dict: 状態、状態ごとの時間とCPU使用率、削減量、復帰遅延
+        """
+        self._account()
+        elapsed, cpu = self.elapsed, self.cpu
+        usage = {state: cpu[state] / elapsed[state] if elapsed[state] > 0 else 0.0 for state in elapsed}
+        idle_time = elapsed["idle"]
+        reads_saved = 0
+        if telemetry_interval > 0 and self.telemetry_interval > telemetry_interval:
+            reads_saved = int(idle_time / telemetry_interval - idle_time / self.telemetry_interval)
+        latencies = list(self.wake_latencies)
+        return {
+            "state": "idle" if self.idle else "active",
+            "quiet_period": self.quiet_period,
+            "active_s": round(elapsed["active"], 3),
+            "idle_s": round(idle_time, 3),
+            "cpu_percent_active": round(usage["active"] * 100, 3),
+            "cpu_percent_idle": round(usage["idle"] * 100, 3) if idle_time > 0 else None,
+            # 通常の状態のCPU使用率のままアイドル時間を過ごした場合との差
+            "cpu_saved_s": round(max(0.0, (usage["active"] - usage["idle"]) * idle_time), 3),
+            "keepalives_saved": int(idle_time / keepalive) if keepalive > 0 else 0,
+            "telemetry_reads_saved": reads_saved,
+            "entries": self.entries,
+            "wakes": self.wakes,
+            "wake_latency_ms": {
+                "last": round(latencies[-1] * 1000, 3) if latencies else None,
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                "max": round(max(latencies) * 1000, 3) if latencies else None,
+            },
+        }
@@ -0,0 +1,197 @@
+"""
+シリアルリンクの容量の計測と、ジョイスティックの送信レートの自動調整を提供するモジュール
+
+- キャリブレーション: 接続時（と要求時）に送信済みの値を連続で書き込み、持続的な書き込みレート（容量）と
+  1フレームあたりの書き込み遅延を計測する
+- 自動調整: 送信レートの上限を容量の一定割合に抑え、書き込み遅延×送信レート（リンクの使用率）が
+  上限を超えたら乗算的に下げ、下回っている間は加算的に戻す（AIMD）
+
+アダプター・ケーブル・ファームウェアの組み合わせで変わる適切な送信レートを、設定値を変えずに選ぶ
+"""
+
+import math
+import statistics
+import time
+
+
+class LinkCalibration:
+    """キャリブレーションの結果"""
+
+    __slots__ = ("frames", "elapsed", "capacity", "latency_p50", "latency_p95", "at")
+
+    def __init__(self, latencies: list[float], elapsed: float):
+        """
+        Args:
+            latencies: フレームごとの書き込み遅延（秒、送信完了まで）
+            elapsed: 全フレームの書き込みにかかった時間（秒）
+        """
+        ordered = sorted(latencies)
+        self.frames = len(ordered)
+        self.elapsed = elapsed
+        self.capacity = self.frames / elapsed if elapsed > 0 else math.inf
+        self.latency_p50 = statistics.median(ordered) if ordered else 0.0
+        self.latency_p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else 0.0
+        self.at = time.time()
+
+    def to_dict(self) -> dict:
+        return {
+            "frames": self.frames,
+            "capacity_hz": round(self.capacity, 1) if math.isfinite(self.capacity) else None,
+            "write_latency_p50_ms": round(self.latency_p50 * 1000, 3),
+            "write_latency_p95_ms": round(self.latency_p95 * 1000, 3),
+            "at": self.at,
+        }
+
+
+class AdaptiveSendRate:
+    """リンクの容量と書き込み遅延に合わせてジョイスティックの送信レートを調整する"""
+
+    # 書き込み遅延の指数移動平均の重み
+    EWMA_ALPHA = 0.1
+    # 送信レートを続けて下げない時間（秒、下げた結果が遅延に反映されるのを待つ）
+    BACKOFF_COOLDOWN = 0.5
+
+    def __init__(
+        self,
+        max_rate: float = 50.0,
+        *,
+        enabled: bool = True,
+        headroom: float = 0.7,
+        min_rate: float = 5.0,
+        backoff: float = 0.7,
+        recovery: float = 10.0,
+    ):
+        """
+        Args:
+            max_rate: 送信レートの上限（Hz、設定値のcontrol_rate）、0以下で制限なし
+            enabled: Falseの場合は常にmax_rateで送信する（計測は行う）
+            headroom: リンクの使用率の上限（0～1）
+            min_rate: 自動調整で下げる送信レートの下限（Hz）
+            backoff: 使用率が上限を超えた場合に送信レートに掛ける係数
+            recovery: 使用率が上限を下回っている間に送信レートを戻す速さ（Hz/秒）
+        """
+        self.max_rate = max_rate
+        self.enabled = enabled
+        self.headroom = headroom
+        self.min_rate = min_rate
+        self.backoff = backoff
+        self.recovery = recovery
+
+        self.calibration: LinkCalibration | None = None
+        self.rate = max_rate
+        self.latency = 0.0
+        self._observed_at = 0.0
+        self._backoff_at = -math.inf
+
+        # 統計カウンター
+        self.calibrations = 0
+        self.backoffs = 0
+        self.writes = 0
+
+    def configure(
+        self,
+        *,
+        max_rate: float | None = None,
+        enabled: bool | None = None,
+        headroom: float | None = None,
+        min_rate: float | None = None,
+    ) -> None:
+        """
+        設定を変更する（Noneの項目は変更しない）
+
+        Args:
+            max_rate: 送信レートの上限（Hz）
+            enabled: 自動調整を行うかどうか
+            headroom: リンクの使用率の上限（0～1）
+            min_rate: 自動調整で下げる送信レートの下限（Hz）
+        """
+        if max_rate is not None:
+            self.max_rate = max_rate
+        if enabled is not None:
+            self.enabled = enabled
+        if headroom is not None:
+            self.headroom = headroom
+        if min_rate is not None:
+            self.min_rate = min_rate
+        self.rate = self.ceiling()
+
+    def ceiling(self) -> float:
+        """
+        現在選べる送信レートの上限
+
+        Returns:
+            float: max_rateとリンクの容量×headroomの小さい方（Hz）、0は制限なし
+        """
+        limit = self.max_rate if self.max_rate > 0 else math.inf
+        if self.enabled and self.calibration is not None:
+            limit = min(limit, self.calibration.capacity * self.headroom)
+        return limit if math.isfinite(limit) else 0.0
+
+    def apply_calibration(self, calibration: LinkCalibration) -> None:
+        """
+        キャリブレーションの結果を反映し、送信レートを上限に戻す
+
+        Args:
+            calibration: キャリブレーションの結果
+        """
+        self.calibration = calibration
+        self.calibrations += 1
+        self.latency = calibration.latency_p50
+        self._backoff_at = -math.inf
+        self.rate = self.ceiling()
+
+    def observe(self, latency: float, now: float) -> None:
+        """
+        ジョイスティックの書き込み遅延を記録し、送信レートを調整する
+
+        Args:
+            latency: 書き込みにかかった時間（秒）
+            now: 現在時刻（単調時計、秒）
+        """
+        self.writes += 1
+        self.latency += self.EWMA_ALPHA * (latency - self.latency)
+        elapsed = now - self._observed_at if self._observed_at else 0.0
+        self._observed_at = now
+        if not self.enabled:
+            return
+
+        ceiling = self.ceiling()
+        rate = self.rate if self.rate > 0 else (1.0 / self.latency if self.latency > 0 else 0.0)
+        if rate <= 0:
+            return
+        if self.latency * rate > self.headroom:
+            if now - self._backoff_at >= self.BACKOFF_COOLDOWN:
+                self.rate = max(self.min_rate, rate * self.backoff)
+                self._backoff_at = now
+                self.backoffs += 1
+        elif self.rate > 0 and (ceiling <= 0 or self.rate < ceiling):
+            recovered = self.rate + self.recovery * min(elapsed, 1.0)
+            self.rate = recovered if ceiling <= 0 else min(ceiling, recovered)
+
+    def get_status(self) -> dict:
+        """
+        状態通知に含める値
+
+        Returns:
+            dict: 送信レートとリンクの容量
+        """
+        calibration = self.calibration
+        capacity = calibration.capacity if calibration is not None else None
+        return {
+            "send_rate": round(self.rate, 1),
+            "link_capacity": round(capacity, 1) if capacity is not None and math.isfinite(capacity) else None,
+        }
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {
+            **self.get_status(),
+            "adaptive": self.enabled,
+            "max_rate": self.max_rate,
+            "ceiling": round(self.ceiling(), 1),
+            "write_latency_ms": round(self.latency * 1000, 3),
+            "utilization": round(self.latency * self.rate, 3) if self.rate > 0 else None,
+            "backoffs": self.backoffs,
+            "calibrations": self.calibrations,
+            "calibration": self.calibration.to_dict() if self.calibration is not None else None,
+        }
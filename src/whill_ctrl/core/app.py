@@ -5,41 +5,151 @@
 
 import asyncio
 import json
+import platform
 import signal
+import socket
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
 import asyncclick as click
 from loguru import logger
+from pydantic import ValidationError
 
-from ..config import get_settings
+from ..config import get_settings, reload_settings
+from ..controller.admission import AdmissionControl
 from ..controller.controller import WHILLController
-from ..mqtt.client import MQTTHandler
+from ..controller.idle import IdleMonitor
+from ..controller.send_rate import AdaptiveSendRate
+from ..diagnostics.loop_monitor import LoopMonitor
+from ..diagnostics.profiler import SamplingProfiler
+from ..fleet.receiver import FleetListener, FleetReceiver
+from ..ingest.handoff import IngestBridge
+from ..ingest.thread import IngestThread, ThreadedComponent
+from ..ipc.server import IPCServer
+from ..ipc.shared import shared_setpoint_supported
+from ..mqtt.client import MQTTHandler, default_client_id, parse_broker_address
+from ..mqtt.standby import StandbySession
 from ..osc.server import OSCServer
+from ..osc.sockets import reserve_osc_port
+from ..recording.recorder import Recorder
+from ..recording.telemetry_store import TelemetryStore
 from ..utils.logger import setup_logger
+from ..utils.tasks import TaskSet
 from ..whill.factory import create_whill_device
+from .lease import Lease, wait_for_takeover
+from .watchdog import Watchdog, sd_notify, watchdog_interval
 
 # Windows環境の場合、正しいイベントループポリシーを設定
 if sys.platform == "win32":
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
+# ログ出力の再設定が必要な設定項目
+LOGGING_FIELDS = ("log_level", "log_dir", "log_file_pattern")
+
+# MQTTの再接続が必要な設定項目（シリアル接続には影響しない）
+MQTT_CONNECTION_FIELDS = (
+    "mqtt_broker",
+    "mqtt_port",
+    "mqtt_client_id",
+    "mqtt_clean_session",
+    "mqtt_keepalive",
+    "mqtt_standby_brokers",
+    "mqtt_reconnect_min_delay",
+    "mqtt_reconnect_max_delay",
+    "mqtt_health_check_timeout",
+    "mqtt_failback_interval",
+    "mqtt_protocol_v5",
+    "mqtt_topic_alias_maximum",
+    "mqtt_message_expiry",
+)
+
+# 制御ループの再設定が必要な設定項目
+CONTROL_FIELDS = (
+    "command_deadline",
+    "control_rate",
+    "joystick_deadzone",
+    "joystick_smoothing",
+    "joystick_slew_rate",
+    "joystick_keepalive",
+    "joystick_suppress_duplicates",
+)
+
+# 送信レートの自動調整の設定項目
+SEND_RATE_FIELDS = ("adaptive_send_rate", "link_calibration_frames", "link_headroom", "min_send_rate")
+
+# アイドル状態の設定項目
+IDLE_FIELDS = ("idle_timeout", "idle_telemetry_interval", "idle_poll_interval", "idle_connection_check_interval")
+
+# 送信元ごとのアドミッション制御の設定項目
+ADMISSION_FIELDS = (
+    "admission_joystick_rate",
+    "admission_joystick_burst",
+    "admission_command_rate",
+    "admission_command_burst",
+)
+
+# テレメトリストアを作り直す設定項目
+TELEMETRY_STORE_FIELDS = (
+    "telemetry_store_path",
+    "telemetry_store_interval",
+    "telemetry_store_segment_rows",
+    "telemetry_store_max_segments",
+)
+
+
 class Application:
     """アプリケーションのメインクラス"""
 
-    def __init__(self):
-        self.settings = get_settings()
+    def __init__(self, debug: bool = False):
+        self.debug = debug
         self.controller = None
         self.mqtt_handler = None
         self.osc_server = None
+        self.ipc_server = None
+        # フリートフレームの受信器とUDPマルチキャストの受信
+        self.fleet: FleetReceiver | None = None
+        self.fleet_listener: FleetListener | None = None
+        # 稼働系・待機系のリースとハートビートのタスク
+        self.lease: Lease | None = None
+        self.lease_task: asyncio.Task | None = None
+        # 待機中に準備した入力経路（確保したOSCのポートと、接続を保つMQTTセッション）
+        self.standby_osc_socket: socket.socket | None = None
+        self.standby_session = None
+        # systemdのウォッチドッグ（WatchdogSec=を指定したユニットで起動した場合のみ）
+        self.watchdog: Watchdog | None = None
+        # 入力スレッドモードでのコマンドの受け渡しと入力スレッド
+        self.bridge = None
+        self.ingest_threads: dict[str, IngestThread] = {}
+        self.loop_monitor = None
+        self.profiler = None
         self.shutdown_event = asyncio.Event()
-        self.tasks = []
+        # アプリケーションが作成したタスク（完了すると削除される）
+        self.tasks = TaskSet("Application")
 
         # 設定ファイルパス
         self.config_dir = Path.home() / ".config" / "whill_ctrl"
         self.config_file = self.config_dir / "settings.json"
         self.config = self._load_config()
+        self._config_mtime = self._get_config_mtime()
+
+        # 設定ファイルにSettingsの項目があれば環境変数より優先して適用する
+        env_settings = get_settings()
+        try:
+            self.settings = reload_settings(self.config)
+        except ValidationError as e:
+            logger.error(f"設定ファイルの値が不正なため、デフォルト設定を使用します: {e}")
+            self.settings = env_settings
+        if any(getattr(env_settings, f) != getattr(self.settings, f) for f in LOGGING_FIELDS):
+            setup_logger(debug_mode=self.debug)
+
+        # 設定の再読み込みを直列化するロック
+        self._reload_lock = asyncio.Lock()
+        self._mqtt_standby: tuple[str, ...] = ()
+        # コマンドラインで指定されたMQTT v5の使用（設定の再読み込みで再接続する場合も引き継ぐ）
+        self._mqtt_v5 = False
 
     def _load_config(self) -> dict:
         """設定ファイルを読み込む"""
@@ -64,9 +174,18 @@ class Application:
         try:
             with open(self.config_file, "w") as f:
                 json.dump(config, f, indent=2)
+            # 自身の保存を設定ファイルの変更として検知しないようにする
+            self._config_mtime = self._get_config_mtime()
         except Exception as e:
             logger.error(f"設定ファイルの保存に失敗しました: {e}")
 
+    def _get_config_mtime(self) -> float | None:
+        """設定ファイルの更新時刻を取得する"""
+        try:
+            return self.config_file.stat().st_mtime
+        except OSError:
+            return None
+
     def get_last_serial_port(self) -> str:
         """最後に使用したシリアルポートを取得する"""
         return self.config.get("last_serial_port", "/dev/ttyUSB0")
@@ -87,6 +206,19 @@ class Application:
         use_mock: bool,
         osc_only: bool,
         mqtt_only: bool,
+        mqtt_client_id: str | None = None,
+        mqtt_standby: tuple[str, ...] = (),
+        mqtt_v5: bool = False,
+        record_path: Path | None = None,
+        telemetry_store_path: Path | None = None,
+        ipc_socket: Path | None = None,
+        shm_name: str | None = None,
+        threaded_ingest: bool | None = None,
+        standby: bool = False,
+        lease_path: Path | None = None,
+        faults: str | None = None,
+        fleet_chair_id: int | None = None,
+        fleet_group: str | None = None,
     ) -> bool:
         """
         アプリケーションを初期化する
@@ -101,11 +233,38 @@ class Application:
             use_mock: モックWHILLを使用するフラグ
             osc_only: OSCのみ使用するフラグ
             mqtt_only: MQTTのみ使用するフラグ
+            mqtt_client_id: MQTTクライアントID（Noneの場合は設定値を使用）
+            mqtt_standby: スタンバイブローカーのアドレス（host:port、空の場合は設定値を使用）
+            mqtt_v5: MQTT v5で接続する（Falseの場合は設定値を使用）
+            record_path: コマンド・遅延トレースの記録先（Noneの場合は記録しない）
+            telemetry_store_path: テレメトリストアのディレクトリ（Noneの場合は記録しない）
+            ipc_socket: ローカルIPCのUnixドメインソケットのパス（Noneの場合は設定値を使用）
+            shm_name: 共有メモリの目標値スロットの名前（Noneの場合は設定値を使用）
+            threaded_ingest: OSC・MQTTの受信処理を専用スレッドで実行するか（Noneの場合は設定値を使用）
+            standby: リースが取得できない場合に、稼働系が停止するまで待機してから制御を引き継ぐ
+            lease_path: リースファイルのパス（Noneの場合は設定値を使用）
+            faults: デバイスに注入する障害の指定（Noneの場合は設定値を使用）
+            fleet_chair_id: フリートフレームで自身を表すchair_id（Noneの場合は設定値を使用）
+            fleet_group: フリートフレームを受信するマルチキャストグループ（Noneの場合は設定値を使用）
 
         Returns:
-            bool: 初期化成功状態
+            bool: 初期化成功状態（失敗した場合は、それまでに開いたデバイス・サーバー・リースを閉じてから返す）
         """
+        initialized = False
         try:
+            # 待機中も通知を続けるため、デバイスを開く前にウォッチドッグを開始する
+            self._start_watchdog()
+
+            # 実行できない指定は、リースの取得やデバイスを開く前に拒否する
+            ipc_socket = ipc_socket or self.settings.ipc_socket_path
+            shm_name = shm_name or self.settings.ipc_shm_name
+            if shm_name and not shared_setpoint_supported():
+                logger.error(
+                    f"--shm-name is not supported on {platform.machine()}: the seqlock needs x86 store ordering "
+                    "(use --ipc-socket instead)"
+                )
+                return False
+
             # シリアルポートが指定されていない場合は前回値を使用
             if serial_port is None:
                 serial_port = self.get_last_serial_port()
@@ -114,52 +273,635 @@ class Application:
                 # 指定されたポートを保存
                 self.save_last_serial_port(serial_port)
 
+            if threaded_ingest is None:
+                threaded_ingest = self.settings.threaded_ingest
+            self._mqtt_standby = mqtt_standby
+            self._mqtt_v5 = mqtt_v5
+
+            # リースを使う場合は、取得してから（待機系は稼働系が停止して取得できるまで待ってから）デバイスを開く
+            lease_path = lease_path or self.settings.lease_path
+            if standby and lease_path is None:
+                logger.error("Standby mode requires a lease file (--lease-file or lease_path)")
+                return False
+            takeover_started = None
+            mirrored = None
+            if lease_path is not None:
+                self.lease = Lease(lease_path)
+                if not self.lease.try_acquire(serial_port):
+                    if not standby:
+                        logger.error(f"Another controller holds the lease {lease_path}; use --standby to wait for it")
+                        return False
+                    logger.info(f"Standby: waiting for the lease {lease_path}")
+                    # 引き継ぎで待たないよう、待機中にOSCのポートを確保し、MQTTのセッションを接続しておく
+                    if not mqtt_only:
+                        self.standby_osc_socket = reserve_osc_port(osc_ip, osc_port)
+                    if not osc_only:
+                        await self._start_standby_session(
+                            mqtt_broker,
+                            mqtt_port,
+                            mqtt_topic,
+                            mqtt_client_id or self.settings.mqtt_client_id or default_client_id(serial_port),
+                            mqtt_standby,
+                            threaded_ingest,
+                        )
+                    # 待機系も起動完了として扱い、systemdの起動タイムアウトで停止されないようにする
+                    sd_notify(f"READY=1\nSTATUS=Standby: waiting for the lease {lease_path}")
+                    mirrored = await wait_for_takeover(
+                        self.lease,
+                        self.settings.standby_poll_interval,
+                        self.settings.lease_timeout,
+                        self.settings.standby_fence,
+                    )
+                    takeover_started = time.monotonic()
+                    # 稼働系がポートを変更していた場合に備え、ミラーしたポートを引き継ぐ
+                    if mirrored is not None and mirrored.port:
+                        serial_port = mirrored.port
+                    self.lease.takeover = {
+                        "previous_pid": mirrored.pid if mirrored else None,
+                        "heartbeat_age_ms": round((takeover_started - mirrored.heartbeat) * 1000, 3)
+                        if mirrored
+                        else None,
+                    }
+                    logger.warning(f"Standby: lease acquired, taking over on port {serial_port}")
+                self.lease_task = asyncio.create_task(self._lease_heartbeat(serial_port))
+
             # WHILLデバイスを作成
-            whill_device = create_whill_device(serial_port, use_mock)
+            whill_device = create_whill_device(serial_port, use_mock, faults or self.settings.device_faults)
 
             # コントローラーを初期化
-            self.controller = WHILLController(whill_device)
+            self.controller = WHILLController(
+                whill_device,
+                command_deadline=self.settings.command_deadline,
+                control_rate=self.settings.control_rate,
+                deadzone=self.settings.joystick_deadzone,
+                smoothing=self.settings.joystick_smoothing,
+                slew_rate=self.settings.joystick_slew_rate,
+                keepalive=self.settings.joystick_keepalive,
+                suppress_duplicates=self.settings.joystick_suppress_duplicates,
+                telemetry_interval=self.settings.telemetry_interval,
+                admission=AdmissionControl(
+                    self.settings.admission_joystick_rate,
+                    self.settings.admission_joystick_burst,
+                    self.settings.admission_command_rate,
+                    self.settings.admission_command_burst,
+                ),
+                send_rate=AdaptiveSendRate(
+                    self.settings.control_rate,
+                    enabled=self.settings.adaptive_send_rate,
+                    headroom=self.settings.link_headroom,
+                    min_rate=self.settings.min_send_rate,
+                ),
+                calibration_frames=self.settings.link_calibration_frames,
+                idle=IdleMonitor(
+                    self.settings.idle_timeout,
+                    telemetry_interval=self.settings.idle_telemetry_interval,
+                    poll_interval=self.settings.idle_poll_interval,
+                    connection_check_interval=self.settings.idle_connection_check_interval,
+                ),
+            )
+            if mirrored is not None:
+                # 稼働系が最後に送った値から再開し、引き継ぎで車椅子の動きが途切れないようにする
+                self.controller.seed_setpoint(mirrored.front, mirrored.side)
+            if record_path is not None:
+                self.controller.recorder = Recorder(record_path)
+            if telemetry_store_path is not None:
+                self.controller.telemetry_store = self._create_telemetry_store(telemetry_store_path)
+            self.controller.watchdog = self.watchdog
+            if self.settings.loop_monitor:
+                self.loop_monitor = LoopMonitor(self.settings.slow_callback_threshold, self.settings.loop_lag_interval)
+                self.loop_monitor.start()
+                self.controller.loop_monitor = self.loop_monitor
             await self.controller.start()
+            # 最初に発行する状態通知に送信レートとリンクの容量を含めるため、サーバーの開始前に計測を終える
+            if self.controller.calibration_task is not None:
+                await self.controller.calibration_task
+
+            # 入力スレッドモードでは、OSC・MQTTはコントローラーの代わりに受け渡し用のブリッジを使う
+            if threaded_ingest:
+                self.bridge = IngestBridge(self.controller)
+                self.bridge.start()
+                logger.info("Threaded ingestion enabled: OSC and MQTT run in their own threads")
+
+            # フリートフレームの受信器を初期化（chair_idが指定された場合のみ、OSC・MQTTからも受信する）
+            if fleet_chair_id is None:
+                fleet_chair_id = self.settings.fleet_chair_id
+            if fleet_chair_id is not None:
+                self.fleet = FleetReceiver()
+                self.fleet.register(fleet_chair_id, self.bridge or self.controller)
+                self.controller.fleet = self.fleet
+                fleet_group = fleet_group or self.settings.fleet_group
+                if fleet_group:
+                    self.fleet_listener = FleetListener(
+                        self.fleet, fleet_group, self.settings.fleet_port, self.settings.fleet_interface
+                    )
+                    if not await self.fleet_listener.start():
+                        return False
 
             # OSCサーバーを初期化（MQTTのみモードでなければ）
             if not mqtt_only:
-                self.osc_server = OSCServer(self.controller, osc_ip, osc_port)
-                await self.osc_server.start()
+                self.osc_server = self._in_ingest_thread(
+                    "osc",
+                    OSCServer(
+                        self.bridge or self.controller,
+                        osc_ip,
+                        osc_port,
+                        feedback_rate=self.settings.osc_feedback_rate,
+                        client_timeout=self.settings.osc_client_timeout,
+                        feedback_port=self.settings.osc_feedback_port,
+                        fleet=self.fleet,
+                        batch_size=self.settings.osc_batch_size,
+                        reuse_port=self.lease is not None,
+                    ),
+                )
+                if not await self.osc_server.start():
+                    return False
+                self._release_standby_osc_port()
+                self.controller.osc_tasks = self.osc_server.osc_controller.tasks
+                if self.osc_server.batching:
+                    self.controller.osc_batching = self.osc_server.osc_controller.batch_stats
+
+            # ローカルIPCサーバーを初期化（ソケットか共有メモリが指定された場合のみ）
+            if ipc_socket or shm_name:
+                self.ipc_server = IPCServer(self.controller, ipc_socket, shm_name)
+                if not await self.ipc_server.start():
+                    return False
 
             # MQTTハンドラーを初期化（OSCのみモードでなければ）
             if not osc_only:
-                self.mqtt_handler = MQTTHandler(
-                    self.controller,
-                    mqtt_broker,
-                    mqtt_port,
-                    mqtt_topic,
-                    self.settings.mqtt_status_topic,
-                    self.settings.mqtt_ctrl_topic,
+                self.mqtt_handler = self._create_mqtt_handler(
+                    mqtt_broker, mqtt_port, mqtt_topic, mqtt_client_id, mqtt_standby
                 )
-                await self.mqtt_handler.start()
+                if self.standby_session is not None:
+                    session, self.standby_session = self.standby_session, None
+                    adopted = await session.handover()
+                    if adopted is not None:
+                        self.mqtt_handler.adopt(*adopted)
+                if not await self.mqtt_handler.start():
+                    return False
+
+            if self.lease is not None:
+                self.controller.lease = self.lease
+                if takeover_started is not None:
+                    # 検出から入力経路の再開までの時間と、稼働系の最後のハートビートからの時間（停止時間の上限）
+                    now = time.monotonic()
+                    self.lease.takeover["ready_ms"] = round((now - takeover_started) * 1000, 3)
+                    self.lease.takeover["outage_ms"] = round(
+                        self.lease.takeover["ready_ms"] + (self.lease.takeover["heartbeat_age_ms"] or 0.0), 3
+                    )
+                    logger.warning(
+                        f"Standby: takeover complete in {self.lease.takeover['ready_ms']:.1f} ms "
+                        f"(outage at most {self.lease.takeover['outage_ms']:.1f} ms)"
+                    )
 
+            sd_notify(f"READY=1\nSTATUS=Controlling {serial_port}")
+            initialized = True
             return True
 
         except Exception as e:
             logger.error(f"Failed to initialize application: {e}")
             return False
 
+        finally:
+            if not initialized:
+                # シリアルポート・制御タスク・サーバー・リースを残したまま終了しないよう、開いた分を閉じる
+                await self._shutdown()
+
+    async def _start_standby_session(
+        self,
+        mqtt_broker: str,
+        mqtt_port: int,
+        mqtt_topic: str,
+        mqtt_client_id: str,
+        mqtt_standby: tuple[str, ...],
+        threaded_ingest: bool,
+    ) -> None:
+        """
+        待機中にMQTTのセッションを接続しておく（引き継ぎでMQTTハンドラーへ渡す）
+
+        Args:
+            mqtt_broker: MQTTブローカーのホスト名
+            mqtt_port: MQTTブローカーのポート番号
+            mqtt_topic: MQTTコマンドトピック
+            mqtt_client_id: 稼働系のMQTTクライアントID
+            mqtt_standby: スタンバイブローカーのアドレス（空の場合は設定値を使用）
+            threaded_ingest: MQTTハンドラーを入力スレッドで動作させるか（同じスレッドで接続する）
+        """
+        session = StandbySession(
+            [(mqtt_broker, mqtt_port), *self._mqtt_standby_brokers(mqtt_port, mqtt_standby)],
+            mqtt_client_id,
+            [(mqtt_topic, 0), (self.settings.mqtt_ctrl_topic, 1)],
+            keepalive=self.settings.mqtt_keepalive,
+            protocol_v5=self._mqtt_v5 or self.settings.mqtt_protocol_v5,
+            reconnect_min_delay=self.settings.mqtt_reconnect_min_delay,
+            reconnect_max_delay=self.settings.mqtt_reconnect_max_delay,
+        )
+        if threaded_ingest:
+            # aiomqttのクライアントは作成したループでしか使えないため、MQTTハンドラーと同じ入力スレッドで動作させる
+            session = ThreadedComponent(session, self._ingest_thread("mqtt"))
+        await session.start()
+        self.standby_session = session
+
+    def _release_standby_osc_port(self) -> None:
+        """待機中に確保したOSCのポートを解放する（待ち受けソケットのバインド後、または終了時）"""
+        if self.standby_osc_socket is not None:
+            self.standby_osc_socket.close()
+            self.standby_osc_socket = None
+
+    async def _lease_heartbeat(self, port: str) -> None:
+        """
+        リースファイルへハートビートと制御状態を書き込み続ける
+
+        Args:
+            port: コントローラーの作成前に書き込むシリアルポート名
+        """
+        interval = self.settings.lease_heartbeat_interval
+        while True:
+            controller = self.controller
+            if controller is None:
+                self.lease.heartbeat(port, False, 0, 0)
+            else:
+                self.lease.heartbeat(
+                    controller.whill.port,
+                    controller.whill.is_connected(),
+                    controller.suppressor.last_front or 0,
+                    controller.suppressor.last_side or 0,
+                )
+            await asyncio.sleep(interval)
+
+    def _start_watchdog(self) -> None:
+        """systemdがウォッチドッグを要求している場合、進行状況を確認して通知するタスクを開始する"""
+        timeout = watchdog_interval()
+        if timeout is None or self.watchdog is not None:
+            return
+        self.watchdog = Watchdog(timeout, stall_timeout=self.settings.watchdog_stall_timeout)
+        self.watchdog.add_check("control", self._check_control)
+        self.watchdog.add_check("osc", self._check_osc)
+        self.watchdog.add_check("ingest_threads", self._check_ingest_threads)
+        self.tasks.spawn(self.watchdog.run(), critical=True)
+
+    def _check_control(self, stall_timeout: float) -> str | None:
+        """制御ループとシリアルへの書き込みを確認する（待機中・初期化中は確認しない）"""
+        if self.controller is None:
+            return None
+        return self.controller.progress_stall(stall_timeout)
+
+    def _check_osc(self, stall_timeout: float) -> str | None:
+        """OSCの受信ソケットが閉じていないことを確認する（入力スレッドモードではスレッドの応答も確認する）"""
+        if self.osc_server is None or self.osc_server.transport is None:
+            return None
+        if self.osc_server.transport.is_closing():
+            return "OSC socket is closed"
+        thread = self.ingest_threads.get("osc")
+        if thread is not None and not thread.responsive(stall_timeout):
+            return "OSC ingest thread is not responding"
+        return None
+
+    def _check_ingest_threads(self, stall_timeout: float) -> str | None:
+        """OSC以外の入力スレッドのイベントループが応答していることを確認する"""
+        for name, thread in self.ingest_threads.items():
+            if name != "osc" and not thread.responsive(stall_timeout):
+                return f"{name} ingest thread is not responding"
+        return None
+
+    def _in_ingest_thread(self, name: str, component):
+        """
+        入力スレッドモードの場合、コンポーネントを専用スレッドで動作させる
+
+        Args:
+            name: 入力スレッドの名前（同じ名前のスレッドは再利用する）
+            component: OSCServerまたはMQTTHandler
+
+        Returns:
+            コンポーネント、またはメソッドを入力スレッドで実行するプロキシ
+        """
+        if self.bridge is None:
+            return component
+        return ThreadedComponent(component, self._ingest_thread(name))
+
+    def _ingest_thread(self, name: str) -> IngestThread:
+        """名前の入力スレッドを取得する（なければ作成して開始する）"""
+        thread = self.ingest_threads.get(name)
+        if thread is None:
+            thread = self.ingest_threads[name] = IngestThread(name)
+            thread.start()
+        return thread
+
+    def _create_telemetry_store(self, path: Path) -> TelemetryStore:
+        """設定値でテレメトリストアを作成する"""
+        return TelemetryStore(
+            path,
+            self.settings.telemetry_store_interval,
+            self.settings.telemetry_store_segment_rows,
+            self.settings.telemetry_store_max_segments,
+        )
+
+    def _create_mqtt_handler(
+        self,
+        mqtt_broker: str,
+        mqtt_port: int,
+        mqtt_topic: str,
+        mqtt_client_id: str | None,
+        mqtt_standby: tuple[str, ...],
+    ) -> MQTTHandler:
+        """
+        MQTTハンドラーを作成する
+
+        Args:
+            mqtt_broker: MQTTブローカーのホスト名
+            mqtt_port: MQTTブローカーのポート番号
+            mqtt_topic: MQTTコマンドトピック
+            mqtt_client_id: MQTTクライアントID（Noneの場合は設定値を使用）
+            mqtt_standby: スタンバイブローカーのアドレス（空の場合は設定値を使用）
+
+        Returns:
+            MQTTHandler: 未起動のMQTTハンドラー（入力スレッドモードではそのプロキシ）
+        """
+        standby_brokers = self._mqtt_standby_brokers(mqtt_port, mqtt_standby)
+        handler = MQTTHandler(
+            self.bridge or self.controller,
+            mqtt_broker,
+            mqtt_port,
+            mqtt_topic,
+            self.settings.mqtt_status_topic,
+            self.settings.mqtt_ctrl_topic,
+            client_id=mqtt_client_id or self.settings.mqtt_client_id,
+            clean_session=self.settings.mqtt_clean_session,
+            keepalive=self.settings.mqtt_keepalive,
+            standby_brokers=standby_brokers,
+            reconnect_min_delay=self.settings.mqtt_reconnect_min_delay,
+            reconnect_max_delay=self.settings.mqtt_reconnect_max_delay,
+            health_check_timeout=self.settings.mqtt_health_check_timeout,
+            failback_interval=self.settings.mqtt_failback_interval,
+            protocol_v5=self._mqtt_v5 or self.settings.mqtt_protocol_v5,
+            topic_alias_maximum=self.settings.mqtt_topic_alias_maximum,
+            message_expiry=self.settings.mqtt_message_expiry,
+            fleet=self.fleet,
+        )
+        if self.bridge is not None:
+            # 設定の再読み込みとプロファイルはデバイスループで実行する
+            handler.reload_handler = self.bridge.on_device_loop(self.reload_config)
+            handler.profile_handler = self.bridge.on_device_loop(self.profile)
+        else:
+            handler.reload_handler = self.reload_config
+            handler.profile_handler = self.profile
+        return self._in_ingest_thread("mqtt", handler)
+
+    def _mqtt_standby_brokers(self, mqtt_port: int, mqtt_standby: tuple[str, ...]) -> list[tuple[str, int]]:
+        """スタンバイブローカーの(host, port)リスト（指定がない場合は設定値）"""
+        return [
+            parse_broker_address(address, mqtt_port) for address in (mqtt_standby or self.settings.mqtt_standby_brokers)
+        ]
+
+    async def profile(self, seconds: float) -> dict:
+        """
+        稼働中のコントローラーを指定した時間だけプロファイルする
+
+        結果（pstatsとcollapsed-stack）はログディレクトリに保存し、概要をMQTTで通知する
+
+        Args:
+            seconds: プロファイルする時間（秒）
+
+        Returns:
+            dict: 結果（ok, error と、成功時は保存したファイルとコルーチンごとの時間）
+        """
+        if self.profiler is not None and self.profiler.running:
+            result = {"ok": False, "error": "profile already running"}
+        else:
+            self.profiler = SamplingProfiler(self.settings.profile_interval)
+            try:
+                summary = await self.profiler.run(seconds, self.settings.log_dir)
+                result = {"ok": True, "error": None, **summary}
+            except Exception as e:
+                logger.error(f"Profiling failed: {e}")
+                result = {"ok": False, "error": str(e)}
+
+        if self.mqtt_handler:
+            await self.mqtt_handler.publish_json("profile", result)
+        return result
+
+    def start_profile(self, seconds: float) -> None:
+        """
+        プロファイルをバックグラウンドで開始する
+
+        Args:
+            seconds: プロファイルする時間（秒）
+        """
+        self.tasks.spawn(self.profile(seconds), critical=True)
+
     def register_signal_handlers(self):
         """シグナルハンドラーを登録する"""
+        if sys.platform == "win32":
+            for sig in [signal.SIGINT, signal.SIGTERM]:
+                signal.signal(sig, self._handle_shutdown)
+            return
+
+        # イベントループ上でハンドラーを実行し、待機中のループをすぐに起こす
+        loop = asyncio.get_running_loop()
         for sig in [signal.SIGINT, signal.SIGTERM]:
-            signal.signal(sig, self._handle_shutdown)
+            loop.add_signal_handler(sig, self._handle_shutdown)
+        loop.add_signal_handler(signal.SIGHUP, self._handle_reload)
 
     def _handle_shutdown(self, sig=None, frame=None):
         """シャットダウンを処理する"""
+        if self.shutdown_event.is_set():
+            return
         logger.info("Shutdown signal received, closing connections...")
-        asyncio.create_task(self._shutdown())
+        self.tasks.spawn(self._shutdown(), critical=True)
+
+    def _handle_reload(self):
+        """SIGHUPで設定を再読み込みする"""
+        logger.info("SIGHUP received, reloading configuration...")
+        self.tasks.spawn(self.reload_config(), critical=True)
+
+    def start_config_watcher(self) -> None:
+        """設定ファイルの変更監視を開始する"""
+        if self.settings.config_watch_interval > 0:
+            self.tasks.spawn(self._watch_config(), critical=True)
+
+    async def _watch_config(self) -> None:
+        """設定ファイルの更新時刻を定期的に確認し、変更されていれば再読み込みする"""
+        while not self.shutdown_event.is_set():
+            await asyncio.sleep(self.settings.config_watch_interval)
+            mtime = self._get_config_mtime()
+            if mtime is not None and mtime != self._config_mtime:
+                logger.info(f"Configuration file changed: {self.config_file}")
+                await self.reload_config()
+
+    async def reload_config(self, updates: dict | None = None) -> dict:
+        """
+        設定ファイルを読み直し、変更された項目だけを稼働中のコンポーネントに適用する
+
+        シリアル接続は切断せず、OSCソケットの再バインド、MQTTの購読変更・再接続、
+        制御ループの再設定、ログ出力の再設定のうち必要なものだけを行う
+
+        Args:
+            updates: 設定ファイルに書き込んでから再読み込みする値（Noneの場合は読み直すのみ）
+
+        Returns:
+            dict: 結果（ok, changed, error）
+        """
+        async with self._reload_lock:
+            result = await self._reload_config(updates)
+
+        # 結果をMQTTで通知（再接続直後で未接続の場合は送信されない）
+        if self.mqtt_handler:
+            await self.mqtt_handler.publish_json("config", result)
+        return result
+
+    async def _reload_config(self, updates: dict | None) -> dict:
+        """設定を再読み込みして適用する（reload_configのロック内で実行）"""
+        self._config_mtime = self._get_config_mtime()
+        try:
+            # 書き込み途中などで読めない場合はデフォルトに戻さず、現在の設定を維持する
+            config = json.loads(self.config_file.read_text()) if self.config_file.exists() else {}
+            if not isinstance(config, dict):
+                raise ValueError("settings file must contain a JSON object")
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read configuration, keeping current settings: {e}")
+            return {"ok": False, "changed": [], "error": str(e)}
+        if updates:
+            config.update(updates)
+
+        old = self.settings
+        try:
+            new = reload_settings(config)
+        except ValidationError as e:
+            logger.error(f"Invalid configuration, keeping current settings: {e}")
+            return {"ok": False, "changed": [], "error": str(e)}
+
+        if updates:
+            self._save_config(config)
+        self.config = config
+        self.settings = new
+
+        changed = [name for name in type(new).model_fields if getattr(old, name) != getattr(new, name)]
+        if not changed:
+            logger.info("Configuration reloaded: no changes")
+            return {"ok": True, "changed": [], "error": None}
+
+        logger.info(f"Configuration reloaded, applying changes: {', '.join(changed)}")
+        try:
+            await self._apply_settings(old, new, set(changed))
+        except Exception as e:
+            logger.error(f"Failed to apply configuration: {e}")
+            return {"ok": False, "changed": changed, "error": str(e)}
+        return {"ok": True, "changed": changed, "error": None}
+
+    async def _apply_settings(self, old, new, changed: set[str]) -> None:
+        """
+        変更された設定を稼働中のコンポーネントに適用する
+
+        Args:
+            old: 変更前の設定
+            new: 変更後の設定
+            changed: 変更された設定項目の名前
+        """
+        if changed & set(LOGGING_FIELDS):
+            new.ensure_config_dirs()
+            setup_logger(debug_mode=self.debug)
+
+        if self.controller and changed & set(CONTROL_FIELDS):
+            self.controller.freshness.deadline = new.command_deadline
+            self.controller.configure_joystick(
+                control_rate=new.control_rate,
+                deadzone=new.joystick_deadzone,
+                smoothing=new.joystick_smoothing,
+                slew_rate=new.joystick_slew_rate,
+                keepalive=new.joystick_keepalive,
+                suppress_duplicates=new.joystick_suppress_duplicates,
+            )
+
+        if self.controller and changed & set(SEND_RATE_FIELDS):
+            self.controller.calibration_frames = new.link_calibration_frames
+            self.controller.send_rate.configure(
+                enabled=new.adaptive_send_rate, headroom=new.link_headroom, min_rate=new.min_send_rate
+            )
+
+        if self.controller and changed & set(IDLE_FIELDS):
+            self.controller.idle.configure(
+                new.idle_timeout,
+                new.idle_telemetry_interval,
+                new.idle_poll_interval,
+                new.idle_connection_check_interval,
+            )
+
+        if self.controller and changed & set(ADMISSION_FIELDS):
+            self.controller.admission.configure(
+                new.admission_joystick_rate,
+                new.admission_joystick_burst,
+                new.admission_command_rate,
+                new.admission_command_burst,
+            )
+
+        if self.loop_monitor and changed & {"slow_callback_threshold", "loop_lag_interval"}:
+            self.loop_monitor.configure(new.slow_callback_threshold, new.loop_lag_interval)
+
+        if self.controller and "record_path" in changed:
+            if self.controller.recorder is not None:
+                self.controller.recorder.close()
+            self.controller.recorder = Recorder(new.record_path) if new.record_path else None
+
+        if self.controller and changed & set(TELEMETRY_STORE_FIELDS):
+            if self.controller.telemetry_store is not None:
+                self.controller.telemetry_store.close()
+            self.controller.telemetry_store = (
+                self._create_telemetry_store(new.telemetry_store_path) if new.telemetry_store_path else None
+            )
+
+        if self.osc_server and changed & {"osc_ip", "osc_port"}:
+            await self.osc_server.rebind(new.osc_ip, new.osc_port)
+
+        if self.osc_server and changed & {"osc_feedback_rate", "osc_client_timeout", "osc_feedback_port"}:
+            feedback = self.osc_server.feedback
+            feedback.rate = new.osc_feedback_rate
+            feedback.client_timeout = new.osc_client_timeout
+            feedback.reply_port = new.osc_feedback_port
+
+        if self.controller and "telemetry_interval" in changed:
+            self.controller.telemetry_interval = new.telemetry_interval
+
+        if self.mqtt_handler:
+            if changed & set(MQTT_CONNECTION_FIELDS):
+                # ブローカーへの接続設定が変わった場合はMQTTクライアントだけを作り直す
+                # 変更されていない項目はコマンドラインで指定された現在の値を引き継ぐ
+                handler = self.mqtt_handler
+                await handler.stop()
+                self.mqtt_handler = self._create_mqtt_handler(
+                    new.mqtt_broker if "mqtt_broker" in changed else handler.broker,
+                    new.mqtt_port if "mqtt_port" in changed else handler.port,
+                    new.mqtt_command_topic if "mqtt_command_topic" in changed else handler.command_topic,
+                    None if "mqtt_client_id" in changed else handler.client_id,
+                    () if "mqtt_standby_brokers" in changed else self._mqtt_standby,
+                )
+                await self.mqtt_handler.start()
+            else:
+                if "mqtt_status_topic" in changed:
+                    self.mqtt_handler.status_topic = new.mqtt_status_topic
+                if changed & {"mqtt_command_topic", "mqtt_ctrl_topic"}:
+                    await self.mqtt_handler.update_topics(new.mqtt_command_topic, new.mqtt_ctrl_topic)
+
+        if "config_watch_interval" in changed and old.config_watch_interval <= 0:
+            self.start_config_watcher()
 
     async def _shutdown(self):
         """アプリケーションをシャットダウンする"""
         # シャットダウンイベントをセット（先に設定して、他のタスクが終了を確認できるようにする）
         self.shutdown_event.set()
+        sd_notify("STOPPING=1")
+
+        # 設定ファイルの監視・再読み込みタスクを停止
+        current = asyncio.current_task()
+        for task in self.tasks:
+            if task is not current:
+                task.cancel()
 
         try:
+            # 引き継がずに終了する待機系の入力経路を閉じる
+            self._release_standby_osc_port()
+            if self.standby_session is not None:
+                await self.standby_session.stop()
+                self.standby_session = None
+
             # MQTTハンドラーを停止
             if self.mqtt_handler:
                 await self.mqtt_handler.stop()
@@ -168,10 +910,34 @@ class Application:
             if self.osc_server:
                 self.osc_server.stop()
 
+            # ローカルIPCサーバーを停止
+            if self.ipc_server:
+                self.ipc_server.stop()
+
+            # フリートフレームの受信を停止
+            if self.fleet_listener:
+                self.fleet_listener.stop()
+
+            # 入力スレッドを停止
+            for thread in self.ingest_threads.values():
+                await thread.stop()
+            if self.bridge:
+                self.bridge.stop()
+
             # コントローラーを停止
             if self.controller:
                 await self.controller.stop()
 
+            # イベントループの遅延モニターを停止
+            if self.loop_monitor:
+                await self.loop_monitor.stop()
+
+            # シリアルポートを閉じた後でリースを解放し、待機系に引き継ぐ
+            if self.lease_task:
+                self.lease_task.cancel()
+            if self.lease:
+                self.lease.release()
+
         except Exception as e:
             logger.error(f"Error during shutdown: {e}")
 
@@ -183,13 +949,15 @@ class Application:
         try:
             # シャットダウンイベントを待機
             await self.shutdown_event.wait()
+            # シャットダウン処理の完了を待つ
+            await asyncio.gather(*self.tasks, return_exceptions=True)
         except asyncio.CancelledError:
             # キャンセルされた場合は静かに終了（トレースバックを表示しない）
             logger.debug("Application run task was cancelled")
 
 
 # Command-line interface using asyncclick.
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option(
     "--serial-port",
     type=str,
@@ -231,6 +999,24 @@ class Application:
     show_default=True,
     help="MQTT topic to subscribe for WHILL commands",
 )
+@click.option(
+    "--mqtt-client-id",
+    type=str,
+    default=None,
+    help="Stable MQTT client identifier used for the persistent session (defaults to whill-controller-<hostname>-<serial port>)",
+)
+@click.option(
+    "--mqtt-standby",
+    type=str,
+    multiple=True,
+    help="Standby MQTT broker as host:port; may be given multiple times, in failover priority order",
+)
+@click.option(
+    "--mqtt-v5",
+    is_flag=True,
+    default=False,
+    help="Connect with MQTT v5 (topic aliases, message expiry, ts/seq user properties)",
+)
 @click.option(
     "--use-mock",
     is_flag=True,
@@ -255,7 +1041,101 @@ class Application:
     default=False,
     help="Use only MQTT client (no OSC)",
 )
-async def main(serial_port, osc_ip, osc_port, mqtt_broker, mqtt_port, mqtt_topic, use_mock, debug, osc_only, mqtt_only):
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Record a binary command and latency trace to this file (see 'whill-ctrl analyze')",
+)
+@click.option(
+    "--telemetry-store",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Store telemetry and controller stats in columnar segments under this directory (see whill/ctrl/query)",
+)
+@click.option(
+    "--ipc-socket",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Accept binary commands from local producers on this Unix datagram socket",
+)
+@click.option(
+    "--shm-name",
+    type=str,
+    default=None,
+    help="Create a shared-memory joystick setpoint slot with this name, read by the control loop every period",
+)
+@click.option(
+    "--fleet-id",
+    type=click.IntRange(0, 65535),
+    default=None,
+    help="Accept fleet broadcast frames and drive the entry with this chair id",
+)
+@click.option(
+    "--fleet-group",
+    type=str,
+    default=None,
+    help="Also receive fleet frames on this UDP multicast group (port: fleet_port setting)",
+)
+@click.option(
+    "--threaded-ingest",
+    is_flag=True,
+    default=False,
+    help="Run OSC and MQTT ingestion in their own threads and event loops, handing commands to the device loop",
+)
+@click.option(
+    "--faults",
+    type=str,
+    default=None,
+    metavar="SPEC",
+    help="Inject device latency, write failures and disconnects given as key=value pairs (for testing)",
+)
+@click.option(
+    "--lease-file",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Hold this lock file while controlling the device (shared by active and standby processes)",
+)
+@click.option(
+    "--standby",
+    is_flag=True,
+    default=False,
+    help="If another controller holds the lease, wait warm and take over the serial port when it stops",
+)
+@click.option(
+    "--profile-seconds",
+    type=float,
+    default=None,
+    help="Profile the controller for this many seconds after startup (results are written to the log directory)",
+)
+@click.pass_context
+async def main(
+    ctx,
+    serial_port,
+    osc_ip,
+    osc_port,
+    mqtt_broker,
+    mqtt_port,
+    mqtt_topic,
+    mqtt_client_id,
+    mqtt_standby,
+    mqtt_v5,
+    use_mock,
+    debug,
+    osc_only,
+    mqtt_only,
+    record,
+    telemetry_store,
+    ipc_socket,
+    shm_name,
+    fleet_id,
+    fleet_group,
+    threaded_ingest,
+    faults,
+    lease_file,
+    standby,
+    profile_seconds,
+):
     """
     WHILL Controller with OSC and MQTT support
 
@@ -264,22 +1144,65 @@ async def main(serial_port, osc_ip, osc_port, mqtt_broker, mqtt_port, mqtt_topic
 
     OSC endpoints:
       /whill/joystick   -> expects two numbers; interprets x as 'side' and y as 'front'
+                           optional 3rd/4th args: sequence number, send time (server clock, double)
+      /whill/time/sync  -> replies token, server receive time and send time to the sender
+      /whill/ping       -> replies /whill/pong with token, receive/dispatch timestamps and queue depth
       /whill/power_on   -> turns on the WHILL
       /whill/power_off  -> turns off the WHILL
       /whill/emergency_stop -> stops the WHILL immediately (set velocity to 0)
+      /whill/fleet      -> blob: fleet frame (with --fleet-id, see whill_ctrl.fleet)
+
+    OSC feedback (sent back to every client that sent a message recently, as one
+    bundle per tick containing only changed values):
+      /whill/status/{connected,mode,port}
+      /whill/telemetry/{front,side,battery_level,battery_current,left_speed,right_speed,power_status,error_code}
 
     MQTT topics:
-      whill/commands/joystick -> payload: "front,side" (-100 to 100 for each)
+      whill/commands/joystick -> payload: "front,side[,seq[,sent_at]]" (-100 to 100 for each)
       whill/commands/power_on -> any payload
       whill/commands/power_off -> any payload
       whill/commands/emergency_stop -> any payload
+      whill/commands/fleet -> binary fleet frame (with --fleet-id)
 
     MQTT status topics:
       whill/status/connection -> JSON with connection status info
+      whill/status/time -> JSON reply to whill/ctrl/time/sync
+      whill/status/stats -> JSON reply to whill/ctrl/stats
+      whill/status/config -> JSON result of whill/ctrl/config/reload
+      whill/status/profile -> JSON summary of a whill/ctrl/profile run
+      whill/status/pong -> JSON reply to whill/ctrl/ping
 
     MQTT control topics:
       whill/ctrl/serial/change_port -> payload: port name (e.g. "/dev/ttyUSB1")
+      whill/ctrl/time/sync -> payload: token; clock offset handshake
+      whill/ctrl/ping -> payload: token; replies with receive/dispatch timestamps and queue depth
+      whill/ctrl/stats -> publishes controller statistics (incl. event-loop lag and slow callbacks)
+      whill/ctrl/query -> payload: JSON {start, end, step, max_points, columns}; replies downsampled telemetry
+      whill/ctrl/config/reload -> payload: empty or JSON object of settings to change
+      whill/ctrl/profile -> payload: seconds (default 10); writes pstats and collapsed stacks to the log directory
+
+    Local IPC (same host, see whill_ctrl.ipc):
+      --ipc-socket PATH -> 16-byte binary datagrams: version, command, front, side, seq, sent_at
+      --shm-name NAME -> seqlock setpoint slot in shared memory, polled by the control loop
+
+    Fleet broadcast (one message per tick drives many chairs, see whill_ctrl.fleet):
+      16-byte header (version, flags, count, frame_seq, sent_at) + count x (chair_id u16, front i8, side i8)
+      received as an OSC blob, an MQTT binary payload or a UDP multicast datagram (--fleet-group)
+
+    Configuration is reloaded without restarting when the settings file changes,
+    on SIGHUP, or via whill/ctrl/config/reload. The serial connection is never touched.
+
+    Subcommands:
+      analyze -> offline analysis of traces recorded with --record
+      bench -> performance regression sweep over input rate, sources and device latency
+      probe -> client-side round-trip measurement via /whill/ping or whill/ctrl/ping
+      soak -> long-running leak check against a mock WHILL under synthetic load and disconnects
+      takeover -> measures the standby takeover outage by killing the active controller
     """
+    # サブコマンドが指定された場合はコントローラーを起動しない
+    if ctx.invoked_subcommand is not None:
+        return
+
     # ロガーの設定
     setup_logger(debug_mode=debug)
 
@@ -303,17 +1226,43 @@ async def main(serial_port, osc_ip, osc_port, mqtt_broker, mqtt_port, mqtt_topic
 
     try:
         # アプリケーションを初期化
-        app = Application()
+        app = Application(debug=debug)
         success = await app.initialize(
-            serial_port, osc_ip, osc_port, mqtt_broker, mqtt_port, mqtt_topic, use_mock, osc_only, mqtt_only
+            serial_port,
+            osc_ip,
+            osc_port,
+            mqtt_broker,
+            mqtt_port,
+            mqtt_topic,
+            use_mock,
+            osc_only,
+            mqtt_only,
+            mqtt_client_id=mqtt_client_id,
+            mqtt_standby=mqtt_standby,
+            mqtt_v5=mqtt_v5,
+            record_path=record or app.settings.record_path,
+            telemetry_store_path=telemetry_store or app.settings.telemetry_store_path,
+            ipc_socket=ipc_socket,
+            shm_name=shm_name,
+            threaded_ingest=threaded_ingest or None,
+            standby=standby,
+            lease_path=lease_file,
+            faults=faults,
+            fleet_chair_id=fleet_id,
+            fleet_group=fleet_group,
         )
 
         if not success:
             logger.error("Application initialization failed")
             return
 
-        # シグナルハンドラーを登録
+        # シグナルハンドラーと設定ファイルの監視を登録
         app.register_signal_handlers()
+        app.start_config_watcher()
+
+        # 起動直後からのプロファイル
+        if profile_seconds:
+            app.start_profile(profile_seconds)
 
         # アプリケーションを実行
         await app.run()
@@ -344,3 +1293,447 @@ def custom_exception_handler(loop, context):
 
     task = context.get("task")
     logger.error(f"Unhandled exception in {task}: {msg or formatted_exception}")
+
+
+@main.command()
+@click.argument("traces", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write the JSON report to this file instead of stdout",
+)
+@click.option(
+    "--plots",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Directory for optional PNG plots (requires matplotlib)",
+)
+@click.option(
+    "--stall-threshold",
+    type=float,
+    default=0.25,
+    show_default=True,
+    help="Gap in seconds between serial writes, while moving, that counts as a stall",
+)
+@click.option(
+    "--event-window",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Seconds around a stall in which reconnect events are correlated",
+)
+@click.option("--top", type=int, default=10, show_default=True, help="Number of worst stalls to report")
+async def analyze(traces, output, plots, stall_threshold, event_window, top):
+    """
+    Analyze command and latency traces recorded with --record
+
+    Loads the traces through a memory map and reports inter-arrival distributions
+    per source, coalescing ratio, ingress-to-serial latency percentiles, jitter
+    spectra and the worst stalls correlated with reconnect events.
+    """
+    from ..recording.analyzer import run_analysis
+
+    try:
+        report = run_analysis(
+            list(traces), output, plots, stall_threshold=stall_threshold, event_window=event_window, top=top
+        )
+    except ImportError as e:
+        raise click.ClickException(str(e))
+
+    if output is None:
+        click.echo(json.dumps(report, indent=2))
+
+
+@main.command()
+@click.option(
+    "--transport",
+    type=click.Choice(["osc", "mqtt"]),
+    default="osc",
+    show_default=True,
+    help="Probe the OSC /whill/ping endpoint or the MQTT whill/ctrl/ping topic",
+)
+@click.option("--host", type=str, default="127.0.0.1", show_default=True, help="Controller host or MQTT broker")
+@click.option("--port", type=int, default=None, help="OSC server or MQTT broker port (defaults to 5005 / 1883)")
+@click.option("--count", type=int, default=100, show_default=True, help="Number of pings")
+@click.option("--interval", type=float, default=0.05, show_default=True, help="Seconds between pings")
+@click.option("--timeout", type=float, default=1.0, show_default=True, help="Seconds to wait for each reply")
+@click.option(
+    "--mqtt-ctrl-prefix", type=str, default="whill/ctrl", show_default=True, help="Base path of the control topics"
+)
+@click.option(
+    "--mqtt-status-prefix", type=str, default="whill/status", show_default=True, help="Base path of the status topics"
+)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the summary as JSON")
+async def probe(transport, host, port, count, interval, timeout, mqtt_ctrl_prefix, mqtt_status_prefix, as_json):
+    """
+    Measure controller responsiveness from the client side
+
+    Sends pings and splits each round trip into time spent inside the
+    controller (receive to dispatch) and time spent on the network, with
+    one-way estimates from the clock offset of the fastest round trip.
+    """
+    from ..diagnostics.probe import probe_mqtt, probe_osc, summarize
+
+    if transport == "osc":
+        samples, lost = await probe_osc(host, port or 5005, count, interval, timeout)
+    else:
+        samples, lost = await probe_mqtt(
+            host, port or 1883, count, interval, timeout, mqtt_ctrl_prefix, mqtt_status_prefix
+        )
+    summary = summarize(samples, lost)
+
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+        return
+
+    click.echo(f"{transport} {host}: {summary['received']}/{summary['sent']} replies, {summary['lost']} lost")
+    if not samples:
+        return
+    click.echo(f"{'(ms)':<10}{'min':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}")
+    for key in ("rtt_ms", "server_ms", "network_ms", "uplink_ms", "downlink_ms"):
+        row = summary[key]
+        values = "".join(f"{row[p]:>9.3f}" for p in ("min", "p50", "p90", "p99", "max"))
+        click.echo(f"{key[:-3]:<10}{values}")
+    click.echo(
+        f"queue depth mean {summary['queue_depth']['mean']}, max {summary['queue_depth']['max']}; "
+        f"clock offset {summary['clock_offset_ms']} ms"
+    )
+
+
+@main.command()
+@click.option("--duration", type=float, default=3600.0, show_default=True, help="Seconds to run")
+@click.option("--sample-interval", type=float, default=10.0, show_default=True, help="Seconds between resource samples")
+@click.option(
+    "--warmup", type=float, default=0.2, show_default=True, help="Fraction of the run excluded from the slope fit"
+)
+@click.option("--osc-sources", type=int, default=4, show_default=True, help="Number of synthetic OSC senders")
+@click.option("--osc-rate", type=float, default=50.0, show_default=True, help="Joystick rate per OSC sender (Hz)")
+@click.option(
+    "--mqtt-broker", type=str, default=None, help="MQTT broker for synthetic load as host[:port] (omit to skip MQTT)"
+)
+@click.option("--mqtt-rate", type=float, default=20.0, show_default=True, help="MQTT joystick rate (Hz)")
+@click.option("--mqtt-v5", is_flag=True, default=False, help="Use MQTT v5 for the controller and the MQTT load")
+@click.option(
+    "--disconnect-interval",
+    type=float,
+    default=60.0,
+    show_default=True,
+    help="Seconds between injected device disconnects and MQTT client restarts (0 disables)",
+)
+@click.option("--max-heap-slope", type=float, default=5.0, show_default=True, help="Allowed heap growth (MB/h)")
+@click.option("--max-rss-slope", type=float, default=20.0, show_default=True, help="Allowed RSS growth (MB/h)")
+@click.option("--max-task-slope", type=float, default=10.0, show_default=True, help="Allowed task count growth (1/h)")
+@click.option(
+    "--output", type=click.Path(dir_okay=False, path_type=Path), default=None, help="Write the full report as JSON"
+)
+@click.option(
+    "--faults",
+    type=str,
+    default=None,
+    metavar="SPEC",
+    help="Inject faults into the mock device (see whill-ctrl --faults)",
+)
+@click.option("--debug", is_flag=True, default=False, help="Show controller logs")
+async def soak(
+    duration,
+    sample_interval,
+    warmup,
+    osc_sources,
+    osc_rate,
+    mqtt_broker,
+    mqtt_rate,
+    mqtt_v5,
+    disconnect_interval,
+    max_heap_slope,
+    max_rss_slope,
+    max_task_slope,
+    output,
+    faults,
+    debug,
+):
+    """
+    Run a soak test against a mock WHILL and fail on resource growth
+
+    Drives an in-process controller with synthetic OSC (and optionally MQTT)
+    load and periodic disconnects, samples tracemalloc heap, live asyncio
+    tasks and RSS, and exits with status 1 if any grows faster than allowed
+    after the warm-up.
+    """
+    from ..diagnostics.soak import SoakHarness
+
+    # --debugなしの場合、コントローラーのログは警告以上のみ表示する（サンプルの記録はすべて表示する）
+    logger.remove()
+    if debug:
+        logger.add(sys.stderr, level="DEBUG")
+    else:
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            filter=lambda record: record["level"].no >= 30 or record["name"] == "whill_ctrl.diagnostics.soak",
+        )
+
+    broker, broker_port = parse_broker_address(mqtt_broker) if mqtt_broker else (None, 1883)
+    harness = SoakHarness(
+        duration,
+        sample_interval=sample_interval,
+        warmup=warmup,
+        osc_sources=osc_sources,
+        osc_rate=osc_rate,
+        mqtt_broker=broker,
+        mqtt_port=broker_port,
+        mqtt_rate=mqtt_rate,
+        mqtt_v5=mqtt_v5,
+        disconnect_interval=disconnect_interval,
+        max_heap_slope=max_heap_slope,
+        max_rss_slope=max_rss_slope,
+        max_task_slope=max_task_slope,
+        faults=faults,
+    )
+    report = await harness.run()
+
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+    slopes = report["slopes_per_hour"]
+    click.echo(
+        f"soak {report['duration']:.0f}s, {len(report['samples'])} samples: "
+        f"heap {slopes['heap_mb']:+.3f} MB/h, rss {slopes['rss_mb']:+.3f} MB/h, tasks {slopes['tasks']:+.3f}/h"
+    )
+    click.echo(", ".join(f"{key} {value}" for key, value in report["load"].items()))
+    for entry in report["top_growth"][:5]:
+        click.echo(f"  +{entry['size_diff'] / 1024:.1f} KiB {entry['where']}")
+    if not report["ok"]:
+        for failure in report["failures"]:
+            click.echo(f"FAIL: {failure}", err=True)
+        sys.exit(1)
+    click.echo("OK")
+
+
+def _parse_sweep(value: str, kind=float) -> list:
+    """カンマ区切りのスイープの値を解析する"""
+    try:
+        return [kind(item.strip()) for item in value.split(",") if item.strip()]
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
+
+
+@main.command()
+@click.option("--rates", type=str, default="50,200", show_default=True, help="Joystick rates per source (Hz)")
+@click.option("--sources", type=str, default="1,4,16", show_default=True, help="Numbers of concurrent sources")
+@click.option("--latencies", type=str, default="0,2,10", show_default=True, help="Injected device write latencies (ms)")
+@click.option(
+    "--transports",
+    type=str,
+    default="osc",
+    show_default=True,
+    help="Transports to measure (mqtt needs --mqtt-broker); a '+' combination such as osc+mqtt alternates sources",
+)
+@click.option(
+    "--ingest",
+    type=str,
+    default="inline",
+    show_default=True,
+    help="Ingest modes to measure: inline (device loop) and/or threaded (ingest threads)",
+)
+@click.option("--mqtt-broker", type=str, default=None, help="MQTT broker (host[:port]) for the mqtt transport")
+@click.option("--duration", type=float, default=3.0, show_default=True, help="Seconds of load per point")
+@click.option(
+    "--repeat", type=int, default=3, show_default=True, help="Runs per point; the best value of each metric is kept"
+)
+@click.option("--control-rate", type=float, default=50.0, show_default=True, help="Controller control rate (Hz)")
+@click.option(
+    "--osc-batch-size",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Drain up to this many OSC datagrams per wakeup (0 disables)",
+)
+@click.option(
+    "--real-time",
+    is_flag=True,
+    default=False,
+    help="Wait in real time instead of skipping idle waits on a bench clock (MQTT and threaded points always do)",
+)
+@click.option(
+    "--min-throughput",
+    type=float,
+    default=0.8,
+    show_default=True,
+    help="Required fraction of the achievable device write rate",
+)
+@click.option(
+    "--latency-slack-ms",
+    type=float,
+    default=20.0,
+    show_default=True,
+    help="Slack added to the p99 latency budget (ms)",
+)
+@click.option(
+    "--max-heap-kb", type=float, default=4096.0, show_default=True, help="Allowed heap peak growth per point (KB)"
+)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Compare against (and with --update-baseline, write) this baseline file",
+)
+@click.option("--update-baseline", is_flag=True, default=False, help="Write the results to the baseline file")
+@click.option(
+    "--tolerance", type=float, default=0.25, show_default=True, help="Allowed regression from the baseline (fraction)"
+)
+@click.option(
+    "--output", type=click.Path(dir_okay=False, path_type=Path), default=None, help="Write the full report as JSON"
+)
+@click.option("--debug", is_flag=True, default=False, help="Show controller logs")
+async def bench(
+    rates,
+    sources,
+    latencies,
+    transports,
+    ingest,
+    mqtt_broker,
+    duration,
+    repeat,
+    control_rate,
+    osc_batch_size,
+    real_time,
+    min_throughput,
+    latency_slack_ms,
+    max_heap_kb,
+    baseline,
+    update_baseline,
+    tolerance,
+    output,
+    debug,
+):
+    """
+    Sweep input rate, sources and device latency and fail on regressions
+
+    Drives an in-process controller over loopback OSC and MQTT through a broker,
+    on the device loop or on ingest threads, into a mock WHILL with injected
+    write latency. Measures the device write rate, input-to-write latency, CPU
+    per input and heap peak for every combination, and exits with status 1 if
+    any point misses its budget (derived from the control rate and write
+    latency) or regresses from the baseline beyond the tolerance.
+    """
+    from ..diagnostics.bench import INGEST_MODES, BenchHarness, BenchPoint, load_baseline, save_baseline
+
+    if update_baseline and baseline is None:
+        raise click.UsageError("--update-baseline requires --baseline")
+
+    # --debugなしの場合、コントローラーのログは警告以上のみ表示する（注入する遅延の警告は点ごとに出るため除く）
+    logger.remove()
+    if debug:
+        logger.add(sys.stderr, level="DEBUG")
+    else:
+        logger.add(
+            sys.stderr,
+            level="INFO",
+            filter=lambda record: (
+                record["name"] == "whill_ctrl.diagnostics.bench"
+                or (record["level"].no >= 30 and record["name"] != "whill_ctrl.whill.faults")
+            ),
+        )
+
+    transport_sets = []
+    for item in transports.split(","):
+        names = tuple(name.strip() for name in item.split("+") if name.strip())
+        if not names or any(name not in ("osc", "mqtt") for name in names):
+            raise click.BadParameter(f"unknown transport: {item}", param_hint="--transports")
+        transport_sets.append(names)
+    ingest_modes = _parse_sweep(ingest, str)
+    if not ingest_modes or any(mode not in INGEST_MODES for mode in ingest_modes):
+        raise click.BadParameter(f"choose from {', '.join(INGEST_MODES)}", param_hint="--ingest")
+    broker = parse_broker_address(mqtt_broker) if mqtt_broker else None
+    if broker is None and any("mqtt" in names for names in transport_sets):
+        raise click.UsageError("the mqtt transport requires --mqtt-broker")
+    points = [
+        BenchPoint(rate, count, latency_ms, names, mode)
+        for mode in ingest_modes
+        for names in transport_sets
+        for latency_ms in _parse_sweep(latencies)
+        for count in _parse_sweep(sources, int)
+        for rate in _parse_sweep(rates)
+    ]
+
+    harness = BenchHarness(
+        points,
+        duration=duration,
+        control_rate=control_rate,
+        osc_batch_size=osc_batch_size,
+        mqtt_broker=broker,
+        repeat=repeat,
+        fast_forward=not real_time,
+        min_throughput=min_throughput,
+        latency_slack_ms=latency_slack_ms,
+        max_heap_kb=max_heap_kb,
+        baseline=load_baseline(baseline) if baseline is not None and not update_baseline else None,
+        tolerance=tolerance,
+    )
+    # 点ごとにイベントループを作成するため、別スレッドで実行する
+    report = await asyncio.to_thread(harness.run)
+
+    if output is not None:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+    if update_baseline:
+        save_baseline(baseline, report)
+        click.echo(f"baseline written to {baseline}")
+
+    cpu = report["cpu"]
+    summary = (
+        f"bench {len(report['results'])} points in {report['wall_seconds']:.1f}s, "
+        f"cpu index {cpu['index']} (reference {report['cpu_reference_us']} us)"
+    )
+    if "ratio_to_baseline" in cpu:
+        summary += f", {cpu['ratio_to_baseline']}x baseline over {cpu['compared_points']} points"
+    click.echo(summary)
+    if not report["ok"]:
+        for failure in report["failures"]:
+            click.echo(f"FAIL: {failure}", err=True)
+        sys.exit(1)
+    click.echo("OK")
+
+
+@main.command()
+@click.option("--runs", type=int, default=5, show_default=True, help="Number of takeovers")
+@click.option(
+    "--ping-interval", type=float, default=0.002, show_default=True, help="Seconds between pings (resolution)"
+)
+@click.option("--settle", type=float, default=2.0, show_default=True, help="Seconds to let the standby start")
+@click.option("--timeout", type=float, default=10.0, show_default=True, help="Seconds to wait for a takeover")
+@click.option("--mqtt-broker", type=str, default=None, help="Also connect both controllers to this MQTT broker")
+@click.option("--mqtt-port", type=int, default=1883, show_default=True, help="MQTT broker port")
+@click.option(
+    "--log-dir",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=None,
+    help="Keep the output of each controller process in this directory",
+)
+@click.option("--json", "as_json", is_flag=True, default=False, help="Print the summary as JSON")
+async def takeover(runs, ping_interval, settle, timeout, mqtt_broker, mqtt_port, log_dir, as_json):
+    """
+    Measure how long the chair is uncontrollable when the active controller dies
+
+    Starts two mock controllers sharing a lease file in standby mode, pings
+    the OSC port continuously, SIGKILLs the active one and measures the gap
+    until the standby answers. Roles alternate for each run.
+    """
+    from ..diagnostics.takeover import TakeoverBench
+
+    extra = ("--mqtt-broker", mqtt_broker, "--mqtt-port", str(mqtt_port)) if mqtt_broker else ()
+    bench = TakeoverBench(runs, ping_interval, settle, timeout, extra, log_dir)
+    summary = await bench.run()
+
+    if as_json:
+        click.echo(json.dumps(summary, indent=2))
+    else:
+        click.echo(f"{summary['runs']} takeovers, {summary['failed']} failed")
+        if summary["runs"]:
+            row = summary["outage_ms"]
+            click.echo("outage (ms): " + ", ".join(f"{p} {row[p]:.1f}" for p in ("min", "p50", "p90", "max")))
+    if summary["failed"]:
+        sys.exit(1)
@@ -0,0 +1,237 @@
+"""
+稼働系・待機系のプロセスで制御を引き継ぐためのローカルリース
+
+リースはロックファイルの排他ロック（flock）で、稼働系のプロセスが終了すると（SIGKILLを含む）カーネルが即座に解放する
+稼働系は一定間隔でハートビートと制御状態（シリアルポート、接続状態、送信済みのセットポイント）をファイルへ書き込み、
+待機系はロックの取得を試みながらその状態をミラーする
+ハートビートが途絶えたまま応答しない稼働系は、待機系が強制終了（フェンシング）してからロックを取得する
+"""
+
+import asyncio
+import fcntl
+import os
+import signal
+import struct
+import time
+from pathlib import Path
+
+from loguru import logger
+
+# リースファイルの形式: magic, pid, 世代, ハートビート時刻, 取得時刻（単調時計）, シリアルポート, 接続状態, front, side
+LEASE_STRUCT = struct.Struct("<4sIIdd64sBbb")
+LEASE_MAGIC = b"WLSE"
+
+
+class LeaseState:
+    """リースファイルに書き込まれた稼働系の状態"""
+
+    __slots__ = ("pid", "generation", "heartbeat", "acquired", "port", "connected", "front", "side")
+
+    def __init__(
+        self,
+        pid: int,
+        generation: int,
+        heartbeat: float,
+        acquired: float,
+        port: str,
+        connected: bool,
+        front: int,
+        side: int,
+    ):
+        self.pid = pid
+        self.generation = generation
+        self.heartbeat = heartbeat
+        self.acquired = acquired
+        self.port = port
+        self.connected = connected
+        self.front = front
+        self.side = side
+
+    def to_dict(self) -> dict:
+        return {
+            "pid": self.pid,
+            "generation": self.generation,
+            "port": self.port,
+            "connected": self.connected,
+            "front": self.front,
+            "side": self.side,
+        }
+
+
+class Lease:
+    """ロックファイルによるリース"""
+
+    def __init__(self, path: Path):
+        """
+        リースを初期化（ファイルを開くだけで、ロックは取得しない）
+
+        Args:
+            path: ロックファイルのパス（存在しない場合は作成する）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 稼働系が書き込んだ内容を消さないよう、切り詰めずに開く
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        self.held = False
+        self.generation = 0
+        self.acquired_at = 0.0
+
+        # 統計カウンター
+        self.heartbeats = 0
+        self.fenced = 0
+        self.takeover: dict | None = None
+
+    def try_acquire(self, port: str = "") -> bool:
+        """
+        ロックの取得を試みる（待機しない）
+
+        取得した場合は、前の稼働系の内容を待機系が読まないよう、すぐにハートビートを書き込む
+
+        Args:
+            port: 書き込むシリアルポート名
+
+        Returns:
+            bool: 取得できた場合はTrue
+        """
+        if self.held:
+            return True
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        previous = self.read()
+        self.generation = previous.generation + 1 if previous is not None else 1
+        self.acquired_at = time.monotonic()
+        self.held = True
+        self.heartbeat(port, False, 0, 0)
+        return True
+
+    def read(self) -> LeaseState | None:
+        """
+        リースファイルの内容を読み込む
+
+        Returns:
+            LeaseState | None: 稼働系の状態、書き込まれていない場合はNone
+        """
+        data = os.pread(self._fd, LEASE_STRUCT.size, 0)
+        if len(data) < LEASE_STRUCT.size:
+            return None
+        magic, pid, generation, heartbeat, acquired, port, connected, front, side = LEASE_STRUCT.unpack(data)
+        if magic != LEASE_MAGIC:
+            return None
+        return LeaseState(
+            pid,
+            generation,
+            heartbeat,
+            acquired,
+            port.rstrip(b"\0").decode(errors="replace"),
+            bool(connected),
+            front,
+            side,
+        )
+
+    def heartbeat(self, port: str, connected: bool, front: int, side: int) -> None:
+        """
+        ハートビートと制御状態を書き込む（リースを保持している場合のみ）
+
+        Args:
+            port: シリアルポート名
+            connected: デバイスの接続状態
+            front: 送信済みの前後方向の値
+            side: 送信済みの左右方向の値
+        """
+        if not self.held:
+            return
+        data = LEASE_STRUCT.pack(
+            LEASE_MAGIC,
+            os.getpid(),
+            self.generation,
+            time.monotonic(),
+            self.acquired_at,
+            port.encode()[:64],
+            connected,
+            front,
+            side,
+        )
+        # 1回のpwriteで書き込み、待機系が途中までの内容を読む可能性を小さくする
+        os.pwrite(self._fd, data, 0)
+        self.heartbeats += 1
+
+    def release(self) -> None:
+        """ロックを解放してファイルを閉じる"""
+        if self._fd < 0:
+            return
+        if self.held:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.held = False
+        os.close(self._fd)
+        self._fd = -1
+
+    def fence(self, state: LeaseState) -> bool:
+        """
+        応答しない稼働系を強制終了する
+
+        Args:
+            state: 稼働系の状態
+
+        Returns:
+            bool: シグナルを送った場合はTrue
+        """
+        if state.pid <= 0 or state.pid == os.getpid():
+            return False
+        try:
+            os.kill(state.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            return False
+        except PermissionError as e:
+            logger.error(f"Cannot fence unresponsive controller (pid {state.pid}): {e}")
+            return False
+        self.fenced += 1
+        return True
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {
+            "role": "active" if self.held else "standby",
+            "generation": self.generation,
+            "heartbeats": self.heartbeats,
+            "fenced": self.fenced,
+            "takeover": self.takeover,
+        }
+
+
+async def wait_for_takeover(
+    lease: Lease, poll_interval: float = 0.02, timeout: float = 0.5, fence: bool = True
+) -> LeaseState | None:
+    """
+    稼働系が停止するまで待機し、リースを取得する
+
+    ロックを取得できるまでpoll_intervalごとに試行し、その間に稼働系の状態をミラーする
+    ハートビートがtimeout秒以上途絶えている場合、fenceがTrueなら稼働系を強制終了する
+
+    Args:
+        lease: リース
+        poll_interval: ロックの取得を試みる間隔（秒）
+        timeout: 稼働系が応答しないとみなすハートビートの途絶時間（秒）
+        fence: 応答しない稼働系を強制終了するかどうか
+
+    Returns:
+        LeaseState | None: 最後にミラーした稼働系の状態（稼働系がいなかった場合はNone）
+    """
+    mirrored = None
+    fenced_pid = None
+    while not lease.try_acquire():
+        state = lease.read()
+        if state is not None:
+            if mirrored is None or state.pid != mirrored.pid:
+                logger.info(f"Standing by for controller pid {state.pid} (port {state.port})")
+            mirrored = state
+            stale = time.monotonic() - state.heartbeat >= timeout
+            if fence and stale and state.pid != fenced_pid and lease.fence(state):
+                fenced_pid = state.pid
+                logger.warning(
+                    f"Controller pid {state.pid} stopped heartbeating for "
+                    f"{time.monotonic() - state.heartbeat:.3f}s, fenced with SIGKILL"
+                )
+        await asyncio.sleep(poll_interval)
+    return mirrored
@@ -0,0 +1,148 @@
+"""
+systemdへの起動完了の通知と、制御の進行状況に基づくウォッチドッグ
+
+sd_notifyプロトコル（$NOTIFY_SOCKET のUnixドメインソケットへデータグラムを送る）を直接実装し、追加の依存を持たない
+ユニットに WatchdogSec= を指定すると、systemdは $WATCHDOG_USEC を渡し、その時間 WATCHDOG=1 が届かなければ
+プロセスを再起動する
+
+プロセスが存在するだけでは通知しない。制御ループ・シリアルへの書き込み・入力スレッドのすべてが一定時間内に
+進んでいる場合だけ WATCHDOG=1 を送るため、書き込みが戻らない・ループが止まったといった状態は再起動される
+（イベントループ自体が止まった場合は、このタスクも動かないため通知は自然に止まる）
+"""
+
+import asyncio
+import os
+import socket
+from collections import Counter
+from collections.abc import Callable
+
+from loguru import logger
+
+
+def sd_notify(state: str, socket_path: str | None = None) -> bool:
+    """
+    systemdへ状態を通知する
+
+    Args:
+        state: 改行区切りの通知（例: "READY=1", "WATCHDOG=1", "STATUS=..."）
+        socket_path: 通知先のソケット（Noneの場合は $NOTIFY_SOCKET、先頭が@の場合は抽象名前空間）
+
+    Returns:
+        bool: 送信した場合はTrue（systemd配下でない場合・送信に失敗した場合はFalse）
+    """
+    path = socket_path or os.environ.get("NOTIFY_SOCKET")
+    if not path:
+        return False
+    if path.startswith("@"):
+        path = "\0" + path[1:]
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.sendto(state.encode(), path)
+        return True
+    except OSError as e:
+        logger.debug(f"sd_notify failed: {e}")
+        return False
+
+
+def watchdog_interval() -> float | None:
+    """
+    systemdが要求するウォッチドッグの時間を取得する
+
+    Returns:
+        float | None: WatchdogSec（秒）、ウォッチドッグが無効・他のプロセス宛ての場合はNone
+    """
+    usec = os.environ.get("WATCHDOG_USEC")
+    pid = os.environ.get("WATCHDOG_PID")
+    # uv run 経由で起動した場合、systemdのメインプロセスは親プロセス（uv）になる
+    if not usec or (pid and pid not in (str(os.getpid()), str(os.getppid()))):
+        return None
+    try:
+        seconds = int(usec) / 1e6
+    except ValueError:
+        return None
+    return seconds if seconds > 0 else None
+
+
+class Watchdog:
+    """進行状況を確認してから WATCHDOG=1 を送る"""
+
+    def __init__(self, timeout: float, *, stall_timeout: float = 2.0, socket_path: str | None = None):
+        """
+        Args:
+            timeout: systemdのウォッチドッグの時間（秒、WatchdogSec）。半分の間隔で確認・通知する
+            stall_timeout: 各コンポーネントが進まない時間がこれを超えたら通知を止める（秒）
+            socket_path: 通知先のソケット（Noneの場合は $NOTIFY_SOCKET）
+        """
+        self.timeout = timeout
+        self.interval = timeout / 2
+        self.stall_timeout = stall_timeout
+        self.socket_path = socket_path
+        # 名前と、停止していれば理由を返す確認関数
+        self.checks: dict[str, Callable[[float], str | None]] = {}
+        # 停止しているコンポーネントと理由
+        self._stalled: dict[str, str] = {}
+
+        # 統計カウンター
+        self.pings = 0
+        self.withheld = 0
+        self.stalls: Counter[str] = Counter()
+
+    def add_check(self, name: str, check: Callable[[float], str | None]) -> None:
+        """
+        確認関数を登録する
+
+        Args:
+            name: コンポーネント名（統計用）
+            check: stall_timeoutを受け取り、進んでいればNone、停止していれば理由を返す関数
+        """
+        self.checks[name] = check
+
+    def check(self) -> dict[str, str]:
+        """
+        すべてのコンポーネントを確認する
+
+        Returns:
+            dict[str, str]: 停止しているコンポーネントの名前と理由（すべて進んでいれば空）
+        """
+        stalled = {}
+        for name, check in self.checks.items():
+            try:
+                reason = check(self.stall_timeout)
+            except Exception as e:
+                reason = f"check failed: {e}"
+            if reason is not None:
+                self.stalls[name] += 1
+                stalled[name] = reason
+        return stalled
+
+    async def run(self) -> None:
+        """確認と通知を繰り返す"""
+        logger.info(f"systemd watchdog enabled: {self.timeout:g}s (stall timeout {self.stall_timeout:g}s)")
+        while True:
+            stalled = self.check()
+            if stalled:
+                self.withheld += 1
+                # 停止しているコンポーネントが変わった場合だけ記録する
+                if stalled.keys() != self._stalled.keys():
+                    summary = "; ".join(f"{name}: {reason}" for name, reason in stalled.items())
+                    logger.error(f"Watchdog: withholding heartbeat: {summary}")
+                    sd_notify(f"STATUS=Stalled: {summary}", self.socket_path)
+            else:
+                if self._stalled:
+                    logger.warning("Watchdog: progress resumed")
+                    sd_notify("STATUS=Running", self.socket_path)
+                if sd_notify("WATCHDOG=1", self.socket_path):
+                    self.pings += 1
+            self._stalled = stalled
+            await asyncio.sleep(self.interval)
+
+    def get_stats(self) -> dict:
+        """ウォッチドッグの統計情報を取得する"""
+        return {
+            "timeout": self.timeout,
+            "stall_timeout": self.stall_timeout,
+            "pings": self.pings,
+            "withheld": self.withheld,
+            "stalls": dict(self.stalls),
+            "stalled": dict(self._stalled),
+        }
@@ -0,0 +1,3 @@
+"""
+診断モジュール: イベントループの遅延監視など、稼働中のコントローラーの性能を調べるための機能
+"""
@@ -0,0 +1,671 @@
+"""
+コントローラーの性能回帰ベンチマーク
+
+入力レート × 送信元の数 × デバイスの書き込み遅延 × 入力の処理方法（デバイスループ・入力スレッド）の組み合わせごとに、
+OSC（ループバックのUDP）とMQTT（ブローカー経由）からの入力を、同じプロセスのコントローラーと、
+書き込み遅延を注入したMockWHILLまで通して計測する
+
+- スループット: デバイスへの書き込みレート（入力レートの合計と送信レートの上限のうち小さい方に対する割合）
+- 遅延: 入力から、その値がデバイスへ書き込まれるまでの時間（p50, p99, 最大）
+- CPU: 入力1件あたりのCPU時間（マシンの速度の違いを除くため、固定の処理にかかる時間との比でも比較する）
+- メモリ: 計測中のtracemallocのヒープの増加（ピーク、tracemallocは処理を遅くするため別の回で計測する）
+
+予算は制御レートと書き込み遅延から決める。送信レートの上限は制御レートと「リンクの使用率の上限 / 書き込み遅延」の
+小さい方で、入力は最大で送信の1周期と書き込み遅延を待つ（送信元の数によらない）。
+OSCだけをデバイスループで処理する点は、待機を飛ばす時計（BenchClock）をイベントループとコントローラーに渡して
+実行するため、各点の計測時間は時計上の時間で、実時間は処理にかかる分だけになる。ブローカーや入力スレッドは
+この時計で待機を飛ばせないため、MQTTや入力スレッドを含む点は実時間で実行する。
+各点は複数回計測し、指標ごとに最良の値を採用する。
+予算を外れた場合と、ベースラインファイルの結果から許容幅を超えて悪化した場合を失敗とする
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import os
+import selectors
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from aiomqtt import Client
+from loguru import logger
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from ..controller.controller import WHILLController
+from ..ingest.handoff import IngestBridge
+from ..ingest.thread import IngestThread, ThreadedComponent
+from ..mqtt.client import MQTTHandler
+from ..osc.server import OSCServer
+from ..whill.faults import FaultProfile, FaultyWHILL, LatencyDistribution
+from ..whill.mock import MockWHILL
+
+# 点ごとにベースラインと比較する指標（大きいほど悪いかどうか、悪化とみなさない絶対的な幅）
+# 遅延のp99は送信の周期単位でばらつくため、幅は送信の周期以上とする（_checkを参照）
+REGRESSION_METRICS = {
+    "latency_p99_ms": (True, 1.0),
+    "heap_peak_kb": (True, 128.0),
+    "write_rate": (False, 1.0),
+}
+# CPU時間は1点ではUDPの送受信などでぶれが大きいため、基準の処理との比の幾何平均を全点でまとめて比較する
+CPU_METRIC = "cpu_index"
+BASELINE_VERSION = 3
+
+# 入力の処理方法（デバイスループで処理する・入力スレッドで受信してデバイスループへ受け渡す）
+INGEST_MODES = ("inline", "threaded")
+
+# MQTTのクライアントIDを点ごとに変える（前の点の永続セッションを引き継がないようにする）
+_client_ids = itertools.count()
+
+
+def reference_cpu_us(rounds: int = 3, iterations: int = 5000) -> float:
+    """
+    基準の処理（小さな辞書の作成と直列化）の1回あたりのCPU時間を計測する
+
+    同じマシンでも周波数や他のプロセスの影響で速度が変わるため、入力1件あたりのCPU時間をこの値で割って比較する。
+    速度は実行中にも変わるため、点ごとに計測した値の中央値を使う
+
+    Returns:
+        float: 1回あたりのCPU時間（マイクロ秒、rounds回のうち最小）
+    """
+    best = math.inf
+    for _ in range(rounds):
+        started = time.thread_time()
+        for i in range(iterations):
+            payload = {"front": i % 100, "side": -i % 100, "source": f"s{i % 7}"}
+            json.dumps(payload)
+        best = min(best, time.thread_time() - started)
+    return best / iterations * 1e6
+
+
+class BenchClock:
+    """
+    待機を飛ばす時計
+
+    単調時計に、飛ばした待機時間を加えた時刻を返す。BenchEventLoopの時計として使い、同じ時計をコントローラーにも渡す。
+    time モジュールは置き換えないため、プロセスの他の部分には影響しない
+    """
+
+    def __init__(self):
+        self.skipped = 0.0
+
+    def time(self) -> float:
+        return time.monotonic() + self.skipped
+
+    def advance(self, seconds: float) -> None:
+        """時計を進める"""
+        self.skipped += seconds
+
+
+class FastForwardSelector(selectors.DefaultSelector):
+    """準備のできたソケットがなければ、待たずに時計をタイムアウトまで進めるセレクター"""
+
+    def __init__(self, clock: BenchClock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout: float | None = None):
+        ready = super().select(0)
+        if ready or (timeout is not None and timeout <= 0):
+            return ready
+        if timeout is None:
+            # タイマーがない場合は進める先がないため、実際に待つ
+            return super().select(None)
+        self.clock.advance(timeout)
+        return []
+
+
+class BenchEventLoop(asyncio.SelectorEventLoop):
+    """
+    BenchClockを時計とするイベントループ
+
+    次のタイマーまで待つときは、FastForwardSelectorが待たずに時計を進めるため、処理にかかった時間はそのまま、
+    待機の時間だけが0になる
+    """
+
+    def __init__(self, clock: BenchClock):
+        super().__init__(FastForwardSelector(clock))
+        self.clock = clock
+
+    def time(self) -> float:
+        return self.clock.time()
+
+
+class _TimingWHILL(MockWHILL):
+    """書き込んだジョイスティックの値を通知するMockWHILL"""
+
+    def __init__(self, port: str, on_write):
+        super().__init__(port)
+        self.on_write = on_write
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        await super().send_joystick(front=front, side=side)
+        self.on_write(front, side)
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    パーセンタイル（最近傍法）
+
+    Args:
+        values: 値
+        q: 0～100
+
+    Returns:
+        float: パーセンタイル、値がない場合はNaN
+    """
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class BenchPoint:
+    """スイープの1点"""
+
+    __slots__ = ("rate", "sources", "latency_ms", "transports", "ingest")
+
+    def __init__(
+        self, rate: float, sources: int, latency_ms: float, transports: tuple[str, ...], ingest: str = "inline"
+    ):
+        """
+        Args:
+            rate: 送信元ごとのジョイスティックの送信レート（Hz）
+            sources: 送信元の数（transportsに順に割り当てる）
+            latency_ms: デバイスの書き込み遅延（ミリ秒、固定）
+            transports: 使用する入力経路（"osc", "mqtt"）
+            ingest: 入力の処理方法（"inline": デバイスループ、"threaded": 入力スレッド）
+        """
+        if ingest not in INGEST_MODES:
+            raise ValueError(f"unknown ingest mode: {ingest}")
+        self.rate = rate
+        self.sources = sources
+        self.latency_ms = latency_ms
+        self.transports = transports
+        self.ingest = ingest
+
+    @property
+    def key(self) -> str:
+        """ベースラインでの識別子"""
+        return (
+            f"rate={self.rate:g},sources={self.sources},latency={self.latency_ms:g}ms,"
+            f"via={'+'.join(self.transports)},ingest={self.ingest}"
+        )
+
+    @property
+    def real_time(self) -> bool:
+        """待機を飛ばす時計を使えない点か（ブローカーや入力スレッドは別のプロセス・スレッドの時計で動く）"""
+        return self.ingest == "threaded" or "mqtt" in self.transports
+
+
+class BenchHarness:
+    """スイープの実行と判定"""
+
+    def __init__(
+        self,
+        points: list[BenchPoint],
+        *,
+        duration: float = 3.0,
+        control_rate: float = 50.0,
+        osc_batch_size: int = 0,
+        mqtt_broker: tuple[str, int] | None = None,
+        repeat: int = 3,
+        fast_forward: bool = True,
+        min_throughput: float = 0.8,
+        latency_slack_ms: float = 20.0,
+        max_heap_kb: float = 4096.0,
+        trace_heap: bool = True,
+        baseline: dict | None = None,
+        tolerance: float = 0.25,
+    ):
+        """
+        Args:
+            points: 計測する点
+            duration: 1点あたりの計測時間（秒、待機を飛ばす点では時計上の時間）
+            control_rate: コントローラーの制御レート（Hz）
+            osc_batch_size: OSCのまとめ読みの上限（0で1つずつ処理する）
+            mqtt_broker: MQTTの点で使うブローカーの(host, port)（MQTTの点がある場合は必須）
+            repeat: 1点あたりの計測回数（指標ごとに最良の値を採用し、ばらつきを抑える）
+            fast_forward: MQTT・入力スレッドを含まない点を、待機を飛ばす時計で実行するかどうか
+            min_throughput: 書き込みレートの上限に対する割合の下限
+            latency_slack_ms: 遅延のp99の予算（書き込み遅延と送信の1周期）に加える余裕（ミリ秒）
+            max_heap_kb: 1点あたりのヒープの増加（ピーク）の上限（KB）
+            trace_heap: ヒープの増加を計測するため、各点をtracemallocを有効にしてもう1回実行するかどうか
+            baseline: 比較するベースライン（load_baselineの結果、Noneの場合は比較しない）
+            tolerance: ベースラインから悪化を許容する割合
+
+        Raises:
+            ValueError: MQTTの点があるのにブローカーが指定されていない場合
+        """
+        if mqtt_broker is None and any("mqtt" in point.transports for point in points):
+            raise ValueError("MQTT points require an MQTT broker")
+        self.points = points
+        self.duration = duration
+        self.control_rate = control_rate
+        self.osc_batch_size = osc_batch_size
+        self.mqtt_broker = mqtt_broker
+        self.repeat = max(1, repeat)
+        self.fast_forward = fast_forward
+        self.min_throughput = min_throughput
+        self.latency_slack_ms = latency_slack_ms
+        self.max_heap_kb = max_heap_kb
+        self.trace_heap = trace_heap
+        self.baseline = baseline
+        self.tolerance = tolerance
+
+        # 計測中の点の状態
+        self._pending: dict[tuple[int, int], float] = {}
+        self._latencies: list[float] = []
+        self._writes = 0
+        self._inputs = 0
+        self._deadline = math.inf
+        self._measuring = False
+
+    def run(self) -> dict:
+        """
+        すべての点を計測する（呼び出したスレッドで点ごとにイベントループを作成する）
+
+        Returns:
+            dict: 点ごとの結果と判定
+        """
+        results = []
+        started = time.monotonic()
+        references = []
+        for point in self.points:
+            references.append(reference_cpu_us())
+            result = self.measure(point)
+            results.append(result)
+            logger.info(self.format_result(result))
+        failures = [f"{r['point']}: {failure}" for r in results for failure in r["failures"]]
+        cpu_reference = statistics.median(references) if references else 0.0
+        for result in results:
+            result[CPU_METRIC] = round(result["cpu_us_per_input"] / cpu_reference, 3) if cpu_reference else 0.0
+        cpu = self._check_cpu(results)
+        if cpu.get("failure"):
+            failures.append(cpu["failure"])
+        return {
+            "ok": not failures,
+            "failures": failures,
+            "wall_seconds": round(time.monotonic() - started, 3),
+            "cpu_reference_us": round(cpu_reference, 4),
+            "cpu": cpu,
+            "config": {
+                "duration": self.duration,
+                "control_rate": self.control_rate,
+                "osc_batch_size": self.osc_batch_size,
+                "repeat": self.repeat,
+                "fast_forward": self.fast_forward,
+                "trace_heap": self.trace_heap,
+                "tolerance": self.tolerance,
+            },
+            "results": results,
+        }
+
+    def measure(self, point: BenchPoint) -> dict:
+        """
+        1点を repeat 回計測し、予算とベースラインで判定する
+
+        Args:
+            point: 計測する点
+
+        Returns:
+            dict: 指標ごとに最良の値と、予算・ベースラインを外れた理由の一覧（failures）
+        """
+        result = self._best([self._run_point(point) for _ in range(self.repeat)])
+        if self.trace_heap:
+            # tracemallocは処理を数倍遅くするため、遅延やCPU時間とは別の回でヒープだけを計測する
+            result["heap_peak_kb"] = self._run_point(point, trace=True)["heap_peak_kb"]
+        result["failures"] = self._check(point, result)
+        return result
+
+    @staticmethod
+    def _best(runs: list[dict]) -> dict:
+        """
+        同じ点の複数回の計測から、指標ごとに最良の値を採用する
+
+        CPU時間やp99はGCや他のプロセスの影響で悪い方にだけぶれるため、最良の値が最も再現性が高い
+        """
+        result = dict(runs[0])
+        for metric, (higher_is_worse, _) in {
+            **REGRESSION_METRICS,
+            "latency_p50_ms": (True, 0),
+            "cpu_us_per_input": (True, 0),
+        }.items():
+            values = [run[metric] for run in runs if run[metric] is not None]
+            if values:
+                result[metric] = min(values) if higher_is_worse else max(values)
+        result["throughput"] = max(run["throughput"] for run in runs)
+        result["runs"] = len(runs)
+        return result
+
+    def _run_point(self, point: BenchPoint, trace: bool = False) -> dict:
+        """1点を計測する（traceの場合はtracemallocを有効にする）"""
+        started_tracing = trace and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            if not self.fast_forward or point.real_time:
+                return asyncio.run(self._measure(point))
+            clock = BenchClock()
+            with asyncio.Runner(loop_factory=lambda: BenchEventLoop(clock)) as runner:
+                return runner.run(self._measure(point))
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    def send_rate_limit(self, latency_ms: float, headroom: float) -> float:
+        """
+        送信レートの上限（Hz）
+
+        制御レートと、書き込み遅延でリンクの使用率が上限（headroom）に達するレートの小さい方
+
+        Args:
+            latency_ms: デバイスの書き込み遅延（ミリ秒）
+            headroom: リンクの使用率の上限（AdaptiveSendRate.headroom）
+        """
+        limit = self.control_rate
+        if latency_ms > 0:
+            limit = min(limit, headroom * 1000 / latency_ms)
+        return limit
+
+    async def _measure(self, point: BenchPoint) -> dict:
+        """コントローラーを起動し、負荷をかけて計測する"""
+        self._pending = {}
+        self._latencies = []
+        self._writes = 0
+        self._inputs = 0
+        self._deadline = math.inf
+        self._measuring = False
+
+        loop = asyncio.get_running_loop()
+        profile = FaultProfile(latency=LatencyDistribution("const", point.latency_ms) if point.latency_ms > 0 else None)
+        whill = FaultyWHILL(_TimingWHILL("bench", self._on_write), profile)
+        # コントローラーのレート制限と進行状況の確認も、イベントループと同じ時計で行う
+        controller = WHILLController(
+            whill, control_rate=self.control_rate, telemetry_interval=0.1, calibration_frames=0, clock=loop.time
+        )
+        send_rate_limit = self.send_rate_limit(point.latency_ms, controller.send_rate.headroom)
+        period = 1.0 / send_rate_limit
+
+        async with contextlib.AsyncExitStack() as stack:
+            await controller.start()
+            stack.push_async_callback(controller.stop)
+            target = controller
+            if point.ingest == "threaded":
+                bridge = target = IngestBridge(controller)
+                bridge.start()
+                stack.callback(bridge.stop)
+
+            def in_thread(name: str, component):
+                """入力スレッドの点では、コンポーネントを専用スレッドで動作させる"""
+                if target is controller:
+                    return component
+                thread = IngestThread(f"bench-{name}")
+                thread.start()
+                stack.push_async_callback(thread.stop)
+                return ThreadedComponent(component, thread)
+
+            osc_port = publisher = None
+            if "osc" in point.transports:
+                server = OSCServer(target, "127.0.0.1", 0, feedback_rate=0, batch_size=self.osc_batch_size)
+                osc_server = in_thread("osc", server)
+                if not await osc_server.start():
+                    raise RuntimeError("Failed to start the OSC server")
+                stack.callback(osc_server.stop)
+                osc_port = osc_server.transport.get_extra_info("sockname")[1]
+            if "mqtt" in point.transports:
+                host, port = self.mqtt_broker
+                handler = MQTTHandler(
+                    target,
+                    host,
+                    port,
+                    "whill/commands/#",
+                    "whill/status",
+                    "whill/ctrl/#",
+                    client_id=f"whill-bench-{os.getpid()}-{next(_client_ids)}",
+                    clean_session=True,
+                )
+                mqtt_handler = in_thread("mqtt", handler)
+                await mqtt_handler.start()
+                stack.push_async_callback(mqtt_handler.stop)
+                publisher = await stack.enter_async_context(
+                    Client(hostname=host, port=port, identifier=f"whill-bench-load-{os.getpid()}")
+                )
+                await self._wait_for_mqtt(controller, publisher)
+
+            heap_started, _ = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            # 入力スレッドのCPU時間も含めるため、プロセス全体のCPU時間で計測する
+            cpu_started = time.process_time()
+            started = loop.time()
+            deadline = self._deadline = started + self.duration
+            self._measuring = True
+
+            load = []
+            for index in range(point.sources):
+                if point.transports[index % len(point.transports)] == "osc":
+                    load.append(asyncio.create_task(self._osc_source(index, point.rate, osc_port, deadline)))
+                else:
+                    load.append(asyncio.create_task(self._mqtt_source(index, point.rate, publisher, deadline)))
+            try:
+                await asyncio.gather(*load)
+            finally:
+                for task in load:
+                    task.cancel()
+            # 最後の入力が書き込まれるまでの時間を計測に含める
+            await asyncio.sleep(period + point.latency_ms / 1000 + 0.1)
+
+            elapsed = loop.time() - started
+            cpu = time.process_time() - cpu_started
+            heap_peak = 0
+            if tracemalloc.is_tracing():
+                heap_peak = max(0, tracemalloc.get_traced_memory()[1] - heap_started)
+            self._measuring = False
+            stats = controller.get_stats()
+
+        # 書き込みレートの上限: 入力レートの合計と、送信レートの上限のうち小さい方
+        ceiling = min(point.rate * point.sources, send_rate_limit)
+        write_rate = self._writes / self.duration
+        latencies = self._latencies
+        return {
+            "point": point.key,
+            "rate": point.rate,
+            "sources": point.sources,
+            "latency_ms": point.latency_ms,
+            "transports": list(point.transports),
+            "ingest": point.ingest,
+            "clock": "real" if not self.fast_forward or point.real_time else "bench",
+            "elapsed": round(elapsed, 3),
+            "inputs": self._inputs,
+            "accepted": stats["joystick"]["inputs"],
+            "throttled": stats["admission"].get("throttled", 0),
+            "writes": self._writes,
+            "write_rate": round(write_rate, 2),
+            "write_ceiling": round(ceiling, 2),
+            "send_period_ms": round(period * 1000, 3),
+            "throughput": round(write_rate / ceiling, 3) if ceiling > 0 else 0.0,
+            "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+            "latency_p99_ms": round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+            "latency_max_ms": round(max(latencies) * 1000, 3) if latencies else None,
+            "latency_mean_ms": round(statistics.fmean(latencies) * 1000, 3) if latencies else None,
+            "cpu_us_per_input": round(cpu / self._inputs * 1e6, 2) if self._inputs else 0.0,
+            "heap_peak_kb": round(heap_peak / 1024, 1),
+        }
+
+    async def _wait_for_mqtt(self, controller: WHILLController, publisher: Client, timeout: float = 5.0) -> None:
+        """ハンドラーが購読を終え、ブローカー経由のジョイスティックがコントローラーに届くまで待つ"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while controller.joystick_inputs == 0:
+            if loop.time() > deadline:
+                raise RuntimeError("MQTT joystick did not reach the controller")
+            await publisher.publish("whill/commands/joystick/bench-ready", "0,0", qos=0)
+            await asyncio.sleep(0.05)
+
+    @staticmethod
+    def _value(index: int, step: int) -> tuple[int, int]:
+        """
+        送信元と送信回数から、書き込みで識別できる値を作る
+
+        side で送信元を、front で201回ごとに一巡する送信回数を表す（遅延が一巡の時間より短い限り一意）
+        """
+        return step % 201 - 100, index % 201 - 100
+
+    def _sent(self, value: tuple[int, int], at: float) -> None:
+        self._pending[value] = at
+        self._inputs += 1
+
+    def _on_write(self, front: int, side: int) -> None:
+        """デバイスへの書き込みを記録する（計測を始める前の書き込みは数えない）"""
+        if not self._measuring:
+            return
+        now = asyncio.get_running_loop().time()
+        if now <= self._deadline:
+            self._writes += 1
+        sent_at = self._pending.pop((front, side), None)
+        if sent_at is not None:
+            self._latencies.append(now - sent_at)
+
+    async def _osc_source(self, index: int, rate: float, port: int, deadline: float) -> None:
+        """1つの送信元からOSCのジョイスティックを一定間隔で送る（間隔は開始時刻からの絶対時刻で決める）"""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=("127.0.0.1", port))
+        interval = 1.0 / rate
+        start = loop.time()
+        step = 0
+        try:
+            while (now := loop.time()) < deadline:
+                front, side = self._value(index, step)
+                builder = OscMessageBuilder(address="/whill/joystick")
+                for arg in (side / 100, front / 100, step + 1):
+                    builder.add_arg(arg)
+                self._sent((front, side), now)
+                transport.sendto(builder.build().dgram)
+                step += 1
+                await asyncio.sleep(start + step * interval - loop.time())
+        finally:
+            transport.close()
+
+    async def _mqtt_source(self, index: int, rate: float, publisher: Client, deadline: float) -> None:
+        """1つの送信元からブローカー経由でMQTTのジョイスティックを一定間隔で送る"""
+        loop = asyncio.get_running_loop()
+        topic = f"whill/commands/joystick/bench-{index}"
+        interval = 1.0 / rate
+        start = loop.time()
+        step = 0
+        while (now := loop.time()) < deadline:
+            front, side = self._value(index, step)
+            self._sent((front, side), now)
+            await publisher.publish(topic, f"{front},{side},{step + 1}", qos=0)
+            step += 1
+            await asyncio.sleep(start + step * interval - loop.time())
+
+    def _check(self, point: BenchPoint, result: dict) -> list[str]:
+        """予算とベースラインを確認する"""
+        failures = []
+        if result["throughput"] < self.min_throughput:
+            failures.append(
+                f"write rate {result['write_rate']} Hz is {result['throughput']:.0%} of {result['write_ceiling']} Hz "
+                f"(budget {self.min_throughput:.0%})"
+            )
+        # 制御ループは最後に受け付けた値を次の送信周期で書き込むため、入力は最大で1周期と書き込み遅延を待つ
+        period_ms = result["send_period_ms"]
+        latency_budget = point.latency_ms + period_ms + self.latency_slack_ms
+        result["latency_budget_ms"] = round(latency_budget, 1)
+        p99 = result["latency_p99_ms"]
+        if p99 is None:
+            failures.append("no input reached the device")
+        elif p99 > latency_budget:
+            failures.append(f"latency p99 {p99} ms exceeds {latency_budget:.1f} ms")
+        if result["heap_peak_kb"] > self.max_heap_kb:
+            failures.append(f"heap peak {result['heap_peak_kb']} KB exceeds {self.max_heap_kb:g} KB")
+
+        reference = (self.baseline or {}).get(point.key)
+        if reference:
+            for metric, (higher_is_worse, floor) in REGRESSION_METRICS.items():
+                value, base = result.get(metric), reference.get(metric)
+                if value is None or base is None:
+                    continue
+                if metric == "latency_p99_ms":
+                    floor = max(floor, period_ms)
+                if higher_is_worse:
+                    limit = max(base * (1 + self.tolerance), base + floor)
+                    regressed = value > limit
+                else:
+                    limit = min(base * (1 - self.tolerance), base - floor)
+                    regressed = value < limit
+                if regressed:
+                    failures.append(f"{metric} {value} regressed from baseline {base} (limit {limit:.2f})")
+        return failures
+
+    def _check_cpu(self, results: list[dict]) -> dict:
+        """基準の処理との比の幾何平均を、ベースラインにある点だけでベースラインと比較する"""
+        indexes = [result[CPU_METRIC] for result in results if result[CPU_METRIC] > 0]
+        summary = {"index": round(statistics.geometric_mean(indexes), 3) if indexes else None}
+        pairs = [
+            (result[CPU_METRIC], reference[CPU_METRIC])
+            for result in results
+            if result[CPU_METRIC] > 0
+            and (reference := (self.baseline or {}).get(result["point"]))
+            and reference.get(CPU_METRIC)
+        ]
+        if not pairs:
+            return summary
+        current = statistics.geometric_mean([value for value, _ in pairs])
+        base = statistics.geometric_mean([base for _, base in pairs])
+        summary.update(compared_points=len(pairs), ratio_to_baseline=round(current / base, 3))
+        if current > base * (1 + self.tolerance):
+            summary["failure"] = (
+                f"cpu: geometric mean {CPU_METRIC} {current:.3f} over {len(pairs)} points regressed "
+                f"{current / base - 1:.0%} from baseline {base:.3f} (tolerance {self.tolerance:.0%})"
+            )
+        return summary
+
+    @staticmethod
+    def format_result(result: dict) -> str:
+        """1点の結果を1行にする"""
+        status = "FAIL" if result.get("failures") else "ok"
+        return (
+            f"[bench] {result['point']:<60} writes {result['write_rate']:7.1f}/{result['write_ceiling']:<6g} Hz, "
+            f"p50 {result['latency_p50_ms']} ms, p99 {result['latency_p99_ms']} ms, "
+            f"cpu {result['cpu_us_per_input']} us/input, heap {result['heap_peak_kb']} KB  {status}"
+        )
+
+
+def load_baseline(path: Path) -> dict | None:
+    """
+    ベースラインファイルを読み込む
+
+    Args:
+        path: ベースラインファイル
+
+    Returns:
+        dict | None: 点の識別子ごとの結果、ファイルがない・形式が異なる場合はNone
+    """
+    try:
+        data = json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+    if data.get("version") != BASELINE_VERSION:
+        logger.warning(f"Ignoring baseline {path}: unsupported version {data.get('version')}")
+        return None
+    return data.get("points", {})
+
+
+def save_baseline(path: Path, report: dict) -> None:
+    """
+    計測結果をベースラインファイルに書き込む（同じ点の結果は置き換え、他の点は残す）
+
+    Args:
+        path: ベースラインファイル
+        report: BenchHarness.runの結果
+    """
+    points = load_baseline(path) or {}
+    for result in report["results"]:
+        points[result["point"]] = {metric: result[metric] for metric in (*REGRESSION_METRICS, CPU_METRIC)}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"version": BASELINE_VERSION, "config": report["config"], "points": points}, indent=2))
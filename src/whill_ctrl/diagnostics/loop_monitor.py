@@ -0,0 +1,276 @@
+"""
+イベントループの遅延を監視し、ループを長時間占有したコールバックを特定するモジュール
+
+- スケジューリング遅延: 一定間隔でスリープするプローブタスクの起床の遅れを計測する
+- 遅いコールバック: asyncioのHandle._runを計測付きの実装に差し替え、閾値を超えたステップを記録する
+- 原因の特定: 監視スレッドが閾値を超えて実行中のステップを検出すると、ループスレッドのスタックを
+  1回だけ取得し、実行中のコルーチン（例: RealWHILL.send_joystick）と最内フレームを記録する
+
+通常時のコストはコールバック1回あたり時計の読み取り2回と、閾値の半分ごとに起きる監視スレッドのみ
+"""
+
+import asyncio
+import inspect
+import sys
+import threading
+import time
+from asyncio import events
+from collections import deque
+from pathlib import Path
+
+from loguru import logger
+
+
+class SlowCallback:
+    """遅いコールバックの集計（ワーストランキングの1行）"""
+
+    __slots__ = ("name", "where", "count", "total", "max", "last_at")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.where = ""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last_at = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "where": self.where,
+            "count": self.count,
+            "max_ms": round(self.max * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "last_at": self.last_at,
+        }
+
+
+def describe_callback(handle: events.Handle) -> str:
+    """
+    コールバックから実行されるコルーチン名を推定する（スタックを取得できなかった場合の代替）
+
+    Args:
+        handle: asyncioのコールバックハンドル
+
+    Returns:
+        str: コルーチンの修飾名、またはコールバックの名前
+    """
+    callback = handle._callback
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        # タスクのステップは、中断しているコルーチンのうち最も内側のもので代表する
+        coro = owner.get_coro()
+        name = getattr(coro, "__qualname__", repr(coro))
+        while coro is not None:
+            inner = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+            if inner is None or not hasattr(inner, "__qualname__"):
+                break
+            coro = inner
+            name = coro.__qualname__
+        return name
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+def describe_stack(frame) -> tuple[str, str]:
+    """
+    ループスレッドのスタックから、実行中のコルーチンと最内フレームを取得する
+
+    Args:
+        frame: ループスレッドの最内フレーム
+
+    Returns:
+        tuple[str, str]: (最も内側のコルーチンの修飾名, 最内フレームの "ファイル:行 関数")
+    """
+    where = f"{Path(frame.f_code.co_filename).name}:{frame.f_lineno} {frame.f_code.co_qualname}"
+    while frame is not None:
+        if frame.f_code.co_flags & inspect.CO_COROUTINE:
+            return frame.f_code.co_qualname, where
+        frame = frame.f_back
+    return "", where
+
+
+class LoopMonitor:
+    """イベントループの遅延モニター"""
+
+    # ワーストランキングに保持する最大件数
+    MAX_OFFENDERS = 64
+
+    # 同じコールバックについての警告ログの最小間隔（秒）
+    LOG_INTERVAL = 5.0
+
+    def __init__(self, threshold: float = 0.02, interval: float = 0.1, window: int = 600):
+        """
+        モニターを初期化
+
+        Args:
+            threshold: これ以上ループを占有したステップを遅いコールバックとして記録する（秒）
+            interval: スケジューリング遅延を計測する間隔（秒）
+            window: 遅延の統計に使う直近の計測数
+        """
+        self.threshold = threshold
+        self.interval = interval
+        self.lags: deque[float] = deque(maxlen=window)
+        self.offenders: dict[str, SlowCallback] = {}
+        self.slow_callbacks = 0
+        self.max_lag = 0.0
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._original_run = None
+        self._probe_task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+        # 実行中のステップ（監視スレッドと共有）
+        self._step_id = 0
+        self._step_started = 0.0
+        self._running = False
+        self._sampled: tuple[int, str, str] | None = None
+        self._last_logged: dict[str, float] = {}
+
+    def start(self) -> None:
+        """実行中のイベントループで監視を開始する"""
+        if self._original_run is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+
+        # Handle._runを計測付きの実装に差し替える（TimerHandleとタスクのステップも含む）
+        original_run = events.Handle._run
+        monitor = self
+
+        def _run(handle: events.Handle) -> None:
+            if monitor._loop_thread_id != threading.get_ident():
+                original_run(handle)
+                return
+            monitor._step_id += 1
+            monitor._step_started = start = time.perf_counter()
+            monitor._running = True
+            try:
+                original_run(handle)
+            finally:
+                monitor._running = False
+                elapsed = time.perf_counter() - start
+                if elapsed >= monitor.threshold:
+                    monitor._record_slow(handle, elapsed)
+
+        self._original_run = original_run
+        events.Handle._run = _run
+
+        self._probe_task = asyncio.create_task(self._probe())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        logger.info(f"Loop monitor started (slow callback threshold: {self.threshold * 1000:.0f} ms)")
+
+    async def stop(self) -> None:
+        """監視を停止し、Handle._runを元に戻す"""
+        if self._original_run is None:
+            return
+        events.Handle._run = self._original_run
+        self._original_run = None
+        self._stopped.set()
+        if self._probe_task:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+        logger.info("Loop monitor stopped")
+
+    def configure(self, threshold: float | None = None, interval: float | None = None) -> None:
+        """
+        閾値と計測間隔を変更する
+
+        Args:
+            threshold: 遅いコールバックの閾値（秒）
+            interval: スケジューリング遅延を計測する間隔（秒）
+        """
+        if threshold is not None:
+            self.threshold = threshold
+        if interval is not None:
+            self.interval = interval
+
+    async def _probe(self) -> None:
+        """一定間隔でスリープし、起床の遅れをスケジューリング遅延として記録する"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+
+    def _watch(self) -> None:
+        """閾値を超えて実行中のステップを検出し、ループスレッドのスタックを取得する"""
+        while not self._stopped.wait(max(self.threshold / 2, 0.001)):
+            if not self._running:
+                continue
+            step_id = self._step_id
+            if time.perf_counter() - self._step_started < self.threshold:
+                continue
+            sampled = self._sampled
+            if sampled is not None and sampled[0] == step_id:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None or step_id != self._step_id:
+                continue
+            name, where = describe_stack(frame)
+            self._sampled = (step_id, name, where)
+
+    def _record_slow(self, handle: events.Handle, elapsed: float) -> None:
+        """遅いコールバックをワーストランキングに記録する"""
+        sampled = self._sampled
+        if sampled is not None and sampled[0] == self._step_id:
+            name, where = sampled[1] or describe_callback(handle), sampled[2]
+        else:
+            name, where = describe_callback(handle), ""
+
+        self.slow_callbacks += 1
+        entry = self.offenders.get(name)
+        if entry is None:
+            if len(self.offenders) >= self.MAX_OFFENDERS:
+                # 最大時間が最も短いものを追い出す
+                del self.offenders[min(self.offenders.values(), key=lambda e: e.max).name]
+            entry = self.offenders[name] = SlowCallback(name)
+        entry.count += 1
+        entry.total += elapsed
+        entry.max = max(entry.max, elapsed)
+        entry.last_at = time.time()
+        if where:
+            entry.where = where
+
+        now = time.monotonic()
+        if now - self._last_logged.get(name, -self.LOG_INTERVAL) >= self.LOG_INTERVAL:
+            self._last_logged[name] = now
+            logger.warning(f"Slow callback: {name} blocked the event loop for {elapsed * 1000:.1f} ms {where}".rstrip())
+
+    def get_stats(self, top: int = 10) -> dict:
+        """
+        遅延の統計とワーストランキングを取得する
+
+        Args:
+            top: ランキングに含める件数
+
+        Returns:
+            dict: 統計情報
+        """
+        lags = sorted(self.lags)
+        if lags:
+            lag = {
+                "last_ms": round(self.lags[-1] * 1000, 3),
+                "mean_ms": round(sum(lags) / len(lags) * 1000, 3),
+                "p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 3),
+                "window_max_ms": round(lags[-1] * 1000, 3),
+                "max_ms": round(self.max_lag * 1000, 3),
+            }
+        else:
+            lag = {}
+        worst = sorted(self.offenders.values(), key=lambda e: e.max, reverse=True)[:top]
+        return {
+            "lag": lag,
+            "slow_callbacks": self.slow_callbacks,
+            "threshold_ms": self.threshold * 1000,
+            "worst": [entry.to_dict() for entry in worst],
+        }
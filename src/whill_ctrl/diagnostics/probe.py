@@ -0,0 +1,215 @@
+"""
+OSC・MQTTのping応答から、クライアントから見た応答時間を計測するモジュール
+
+往復時間（RTT）を、コントローラー内での処理時間（受信からディスパッチまで）と
+それ以外（ネットワークとクライアント・ブローカーでの処理）に分解する
+"""
+
+import asyncio
+import json
+import statistics
+import time
+import uuid
+
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from ..controller.freshness import estimate_clock_offset
+
+
+class PingSample:
+    """ping 1回分の計測結果"""
+
+    __slots__ = ("t_send", "t_recv", "t_dispatch", "t_reply", "queue_depth")
+
+    def __init__(self, t_send: float, t_recv: float, t_dispatch: float, t_reply: float, queue_depth: int):
+        """
+        Args:
+            t_send: クライアントの送信時刻（クライアント時計）
+            t_recv: サーバーの受信時刻（サーバー時計）
+            t_dispatch: サーバーのディスパッチ時刻（サーバー時計）
+            t_reply: クライアントの応答受信時刻（クライアント時計）
+            queue_depth: サーバーの待ち件数
+        """
+        self.t_send = t_send
+        self.t_recv = t_recv
+        self.t_dispatch = t_dispatch
+        self.t_reply = t_reply
+        self.queue_depth = queue_depth
+
+    @property
+    def rtt(self) -> float:
+        return self.t_reply - self.t_send
+
+    @property
+    def server(self) -> float:
+        return self.t_dispatch - self.t_recv
+
+
+class _OSCProbeProtocol(asyncio.DatagramProtocol):
+    """/whill/pong を受信して待機中のpingに結果を渡す"""
+
+    def __init__(self, pending: dict):
+        self.pending = pending
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        t_reply = time.time()
+        try:
+            message = OscMessage(data)
+        except Exception:
+            return
+        if message.address != "/whill/pong" or len(message.params) < 4:
+            return
+        token, t_recv, t_dispatch, queue_depth = message.params[:4]
+        pending = self.pending.pop(token, None)
+        if pending is not None and not pending[1].done():
+            pending[1].set_result(PingSample(pending[0], t_recv, t_dispatch, t_reply, queue_depth))
+
+
+async def probe_osc(host: str, port: int, count: int, interval: float, timeout: float) -> tuple[list[PingSample], int]:
+    """
+    OSCの /whill/ping で応答時間を計測する
+
+    Args:
+        host: コントローラーのホスト名
+        port: OSCサーバーのポート番号
+        count: pingの回数
+        interval: pingの間隔（秒）
+        timeout: 応答を待つ時間（秒）
+
+    Returns:
+        tuple[list[PingSample], int]: (計測結果, 応答がなかった回数)
+    """
+    loop = asyncio.get_running_loop()
+    pending: dict = {}
+    transport, _ = await loop.create_datagram_endpoint(lambda: _OSCProbeProtocol(pending), remote_addr=(host, port))
+    samples, lost = [], 0
+    try:
+        for token in range(1, count + 1):
+            future = loop.create_future()
+            builder = OscMessageBuilder(address="/whill/ping")
+            builder.add_arg(token)
+            pending[token] = (time.time(), future)
+            transport.sendto(builder.build().dgram)
+            try:
+                samples.append(await asyncio.wait_for(future, timeout))
+            except TimeoutError:
+                pending.pop(token, None)
+                lost += 1
+            await asyncio.sleep(interval)
+    finally:
+        transport.close()
+    return samples, lost
+
+
+async def probe_mqtt(
+    broker: str, port: int, count: int, interval: float, timeout: float, ctrl_topic: str, status_topic: str
+) -> tuple[list[PingSample], int]:
+    """
+    MQTTの whill/ctrl/ping で応答時間を計測する
+
+    Args:
+        broker: MQTTブローカーのホスト名
+        port: MQTTブローカーのポート番号
+        count: pingの回数
+        interval: pingの間隔（秒）
+        timeout: 応答を待つ時間（秒）
+        ctrl_topic: 制御コマンドトピックのベースパス（例: whill/ctrl）
+        status_topic: 状態通知トピックのベースパス（例: whill/status）
+
+    Returns:
+        tuple[list[PingSample], int]: (計測結果, 応答がなかった回数)
+    """
+    from aiomqtt import Client
+
+    # 他のプローブの応答と区別するための接頭辞
+    prefix = uuid.uuid4().hex[:8]
+    pending: dict = {}
+    samples, lost = [], 0
+
+    async with Client(broker, port) as client:
+        await client.subscribe(f"{status_topic}/pong", qos=0)
+
+        async def receive():
+            async for message in client.messages:
+                t_reply = time.time()
+                try:
+                    data = json.loads(message.payload)
+                except ValueError:
+                    continue
+                entry = pending.pop(data.get("token"), None)
+                if entry is not None and not entry[1].done():
+                    entry[1].set_result(
+                        PingSample(entry[0], data["t_recv"], data["t_dispatch"], t_reply, data.get("queue_depth", 0))
+                    )
+
+        receiver = asyncio.create_task(receive())
+        try:
+            loop = asyncio.get_running_loop()
+            for i in range(1, count + 1):
+                token = f"{prefix}-{i}"
+                future = loop.create_future()
+                pending[token] = (time.time(), future)
+                await client.publish(f"{ctrl_topic}/ping", token, qos=0)
+                try:
+                    samples.append(await asyncio.wait_for(future, timeout))
+                except TimeoutError:
+                    pending.pop(token, None)
+                    lost += 1
+                await asyncio.sleep(interval)
+        finally:
+            receiver.cancel()
+    return samples, lost
+
+
+def _percentiles(values: list[float], scale: float = 1000.0) -> dict:
+    """値の分布をミリ秒単位の代表値にまとめる"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {
+        "min": round(ordered[0] * scale, 3),
+        "p50": round(ordered[n // 2] * scale, 3),
+        "p90": round(ordered[min(n - 1, int(n * 0.9))] * scale, 3),
+        "p99": round(ordered[min(n - 1, int(n * 0.99))] * scale, 3),
+        "max": round(ordered[-1] * scale, 3),
+        "mean": round(statistics.fmean(ordered) * scale, 3),
+    }
+
+
+def summarize(samples: list[PingSample], lost: int) -> dict:
+    """
+    計測結果をまとめる
+
+    RTTのうちサーバー内の処理時間を除いた部分をネットワーク遅延とし、RTTが最小の計測から
+    推定したクロックオフセットで片道（上り・下り）の遅延も推定する
+
+    Args:
+        samples: 計測結果
+        lost: 応答がなかった回数
+
+    Returns:
+        dict: ミリ秒単位の統計
+    """
+    result = {"sent": len(samples) + lost, "received": len(samples), "lost": lost}
+    if not samples:
+        return result
+
+    best = min(samples, key=lambda s: s.rtt)
+    offset, _ = estimate_clock_offset(best.t_send, best.t_recv, best.t_dispatch, best.t_reply)
+    result.update(
+        {
+            "rtt_ms": _percentiles([s.rtt for s in samples]),
+            "server_ms": _percentiles([s.server for s in samples]),
+            "network_ms": _percentiles([s.rtt - s.server for s in samples]),
+            "uplink_ms": _percentiles([s.t_recv - offset - s.t_send for s in samples]),
+            "downlink_ms": _percentiles([s.t_reply - (s.t_dispatch - offset) for s in samples]),
+            "queue_depth": {
+                "mean": round(statistics.fmean(s.queue_depth for s in samples), 3),
+                "max": max(s.queue_depth for s in samples),
+            },
+            "clock_offset_ms": round(offset * 1000, 3),
+        }
+    )
+    return result
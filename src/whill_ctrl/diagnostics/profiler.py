@@ -0,0 +1,239 @@
+"""
+稼働中のコントローラーを時間を区切ってプロファイルするモジュール
+
+- スタックのサンプリング: 別スレッドが一定間隔で全スレッドのスタックを取得し、
+  pstats形式（snakeviz・pstatsで閲覧可能）と、フレームグラフ用の collapsed-stack 形式で保存する
+- コルーチンごとの時間: asyncioのHandle._runを計測付きの実装に差し替え、タスクのステップごとの
+  実時間とCPU時間をトップレベルのコルーチン単位で集計する（実時間とCPU時間の差はブロッキングI/O）
+
+プロファイル中以外は何も差し替えないため、通常時のコストはない
+"""
+
+import asyncio
+import json
+import marshal
+import sys
+import threading
+import time
+from asyncio import events
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from loguru import logger
+
+
+def coroutine_name(handle: events.Handle) -> str:
+    """
+    コールバックが属するトップレベルのコルーチン名を取得する
+
+    Args:
+        handle: asyncioのコールバックハンドル
+
+    Returns:
+        str: タスクのコルーチンの修飾名、またはコールバックの名前
+    """
+    callback = handle._callback
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, "__qualname__", None) or owner.get_name()
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+class CoroutineTime:
+    """コルーチンごとの実行時間の集計"""
+
+    __slots__ = ("steps", "wall", "cpu")
+
+    def __init__(self):
+        self.steps = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+
+
+class SamplingProfiler:
+    """時間を区切ったサンプリングプロファイラー"""
+
+    # 1回のプロファイルの最大時間（秒）
+    MAX_SECONDS = 300.0
+
+    def __init__(self, interval: float = 0.005):
+        """
+        プロファイラーを初期化
+
+        Args:
+            interval: スタックを取得する間隔（秒）
+        """
+        self.interval = interval
+        self.stacks: Counter[tuple] = Counter()
+        self.coroutines: dict[str, CoroutineTime] = {}
+        self.samples = 0
+        self.running = False
+
+        self._loop_thread_id: int | None = None
+        self._original_run = None
+        self._wrapper = None
+        self._stopped = threading.Event()
+
+    async def run(self, seconds: float, output_dir: Path) -> dict:
+        """
+        指定した時間だけプロファイルし、結果をファイルに保存する
+
+        Args:
+            seconds: プロファイルする時間（秒、MAX_SECONDSまで）
+            output_dir: 結果の保存先ディレクトリ
+
+        Returns:
+            dict: 保存したファイルとコルーチンごとの時間の概要
+        """
+        if self.running:
+            raise RuntimeError("Profiler is already running")
+        seconds = max(0.0, min(seconds, self.MAX_SECONDS))
+
+        self._start()
+        logger.info(f"Profiling for {seconds:.1f}s (sample interval: {self.interval * 1000:.1f} ms)")
+        started = time.perf_counter()
+        sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self._stop()
+            await asyncio.to_thread(sampler.join)
+        elapsed = time.perf_counter() - started
+
+        return await asyncio.to_thread(self._write, Path(output_dir), elapsed)
+
+    def _start(self) -> None:
+        """コルーチンごとの計測を開始する"""
+        self.running = True
+        self.stacks.clear()
+        self.coroutines.clear()
+        self.samples = 0
+        self._stopped.clear()
+        self._loop_thread_id = threading.get_ident()
+
+        original_run = events.Handle._run
+        profiler = self
+
+        def _run(handle: events.Handle) -> None:
+            if profiler._loop_thread_id != threading.get_ident():
+                original_run(handle)
+                return
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            try:
+                original_run(handle)
+            finally:
+                wall = time.perf_counter() - wall
+                cpu = time.thread_time() - cpu
+                name = coroutine_name(handle)
+                entry = profiler.coroutines.get(name)
+                if entry is None:
+                    entry = profiler.coroutines[name] = CoroutineTime()
+                entry.steps += 1
+                entry.wall += wall
+                entry.cpu += cpu
+
+        self._original_run = original_run
+        self._wrapper = _run
+        events.Handle._run = _run
+
+    def _stop(self) -> None:
+        """計測を停止し、Handle._runを元に戻す"""
+        self._stopped.set()
+        if events.Handle._run is self._wrapper:
+            events.Handle._run = self._original_run
+        else:
+            # プロファイル中に他のモニターが差し替えた場合は、そのラッパーを壊さないよう残す
+            logger.warning("Handle._run was replaced during profiling; leaving it in place")
+        self._original_run = None
+        self.running = False
+
+    def _sample(self) -> None:
+        """一定間隔で全スレッドのスタックを取得する"""
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_qualname))
+                    frame = frame.f_back
+                stack.append(("~", 0, f"<thread {names.get(thread_id, thread_id)}>"))
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def _pstats(self) -> dict:
+        """サンプルからpstats形式の統計を作成する（呼び出し回数はサンプル数）"""
+        dt = self.interval
+        stats: dict[tuple, list] = {}
+
+        def entry(func):
+            if func not in stats:
+                stats[func] = [0, 0, 0.0, 0.0, {}]
+            return stats[func]
+
+        for stack, count in self.stacks.items():
+            leaf = entry(stack[-1])
+            leaf[2] += dt * count
+            for func in set(stack):
+                e = entry(func)
+                e[0] += count
+                e[1] += count
+                e[3] += dt * count
+            leaf_pair = stack[-2:]
+            for caller, callee in set(zip(stack, stack[1:], strict=False)):
+                callers = entry(callee)[4]
+                c = callers.get(caller, (0, 0, 0.0, 0.0))
+                own_time = dt * count if (caller, callee) == leaf_pair else 0.0
+                callers[caller] = (c[0] + count, c[1] + count, c[2] + own_time, c[3] + dt * count)
+
+        return {func: (e[0], e[1], e[2], e[3], e[4]) for func, e in stats.items()}
+
+    def _collapsed(self) -> str:
+        """サンプルをフレームグラフ用の collapsed-stack 形式にする"""
+        lines = []
+        for stack, count in self.stacks.most_common():
+            frames = ";".join(
+                func if filename == "~" else f"{Path(filename).stem}:{func}" for filename, _, func in stack
+            )
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def _write(self, output_dir: Path, elapsed: float) -> dict:
+        """結果をファイルに保存して概要を返す"""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        base = output_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        pstats_path = base.with_suffix(".pstats")
+        collapsed_path = base.with_suffix(".collapsed.txt")
+        summary_path = base.with_suffix(".json")
+
+        with open(pstats_path, "wb") as f:
+            marshal.dump(self._pstats(), f)
+        collapsed_path.write_text(self._collapsed())
+
+        coroutines = [
+            {
+                "name": name,
+                "steps": entry.steps,
+                "wall_ms": round(entry.wall * 1000, 3),
+                "cpu_ms": round(entry.cpu * 1000, 3),
+            }
+            for name, entry in sorted(self.coroutines.items(), key=lambda item: item[1].wall, reverse=True)
+        ]
+        summary = {
+            "duration": round(elapsed, 3),
+            "samples": self.samples,
+            "pstats": str(pstats_path),
+            "collapsed": str(collapsed_path),
+            "coroutines": coroutines,
+        }
+        summary_path.write_text(json.dumps(summary, indent=2))
+        logger.info(f"Profile written to {pstats_path} and {collapsed_path}")
+        return summary
@@ -0,0 +1,329 @@
+"""
+長時間稼働でのメモリ・タスクのリークを検出するソークテスト
+
+MockWHILLを使うコントローラーに、OSC・MQTTの擬似的な負荷と切断（デバイスの切断、MQTTクライアントの再起動）を
+与え続け、一定間隔でtracemallocのヒープ使用量、実行中のタスク数、RSSを記録する
+ウォームアップ後の記録の回帰直線の傾きが閾値を超えた場合を失敗とする
+"""
+
+import asyncio
+import gc
+import os
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+
+from loguru import logger
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from ..controller.controller import WHILLController
+from ..osc.server import OSCServer
+from ..whill.factory import create_whill_device
+
+
+def read_rss() -> int:
+    """
+    プロセスの常駐メモリ（RSS）を取得する
+
+    Returns:
+        int: RSS（バイト）。/procがない環境では最大RSS
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def slope_per_hour(times: list[float], values: list[float]) -> float:
+    """
+    最小二乗法で求めた1時間あたりの増加量
+
+    Args:
+        times: 時刻（秒）
+        values: 値
+
+    Returns:
+        float: 傾き（1時間あたり）、計測が2点未満の場合は0
+    """
+    if len(times) < 2 or len(set(times)) < 2:
+        return 0.0
+    return statistics.linear_regression(times, values).slope * 3600.0
+
+
+class ResourceSample:
+    """リソース使用量の1回分の記録"""
+
+    __slots__ = ("t", "heap", "rss", "tasks", "threads")
+
+    def __init__(self, t: float, heap: int, rss: int, tasks: int, threads: int):
+        self.t = t
+        self.heap = heap
+        self.rss = rss
+        self.tasks = tasks
+        self.threads = threads
+
+    def to_dict(self) -> dict:
+        return {"t": round(self.t, 3), "heap": self.heap, "rss": self.rss, "tasks": self.tasks, "threads": self.threads}
+
+
+class SoakHarness:
+    """ソークテストの実行"""
+
+    def __init__(
+        self,
+        duration: float,
+        *,
+        sample_interval: float = 10.0,
+        warmup: float = 0.2,
+        osc_sources: int = 4,
+        osc_rate: float = 50.0,
+        mqtt_broker: str | None = None,
+        mqtt_port: int = 1883,
+        mqtt_rate: float = 20.0,
+        mqtt_v5: bool = False,
+        disconnect_interval: float = 60.0,
+        max_heap_slope: float = 5.0,
+        max_rss_slope: float = 20.0,
+        max_task_slope: float = 10.0,
+        faults: str | None = None,
+    ):
+        """
+        ソークテストを初期化
+
+        Args:
+            duration: 実行時間（秒）
+            sample_interval: リソース使用量を記録する間隔（秒）
+            warmup: 傾きの計算から除く先頭の割合（0～1）
+            osc_sources: OSCの擬似送信元の数
+            osc_rate: 送信元ごとのOSCジョイスティックの送信レート（Hz）
+            mqtt_broker: MQTTブローカーのホスト名（Noneの場合はMQTTの負荷をかけない）
+            mqtt_port: MQTTブローカーのポート番号
+            mqtt_rate: MQTTジョイスティックの送信レート（Hz）
+            mqtt_v5: MQTT v5で接続し、ジョイスティックをトピックエイリアス・有効期限付きで送信する
+            disconnect_interval: 切断を発生させる間隔（秒）、0以下で切断しない
+            max_heap_slope: tracemallocのヒープ使用量の増加の上限（MB/時）
+            max_rss_slope: RSSの増加の上限（MB/時）
+            max_task_slope: 実行中のタスク数の増加の上限（個/時）
+            faults: モックWHILLに注入する障害の指定（Noneの場合は注入しない）
+        """
+        self.duration = duration
+        self.sample_interval = sample_interval
+        self.warmup = min(max(warmup, 0.0), 0.9)
+        self.osc_sources = osc_sources
+        self.osc_rate = osc_rate
+        self.mqtt_broker = mqtt_broker
+        self.mqtt_port = mqtt_port
+        self.mqtt_rate = mqtt_rate
+        self.mqtt_v5 = mqtt_v5
+        self.disconnect_interval = disconnect_interval
+        self.faults = faults
+        self.thresholds = {"heap": max_heap_slope, "rss": max_rss_slope, "tasks": max_task_slope}
+
+        self.samples: list[ResourceSample] = []
+        self.sent = {"osc": 0, "mqtt": 0, "device_disconnects": 0, "mqtt_restarts": 0}
+        self.controller: WHILLController | None = None
+        self.osc_server: OSCServer | None = None
+        self.mqtt_handler = None
+        self._started = 0.0
+
+    async def run(self) -> dict:
+        """
+        ソークテストを実行する
+
+        Returns:
+            dict: 記録と判定結果
+        """
+        tracemalloc.start()
+        self._started = time.monotonic()
+        self.controller = WHILLController(
+            create_whill_device("soak", use_mock=True, faults=self.faults), control_rate=50.0, telemetry_interval=0.1
+        )
+        await self.controller.start()
+        self.osc_server = OSCServer(self.controller, "127.0.0.1", 0, feedback_rate=10.0)
+        if not await self.osc_server.start():
+            raise RuntimeError("Failed to start the OSC server")
+        osc_port = self.osc_server.transport.get_extra_info("sockname")[1]
+        if self.mqtt_broker:
+            self.mqtt_handler = self._create_mqtt_handler()
+            await self.mqtt_handler.start()
+
+        baseline = None
+        load = [asyncio.create_task(self._osc_load(osc_port, i)) for i in range(self.osc_sources)]
+        if self.mqtt_broker:
+            load.append(asyncio.create_task(self._mqtt_load()))
+        if self.disconnect_interval > 0:
+            load.append(asyncio.create_task(self._inject_faults()))
+
+        try:
+            deadline = self._started + self.duration
+            warmup_end = self._started + self.duration * self.warmup
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                await asyncio.sleep(min(self.sample_interval, deadline - now))
+                self._sample()
+                if baseline is None and time.monotonic() >= warmup_end:
+                    baseline = tracemalloc.take_snapshot()
+                logger.info(self._format_sample(self.samples[-1]))
+        finally:
+            for task in load:
+                task.cancel()
+            await asyncio.gather(*load, return_exceptions=True)
+            final = tracemalloc.take_snapshot()
+            if self.mqtt_handler is not None:
+                await self.mqtt_handler.stop()
+            self.osc_server.stop()
+            await self.controller.stop()
+            tracemalloc.stop()
+
+        return self._report(baseline, final)
+
+    def _create_mqtt_handler(self):
+        """負荷をかけるMQTTハンドラーを作成する"""
+        from ..mqtt.client import MQTTHandler
+
+        return MQTTHandler(
+            self.controller,
+            self.mqtt_broker,
+            self.mqtt_port,
+            "whill/commands/#",
+            "whill/status",
+            "whill/ctrl/#",
+            client_id=f"whill-soak-{os.getpid()}",
+            clean_session=True,
+            protocol_v5=self.mqtt_v5,
+        )
+
+    async def _osc_load(self, port: int, index: int) -> None:
+        """1つの送信元からOSCのジョイスティックと時々個別コマンド・pingを送り続ける"""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=("127.0.0.1", port))
+        interval = 1.0 / self.osc_rate
+        seq = 0
+        try:
+            while True:
+                seq += 1
+                builder = OscMessageBuilder(address="/whill/joystick")
+                phase = (seq % 200) / 100.0 - 1.0
+                for arg in (phase / 2, phase, seq):
+                    builder.add_arg(arg)
+                transport.sendto(builder.build().dgram)
+                if seq % 250 == index:
+                    builder = OscMessageBuilder(address="/whill/ping")
+                    builder.add_arg(seq)
+                    transport.sendto(builder.build().dgram)
+                if seq % 1000 == index:
+                    transport.sendto(OscMessageBuilder(address="/whill/power_on").build().dgram)
+                self.sent["osc"] += 1
+                await asyncio.sleep(interval)
+        finally:
+            transport.close()
+
+    async def _mqtt_load(self) -> None:
+        """MQTTのジョイスティックを送り続ける（ブローカーとの切断後は再接続する）"""
+        from aiomqtt import Client, MqttError
+
+        from ..mqtt.v5 import JoystickPublisher, V5Client
+
+        interval = 1.0 / self.mqtt_rate
+        topic = f"whill/commands/joystick/soak-{os.getpid()}"
+        seq = 0
+        while True:
+            try:
+                if self.mqtt_v5:
+                    async with V5Client(self.mqtt_broker, self.mqtt_port, session_expiry=0) as client:
+                        publisher = JoystickPublisher(client, topic)
+                        while True:
+                            await publisher.send(publisher.seq % 100, 0)
+                            self.sent["mqtt"] += 1
+                            await asyncio.sleep(interval)
+                async with Client(self.mqtt_broker, self.mqtt_port) as client:
+                    while True:
+                        seq += 1
+                        await client.publish(topic, f"{seq % 100},0,{seq}", qos=0)
+                        self.sent["mqtt"] += 1
+                        await asyncio.sleep(interval)
+            except MqttError as e:
+                logger.warning(f"Soak MQTT publisher disconnected: {e}")
+                await asyncio.sleep(1.0)
+
+    async def _inject_faults(self) -> None:
+        """一定間隔でデバイスを切断し、MQTTクライアントを再起動する"""
+        while True:
+            await asyncio.sleep(self.disconnect_interval)
+            # 接続監視が再接続する
+            await self.controller.whill.disconnect()
+            self.sent["device_disconnects"] += 1
+            if self.mqtt_handler is not None:
+                await self.mqtt_handler.stop()
+                self.mqtt_handler = self._create_mqtt_handler()
+                await self.mqtt_handler.start()
+                self.sent["mqtt_restarts"] += 1
+
+    def _sample(self) -> None:
+        """リソース使用量を記録する（循環参照を回収してから計測する）"""
+        gc.collect()
+        heap, _ = tracemalloc.get_traced_memory()
+        self.samples.append(
+            ResourceSample(
+                time.monotonic() - self._started,
+                heap,
+                read_rss(),
+                len(asyncio.all_tasks()),
+                threading.active_count(),
+            )
+        )
+
+    @staticmethod
+    def _format_sample(sample: ResourceSample) -> str:
+        return (
+            f"[soak {sample.t:8.0f}s] heap {sample.heap / 1e6:8.2f} MB, rss {sample.rss / 1e6:8.2f} MB, "
+            f"tasks {sample.tasks}, threads {sample.threads}"
+        )
+
+    def _report(self, baseline: tracemalloc.Snapshot | None, final: tracemalloc.Snapshot) -> dict:
+        """ウォームアップ後の傾きを計算し、閾値と比較する"""
+        steady = [s for s in self.samples if s.t >= self.duration * self.warmup] or self.samples
+        times = [s.t for s in steady]
+        slopes = {
+            "heap": slope_per_hour(times, [s.heap / 1e6 for s in steady]),
+            "rss": slope_per_hour(times, [s.rss / 1e6 for s in steady]),
+            "tasks": slope_per_hour(times, [float(s.tasks) for s in steady]),
+        }
+        failures = [
+            f"{name} grows {slopes[name]:.3f}/h (limit {limit}/h)"
+            for name, limit in self.thresholds.items()
+            if slopes[name] > limit
+        ]
+
+        growth = []
+        if baseline is not None:
+            for stat in final.compare_to(baseline, "lineno")[:10]:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                growth.append({"where": f"{frame.filename}:{frame.lineno}", "size_diff": stat.size_diff})
+
+        return {
+            "ok": not failures,
+            "failures": failures,
+            "duration": round(time.monotonic() - self._started, 3),
+            "slopes_per_hour": {
+                "heap_mb": round(slopes["heap"], 4),
+                "rss_mb": round(slopes["rss"], 4),
+                "tasks": round(slopes["tasks"], 4),
+            },
+            "thresholds_per_hour": {
+                "heap_mb": self.thresholds["heap"],
+                "rss_mb": self.thresholds["rss"],
+                "tasks": self.thresholds["tasks"],
+            },
+            "load": self.sent,
+            "controller": self.controller.get_stats() if self.controller else {},
+            "top_growth": growth,
+            "samples": [s.to_dict() for s in self.samples],
+        }
@@ -0,0 +1,172 @@
+"""
+稼働系の停止から待機系が制御を引き継ぐまでの時間を計測するモジュール
+
+モックWHILLを使う2つのコントローラーを同じリースファイルで待機モードとして起動し、
+OSCの /whill/ping を短い間隔で送り続けながら稼働系をSIGKILLで停止して、応答が途切れていた時間を計測する
+停止した側は待機系として起動し直し、役割を入れ替えながら繰り返す
+"""
+
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pythonosc.osc_message import OscMessage
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from .probe import _percentiles
+
+
+class _PongProtocol(asyncio.DatagramProtocol):
+    """/whill/pong の受信時刻を記録する"""
+
+    def __init__(self):
+        self.received: list[float] = []
+        self.event = asyncio.Event()
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        now = time.monotonic()
+        try:
+            message = OscMessage(data)
+        except Exception:
+            return
+        if message.address == "/whill/pong":
+            self.received.append(now)
+            self.event.set()
+
+
+def _free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TakeoverBench:
+    """稼働系・待機系の切り替え時間の計測"""
+
+    def __init__(
+        self,
+        runs: int = 5,
+        ping_interval: float = 0.002,
+        settle: float = 2.0,
+        timeout: float = 10.0,
+        extra_args: tuple[str, ...] = (),
+        log_dir: Path | None = None,
+    ):
+        """
+        Args:
+            runs: 切り替えの回数
+            ping_interval: pingの送信間隔（秒、計測の分解能）
+            settle: 待機系の起動を待つ時間（秒）
+            timeout: 引き継ぎを待つ最大時間（秒）
+            extra_args: コントローラーに追加するコマンドライン引数
+            log_dir: コントローラーの出力先（Noneの場合は捨てる）
+        """
+        self.runs = runs
+        self.ping_interval = ping_interval
+        self.settle = settle
+        self.timeout = timeout
+        self.extra_args = extra_args
+        self.log_dir = log_dir
+        self._workdir = Path(tempfile.mkdtemp(prefix="whill-takeover-"))
+        self.lease_path = self._workdir / "controller.lease"
+        self.osc_port = _free_udp_port()
+        self._spawned = 0
+
+    def _spawn(self) -> subprocess.Popen:
+        """待機モードのコントローラーを起動する"""
+        self._spawned += 1
+        args = [
+            sys.executable,
+            "-m",
+            "whill_ctrl",
+            "--use-mock",
+            "--osc-ip",
+            "127.0.0.1",
+            "--osc-port",
+            str(self.osc_port),
+            "--lease-file",
+            str(self.lease_path),
+            "--standby",
+            *self.extra_args,
+        ]
+        if "--mqtt-broker" not in self.extra_args:
+            args.append("--osc-only")
+        if self.log_dir is None:
+            return subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_dir / f"controller-{self._spawned}.log", "wb") as output:
+            return subprocess.Popen(args, stdout=output, stderr=subprocess.STDOUT)
+
+    async def _wait_for_pong(self, transport, protocol: _PongProtocol, deadline: float) -> float | None:
+        """pingを送り続け、応答を受信した時刻を返す"""
+        ping = OscMessageBuilder(address="/whill/ping")
+        ping.add_arg(0)
+        dgram = ping.build().dgram
+        protocol.event.clear()
+        while time.monotonic() < deadline:
+            transport.sendto(dgram)
+            try:
+                await asyncio.wait_for(protocol.event.wait(), self.ping_interval)
+                return protocol.received[-1]
+            except TimeoutError:
+                continue
+        return None
+
+    async def run(self) -> dict:
+        """
+        計測を実行する
+
+        Returns:
+            dict: 切り替えごとの停止時間と統計
+        """
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            _PongProtocol, remote_addr=("127.0.0.1", self.osc_port)
+        )
+        active = self._spawn()
+        standby = None
+        outages, failures = [], 0
+        try:
+            if await self._wait_for_pong(transport, protocol, time.monotonic() + self.timeout) is None:
+                raise RuntimeError("The first controller did not answer /whill/ping")
+            for _ in range(self.runs):
+                standby = self._spawn()
+                await asyncio.sleep(self.settle)
+                # 停止直前まで稼働系が応答していることを確認してから停止する
+                await self._wait_for_pong(transport, protocol, time.monotonic() + self.timeout)
+                killed_at = time.monotonic()
+                os.kill(active.pid, signal.SIGKILL)
+                active.wait()
+                # 停止後に届いた応答は稼働系の送信済みのものを除き、待機系からのもの
+                await asyncio.sleep(self.ping_interval)
+                answered = await self._wait_for_pong(transport, protocol, killed_at + self.timeout)
+                if answered is None:
+                    failures += 1
+                    break
+                outages.append(answered - killed_at)
+                active, standby = standby, None
+        finally:
+            transport.close()
+            for process in (active, standby):
+                if process is not None and process.poll() is None:
+                    process.send_signal(signal.SIGINT)
+                    try:
+                        process.wait(5.0)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+            shutil.rmtree(self._workdir, ignore_errors=True)
+
+        return {
+            "runs": len(outages),
+            "failed": failures,
+            "outage_ms": _percentiles(outages),
+            "outages_ms": [round(o * 1000, 3) for o in outages],
+            "ping_interval_ms": self.ping_interval * 1000,
+        }
@@ -0,0 +1,3 @@
+"""
+フリートモジュール: 1つのフレームで複数のWHILLを同時に操作するブロードキャスト形式と、その受信・振り分け
+"""
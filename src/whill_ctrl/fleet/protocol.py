@@ -0,0 +1,113 @@
+"""
+フリートフレームのバイナリ形式
+
+1フレームで複数の車椅子のジョイスティック値を送る（OSCのblob、MQTTのバイナリペイロード、UDPマルチキャストの
+データグラムのいずれでも同じ形式）。台数が増えてもネットワークのメッセージ数は1ティックあたり1つのまま
+
+リトルエンディアン
+  ヘッダー（16バイト）: version (u8), flags (u8, 予約), count (u16), frame_seq (u32), sent_at (f64, 0で省略)
+  エントリー（4バイト×count）: chair_id (u16), front (i8), side (i8)
+"""
+
+import socket
+import struct
+import time
+from collections.abc import Iterable
+from functools import lru_cache
+
+HEADER_STRUCT = struct.Struct("<BBHId")
+HEADER_SIZE = HEADER_STRUCT.size
+ENTRY_FORMAT = "Hbb"
+ENTRY_SIZE = struct.calcsize("<" + ENTRY_FORMAT)
+PROTOCOL_VERSION = 1
+
+# UDPデータグラムに収まるエントリー数
+MAX_ENTRIES = (65507 - HEADER_SIZE) // ENTRY_SIZE
+# フレームのシーケンス番号は32ビットで一周する
+SEQ_MASK = 0xFFFFFFFF
+
+
+@lru_cache(maxsize=64)
+def _entries_struct(count: int) -> struct.Struct:
+    """count個のエントリーを一度に変換するStruct（台数ごとに作成して再利用する）"""
+    return struct.Struct("<" + ENTRY_FORMAT * count)
+
+
+def encode_frame(frame_seq: int, entries: Iterable[tuple[int, int, int]], sent_at: float | None = None) -> bytes:
+    """
+    エントリーをフレームに変換する
+
+    Args:
+        frame_seq: フレームのシーケンス番号
+        entries: (chair_id, front, side) の列（front, sideは-100～100に丸める）
+        sent_at: 送信時刻（サーバー時計換算のUNIX時刻、任意）
+
+    Returns:
+        bytes: フレーム
+
+    Raises:
+        ValueError: エントリーが多すぎる場合
+    """
+    values = []
+    for chair_id, front, side in entries:
+        values += (chair_id, max(-100, min(100, int(front))), max(-100, min(100, int(side))))
+    count = len(values) // 3
+    if count > MAX_ENTRIES:
+        raise ValueError(f"Too many fleet entries: {count} (max {MAX_ENTRIES})")
+    header = HEADER_STRUCT.pack(PROTOCOL_VERSION, 0, count, frame_seq & SEQ_MASK, sent_at or 0.0)
+    return header + _entries_struct(count).pack(*values)
+
+
+def decode_frame(data: bytes) -> tuple[int, float | None, tuple[int, ...], tuple[int, ...], tuple[int, ...]]:
+    """
+    フレームを変換する
+
+    全エントリーを1回のunpackで読み、スライスで列ごとに分ける（エントリーごとのPythonのループを回さない）
+
+    Args:
+        data: 受信したフレーム
+
+    Returns:
+        tuple: (frame_seq, sent_at, chair_idの列, frontの列, sideの列)
+
+    Raises:
+        ValueError: 長さまたはバージョンが不正な場合
+    """
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"Fleet frame too short: {len(data)}")
+    version, _flags, count, frame_seq, sent_at = HEADER_STRUCT.unpack_from(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported fleet protocol version: {version}")
+    if len(data) != HEADER_SIZE + count * ENTRY_SIZE:
+        raise ValueError(f"Fleet frame size {len(data)} does not match {count} entries")
+    values = _entries_struct(count).unpack_from(data, HEADER_SIZE)
+    return frame_seq, sent_at or None, values[0::3], values[1::3], values[2::3]
+
+
+class FleetSender:
+    """フリートフレームをUDP（マルチキャスト・ユニキャスト）で送るクライアント（群を動かすプロデューサー用）"""
+
+    def __init__(self, group: str, port: int, *, ttl: int = 1):
+        """
+        Args:
+            group: 送信先のマルチキャストグループ（またはユニキャストアドレス）
+            port: 送信先のポート番号
+            ttl: マルチキャストのTTL（1で同じセグメント内に限る）
+        """
+        self.address = (group, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        self.seq = 0
+
+    def send(self, entries: Iterable[tuple[int, int, int]]) -> None:
+        """
+        全台分のジョイスティックの値を1つのデータグラムで送る（シーケンス番号と送信時刻を付ける）
+
+        Args:
+            entries: (chair_id, front, side) の列
+        """
+        self.seq = (self.seq + 1) & SEQ_MASK
+        self.sock.sendto(encode_frame(self.seq, entries, time.time()), self.address)
+
+    def close(self) -> None:
+        self.sock.close()
@@ -0,0 +1,256 @@
+"""
+フリートフレームの受信と、車椅子ごとのコントローラーへの振り分け
+
+OSC（/whill/fleet のblob）、MQTT（whill/commands/fleet のバイナリペイロード）、UDPマルチキャストの
+どの経路で届いたフレームも同じ受信器に渡す。フレームのシーケンス番号で重複（複数経路からの同じフレーム）と
+順序の逆転を捨て、欠番をフレームの損失として数える。しばらくフレームを受け付けていない間に番号が戻った場合は、
+送信側が再起動して番号を1から振り直したものとみなして受け付ける。登録した車椅子のエントリーだけを取り出し、
+送信元 "fleet" のジョイスティックとしてコントローラーへ渡す
+"""
+
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from collections import Counter
+
+from loguru import logger
+
+from .protocol import SEQ_MASK, decode_frame
+
+
+class FleetMember:
+    """フリートで操作する1台（振り分け先と受信の統計）"""
+
+    __slots__ = ("chair_id", "controller", "last_seq", "received", "absent", "lost", "rejected")
+
+    def __init__(self, chair_id: int, controller):
+        """
+        Args:
+            chair_id: フレームのchair_id
+            controller: 振り分け先（WHILLControllerまたはIngestBridge）
+        """
+        self.chair_id = chair_id
+        self.controller = controller
+        # 最後に受け取ったフレームのシーケンス番号（エントリーの有無によらない）
+        self.last_seq: int | None = None
+
+        # 統計カウンター
+        self.received = 0  # エントリーを含むフレーム
+        self.absent = 0  # 届いたがエントリーを含まないフレーム
+        self.lost = 0  # 届かなかったフレーム（登録以降の欠番）
+        self.rejected = 0  # コントローラーが破棄したエントリー（レート制限・期限切れ、入力スレッドモードでは数えない）
+
+    def to_dict(self) -> dict:
+        total = self.received + self.absent + self.lost
+        return {
+            "received": self.received,
+            "absent": self.absent,
+            "lost": self.lost,
+            "rejected": self.rejected,
+            "loss_rate": round(self.lost / total, 4) if total else 0.0,
+        }
+
+
+class FleetReceiver:
+    """フリートフレームを受信して登録した車椅子へ振り分ける"""
+
+    # 振り分けるジョイスティックの送信元の識別子（経路をまたいでレート制限・統計をまとめるため1つにする）
+    SOURCE = "fleet"
+
+    def __init__(self, reset_after: float = 1.0):
+        """
+        Args:
+            reset_after: この時間（秒）フレームを受け付けていない場合は、番号が戻ったフレームも送信側の再起動とみなして受け付ける
+        """
+        self.members: dict[int, FleetMember] = {}
+        self.reset_after = reset_after
+        self.last_seq: int | None = None
+        # 最後にフレームを受け付けた時刻（単調時計）
+        self.last_frame_at = 0.0
+        # 入力スレッドモードではOSC・MQTTのスレッドから同時に呼ばれるため、シーケンス番号の検査を直列化する
+        self._lock = threading.Lock()
+
+        # 統計カウンター
+        self.frames = 0
+        self.entries = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.lost = 0
+        self.restarts = 0
+        self.transports: Counter[str] = Counter()
+
+    def register(self, chair_id: int, controller) -> None:
+        """
+        車椅子を登録する（同じchair_idの登録は置き換える）
+
+        Args:
+            chair_id: フレームのchair_id（0～65535）
+            controller: 振り分け先（WHILLControllerまたはIngestBridge）
+        """
+        if not 0 <= chair_id <= 0xFFFF:
+            raise ValueError(f"chair_id must be between 0 and 65535: {chair_id}")
+        with self._lock:
+            self.members[chair_id] = FleetMember(chair_id, controller)
+        logger.info(f"Fleet: chair {chair_id} registered")
+
+    def unregister(self, chair_id: int) -> None:
+        """車椅子の登録を解除する"""
+        with self._lock:
+            self.members.pop(chair_id, None)
+
+    def handle(self, data: bytes, transport: str, received_at: float | None = None) -> int:
+        """
+        受信したフレームを振り分ける
+
+        Args:
+            data: フレーム
+            transport: 受信した経路（"osc", "mqtt", "udp"、統計用）
+            received_at: 受信時刻（UNIX時刻、Noneの場合は現在時刻）
+
+        Returns:
+            int: コントローラーが受け付けたエントリーの数
+        """
+        if received_at is None:
+            received_at = time.time()
+        try:
+            frame_seq, sent_at, chair_ids, fronts, sides = decode_frame(data)
+        except ValueError as e:
+            self.invalid += 1
+            logger.debug(f"[Fleet {transport}] Discarded invalid frame: {e}")
+            return 0
+
+        accepted = 0
+        now = time.monotonic()
+        with self._lock:
+            if self.last_seq is not None:
+                # 32ビットで一周するため、差が半周を超える場合は古いフレームとみなす
+                ahead = (frame_seq - self.last_seq) & SEQ_MASK
+                if ahead != 0 and ahead <= SEQ_MASK // 2:
+                    self.lost += ahead - 1
+                elif now - self.last_frame_at >= self.reset_after:
+                    # 間が空いた後に番号が戻った場合は、送信側が再起動して番号を振り直したとみなす
+                    self.restarts += 1
+                    logger.info(f"[Fleet {transport}] Sequence restarted at {frame_seq} (last {self.last_seq})")
+                    for member in self.members.values():
+                        member.last_seq = None
+                else:
+                    self.duplicates += 1
+                    return 0
+            self.last_seq = frame_seq
+            self.last_frame_at = now
+            self.frames += 1
+            self.entries += len(chair_ids)
+            self.transports[transport] += 1
+
+            members = self.members
+            if len(members) > 1:
+                # 複数台へ振り分ける場合は、位置の表を1回の走査で作る
+                positions = dict(zip(chair_ids, range(len(chair_ids)), strict=True))
+            for chair_id, member in members.items():
+                if member.last_seq is not None:
+                    member.lost += ((frame_seq - member.last_seq) & SEQ_MASK) - 1
+                member.last_seq = frame_seq
+
+                if len(members) > 1:
+                    index = positions.get(chair_id)
+                else:
+                    try:
+                        index = chair_ids.index(chair_id)
+                    except ValueError:
+                        index = None
+                if index is None:
+                    member.absent += 1
+                    continue
+                member.received += 1
+                # 重複・順序の逆転はここで検査済みのため、コントローラーにはシーケンス番号を渡さない
+                # （送信側の再起動で番号が戻っても、コントローラー側で古いフレームとして破棄されないようにする）
+                if member.controller.submit_joystick(
+                    max(-100, min(100, fronts[index])),
+                    max(-100, min(100, sides[index])),
+                    source=self.SOURCE,
+                    sent_at=sent_at,
+                    received_at=received_at,
+                ):
+                    accepted += 1
+                else:
+                    member.rejected += 1
+        return accepted
+
+    def get_stats(self) -> dict:
+        """フリートの受信の統計情報を取得する"""
+        return {
+            "frames": self.frames,
+            "entries": self.entries,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "lost": self.lost,
+            "restarts": self.restarts,
+            "transports": dict(self.transports),
+            "chairs": {str(chair_id): member.to_dict() for chair_id, member in list(self.members.items())},
+        }
+
+
+class _FleetProtocol(asyncio.DatagramProtocol):
+    """受信したデータグラムを受信器に渡す"""
+
+    def __init__(self, receiver: FleetReceiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.receiver.handle(data, "udp")
+
+
+class FleetListener:
+    """フリートフレームをUDP（マルチキャストグループまたはユニキャスト）で受信する"""
+
+    def __init__(self, receiver: FleetReceiver, group: str, port: int, interface: str = "0.0.0.0"):
+        """
+        Args:
+            receiver: フレームを渡す受信器
+            group: 参加するマルチキャストグループ（マルチキャストでないアドレスの場合はそのアドレスで待ち受ける）
+            port: 待ち受けるポート番号
+            interface: マルチキャストグループに参加するインターフェースのIPアドレス
+        """
+        self.receiver = receiver
+        self.group = group
+        self.port = port
+        self.interface = interface
+        self.transport: asyncio.DatagramTransport | None = None
+
+    async def start(self) -> bool:
+        """
+        ソケットを開き、マルチキャストグループに参加する
+
+        Returns:
+            bool: 開始に成功した場合はTrue
+        """
+        sock = None
+        try:
+            multicast = ipaddress.ip_address(self.group).is_multicast
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            # 同じホストの複数のコントローラーが同じグループを受信できるようにする
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, "SO_REUSEPORT"):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.bind(("" if multicast else self.group, self.port))
+            if multicast:
+                membership = socket.inet_aton(self.group) + socket.inet_aton(self.interface)
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+            loop = asyncio.get_running_loop()
+            self.transport, _ = await loop.create_datagram_endpoint(lambda: _FleetProtocol(self.receiver), sock=sock)
+            logger.info(f"Fleet listener on {self.group}:{self.port}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start fleet listener: {e}")
+            if sock is not None and self.transport is None:
+                sock.close()
+            return False
+
+    def stop(self) -> None:
+        """ソケットを閉じる"""
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+            logger.info("Fleet listener stopped")
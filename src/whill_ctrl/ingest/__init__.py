@@ -0,0 +1,3 @@
+"""
+入力処理モジュール: OSC・MQTTの受信処理を専用スレッドのイベントループで実行し、デバイスループへ受け渡す
+"""
@@ -0,0 +1,337 @@
+"""
+入力スレッドからデバイスループ（コントローラーのイベントループ）へのコマンドの受け渡し
+
+- ジョイスティック: 送信元ごとに最新値だけを保持するスロット。書き込みは参照の代入1回、読み取りは参照の比較のみで、
+  ロックを使わない（参照の読み書きが不可分であることだけに依存する。複数スレッドからの同時書き込みは
+  tests/test_ingest.py で確認する）
+- 個別コマンド: collections.deque（append/popleftはスレッドセーフ）で順序を保って渡す
+- 順序: 受け渡すたびに通し番号を付け、デバイスループは1回の受け渡しで取り出したジョイスティックと個別コマンドを
+  届いた順に処理する（緊急停止の後に届いたジョイスティックは停止の後に反映し、停止より前の値は停止で破棄される）
+- 起床: デバイスループが受け渡しを処理するまでの間、call_soon_threadsafe は1回だけ発行する
+- 入力スレッドからの参照: デバイスループの待ち件数はデバイスループが定期的に公開した値を読み、統計はデバイスループで
+  取得した結果を待機せずに await する（入力スレッドのイベントループをデバイスループの応答待ちで止めない）
+
+統計カウンターは複数のスレッドから更新するため概数
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from operator import itemgetter
+from typing import Any
+
+from loguru import logger
+
+from ..controller.controller import WHILLController
+from ..recording.telemetry_store import TelemetryStore
+from ..utils.tasks import TaskSet
+
+# 受け渡した (通し番号, 個別コマンドのハンドラー（ジョイスティックはNone）, コマンド名, パラメータ)
+Handoff = tuple[int, Callable[..., Awaitable[None]] | None, str, dict]
+
+
+class LatestSlot:
+    """最新値だけを保持するロックフリーのスロット（書き込みは複数スレッド、読み取りは1スレッド）"""
+
+    __slots__ = ("_value", "_taken", "puts", "takes", "updated")
+
+    def __init__(self):
+        self._value: tuple[int, dict] | None = None
+        self._taken: tuple[int, dict] | None = None
+        self.puts = 0
+        self.takes = 0
+        self.updated = time.monotonic()
+
+    def put(self, value: tuple[int, dict]) -> None:
+        """
+        値を書き込む（未読の値は上書きされる）
+
+        Args:
+            value: 書き込む (通し番号, パラメータ)（毎回新しいオブジェクトであること）
+        """
+        self._value = value
+        self.puts += 1
+        self.updated = time.monotonic()
+
+    def take(self) -> tuple[int, dict] | None:
+        """
+        前回の読み取り以降に書き込まれた最新値を取得する
+
+        スロットを空に戻す書き込みをしないため、読み取り中の書き込みが失われることはない
+
+        Returns:
+            tuple | None: 最新の (通し番号, パラメータ)、未読の値がない場合はNone
+        """
+        value = self._value
+        if value is None or value is self._taken:
+            return None
+        self._taken = value
+        self.takes += 1
+        return value
+
+    def pending(self) -> bool:
+        """未読の値があるかどうか"""
+        value = self._value
+        return value is not None and value is not self._taken
+
+
+class _RecorderProxy:
+    """入力スレッドからのイベント記録をデバイスループで実行する"""
+
+    def __init__(self, bridge: "IngestBridge"):
+        self.bridge = bridge
+
+    def event(self, name: str) -> None:
+        recorder = self.bridge.controller.recorder
+        if recorder is not None:
+            self.bridge.loop.call_soon_threadsafe(recorder.event, name)
+
+
+class IngestBridge:
+    """
+    入力スレッドから見たコントローラー
+
+    OSCサーバー・MQTTハンドラーにWHILLControllerの代わりに渡し、受け取ったコマンドを
+    デバイスループへ受け渡す。ジョイスティックは送信元ごとの最新値のみを、個別コマンドとあわせて届いた順に処理する
+    （緊急停止の後に届いたジョイスティックは停止の後に目標値へ反映する）
+    """
+
+    # この時間（秒）更新のない送信元のスロットを削除する
+    IDLE_TIMEOUT = 30.0
+    # デバイスループの待ち件数を公開する間隔（秒）
+    DEPTH_INTERVAL = 0.05
+
+    def __init__(self, controller: WHILLController):
+        """
+        Args:
+            controller: WHILLコントローラーインスタンス
+        """
+        self.controller = controller
+        self.whill = controller.whill
+        self.send_rate = controller.send_rate
+        self.idle = controller.idle
+        self.events = controller.events
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.joysticks: dict[str, LatestSlot] = {}
+        self.commands: deque[Handoff] = deque()
+        # 受け渡しの通し番号（next()は不可分）
+        self._stamps = itertools.count()
+        # 個別コマンドを処理中のタスクが残りを取り出す列（処理中でなければNone）
+        self._backlog: deque[Handoff] | None = None
+        self._wake_pending = False
+        self._recorder = _RecorderProxy(self)
+        self.tasks = TaskSet("Ingest")
+        # デバイスループが公開する待ち件数（入力スレッドは値を読むだけで、デバイスループを待たない）
+        self.device_queue_depth = 0
+        self._depth_handle: asyncio.TimerHandle | None = None
+
+        # 統計カウンター
+        self.wakeups = 0
+        self.drains = 0
+        self.commands_handed_off = 0
+        self._retired_puts = 0
+        self._retired_takes = 0
+        self._pruned_at = time.monotonic()
+
+    def start(self) -> None:
+        """デバイスループ（実行中のイベントループ）を受け渡し先に設定し、待ち件数の公開を始める"""
+        self.loop = asyncio.get_running_loop()
+        self._publish_depth()
+
+    def stop(self) -> None:
+        """待ち件数の公開をやめる（デバイスループから呼ぶ）"""
+        if self._depth_handle is not None:
+            self._depth_handle.cancel()
+            self._depth_handle = None
+
+    @property
+    def recorder(self) -> _RecorderProxy | None:
+        return self._recorder if self.controller.recorder is not None else None
+
+    @property
+    def telemetry_store(self) -> TelemetryStore | None:
+        """テレメトリストア（検索はファイルを直接読むため、入力スレッドから参照してよい）"""
+        return self.controller.telemetry_store
+
+    # 以下は入力スレッドから呼び出す
+
+    async def handle_osc_command(self, command: str, **kwargs) -> None:
+        """OSCからのコマンドをデバイスループへ受け渡す"""
+        self.submit(self.controller.handle_osc_command, command, kwargs)
+
+    async def handle_mqtt_command(self, command: str, **kwargs) -> None:
+        """MQTTからのコマンドをデバイスループへ受け渡す"""
+        self.submit(self.controller.handle_mqtt_command, command, kwargs)
+
+    def submit_joystick(self, front: int, side: int, **kwargs) -> bool:
+        """
+        ジョイスティックの目標値をデバイスループへ受け渡す（フリートの振り分けから呼ばれる）
+
+        受け付けるかどうかはデバイスループで判定するため、常にTrueを返す
+        """
+        self.submit(None, "joystick", {"front": front, "side": side, **kwargs})
+        return True
+
+    def submit(self, handler: Callable[..., Awaitable[None]] | None, command: str, kwargs: dict) -> None:
+        """
+        コマンドを受け渡し、必要であればデバイスループを起こす
+
+        Args:
+            handler: デバイスループで個別コマンドを処理するコントローラーのメソッド（ジョイスティックでは使わない）
+            command: コマンド名
+            kwargs: コマンドパラメータ
+        """
+        stamp = next(self._stamps)
+        if command == "joystick":
+            source = kwargs.get("source") or "unknown"
+            slot = self.joysticks.get(source)
+            if slot is None:
+                # setdefaultは不可分のため、複数スレッドから同時に作成しても1つに決まる
+                slot = self.joysticks.setdefault(source, LatestSlot())
+            slot.put((stamp, kwargs))
+        else:
+            self.commands.append((stamp, handler, command, kwargs))
+            self.commands_handed_off += 1
+        if not self._wake_pending:
+            self._wake_pending = True
+            self.wakeups += 1
+            self.loop.call_soon_threadsafe(self._drain)
+
+    async def change_port(self, new_port: str) -> bool:
+        """シリアルポートの変更をデバイスループで実行する"""
+        return await self.run_on_device_loop(self.controller.change_port(new_port))
+
+    async def calibrate_link(self, frames: int | None = None) -> dict | None:
+        """リンクのキャリブレーションをデバイスループで実行する"""
+        return await self.run_on_device_loop(self.controller.calibrate_link(frames))
+
+    def queue_depth(self) -> int:
+        """デバイスループが公開した待ち件数（最大DEPTH_INTERVAL前の値）に、受け渡し待ち・処理待ちの件数を加える"""
+        pending = sum(1 for slot in list(self.joysticks.values()) if slot.pending())
+        backlog = self._backlog
+        return self.device_queue_depth + len(self.commands) + pending + (len(backlog) if backlog else 0)
+
+    def snapshot(self) -> dict:
+        """接続状態・セットポイント・テレメトリを取得する（値は置き換えのみで更新されるため直接読む）"""
+        return self.controller.snapshot()
+
+    async def fetch_stats(self) -> dict:
+        """デバイスループでコントローラーの統計を取得し（入力スレッドのループは止めずに待つ）、受け渡しの統計を加える"""
+        stats = await self.run_on_device_loop(self.controller.fetch_stats())
+        stats["ingest"] = self.get_ingest_stats()
+        return stats
+
+    def get_ingest_stats(self) -> dict:
+        """受け渡しの統計を取得する"""
+        slots = list(self.joysticks.values())
+        puts = self._retired_puts + sum(slot.puts for slot in slots)
+        takes = self._retired_takes + sum(slot.takes for slot in slots)
+        return {
+            "joystick_sources": len(slots),
+            "joystick_handoffs": puts,
+            "joystick_overwritten": max(0, puts - takes),
+            "commands": self.commands_handed_off,
+            "wakeups": self.wakeups,
+            "drains": self.drains,
+        }
+
+    async def run_on_device_loop(self, coro: Awaitable) -> Any:
+        """
+        コルーチンをデバイスループで実行し、結果を待つ
+
+        Args:
+            coro: 実行するコルーチン
+
+        Returns:
+            Any: コルーチンの戻り値
+        """
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def on_device_loop(self, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """
+        非同期関数をデバイスループで実行するラッパーを作成する
+
+        Args:
+            func: デバイスループで実行する非同期関数
+
+        Returns:
+            Callable: 入力スレッドから呼び出せる非同期関数
+        """
+
+        async def call(*args, **kwargs):
+            return await self.run_on_device_loop(func(*args, **kwargs))
+
+        return call
+
+    # 以下はデバイスループで実行する
+
+    def _publish_depth(self) -> None:
+        """デバイスループの待ち件数を公開し、次の公開を予約する"""
+        self.device_queue_depth = self.controller.queue_depth()
+        self._depth_handle = self.loop.call_later(self.DEPTH_INTERVAL, self._publish_depth)
+
+    def _drain(self) -> None:
+        """
+        受け渡されたコマンドを届いた順にコントローラーへ渡す
+
+        ジョイスティックだけの場合はタスクを作らずに目標値を更新し、個別コマンドを含む場合は1つのタスクで順に処理する
+        （個別コマンドは破棄しないため、タスクの上限によらず作成する）。タスクが処理中の間に取り出した分は、
+        追い越さないようにそのタスクの後ろに並べる
+        """
+        # 先にフラグを戻し、処理中に届いたコマンドで再び起床させる
+        self._wake_pending = False
+        self.drains += 1
+
+        items: list[Handoff] = []
+        for slot in list(self.joysticks.values()):
+            value = slot.take()
+            if value is not None:
+                items.append((value[0], None, "joystick", value[1]))
+        discrete = bool(self.commands)
+        while self.commands:
+            items.append(self.commands.popleft())
+        items.sort(key=itemgetter(0))
+
+        if self._backlog is not None:
+            self._backlog.extend(items)
+        elif discrete:
+            self._backlog = deque(items)
+            self.tasks.spawn(self._run_backlog(), critical=True)
+        else:
+            for _, _, _, kwargs in items:
+                self.controller.submit_joystick(**kwargs)
+
+        now = time.monotonic()
+        if now - self._pruned_at >= self.IDLE_TIMEOUT:
+            self._pruned_at = now
+            self._prune(now)
+
+    async def _run_backlog(self) -> None:
+        """
+        個別コマンドを含む受け渡しを届いた順に処理する
+
+        1つのコマンドが失敗しても残りの処理を続ける（後ろに並んだ緊急停止などを破棄しない）
+        """
+        backlog = self._backlog
+        try:
+            while backlog:
+                _, handler, command, kwargs = backlog.popleft()
+                try:
+                    if handler is None:
+                        self.controller.submit_joystick(**kwargs)
+                    else:
+                        await handler(command, **kwargs)
+                except Exception as e:
+                    logger.error(f"Error handling {command} command from {kwargs.get('source')}: {e}")
+        finally:
+            self._backlog = None
+
+    def _prune(self, now: float) -> None:
+        """しばらく更新のない送信元のスロットを削除する"""
+        for source, slot in list(self.joysticks.items()):
+            if now - slot.updated >= self.IDLE_TIMEOUT and not slot.pending():
+                del self.joysticks[source]
+                self._retired_puts += slot.puts
+                self._retired_takes += slot.takes
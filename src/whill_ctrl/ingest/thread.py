@@ -0,0 +1,169 @@
+"""
+入力処理を専用スレッドのイベントループで実行する
+
+OSCサーバー・MQTTハンドラーはそれぞれのスレッドのイベントループで動作し、
+一方の受信が集中しても他方やデバイスへの送信を遅らせない
+"""
+
+import asyncio
+import concurrent.futures
+import inspect
+import threading
+import time
+from collections.abc import Awaitable
+from typing import Any
+
+from loguru import logger
+
+
+class IngestThread:
+    """イベントループを実行する入力スレッド"""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: スレッド名（ログと統計に使用）
+        """
+        self.name = name
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.thread: threading.Thread | None = None
+        self._ready = threading.Event()
+        # 応答確認を送った時刻と、スレッドのイベントループが応答した時刻（time.monotonic()）
+        self._probed_at: float | None = None
+        self._answered_at = 0.0
+
+    def start(self) -> None:
+        """スレッドを開始し、イベントループが動き出すまで待つ"""
+        self.thread = threading.Thread(target=self._run, name=f"ingest-{self.name}", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        logger.info(f"Ingest thread started: {self.thread.name}")
+
+    def _run(self) -> None:
+        """スレッドのイベントループを実行する"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        try:
+            self.loop.run_forever()
+            # 残ったタスクを終了させてからループを閉じる
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        finally:
+            self.loop.close()
+
+    def responsive(self, timeout: float) -> bool:
+        """
+        スレッドのイベントループが応答しているかを確認する（ウォッチドッグ用）
+
+        前回の確認に応答済みであれば次の確認を送る。応答がないまま timeout を超えた場合は応答なしとする
+
+        Args:
+            timeout: 応答を待つ時間（秒）
+
+        Returns:
+            bool: 応答している（または応答待ちでtimeout以内）場合はTrue
+        """
+        if self.thread is None or not self.thread.is_alive():
+            return False
+        now = time.monotonic()
+        probed_at = self._probed_at
+        if probed_at is not None and self._answered_at < probed_at:
+            return now - probed_at <= timeout
+        self._probed_at = now
+        self.loop.call_soon_threadsafe(self._answer)
+        return True
+
+    def _answer(self) -> None:
+        self._answered_at = time.monotonic()
+
+    async def call(self, coro: Awaitable) -> Any:
+        """
+        コルーチンをこのスレッドのイベントループで実行し、結果を待つ
+
+        Args:
+            coro: 実行するコルーチン
+
+        Returns:
+            Any: コルーチンの戻り値
+        """
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def call_soon(self, func, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        同期関数をこのスレッドのイベントループで実行する（結果を待たない）
+
+        呼び出し元のスレッドを止めないよう、実行を予約して結果の Future を返す。
+        同じスレッドへの予約は順に実行されるため、stop() の前に予約した停止処理は停止より先に実行される
+
+        Args:
+            func: 実行する関数
+            *args: 関数の引数
+            **kwargs: 関数のキーワード引数
+
+        Returns:
+            concurrent.futures.Future: 関数の戻り値または例外が設定される Future
+        """
+        future = concurrent.futures.Future()
+
+        def run():
+            try:
+                future.set_result(func(*args, **kwargs))
+            except Exception as e:
+                logger.error(f"Ingest thread {self.name}: {getattr(func, '__qualname__', func)} failed: {e}")
+                future.set_exception(e)
+
+        if threading.current_thread() is self.thread:
+            run()
+        else:
+            self.loop.call_soon_threadsafe(run)
+        return future
+
+    async def stop(self) -> None:
+        """イベントループを停止し、スレッドの終了を待つ"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        await asyncio.to_thread(self.thread.join, 5.0)
+        logger.info(f"Ingest thread stopped: {self.thread.name}")
+
+
+class ThreadedComponent:
+    """
+    入力スレッドで動作するコンポーネント（OSCServer・MQTTHandler）のプロキシ
+
+    メソッドの呼び出しはコンポーネントのスレッドで実行し、属性の読み書きはそのまま行う。
+    非同期メソッドは呼び出し元のループを止めずに結果を待ち、同期メソッドは実行を予約するだけで結果を待たない
+    （呼び出し元のスレッドをコンポーネントのスレッドの応答待ちで止めない）
+    """
+
+    def __init__(self, component: Any, thread: IngestThread):
+        """
+        Args:
+            component: スレッドで動作させるコンポーネント
+            thread: コンポーネントを動作させる入力スレッド
+        """
+        object.__setattr__(self, "component", component)
+        object.__setattr__(self, "thread", thread)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.component, name)
+        if inspect.iscoroutinefunction(attr):
+
+            async def call_async(*args, **kwargs):
+                return await self.thread.call(attr(*args, **kwargs))
+
+            return call_async
+        if inspect.ismethod(attr):
+
+            def call_soon(*args, **kwargs):
+                return self.thread.call_soon(attr, *args, **kwargs)
+
+            return call_soon
+        return attr
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.component, name, value)
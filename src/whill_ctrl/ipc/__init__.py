@@ -0,0 +1,3 @@
+"""
+IPCモジュール: 同一ホスト上のプロデューサー向けの、Unixドメインソケットと共有メモリによるコマンド入力
+"""
@@ -0,0 +1,90 @@
+"""
+ローカルIPCのバイナリコマンド形式
+
+1コマンドは16バイトのリトルエンディアン形式のデータグラム
+  version (u8), command (u8), front (i8), side (i8), seq (u32, 0で省略), sent_at (f64, 0で省略)
+"""
+
+import socket
+import struct
+import time
+
+COMMAND_STRUCT = struct.Struct("<BBbbId")
+COMMAND_SIZE = COMMAND_STRUCT.size
+PROTOCOL_VERSION = 1
+
+# コマンドコード
+CMD_JOYSTICK = 1
+CMD_POWER_ON = 2
+CMD_POWER_OFF = 3
+CMD_EMERGENCY_STOP = 4
+CMD_WAKE = 5  # 共有メモリのセットポイントをすぐに読むよう制御ループを起こす
+
+COMMAND_NAMES = {CMD_POWER_ON: "power_on", CMD_POWER_OFF: "power_off", CMD_EMERGENCY_STOP: "emergency_stop"}
+
+
+def encode_command(
+    command: int, front: int = 0, side: int = 0, seq: int | None = None, sent_at: float | None = None
+) -> bytes:
+    """
+    コマンドをデータグラムに変換する
+
+    Args:
+        command: コマンドコード
+        front: 前後方向の値（-100～100）
+        side: 左右方向の値（-100～100）
+        seq: シーケンス番号（任意）
+        sent_at: 送信時刻（サーバー時計換算のUNIX時刻、任意）
+
+    Returns:
+        bytes: 16バイトのデータグラム
+    """
+    front = max(-100, min(100, int(front)))
+    side = max(-100, min(100, int(side)))
+    return COMMAND_STRUCT.pack(PROTOCOL_VERSION, command, front, side, (seq or 0) & 0xFFFFFFFF, sent_at or 0.0)
+
+
+def decode_command(data: bytes) -> tuple[int, int, int, int | None, float | None]:
+    """
+    データグラムをコマンドに変換する
+
+    Args:
+        data: 受信したデータグラム
+
+    Returns:
+        tuple: (コマンドコード, front, side, seq, sent_at)
+
+    Raises:
+        ValueError: 長さまたはバージョンが不正な場合
+    """
+    if len(data) != COMMAND_SIZE:
+        raise ValueError(f"Invalid command size: {len(data)}")
+    version, command, front, side, seq, sent_at = COMMAND_STRUCT.unpack(data)
+    if version != PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported protocol version: {version}")
+    return command, front, side, seq or None, sent_at or None
+
+
+class IPCClient:
+    """ローカルIPCでコマンドを送るクライアント（TouchDesignerなどのプロデューサー用）"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: コントローラーのUnixドメインソケットのパス
+        """
+        self.path = path
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.seq = 0
+
+    def joystick(self, front: int, side: int) -> None:
+        """ジョイスティックの値を送る（シーケンス番号と送信時刻を付ける）"""
+        self.seq += 1
+        self.sock.sendto(encode_command(CMD_JOYSTICK, front, side, self.seq, time.time()), self.path)
+
+    def command(self, command: int) -> None:
+        """ジョイスティック以外のコマンドを送る"""
+        self.sock.sendto(encode_command(command), self.path)
+
+    def close(self) -> None:
+        self.sock.close()
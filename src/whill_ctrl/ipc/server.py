@@ -0,0 +1,144 @@
+"""
+Unixドメインソケット（データグラム）でバイナリ形式のコマンドを受け付けるサーバー
+同一ホストのプロデューサーから、OSCのパースやネットワークスタックを経由せずにコマンドを受け取る
+"""
+
+import asyncio
+import os
+import socket
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from ..controller.controller import WHILLController
+from ..utils.tasks import TaskSet
+from .protocol import CMD_JOYSTICK, CMD_WAKE, COMMAND_NAMES, decode_command
+from .shared import SharedSetpoint
+
+
+class _IPCProtocol(asyncio.DatagramProtocol):
+    """受信したデータグラムをサーバーに渡す"""
+
+    def __init__(self, server: "IPCServer"):
+        self.server = server
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.server.handle_datagram(data, addr)
+
+
+class IPCServer:
+    """ローカルIPCサーバー（Unixドメインソケットと共有メモリの目標値スロット）"""
+
+    def __init__(self, controller: WHILLController, socket_path: Path | None = None, shm_name: str | None = None):
+        """
+        IPCサーバーを初期化
+
+        Args:
+            controller: WHILLコントローラーインスタンス
+            socket_path: Unixドメインソケットのパス（Noneの場合は開かない）
+            shm_name: 共有メモリの目標値スロットの名前（Noneの場合は作成しない）
+        """
+        self.controller = controller
+        self.socket_path = Path(socket_path) if socket_path else None
+        self.shm_name = shm_name
+        self.transport: asyncio.DatagramTransport | None = None
+        self.shared: SharedSetpoint | None = None
+        self.tasks = TaskSet("IPC")
+
+        # 統計カウンター
+        self.received = 0
+        self.invalid = 0
+
+    async def start(self) -> bool:
+        """
+        ソケットと共有メモリを開く
+
+        Returns:
+            bool: 開始に成功した場合はTrue
+        """
+        self.controller.ipc_server = self
+        try:
+            if self.shm_name:
+                self.shared = SharedSetpoint(self.shm_name, create=True)
+                self.controller.shared_setpoint = self.shared
+                logger.info(f"IPC shared setpoint created: {self.shm_name}")
+
+            if self.socket_path:
+                # 前回異常終了したときに残ったソケットファイルは削除する
+                if self.socket_path.is_socket():
+                    self.socket_path.unlink()
+                self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                sock.bind(str(self.socket_path))
+                os.chmod(self.socket_path, 0o660)
+                loop = asyncio.get_running_loop()
+                self.transport, _ = await loop.create_datagram_endpoint(lambda: _IPCProtocol(self), sock=sock)
+                logger.info(f"IPC server listening on {self.socket_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to start IPC server: {e}")
+            self.stop()
+            return False
+
+    def handle_datagram(self, data: bytes, addr) -> None:
+        """
+        受信したコマンドを処理する
+
+        Args:
+            data: 受信したデータグラム
+            addr: 送信元のソケットパス（名前のないソケットの場合は空）
+        """
+        received_at = time.time()
+        try:
+            command, front, side, seq, sent_at = decode_command(data)
+        except ValueError as e:
+            self.invalid += 1
+            logger.debug(f"[IPC] Discarded invalid datagram: {e}")
+            return
+        self.received += 1
+
+        if command == CMD_JOYSTICK:
+            # ロックを待たないため、タスクを作らずに目標値を更新する
+            self.controller.submit_joystick(
+                front, side, source=f"ipc:{addr or 'local'}", seq=seq, sent_at=sent_at, received_at=received_at
+            )
+        elif command == CMD_WAKE:
+            # 共有メモリの目標値をすぐに読むよう制御ループを起こす
+            self.controller.wake()
+        elif command in COMMAND_NAMES:
+            logger.debug(f"[IPC] {COMMAND_NAMES[command]} command received")
+            self.tasks.spawn(
+                self.controller.handle_ipc_command(
+                    COMMAND_NAMES[command], source=f"ipc:{addr or 'local'}", received_at=received_at
+                ),
+                critical=True,
+            )
+        else:
+            self.invalid += 1
+            logger.debug(f"[IPC] Unknown command: {command}")
+
+    def get_stats(self) -> dict:
+        """IPCの統計情報を取得する"""
+        stats = {"received": self.received, "invalid": self.invalid}
+        if self.shared is not None:
+            stats["shm_updates"] = self.shared.updates
+            stats["shm_retries"] = self.shared.retries
+        return stats
+
+    def stop(self) -> None:
+        """ソケットと共有メモリを閉じる"""
+        self.tasks.cancel()
+        if self.transport:
+            self.transport.close()
+            self.transport = None
+        if self.socket_path and self.socket_path.is_socket():
+            self.socket_path.unlink()
+        if self.shared is not None:
+            if self.controller.shared_setpoint is self.shared:
+                self.controller.shared_setpoint = None
+            self.shared.close()
+            self.shared = None
+        if self.controller.ipc_server is self:
+            self.controller.ipc_server = None
+        logger.info("IPC server stopped")
@@ -0,0 +1,136 @@
+"""
+共有メモリ上のジョイスティック目標値スロット（seqlock）
+
+同一ホストのプロデューサーが目標値を書き込み、制御ループが送信周期ごとに読み取る
+更新のたびにシステムコールを発行しないため、高レートの入力でもカーネルを経由しない
+
+レイアウト（リトルエンディアン、24バイト）
+  version (u32、書き込み中は奇数), front (i8), side (i8), pad (2), seq (u32, 0で省略), sent_at (f64, 0で省略)
+
+書き込み側は version を奇数にしてから値を書き、偶数に戻す。読み取り側は version が奇数の場合や
+読み取りの前後で変わった場合に読み直す。Pythonからはメモリバリアを発行できないため、ストア同士・ロード同士の
+順序をハードウェアが保証するx86（TSO）でのみ使用できる。ARMなど順序の弱いCPUでは、読み取り側が新しい version と
+古い目標値を組み合わせて読む（車椅子への目標値が壊れる）可能性があるため、スロットの作成・接続を拒否する
+"""
+
+import platform
+import struct
+from multiprocessing import shared_memory
+
+VERSION_STRUCT = struct.Struct("<I")
+PAYLOAD_STRUCT = struct.Struct("<bbxxId")
+PAYLOAD_OFFSET = VERSION_STRUCT.size
+SLOT_SIZE = 24
+
+# 書き込み中の値を読み直す最大回数
+MAX_RETRIES = 16
+
+# ストア同士・ロード同士の順序が保たれるアーキテクチャ（platform.machine()の値）
+ORDERED_MACHINES = frozenset({"x86_64", "amd64", "i386", "i486", "i586", "i686", "x86"})
+
+
+def shared_setpoint_supported(machine: str | None = None) -> bool:
+    """
+    このCPUで共有メモリの目標値スロットを安全に使えるかどうか
+
+    Args:
+        machine: アーキテクチャ名（Noneの場合は実行中のもの）
+
+    Returns:
+        bool: メモリバリアなしでseqlockの順序が保たれる場合はTrue
+    """
+    return (machine or platform.machine()).lower() in ORDERED_MACHINES
+
+
+class SharedSetpoint:
+    """共有メモリ上の目標値スロット"""
+
+    def __init__(self, name: str, create: bool = False):
+        """
+        スロットを開く
+
+        Args:
+            name: 共有メモリの名前
+            create: Trueの場合は新しく作成する（コントローラー側）、Falseの場合は既存のものに接続する
+
+        Raises:
+            RuntimeError: メモリの順序が保証されないアーキテクチャの場合
+        """
+        if not shared_setpoint_supported():
+            raise RuntimeError(
+                f"Shared-memory setpoints require an x86 CPU (store order without barriers); "
+                f"{platform.machine()} may read a torn setpoint, use the IPC socket instead"
+            )
+        self.name = name
+        self.owner = create
+        if create:
+            try:
+                # 前回異常終了したときに残った共有メモリは作り直す
+                stale = shared_memory.SharedMemory(name=name, track=False)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=SLOT_SIZE, track=False)
+            self.shm.buf[:SLOT_SIZE] = bytes(SLOT_SIZE)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        self.buf = self.shm.buf
+        # 最後に読み取ったバージョン
+        self.last_version = 0
+
+        # 統計カウンター
+        self.updates = 0
+        self.retries = 0
+
+    def write(self, front: int, side: int, seq: int | None = None, sent_at: float | None = None) -> None:
+        """
+        目標値を書き込む（プロデューサー側、書き込み側は1つのみ）
+
+        Args:
+            front: 前後方向の値（-100～100）
+            side: 左右方向の値（-100～100）
+            seq: シーケンス番号（任意）
+            sent_at: 送信時刻（サーバー時計換算のUNIX時刻、任意）
+        """
+        front = max(-100, min(100, int(front)))
+        side = max(-100, min(100, int(side)))
+        (version,) = VERSION_STRUCT.unpack_from(self.buf, 0)
+        VERSION_STRUCT.pack_into(self.buf, 0, (version + 1) & 0xFFFFFFFF)
+        PAYLOAD_STRUCT.pack_into(self.buf, PAYLOAD_OFFSET, front, side, (seq or 0) & 0xFFFFFFFF, sent_at or 0.0)
+        VERSION_STRUCT.pack_into(self.buf, 0, (version + 2) & 0xFFFFFFFF)
+
+    def poll(self) -> tuple[int, int, int | None, float | None] | None:
+        """
+        前回の読み取り以降に書き込まれた目標値を取得する（コントローラー側）
+
+        Returns:
+            tuple | None: (front, side, seq, sent_at)、更新がないか書き込み中の場合はNone
+        """
+        for _ in range(MAX_RETRIES):
+            (before,) = VERSION_STRUCT.unpack_from(self.buf, 0)
+            if before == self.last_version:
+                return None
+            if before & 1:
+                self.retries += 1
+                continue
+            front, side, seq, sent_at = PAYLOAD_STRUCT.unpack_from(self.buf, PAYLOAD_OFFSET)
+            (after,) = VERSION_STRUCT.unpack_from(self.buf, 0)
+            if before != after:
+                self.retries += 1
+                continue
+            self.last_version = after
+            self.updates += 1
+            return front, side, seq or None, sent_at or None
+        # 書き込みが続いている場合は次の周期に読み直す
+        return None
+
+    def close(self) -> None:
+        """スロットを閉じる（作成した側は共有メモリを削除する）"""
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
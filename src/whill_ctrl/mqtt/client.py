@@ -5,12 +5,57 @@ WHILLコントローラーからの指示を受け取り、MQTTメッセージ
 
 import asyncio
 import json
+import re
+import socket
+import time
+from collections.abc import Awaitable, Callable
 from datetime import datetime
 
 from aiomqtt import Client, Message, MqttError, Will
 from loguru import logger
 
 from ..controller.controller import WHILLController
+from ..controller.events import LATEST
+from ..fleet.receiver import FleetReceiver
+from ..recording.telemetry_store import query_telemetry, to_compact_json
+from ..utils.backoff import Backoff
+from ..utils.tasks import TaskSet
+from .v5 import SESSION_EXPIRY_NEVER, TopicAliases, V5Client, publish_properties, user_properties
+
+
+def parse_broker_address(address: str, default_port: int = 1883) -> tuple[str, int]:
+    """
+    "host:port"形式のブローカーアドレスを解析する
+
+    Args:
+        address: ブローカーアドレス（ポート省略時はdefault_portを使用）
+        default_port: デフォルトのポート番号
+
+    Returns:
+        tuple[str, int]: (host, port)
+    """
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        return address, default_port
+    return host, int(port)
+
+
+def default_client_id(serial_port: str | None) -> str:
+    """
+    ホスト名とシリアルポートからMQTTクライアントIDを生成する
+
+    同じホストで複数の車椅子を制御する場合もIDが重ならないよう、シリアルポート名を含める
+    （同じIDの2つ目の接続はブローカーが1つ目を切断し、永続セッションも共有してしまう）。
+    同じポートを引き継ぐ待機系は稼働系と同じIDになり、永続セッションをそのまま引き継ぐ
+
+    Args:
+        serial_port: シリアルポート（/dev/ttyUSB0、COM3など）
+
+    Returns:
+        str: whill-controller-<ホスト名>-<ポート名>
+    """
+    name = re.sub(r"[^A-Za-z0-9_-]", "_", (serial_port or "").rstrip("/").rsplit("/", 1)[-1])
+    return f"whill-controller-{socket.gethostname()}-{name}" if name else f"whill-controller-{socket.gethostname()}"
 
 
 class MQTTHandler:
@@ -24,6 +69,19 @@ class MQTTHandler:
         command_topic: str,
         status_topic: str,
         ctrl_topic: str,
+        *,
+        client_id: str | None = None,
+        clean_session: bool = False,
+        keepalive: int = 60,
+        standby_brokers: list[tuple[str, int]] | None = None,
+        reconnect_min_delay: float = 0.02,
+        reconnect_max_delay: float = 1.0,
+        health_check_timeout: float = 0.2,
+        failback_interval: float = 30.0,
+        protocol_v5: bool = False,
+        topic_alias_maximum: int = 8,
+        message_expiry: int = 5,
+        fleet: FleetReceiver | None = None,
     ):
         """
         MQTTハンドラーを初期化
@@ -35,6 +93,18 @@ class MQTTHandler:
             command_topic: コマンド受信用トピック
             status_topic: 状態通知用トピックのベースパス
             ctrl_topic: 制御コマンド受信用トピック
+            client_id: MQTTクライアントID（Noneの場合はホスト名とデバイスのシリアルポートから生成）
+            clean_session: 再接続ごとにセッションを破棄するかどうか
+            keepalive: キープアライブ間隔（秒）
+            standby_brokers: スタンバイブローカーの(host, port)リスト（優先順）
+            reconnect_min_delay: 再接続の最小待機時間（秒）
+            reconnect_max_delay: 再接続の最大待機時間（秒）
+            health_check_timeout: ブローカーのヘルスチェックのタイムアウト（秒）
+            failback_interval: スタンバイ接続中にプライマリの復旧を確認する間隔（秒）
+            protocol_v5: MQTT v5で接続する（トピックエイリアス・有効期限・ユーザープロパティを使う）
+            topic_alias_maximum: v5で状態通知に使うトピックエイリアスの最大数、0で使わない
+            message_expiry: v5で保持しない状態通知（応答・統計など）に付ける有効期限（秒）、0で期限なし
+            fleet: whill/commands/fleet のフレームを渡す受信器（Noneの場合は受け付けない）
         """
         self.controller = controller
         self.broker = broker
@@ -42,10 +112,49 @@ class MQTTHandler:
         self.command_topic = command_topic
         self.status_topic = status_topic
         self.ctrl_topic = ctrl_topic
+        self.client_id = client_id or default_client_id(controller.whill.port)
+        self.clean_session = clean_session
+        self.keepalive = keepalive
+        self.health_check_timeout = health_check_timeout
+        self.failback_interval = failback_interval
+        self.protocol_v5 = protocol_v5
+        self.message_expiry = message_expiry
+        self.aliases = TopicAliases(topic_alias_maximum)
+        self.fleet = fleet
         self.client = None
         self.running = False
         self.client_task = None
 
+        # 設定の再読み込み処理（アプリケーションが設定する）
+        self.reload_handler: Callable[[dict | None], Awaitable[dict]] | None = None
+
+        # プロファイル処理（アプリケーションが設定する）
+        self.profile_handler: Callable[[float], Awaitable[dict]] | None = None
+
+        # 受信ループを待たせないよう別のタスクで実行する処理
+        # （ポート変更・キャリブレーション・検索・再読み込み・プロファイル）
+        self.tasks = TaskSet("MQTT", limit=16)
+
+        # 接続先候補（先頭がプライマリ）と現在の接続先
+        self.brokers: list[tuple[str, int]] = [(broker, port), *(standby_brokers or [])]
+        self.current_broker: tuple[str, int] | None = None
+        self.backoff = Backoff(reconnect_min_delay, reconnect_max_delay)
+        # 待機系から引き継いだ接続中のクライアント（最初の接続だけで使う）
+        self._adopted: tuple[Client, tuple[str, int]] | None = None
+
+    def adopt(self, client: Client, broker: tuple[str, int]) -> None:
+        """
+        待機系のセッションの接続中のクライアントを引き継ぐ（start() の前に呼ぶ）
+
+        最初の接続では新しく接続せずにこのクライアントで受信を始める。引き継いだ接続には待機系のクライアントIDと
+        Last Willなしの設定が残るため、切断後の再接続からこのハンドラーの設定で接続する
+
+        Args:
+            client: 接続・購読済みのクライアント
+            broker: 接続先の(host, port)
+        """
+        self._adopted = (client, broker)
+
     async def start(self) -> bool:
         """MQTTクライアントを起動する"""
         self.running = True
@@ -68,49 +177,210 @@ class MQTTHandler:
     async def _run_mqtt_client(self) -> None:
         """MQTTクライアントのメインループ"""
         while self.running:
+            adopted, self._adopted = self._adopted, None
+            broker = adopted[1] if adopted is not None else await self._select_broker()
+            if broker is None:
+                delay = self.backoff.next_delay()
+                logger.warning(f"No healthy MQTT broker available, retrying in {delay:.3f}s...")
+                await asyncio.sleep(delay)
+                continue
+
             try:
-                # Last Willメッセージを設定
-                will_payload = json.dumps(
-                    {
-                        "connected": False,
-                        "port": self.controller.whill.port,
-                        "mode": self.controller.whill.get_mode(),
-                        "last_update": datetime.now().isoformat(),
-                    }
-                )
+                if adopted is not None:
+                    await self._serve_adopted(adopted[0], *broker)
+                else:
+                    await self._serve_broker(*broker)
+            except MqttError as e:
+                logger.error(f"MQTT connection error on {broker[0]}:{broker[1]}: {e}")
+            except Exception as e:
+                logger.error(f"Unexpected MQTT error on {broker[0]}:{broker[1]}: {e}")
+            finally:
+                if self.current_broker is not None and self.controller.recorder is not None:
+                    self.controller.recorder.event("mqtt_disconnected")
+                self.client = None
+                self.current_broker = None
+
+            if self.running:
+                delay = self.backoff.next_delay()
+                logger.info(f"Reconnecting to MQTT broker in {delay:.3f}s...")
+                await asyncio.sleep(delay)
+
+    async def _serve_broker(self, host: str, port: int) -> None:
+        """
+        指定したブローカーに接続し、切断されるまでメッセージを処理する
+
+        スタンバイブローカーに接続している間は、プライマリの復旧を監視し、
+        復旧を確認した時点で接続を切り替える
+
+        Args:
+            host: ブローカーホスト名
+            port: ブローカーポート
+        """
+        # Last Willメッセージを設定
+        will_payload = json.dumps(
+            {
+                "connected": False,
+                "port": self.controller.whill.port,
+                "mode": self.controller.whill.get_mode(),
+                "last_update": datetime.now().isoformat(),
+            }
+        )
+
+        will = Will(topic=f"{self.status_topic}/connection", payload=will_payload, qos=1, retain=True)
+
+        # 固定のクライアントIDと永続セッションで接続し、ブローカー側に購読状態を保持させる
+        options = {
+            "hostname": host,
+            "port": port,
+            "identifier": self.client_id,
+            "keepalive": self.keepalive,
+            "timeout": max(self.health_check_timeout * 5, 1.0),
+            "will": will,
+        }
+        if self.protocol_v5:
+            # v5ではclean startとセッションの保持期間で永続セッションを表す
+            client = V5Client(
+                session_expiry=0 if self.clean_session else SESSION_EXPIRY_NEVER,
+                clean_start=self.clean_session,
+                **options,
+            )
+        else:
+            client = Client(clean_session=self.clean_session, **options)
+        async with client:
+            # コマンドはQoS 0で購読し、切断中に溜まった古い操作がセッション経由で再送されないようにする
+            await client.subscribe(self.command_topic, qos=0)
+            await client.subscribe(self.ctrl_topic, qos=1)
+            logger.info(
+                f"Connected to MQTT broker at {host}:{port} (client id: {self.client_id}"
+                f"{', MQTT v5' if self.protocol_v5 else ''})"
+            )
+            logger.info(f"Subscribed to topics: {self.command_topic} and {self.ctrl_topic}")
+            await self._serve_client(client, host, port)
+
+    async def _serve_adopted(self, client: Client, host: str, port: int) -> None:
+        """
+        待機系から引き継いだ接続・購読済みのクライアントで、切断されるまでメッセージを処理する
 
-                will = Will(topic=f"{self.status_topic}/connection", payload=will_payload, qos=1, retain=True)
+        Args:
+            client: 引き継いだクライアント
+            host: ブローカーホスト名
+            port: ブローカーポート
+        """
+        logger.info(f"Took over the standby MQTT session on {host}:{port} (client id: {client.identifier})")
+        try:
+            await self._serve_client(client, host, port)
+        finally:
+            try:
+                await client.__aexit__(None, None, None)
+            except MqttError:
+                pass
 
-                # MQTTクライアントに接続
-                async with Client(
-                    hostname=self.broker, port=self.port, identifier=f"whill-controller-{id(self)}", will=will
-                ) as client:
-                    self.client = client
+    async def _serve_client(self, client: Client, host: str, port: int) -> None:
+        """
+        接続・購読済みのクライアントで状態を発行し、切断されるまでメッセージを処理する
 
-                    # コマンドトピックとコントロールトピックを購読
-                    await self.client.subscribe(self.command_topic)
-                    await self.client.subscribe(self.ctrl_topic)
+        Args:
+            client: 接続・購読済みのクライアント
+            host: ブローカーホスト名
+            port: ブローカーポート
+        """
+        self.client = client
+        if self.protocol_v5:
+            self.aliases.reset(getattr(client, "topic_alias_maximum", 0))
+        self.current_broker = (host, port)
+        self.backoff.reset()
+        if self.controller.recorder is not None:
+            self.controller.recorder.event("mqtt_connected")
+
+        # 現在の状態を発行
+        await self.publish_status()
+
+        receive_task = asyncio.create_task(self._receive_messages())
+        watch_tasks = {receive_task, asyncio.create_task(self._publish_state_changes())}
+        if (host, port) != self.brokers[0]:
+            watch_tasks.add(asyncio.create_task(self._watch_primary()))
 
-                    logger.info(f"Connected to MQTT broker at {self.broker}:{self.port}")
-                    logger.info(f"Subscribed to topics: {self.command_topic} and {self.ctrl_topic}")
+        try:
+            done, _ = await asyncio.wait(watch_tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in watch_tasks:
+                task.cancel()
+            await asyncio.gather(*watch_tasks, return_exceptions=True)
+
+        # 受信ループの例外（切断など）は呼び出し元で処理する
+        if receive_task in done:
+            receive_task.result()
+
+    async def _receive_messages(self) -> None:
+        """メッセージ受信ループ"""
+        async for message in self.client.messages:
+            if not self.running:
+                break
+            await self._process_message(message)
+
+    async def _publish_state_changes(self) -> None:
+        """デバイスとの接続・リンクの状態が変わるたびに状態を発行する（続けて変わった場合は最新の1回にまとめる）"""
+        subscription = self.controller.events.state.subscribe(policy=LATEST)
+        try:
+            async for _event in subscription:
+                await self.publish_status()
+        finally:
+            subscription.close()
+
+    async def _watch_primary(self) -> None:
+        """スタンバイ接続中にプライマリブローカーの復旧を待つ"""
+        host, port = self.brokers[0]
+        while True:
+            await asyncio.sleep(self.failback_interval)
+            if await self._probe_broker(host, port):
+                logger.info(f"Primary MQTT broker {host}:{port} is healthy again, failing back")
+                return
+
+    async def _select_broker(self) -> tuple[str, int] | None:
+        """
+        接続先のブローカーを選択する
 
-                    # 現在の状態を発行
-                    await self.publish_status()
+        プライマリを優先し、応答しない場合はスタンバイを並行してヘルスチェックして
+        優先順位が最も高い正常なブローカーを返す
 
-                    # メッセージ受信ループ
-                    async for message in self.client.messages:
-                        if not self.running:
-                            break
-                        await self._process_message(message)
+        Returns:
+            tuple[str, int] | None: 接続先の(host, port)、正常なブローカーがなければNone
+        """
+        primary = self.brokers[0]
+        if len(self.brokers) == 1 or await self._probe_broker(*primary):
+            return primary
+
+        standbys = self.brokers[1:]
+        results = await asyncio.gather(*(self._probe_broker(host, port) for host, port in standbys))
+        for broker, healthy in zip(standbys, results, strict=True):
+            if healthy:
+                logger.warning(
+                    f"Primary MQTT broker {primary[0]}:{primary[1]} unavailable, failing over to {broker[0]}:{broker[1]}"
+                )
+                return broker
+        return None
 
-            except MqttError as e:
-                logger.error(f"MQTT connection error: {e}")
-                logger.info("Reconnecting to MQTT broker in 5 seconds...")
-                await asyncio.sleep(5)
-            except Exception as e:
-                logger.error(f"Unexpected MQTT error: {e}")
-                logger.info("Reconnecting to MQTT broker in 5 seconds...")
-                await asyncio.sleep(5)
+    async def _probe_broker(self, host: str, port: int) -> bool:
+        """
+        ブローカーのポートにTCP接続できるかを確認する
+
+        Args:
+            host: ブローカーホスト名
+            port: ブローカーポート
+
+        Returns:
+            bool: 接続できればTrue
+        """
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.health_check_timeout)
+        except (OSError, TimeoutError):
+            return False
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
 
     async def _process_message(self, message: Message) -> None:
         """
@@ -119,7 +389,17 @@ class MQTTHandler:
         Args:
             message: 受信したMQTTメッセージ
         """
+        received_at = time.time()
         topic = message.topic.value
+
+        # フリートフレームはバイナリのため、文字列に変換せずに受信器へ渡す
+        if topic == "whill/commands/fleet" or topic.startswith("whill/commands/fleet/"):
+            if message.retain:
+                logger.warning(f"Ignoring retained command on topic {topic}")
+            elif self.fleet is not None and isinstance(message.payload, bytes | bytearray):
+                self.fleet.handle(bytes(message.payload), "mqtt", received_at)
+            return
+
         payload = message.payload.decode("utf-8").strip()
 
         logger.debug(f"Received MQTT message on topic {topic}: {payload}")
@@ -138,6 +418,8 @@ class MQTTHandler:
         # WHILL制御コマンド
         if topic_parts[0] == "whill" and topic_parts[1] == "commands":
             command = topic_parts[2]
+            # トピック末尾（whill/commands/<command>/<client_id>）を送信元の識別子とする
+            source = f"mqtt:{topic_parts[3]}" if len(topic_parts) > 3 else "mqtt"
 
             if command == "joystick":
                 # ペイロードからジョイスティック値を解析
@@ -146,27 +428,43 @@ class MQTTHandler:
                     if len(values) < 2:
                         raise ValueError("Joystick command requires two values: front,side")
 
-                    front, side = map(int, values)
+                    front, side = int(values[0]), int(values[1])
                     # 値の範囲を-100～100にクリッピング
                     front = max(min(front, 100), -100)
                     side = max(min(side, 100), -100)
 
+                    # 任意のシーケンス番号と送信時刻（サーバー時計換算のUNIX時刻）
+                    # ペイロードにない場合はMQTT v5のユーザープロパティ（seq, ts）から取得する
+                    user = user_properties(message.properties)
+                    seq = values[2] if len(values) > 2 and values[2] else user.get("seq")
+                    sent_at = values[3] if len(values) > 3 and values[3] else user.get("ts")
+                    seq = int(seq) if seq else None
+                    sent_at = float(sent_at) if sent_at else None
+
                     logger.debug(f"[MQTT {topic}] Joystick command: front={front}, side={side}")
-                    await self.controller.handle_mqtt_command("joystick", front=front, side=side)
+                    await self.controller.handle_mqtt_command(
+                        "joystick",
+                        front=front,
+                        side=side,
+                        source=source,
+                        seq=seq,
+                        sent_at=sent_at,
+                        received_at=received_at,
+                    )
                 except Exception as e:
                     logger.error(f"Invalid joystick payload: {payload}, error: {e}")
 
             elif command == "power_on":
                 logger.debug(f"[MQTT {topic}] Power on command received")
-                await self.controller.handle_mqtt_command("power_on")
+                await self.controller.handle_mqtt_command("power_on", source=source, received_at=received_at)
 
             elif command == "power_off":
                 logger.debug(f"[MQTT {topic}] Power off command received")
-                await self.controller.handle_mqtt_command("power_off")
+                await self.controller.handle_mqtt_command("power_off", source=source, received_at=received_at)
 
             elif command == "emergency_stop":
                 logger.debug(f"[MQTT {topic}] Emergency stop command received")
-                await self.controller.handle_mqtt_command("emergency_stop")
+                await self.controller.handle_mqtt_command("emergency_stop", source=source, received_at=received_at)
 
             else:
                 logger.warning(f"Unknown command in topic: {topic}")
@@ -174,7 +472,193 @@ class MQTTHandler:
         # WHILL制御系コマンド（設定変更など）
         elif topic_parts[0] == "whill" and topic_parts[1] == "ctrl":
             if len(topic_parts) >= 4 and topic_parts[2] == "serial" and topic_parts[3] == "change_port":
-                await self.controller.change_port(payload)
+                # ポートを開き直してリンクを計測する間も、緊急停止などのコマンドを受け付けられるようにする
+                self.tasks.spawn(self.controller.change_port(payload), critical=True)
+
+            elif len(topic_parts) >= 4 and topic_parts[2] == "time" and topic_parts[3] == "sync":
+                await self.publish_json("time", {"token": payload, "t_recv": received_at, "t_send": time.time()})
+
+            elif topic_parts[2] == "ping":
+                await self.publish_json(
+                    "pong",
+                    {
+                        "token": payload,
+                        "t_recv": received_at,
+                        "t_dispatch": time.time(),
+                        "queue_depth": self.controller.queue_depth(),
+                    },
+                )
+
+            elif topic_parts[2] == "stats":
+                await self.publish_json("stats", {**(await self.controller.fetch_stats()), "mqtt": self.get_stats()})
+
+            elif topic_parts[2] == "calibrate":
+                # 計測中も他のメッセージを処理できるよう、別のタスクで実行する
+                self.tasks.spawn(self._answer_calibration(payload))
+
+            elif topic_parts[2] == "query":
+                # 範囲が広い場合に他のメッセージの処理を待たせないよう、別のタスクで応答する
+                self.tasks.spawn(self._answer_query(payload))
+
+            elif len(topic_parts) >= 4 and topic_parts[2] == "config" and topic_parts[3] == "reload":
+                self._request_reload(payload)
+
+            elif topic_parts[2] == "profile":
+                self._request_profile(payload)
+
+    async def _answer_calibration(self, payload: str) -> None:
+        """
+        リンクのキャリブレーションを実行して結果と状態を発行する
+
+        Args:
+            payload: 書き込むフレーム数（空の場合は設定値）
+        """
+        try:
+            frames = int(payload) if payload else None
+        except ValueError:
+            logger.error(f"Invalid calibration frame count: {payload}")
+            return
+        result = await self.controller.calibrate_link(frames)
+        await self.publish_json("calibration", result or {"error": "device not connected"})
+        await self.publish_status()
+
+    async def _answer_query(self, payload: str) -> None:
+        """テレメトリストアを検索して結果を発行する"""
+        await self.publish_json("query", await self._query_telemetry(payload))
+
+    async def _query_telemetry(self, payload: str) -> dict:
+        """
+        テレメトリストアを検索する（ファイルの読み込みと集計は別スレッドで行う）
+
+        Args:
+            payload: 検索条件のJSONオブジェクト
+                （token, start, end, step, max_points, columns、時刻はUNIX時刻、startが負の場合は現在からの秒数）
+
+        Returns:
+            dict: to_compact_json() の結果にtokenを加えたもの、失敗時は {"token", "error"}
+        """
+        try:
+            request = json.loads(payload) if payload else {}
+            if not isinstance(request, dict):
+                raise ValueError("payload must be a JSON object")
+        except ValueError as e:
+            return {"error": f"invalid query: {e}"}
+        token = request.get("token")
+
+        store = self.controller.telemetry_store
+        if store is None:
+            return {"token": token, "error": "telemetry store is not enabled"}
+
+        start, end = request.get("start"), request.get("end")
+        if start is not None and start < 0:
+            start += time.time()
+        try:
+            result = await asyncio.to_thread(
+                query_telemetry,
+                store.directory,
+                start,
+                end,
+                step=request.get("step"),
+                max_points=int(request.get("max_points", 1000)),
+                columns=request.get("columns"),
+            )
+        except (ImportError, ValueError, TypeError, OSError) as e:
+            logger.error(f"Telemetry query failed: {e}")
+            return {"token": token, "error": str(e)}
+        return {"token": token, **to_compact_json(result)}
+
+    def _request_reload(self, payload: str) -> None:
+        """
+        設定の再読み込みを要求する
+
+        再読み込みでこのハンドラー自体が再起動される場合があるため、受信処理とは別のタスクで実行する
+
+        Args:
+            payload: 空文字列、または変更する設定値のJSONオブジェクト
+        """
+        if self.reload_handler is None:
+            logger.warning("Configuration reload is not available")
+            return
+        try:
+            updates = json.loads(payload) if payload else None
+            if updates is not None and not isinstance(updates, dict):
+                raise ValueError("payload must be a JSON object")
+        except ValueError as e:
+            logger.error(f"Invalid config reload payload: {payload}, error: {e}")
+            return
+        self.tasks.spawn(self.reload_handler(updates), critical=True)
+
+    def _request_profile(self, payload: str) -> None:
+        """
+        プロファイルを要求する（完了まで待たずに受信処理へ戻る）
+
+        Args:
+            payload: プロファイルする秒数（空の場合は10秒）
+        """
+        if self.profile_handler is None:
+            logger.warning("Profiling is not available")
+            return
+        try:
+            seconds = float(payload) if payload else 10.0
+        except ValueError:
+            logger.error(f"Invalid profile duration: {payload}")
+            return
+        self.tasks.spawn(self.profile_handler(seconds))
+
+    async def update_topics(self, command_topic: str, ctrl_topic: str) -> None:
+        """
+        購読するトピックを変更する（接続中であれば購読し直す）
+
+        Args:
+            command_topic: コマンド受信用トピック
+            ctrl_topic: 制御コマンド受信用トピック
+        """
+        old_topics = [self.command_topic, self.ctrl_topic]
+        self.command_topic = command_topic
+        self.ctrl_topic = ctrl_topic
+        if self.client is None:
+            return
+        try:
+            await self.client.unsubscribe(old_topics)
+            await self.client.subscribe(self.command_topic, qos=0)
+            await self.client.subscribe(self.ctrl_topic, qos=1)
+            logger.info(f"Resubscribed to MQTT topics: {self.command_topic}, {self.ctrl_topic}")
+        except MqttError as e:
+            logger.error(f"Failed to resubscribe MQTT topics: {e}")
+
+    async def publish_json(self, subtopic: str, data: dict) -> None:
+        """
+        状態通知トピック配下にJSONを発行する
+
+        Args:
+            subtopic: 状態通知トピックのベースパスからの相対トピック
+            data: 発行するデータ
+        """
+        if self.client is None:
+            return
+
+        try:
+            topic = f"{self.status_topic}/{subtopic}"
+            if self.protocol_v5:
+                # 応答は期限を過ぎたら配送しない。繰り返し発行するトピックはエイリアスで送る
+                properties = publish_properties(expiry=self.message_expiry)
+                topic = self.aliases.resolve(topic, properties)
+                await self.client.publish(topic, json.dumps(data), qos=0, properties=properties)
+            else:
+                await self.client.publish(topic, json.dumps(data), qos=0)
+        except Exception as e:
+            logger.error(f"Error publishing {subtopic}: {e}")
+
+    def get_stats(self) -> dict:
+        """MQTT接続の統計情報を取得する"""
+        stats = {
+            "protocol": "5" if self.protocol_v5 else "3.1.1",
+            "broker": f"{self.current_broker[0]}:{self.current_broker[1]}" if self.current_broker else None,
+            "tasks": self.tasks.get_stats(),
+        }
+        if self.protocol_v5:
+            stats["topic_aliases"] = self.aliases.get_stats()
+        return stats
 
     async def publish_status(self, force_offline: bool = False) -> None:
         """
@@ -189,6 +673,7 @@ class MQTTHandler:
         try:
             # 基本的な状態情報を取得
             status = self.controller.whill.get_status()
+            status.update(self.controller.send_rate.get_status())
 
             if force_offline:
                 status["connected"] = False
@@ -0,0 +1,152 @@
+"""
+待機系のMQTTセッション
+
+待機系は稼働系と別のクライアントID（<client_id>-standby）でブローカーへ接続し、コマンドと制御のトピックを購読しておく
+（同じIDで接続すると稼働系の接続がブローカーに切断される）。待機中に届いたメッセージは稼働系が処理するため読み捨てる
+引き継ぎでは接続ごと MQTTHandler.adopt() へ渡し、接続とブローカー側の購読をやり直さずに受信を始める
+待機系の接続にはLast Willを設定しない（待機系の切断で稼働系の接続状態を上書きしないため）
+"""
+
+import asyncio
+
+from aiomqtt import Client, MqttError
+from loguru import logger
+
+from ..utils.backoff import Backoff
+from .v5 import V5Client
+
+
+class StandbySession:
+    """待機中に接続を保つMQTTセッション"""
+
+    def __init__(
+        self,
+        brokers: list[tuple[str, int]],
+        client_id: str,
+        topics: list[tuple[str, int]],
+        *,
+        keepalive: int = 60,
+        protocol_v5: bool = False,
+        reconnect_min_delay: float = 0.02,
+        reconnect_max_delay: float = 1.0,
+        connect_timeout: float = 1.0,
+    ):
+        """
+        Args:
+            brokers: 接続先候補の(host, port)リスト（優先順、接続できたものを使う）
+            client_id: 稼働系のクライアントID（待機系は末尾に -standby を付ける）
+            topics: 購読する(トピック, QoS)のリスト
+            keepalive: キープアライブ間隔（秒）
+            protocol_v5: MQTT v5で接続する
+            reconnect_min_delay: 再接続の最小待機時間（秒）
+            reconnect_max_delay: 再接続の最大待機時間（秒）
+            connect_timeout: 1つのブローカーへの接続のタイムアウト（秒）
+        """
+        self.brokers = brokers
+        self.client_id = f"{client_id}-standby"
+        self.topics = topics
+        self.keepalive = keepalive
+        self.protocol_v5 = protocol_v5
+        self.connect_timeout = connect_timeout
+        self.backoff = Backoff(reconnect_min_delay, reconnect_max_delay)
+        self.client: Client | None = None
+        self.broker: tuple[str, int] | None = None
+        self.task: asyncio.Task | None = None
+
+        # 統計カウンター
+        self.connects = 0
+        self.discarded = 0
+
+    async def start(self) -> None:
+        """接続を保つタスクを開始する"""
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        """接続し、切断されたら再接続する（待機中に届いたメッセージは読み捨てる）"""
+        while True:
+            for host, port in self.brokers:
+                client = self._create_client(host, port)
+                try:
+                    await client.__aenter__()
+                except MqttError as e:
+                    logger.debug(f"Standby MQTT session cannot connect to {host}:{port}: {e}")
+                    continue
+                try:
+                    for topic, qos in self.topics:
+                        await client.subscribe(topic, qos=qos)
+                    self.client, self.broker = client, (host, port)
+                    self.connects += 1
+                    self.backoff.reset()
+                    logger.info(f"Standby MQTT session connected to {host}:{port} (client id: {self.client_id})")
+                    async for _message in client.messages:
+                        self.discarded += 1
+                except MqttError as e:
+                    logger.warning(f"Standby MQTT session lost {host}:{port}: {e}")
+                finally:
+                    # 引き継ぎで渡した接続は閉じない
+                    if self.client is client:
+                        self.client = self.broker = None
+                        await self._close(client)
+                break
+            await asyncio.sleep(self.backoff.next_delay())
+
+    def _create_client(self, host: str, port: int) -> Client:
+        options = {
+            "hostname": host,
+            "port": port,
+            "identifier": self.client_id,
+            "keepalive": self.keepalive,
+            "timeout": self.connect_timeout,
+        }
+        if self.protocol_v5:
+            return V5Client(session_expiry=0, clean_start=True, **options)
+        return Client(clean_session=True, **options)
+
+    @staticmethod
+    async def _close(client: Client) -> None:
+        try:
+            await client.__aexit__(None, None, None)
+        except MqttError:
+            pass
+
+    async def handover(self) -> tuple[Client, tuple[str, int]] | None:
+        """
+        読み捨てをやめ、接続中のクライアントを渡す
+
+        Returns:
+            tuple | None: (接続中のクライアント, (host, port))、接続していない場合はNone
+        """
+        client, broker = self.client, self.broker
+        # 先に参照を外し、タスクの終了処理で渡す接続を閉じないようにする
+        self.client = self.broker = None
+        await self._cancel()
+        if client is None:
+            return None
+        logger.info(f"Handing over the standby MQTT session on {broker[0]}:{broker[1]}")
+        return client, broker
+
+    async def stop(self) -> None:
+        """接続を閉じる（引き継がずに終了する場合）"""
+        client, self.client, self.broker = self.client, None, None
+        await self._cancel()
+        if client is not None:
+            await self._close(client)
+
+    async def _cancel(self) -> None:
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {
+            "client_id": self.client_id,
+            "broker": f"{self.broker[0]}:{self.broker[1]}" if self.broker else None,
+            "connects": self.connects,
+            "discarded": self.discarded,
+        }
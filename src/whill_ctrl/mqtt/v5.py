@@ -0,0 +1,205 @@
+"""
+MQTT v5の機能（トピックエイリアス、メッセージの有効期限、ユーザープロパティ）を扱うモジュール
+
+- トピックエイリアス: 同じトピックへの2回目以降の発行でトピック文字列の代わりに2バイトの番号を送る
+  （エイリアスは接続ごとに有効で、数はブローカーがCONNACKで通知する上限を超えない）
+- メッセージの有効期限: ブローカーが期限を過ぎたジョイスティックコマンドを配送せずに破棄する
+- ユーザープロパティ: 送信時刻（ts）とシーケンス番号（seq）をペイロードの外でコントローラーへ渡す
+
+ジョイスティックを送信するクライアント向けに JoystickPublisher を提供する
+"""
+
+import time
+
+import paho.mqtt.client as mqtt
+from aiomqtt import Client, ProtocolVersion
+from loguru import logger
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+# セッションを無期限に保持する（v3.1.1の永続セッションと同じ）
+SESSION_EXPIRY_NEVER = 0xFFFFFFFF
+
+
+class V5Client(Client):
+    """CONNACKでブローカーが通知したトピックエイリアスの上限を保持するaiomqttクライアント"""
+
+    def __init__(self, hostname: str, port: int = 1883, *, session_expiry: int = SESSION_EXPIRY_NEVER, **kwargs):
+        """
+        Args:
+            hostname: ブローカーのホスト名
+            port: ブローカーのポート番号
+            session_expiry: 切断後にセッションを保持する時間（秒）、0で保持しない
+            **kwargs: aiomqtt.Clientの引数（clean_sessionは使えない、clean_startを使う）
+        """
+        properties = Properties(PacketTypes.CONNECT)
+        properties.SessionExpiryInterval = session_expiry
+        super().__init__(hostname, port, protocol=ProtocolVersion.V5, properties=properties, **kwargs)
+        self.topic_alias_maximum = 0
+
+        # aiomqttはCONNACKのプロパティを公開しないため、aiomqttのメソッドは上書きせず、
+        # pahoクライアントの公開コールバック on_connect を包んで読み取る
+        # （pahoクライアントを取得できない場合は上限0のまま、エイリアスを使わずに接続する）
+        paho = getattr(self, "_client", None)
+        if isinstance(paho, mqtt.Client) and paho.on_connect is not None:
+            paho.on_connect = self._read_connack(paho.on_connect)
+        else:
+            logger.warning("Cannot read the broker's topic alias maximum, MQTT v5 topic aliases are disabled")
+
+    def _read_connack(self, on_connect):
+        """CONNACKのトピックエイリアスの上限を保持してから、aiomqttのコールバックを呼ぶコールバック"""
+
+        def callback(client, userdata, flags, reason_code, properties=None) -> None:
+            self.topic_alias_maximum = getattr(properties, "TopicAliasMaximum", 0) if properties is not None else 0
+            on_connect(client, userdata, flags, reason_code, properties)
+
+        return callback
+
+
+class TopicAliases:
+    """発行するトピックへのエイリアスの割り当て"""
+
+    def __init__(self, maximum: int = 8):
+        """
+        Args:
+            maximum: 使用するエイリアスの最大数（ブローカーの上限と小さい方を使う）、0で使わない
+        """
+        self.maximum = maximum
+        self.limit = 0
+        self._aliases: dict[str, int] = {}
+
+        # 統計カウンター
+        self.aliased = 0
+        self.bytes_saved = 0
+
+    def reset(self, broker_maximum: int) -> None:
+        """
+        接続ごとに割り当てを破棄する（エイリアスは接続をまたいで使えない）
+
+        Args:
+            broker_maximum: ブローカーがCONNACKで通知した上限
+        """
+        self.limit = min(self.maximum, broker_maximum)
+        self._aliases.clear()
+
+    def resolve(self, topic: str, properties: Properties) -> str:
+        """
+        発行するトピックにエイリアスを割り当てる
+
+        初回はトピックとエイリアスの両方を送り、2回目以降は空のトピックとエイリアスだけを送る
+        上限まで割り当て済みの場合は、エイリアスを使わずにトピックを送る
+
+        Args:
+            topic: 発行するトピック
+            properties: PUBLISHのプロパティ（TopicAliasを設定する）
+
+        Returns:
+            str: 実際に送るトピック
+        """
+        alias = self._aliases.get(topic)
+        if alias is not None:
+            properties.TopicAlias = alias
+            self.aliased += 1
+            self.bytes_saved += len(topic.encode())
+            return ""
+        if len(self._aliases) < self.limit:
+            alias = len(self._aliases) + 1
+            self._aliases[topic] = alias
+            properties.TopicAlias = alias
+        return topic
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {
+            "limit": self.limit,
+            "assigned": len(self._aliases),
+            "aliased": self.aliased,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def publish_properties(
+    *, expiry: int | None = None, seq: int | None = None, sent_at: float | None = None
+) -> Properties:
+    """
+    PUBLISHのプロパティを作成する
+
+    Args:
+        expiry: メッセージの有効期限（秒）、Noneまたは0以下で期限なし
+        seq: シーケンス番号（ユーザープロパティ seq）
+        sent_at: 送信時刻（サーバー時計換算のUNIX時刻、ユーザープロパティ ts）
+
+    Returns:
+        Properties: PUBLISHのプロパティ
+    """
+    properties = Properties(PacketTypes.PUBLISH)
+    if expiry is not None and expiry > 0:
+        properties.MessageExpiryInterval = int(expiry)
+    user = []
+    if sent_at is not None:
+        user.append(("ts", repr(sent_at)))
+    if seq is not None:
+        user.append(("seq", str(seq)))
+    if user:
+        properties.UserProperty = user
+    return properties
+
+
+def user_properties(properties: Properties | None) -> dict[str, str]:
+    """
+    受信したメッセージのユーザープロパティを辞書にする（同じキーは最後の値）
+
+    Args:
+        properties: 受信したメッセージのプロパティ（v3.1.1ではNone）
+
+    Returns:
+        dict[str, str]: ユーザープロパティ
+    """
+    if properties is None:
+        return {}
+    return dict(getattr(properties, "UserProperty", ()) or ())
+
+
+class JoystickPublisher:
+    """
+    MQTT v5でジョイスティックコマンドを送信するクライアント
+
+    トピックエイリアスでトピック文字列を初回以外省略し、有効期限を付けて古い目標値がブローカーに残らないようにする
+    送信時刻とシーケンス番号はユーザープロパティで送り、ペイロードは "front,side" のみになる
+    """
+
+    def __init__(
+        self,
+        client: V5Client,
+        topic: str = "whill/commands/joystick",
+        *,
+        expiry: int = 1,
+        clock_offset: float = 0.0,
+    ):
+        """
+        Args:
+            client: 接続済みのV5Client
+            topic: 送信するトピック（whill/commands/joystick/<client_id> で送信元を区別できる）
+            expiry: メッセージの有効期限（秒）、0で期限なし
+            clock_offset: 自身の時刻に加算してサーバー時計に換算するオフセット（秒）
+        """
+        self.client = client
+        self.topic = topic
+        self.expiry = expiry
+        self.clock_offset = clock_offset
+        self.seq = 0
+        self.aliases = TopicAliases(1)
+        self.aliases.reset(client.topic_alias_maximum)
+
+    async def send(self, front: int, side: int) -> None:
+        """
+        ジョイスティックの値を送信する
+
+        Args:
+            front: 前後方向の値（-100～100）
+            side: 左右方向の値（-100～100）
+        """
+        self.seq += 1
+        properties = publish_properties(expiry=self.expiry, seq=self.seq, sent_at=time.time() + self.clock_offset)
+        topic = self.aliases.resolve(self.topic, properties)
+        await self.client.publish(topic, f"{front},{side}", qos=0, properties=properties)
@@ -1,3 +1,3 @@
 """
-OSCモジュール: OSCサーバ処理、AsyncIOOSCUDPServerの初期化・起動、OSCメッセージのディスパッチ
+OSCモジュール: OSCサーバ処理、待ち受けソケットの作成・起動、OSCメッセージのディスパッチ
 """
@@ -0,0 +1,151 @@
+"""
+OSCデータグラムのまとめ読み
+
+asyncioのデータグラムトランスポートは1回の起床で1つのデータグラムしか読まず、OSCサーバーはメッセージごとに
+タスクを作る。クライアントが連続して送った場合やループが一時的に止まった場合、溜まったジョイスティックを
+1つずつ処理することになるが、意味があるのは送信元ごとの最新の値だけである
+
+このモードでは1回の起床でソケットに溜まったデータグラムをまとめて読み、その中で
+- ジョイスティックは送信元ごとに最新の値だけを残す（個別コマンドをまたいでは統合しない）
+- 電源・緊急停止などの個別コマンドはすべて受信順に実行する
+ジョイスティックだけの場合はタスクを作らずに目標値を更新し、個別コマンドを含む場合は1つのタスクで順に処理する
+"""
+
+import asyncio
+import socket
+
+from loguru import logger
+
+# まとめ読みの大きさの分布（統計用、上限を含む）
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class OSCBatch:
+    """1回の起床で読んだデータグラムに含まれるコマンド"""
+
+    __slots__ = ("items", "latest", "discrete", "received", "coalesced")
+
+    def __init__(self):
+        # 実行する(コマンド名, パラメータ)の列
+        self.items: list[tuple[str, dict]] = []
+        # 直前の個別コマンド以降のジョイスティックの位置（送信元ごと）
+        self.latest: dict[str, int] = {}
+        self.discrete = False
+        self.received = 0
+        self.coalesced = 0
+
+    def joystick(self, kwargs: dict) -> None:
+        """ジョイスティックを追加する（同じ区間の同じ送信元の値は置き換える）"""
+        self.received += 1
+        index = self.latest.get(kwargs["source"])
+        if index is not None:
+            self.items[index] = ("joystick", kwargs)
+            self.coalesced += 1
+            return
+        self.latest[kwargs["source"]] = len(self.items)
+        self.items.append(("joystick", kwargs))
+
+    def command(self, command: str, kwargs: dict) -> None:
+        """個別コマンドを追加する（前後のジョイスティックとの順序を保つため区間を区切る）"""
+        self.received += 1
+        self.items.append((command, kwargs))
+        self.latest.clear()
+        self.discrete = True
+
+
+class BatchStats:
+    """まとめ読みの統計"""
+
+    __slots__ = ("batches", "datagrams", "largest", "sizes", "coalesced", "tasks_avoided")
+
+    def __init__(self):
+        self.batches = 0
+        self.datagrams = 0
+        self.largest = 0
+        self.sizes = [0] * (len(SIZE_BUCKETS) + 1)
+        self.coalesced = 0  # 送信元ごとの最新値に置き換えられ、処理しなかったジョイスティック
+        self.tasks_avoided = 0  # コマンドごとにタスクを作る場合と比べて作らずに済んだタスク
+
+    def record(self, datagrams: int, batch: OSCBatch, tasks: int) -> None:
+        """
+        1回のまとめ読みを記録する
+
+        Args:
+            datagrams: 読んだデータグラムの数
+            batch: データグラムに含まれていたコマンド
+            tasks: 作成したタスクの数
+        """
+        self.batches += 1
+        self.datagrams += datagrams
+        self.largest = max(self.largest, datagrams)
+        for i, bound in enumerate(SIZE_BUCKETS):
+            if datagrams <= bound:
+                self.sizes[i] += 1
+                break
+        else:
+            self.sizes[-1] += 1
+        self.coalesced += batch.coalesced
+        self.tasks_avoided += batch.received - tasks
+
+    def get_stats(self) -> dict:
+        """まとめ読みの統計情報を取得する"""
+        labels = [f"<={bound}" for bound in SIZE_BUCKETS] + [f">{SIZE_BUCKETS[-1]}"]
+        return {
+            "batches": self.batches,
+            "datagrams": self.datagrams,
+            "mean_batch": round(self.datagrams / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest,
+            "batch_sizes": dict(zip(labels, self.sizes, strict=True)),
+            "joysticks_coalesced": self.coalesced,
+            "tasks_avoided": self.tasks_avoided,
+        }
+
+
+class BatchingOSCProtocol(asyncio.DatagramProtocol):
+    """起床ごとにソケットに溜まったデータグラムをまとめて読み、OSCコントローラーに渡す"""
+
+    def __init__(self, handler, sock: socket.socket, max_batch: int):
+        """
+        Args:
+            handler: データグラムの列を受け取るOSCコントローラー（handle_datagrams）
+            sock: トランスポートと共有するノンブロッキングのソケット
+            max_batch: 1回の起床で読むデータグラムの上限
+        """
+        self.handler = handler
+        self.sock = sock
+        self.max_batch = max_batch
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        # トランスポートが読んだ1つに続けて、ソケットに溜まっている分を読む
+        datagrams = [(data, addr)]
+        recvfrom = self.sock.recvfrom
+        while len(datagrams) < self.max_batch:
+            try:
+                datagrams.append(recvfrom(65535))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                logger.debug(f"OSC batch read stopped: {e}")
+                break
+        self.handler.handle_datagrams(datagrams)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.debug(f"OSC socket error: {exc}")
+
+
+async def create_batching_endpoint(
+    sock: socket.socket, handler, max_batch: int
+) -> tuple[asyncio.DatagramTransport, BatchingOSCProtocol]:
+    """
+    まとめ読みするOSCの待ち受けを作成する
+
+    Args:
+        sock: バインドしたノンブロッキングのソケット（トランスポートと共有する）
+        handler: データグラムの列を受け取るOSCコントローラー
+        max_batch: 1回の起床で読むデータグラムの上限
+
+    Returns:
+        tuple: (トランスポート, プロトコル)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.create_datagram_endpoint(lambda: BatchingOSCProtocol(handler, sock, max_batch), sock=sock)
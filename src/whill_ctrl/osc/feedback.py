@@ -0,0 +1,160 @@
+"""
+OSCクライアントへ状態とテレメトリを送り返すフィードバックチャンネル
+
+メッセージを送ってきたクライアントを登録し、一定時間送信のないクライアントは削除する
+一定間隔で、クライアントごとに前回送った値から変化した値だけを1つのOSCバンドルにまとめて送信する
+"""
+
+import asyncio
+import time
+
+from loguru import logger
+from pythonosc.osc_bundle_builder import IMMEDIATELY, OscBundleBuilder
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from ..controller.controller import WHILLController
+
+# スナップショットのうち状態として送る項目（それ以外はテレメトリとして送る）
+STATUS_KEYS = frozenset({"connected", "mode", "port"})
+
+
+def feedback_address(key: str) -> str:
+    """
+    スナップショットの項目名をOSCアドレスに変換する
+
+    Args:
+        key: 項目名
+
+    Returns:
+        str: /whill/status/<key> または /whill/telemetry/<key>
+    """
+    return f"/whill/status/{key}" if key in STATUS_KEYS else f"/whill/telemetry/{key}"
+
+
+class OSCClient:
+    """フィードバックの送信先クライアント"""
+
+    __slots__ = ("address", "last_seen", "sent")
+
+    def __init__(self, address: tuple[str, int], now: float):
+        self.address = address
+        self.last_seen = now
+        # 前回送信した値（OSCアドレス -> 値）
+        self.sent: dict[str, object] = {}
+
+
+class OSCFeedback:
+    """OSCクライアントへのフィードバック送信"""
+
+    # 登録するクライアントの最大数
+    MAX_CLIENTS = 32
+
+    def __init__(
+        self, controller: WHILLController, rate: float = 10.0, client_timeout: float = 10.0, reply_port: int = 0
+    ):
+        """
+        フィードバックチャンネルを初期化
+
+        Args:
+            controller: WHILLコントローラーインスタンス
+            rate: 送信レート（Hz）、0以下で送信しない
+            client_timeout: この時間（秒）メッセージのないクライアントを削除する
+            reply_port: 送信先ポート、0の場合は送信元ポートへ返す
+        """
+        self.controller = controller
+        self.rate = rate
+        self.client_timeout = client_timeout
+        self.reply_port = reply_port
+        self.transport: asyncio.DatagramTransport | None = None
+        self.clients: dict[tuple[str, int], OSCClient] = {}
+        self.task: asyncio.Task | None = None
+
+        # 統計カウンター
+        self.bundles_sent = 0
+        self.values_sent = 0
+
+    def touch(self, client_address: tuple[str, int]) -> None:
+        """
+        メッセージを受信したクライアントを登録・更新する
+
+        Args:
+            client_address: 送信元の(IPアドレス, ポート)
+        """
+        if self.reply_port:
+            client_address = (client_address[0], self.reply_port)
+        now = time.monotonic()
+        client = self.clients.get(client_address)
+        if client is not None:
+            client.last_seen = now
+            return
+        if len(self.clients) >= self.MAX_CLIENTS:
+            self._evict(now, force=True)
+        self.clients[client_address] = OSCClient(client_address, now)
+        logger.info(f"OSC feedback client registered: {client_address[0]}:{client_address[1]}")
+
+    def start(self) -> None:
+        """送信ループを開始する"""
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """送信ループを停止する"""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _run(self) -> None:
+        """一定間隔でフィードバックを送信する"""
+        while True:
+            if self.rate <= 0:
+                await asyncio.sleep(1.0)
+                continue
+            # コントローラーがアイドル中はテレメトリの読み取り間隔に合わせて送信を減らす
+            idle = self.controller.idle
+            await asyncio.sleep(max(1.0 / self.rate, idle.telemetry_interval) if idle.idle else 1.0 / self.rate)
+            self.tick()
+
+    def tick(self) -> None:
+        """全クライアントに変化した値を送信する"""
+        now = time.monotonic()
+        self._evict(now)
+        if not self.clients or self.transport is None:
+            return
+
+        values = {
+            feedback_address(key): value for key, value in self.controller.snapshot().items() if value is not None
+        }
+        # 同じ値のメッセージはクライアント間で使い回す
+        messages = {}
+        for client in self.clients.values():
+            changed = [(address, value) for address, value in values.items() if client.sent.get(address) != value]
+            if not changed:
+                continue
+            bundle = OscBundleBuilder(IMMEDIATELY)
+            for address, value in changed:
+                message = messages.get(address)
+                if message is None:
+                    builder = OscMessageBuilder(address=address)
+                    builder.add_arg(int(value) if isinstance(value, bool) else value)
+                    message = messages[address] = builder.build()
+                bundle.add_content(message)
+                client.sent[address] = value
+            self.transport.sendto(bundle.build().dgram, client.address)
+            self.bundles_sent += 1
+            self.values_sent += len(changed)
+
+    def _evict(self, now: float, force: bool = False) -> None:
+        """
+        一定時間メッセージのないクライアントを削除する
+
+        Args:
+            now: 現在時刻（単調時計、秒）
+            force: Trueの場合、期限内でも最も古いクライアントを1件削除する
+        """
+        for address, client in list(self.clients.items()):
+            if now - client.last_seen >= self.client_timeout:
+                del self.clients[address]
+                logger.info(f"OSC feedback client expired: {address[0]}:{address[1]}")
+        if force and len(self.clients) >= self.MAX_CLIENTS:
+            oldest = min(self.clients.values(), key=lambda c: c.last_seen)
+            del self.clients[oldest.address]
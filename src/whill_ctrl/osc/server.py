@@ -4,44 +4,211 @@ WHILLコントローラーからの指示を受け取り、OSCメッセージに
 """
 
 import asyncio
+import time
+from collections import deque
+from collections.abc import Callable
 
 from loguru import logger
 from pythonosc.dispatcher import Dispatcher
-from pythonosc.osc_server import AsyncIOOSCUDPServer
+from pythonosc.osc_message_builder import OscMessageBuilder
 
 from ..controller.controller import WHILLController
+from ..fleet.receiver import FleetReceiver
+from ..utils.tasks import TaskSet
+from .batching import BatchStats, OSCBatch, create_batching_endpoint
+from .feedback import OSCFeedback
+from .sockets import bind_osc_socket
+
+
+class ClientTrackingDispatcher(Dispatcher):
+    """パケットを受信するたびに送信元を通知するディスパッチャー"""
+
+    def __init__(self, on_packet: Callable[[tuple[str, int]], None]):
+        """
+        Args:
+            on_packet: 送信元の(IPアドレス, ポート)を受け取るコールバック
+        """
+        super().__init__()
+        self._on_packet = on_packet
+
+    def call_handlers_for_packet(self, data: bytes, client_address: tuple[str, int]) -> list:
+        self._on_packet(client_address)
+        return super().call_handlers_for_packet(data, client_address)
 
 
 class WHILLOSCController:
     """WHILLデバイスをOSC経由で制御するクラス"""
 
-    def __init__(self, controller: WHILLController) -> None:
+    def __init__(
+        self, controller: WHILLController, feedback: OSCFeedback | None = None, fleet: FleetReceiver | None = None
+    ) -> None:
         """
         OSCコントローラーを初期化
 
         Args:
             controller: WHILLコントローラーインスタンス
+            feedback: 送信元を登録するフィードバックチャンネル（Noneの場合は登録しない）
+            fleet: /whill/fleet のフレームを渡す受信器（Noneの場合は受け付けない）
         """
         self.controller = controller
-        self.dispatcher = Dispatcher()
+        self.fleet = fleet
+        self.dispatcher = ClientTrackingDispatcher(feedback.touch) if feedback is not None else Dispatcher()
+        # 応答送信用のトランスポート（OSCServer起動時に設定）
+        self.transport: asyncio.DatagramTransport | None = None
+        # コールバックから作成したタスク（参照を保持し、数に上限を設ける）
+        self.tasks = TaskSet("OSC")
+        # まとめ読み中のコマンド（まとめ読み中でなければNone）と統計
+        self._batch: OSCBatch | None = None
+        # まとめたコマンドを処理中のタスクが残りを取り出す列（処理中でなければNone）
+        self._backlog: deque[tuple[str, dict]] | None = None
+        self.batch_stats = BatchStats()
         self.register_callbacks()
 
     def register_callbacks(self) -> None:
         """OSCコールバックを登録する"""
-        self.dispatcher.map("/whill/joystick", self.osc_joystick_callback)
-        self.dispatcher.map("/whill/power_on", self.power_on_callback)
-        self.dispatcher.map("/whill/power_off", self.power_off_callback)
-        self.dispatcher.map("/whill/emergency_stop", self.emergency_stop_callback)
+        self.dispatcher.map("/whill/joystick", self.osc_joystick_callback, needs_reply_address=True)
+        self.dispatcher.map("/whill/time/sync", self.time_sync_callback, needs_reply_address=True)
+        self.dispatcher.map("/whill/ping", self.ping_callback, needs_reply_address=True)
+        self.dispatcher.map("/whill/power_on", self.power_on_callback, needs_reply_address=True)
+        self.dispatcher.map("/whill/power_off", self.power_off_callback, needs_reply_address=True)
+        self.dispatcher.map("/whill/emergency_stop", self.emergency_stop_callback, needs_reply_address=True)
+        if self.fleet is not None:
+            self.dispatcher.map("/whill/fleet", self.fleet_callback)
+
+    def send_reply(self, client_address: tuple[str, int], address: str, *args) -> None:
+        """
+        OSCメッセージを送信元へ返信する
+
+        Args:
+            client_address: 返信先の(IPアドレス, ポート)
+            address: OSCアドレス
+            args: OSCパラメータ（floatは倍精度で送信）
+        """
+        if self.transport is None:
+            return
+
+        builder = OscMessageBuilder(address=address)
+        for arg in args:
+            builder.add_arg(arg, OscMessageBuilder.ARG_TYPE_DOUBLE if isinstance(arg, float) else None)
+        self.transport.sendto(builder.build().dgram, client_address)
+
+    def dispatch(self, command: str, kwargs: dict) -> None:
+        """
+        コマンドをコントローラーへ渡す（まとめ読み中は実行せずにまとめる）
+
+        上限を超えたタスクを破棄してよいのは次の値で置き換わるジョイスティックだけで、個別コマンドは常に実行する
+
+        Args:
+            command: コマンド名
+            kwargs: コマンドパラメータ
+        """
+        batch = self._batch
+        if batch is None:
+            critical = command != "joystick"
+            self.tasks.spawn(self.controller.handle_osc_command(command, **kwargs), critical=critical)
+        elif command == "joystick":
+            batch.joystick(kwargs)
+        else:
+            batch.command(command, kwargs)
+
+    def handle_datagrams(self, datagrams: list[tuple[bytes, tuple[str, int]]]) -> None:
+        """
+        1回の起床で読んだデータグラムをまとめて処理する
+
+        ジョイスティックだけの場合はタスクを作らずに送信元ごとの最新の値で目標値を更新し、
+        個別コマンドを含む場合は1つのタスクで受信順に処理する（個別コマンドは破棄しないため、タスクの上限によらず作成する）。
+        タスクが処理中の間に読んだ分は、追い越さないようにそのタスクの後ろに並べる
+
+        Args:
+            datagrams: (データグラム, 送信元の(IPアドレス, ポート))の列
+        """
+        batch = self._batch = OSCBatch()
+        try:
+            for data, client_address in datagrams:
+                self.dispatcher.call_handlers_for_packet(data, client_address)
+        finally:
+            self._batch = None
+
+        tasks = 0
+        if self._backlog is not None:
+            self._backlog.extend(batch.items)
+        elif batch.discrete:
+            self._backlog = deque(batch.items)
+            self.tasks.spawn(self._run_backlog(), critical=True)
+            tasks = 1
+        else:
+            for _, kwargs in batch.items:
+                self.controller.submit_joystick(**kwargs)
+        self.batch_stats.record(len(datagrams), batch, tasks)
+
+    async def _run_backlog(self) -> None:
+        """
+        まとめたコマンドを受信順に処理する
+
+        1つのコマンドが失敗しても残りの処理を続ける（後ろに並んだ緊急停止などを破棄しない）
+        """
+        backlog = self._backlog
+        try:
+            while backlog:
+                command, kwargs = backlog.popleft()
+                try:
+                    if command == "joystick":
+                        self.controller.submit_joystick(**kwargs)
+                    else:
+                        await self.controller.handle_osc_command(command, **kwargs)
+                except Exception as e:
+                    logger.error(f"Error handling OSC {command} command from {kwargs.get('source')}: {e}")
+        finally:
+            self._backlog = None
+
+    def time_sync_callback(self, client_address: tuple[str, int], address: str, *args) -> None:
+        """
+        時刻同期ハンドシェイクのコールバック
+
+        クライアントのトークンに受信時刻と送信時刻（サーバーのUNIX時刻）を付けて返信する
+        クライアントは estimate_clock_offset で自身の時計とのオフセットを推定できる
+
+        Args:
+            client_address: 送信元の(IPアドレス, ポート)
+            address: OSCアドレス
+            args: OSCパラメータ (token)
+        """
+        received_at = time.time()
+        token = args[0] if args else 0
+        self.send_reply(client_address, address, token, received_at, time.time())
+
+    def ping_callback(self, client_address: tuple[str, int], address: str, *args) -> None:
+        """
+        遅延計測用のpingのコールバック
 
-    def osc_joystick_callback(self, address: str, *args) -> None:
+        コマンドと同じくタスクとしてイベントループに渡し、実行された時点で /whill/pong を送信元へ返信する
+        返信: token, 受信時刻, ディスパッチ時刻（サーバーのUNIX時刻）, 待ち件数
+
+        Args:
+            client_address: 送信元の(IPアドレス, ポート)
+            address: OSCアドレス
+            args: OSCパラメータ (token)
+        """
+        received_at = time.time()
+        token = args[0] if args else 0
+        self.tasks.spawn(self._pong(client_address, token, received_at))
+
+    async def _pong(self, client_address: tuple[str, int], token, received_at: float) -> None:
+        """pingに返信する"""
+        self.send_reply(client_address, "/whill/pong", token, received_at, time.time(), self.controller.queue_depth())
+
+    def osc_joystick_callback(self, client_address: tuple[str, int], address: str, *args) -> None:
         """
         OSCジョイスティックコマンドのコールバック
 
         Args:
+            client_address: 送信元の(IPアドレス, ポート)
             address: OSCアドレス
-            args: OSCパラメータ (x, y)値を期待
+            args: OSCパラメータ (x, y[, seq[, sent_at]])値を期待
+                  seqはシーケンス番号、sent_atはサーバー時計換算の送信時刻（UNIX時刻、秒）
         """
         try:
+            received_at = time.time()
             if len(args) < 2:
                 raise ValueError("At least 2 parameters required: x and y values.")
 
@@ -56,49 +223,115 @@ class WHILLOSCController:
 
             logger.debug(f"[OSC {address}] Received x: {x_raw:.2f}, y: {y_raw:.2f} => side: {side}, front: {front}")
 
+            seq = int(args[2]) if len(args) > 2 else None
+            sent_at = float(args[3]) if len(args) > 3 else None
+
             # 非同期処理をタスクとして実行
-            asyncio.create_task(self.controller.handle_osc_command("joystick", front=front, side=side))
+            self.dispatch(
+                "joystick",
+                {
+                    "front": front,
+                    "side": side,
+                    "source": f"osc:{client_address[0]}:{client_address[1]}",
+                    "seq": seq,
+                    "sent_at": sent_at,
+                    "received_at": received_at,
+                },
+            )
         except Exception as e:
             logger.error(f"Error in OSC joystick callback: {e}")
 
-    def power_on_callback(self, address: str, *args) -> None:
+    def fleet_callback(self, address: str, *args) -> None:
+        """
+        フリートフレームのコールバック
+
+        タスクを作らずに、受信器が登録した車椅子の目標値を更新する
+
+        Args:
+            address: OSCアドレス
+            args: OSCパラメータ (blob: フリートフレーム)
+        """
+        if not args or not isinstance(args[0], bytes):
+            logger.debug(f"[OSC {address}] Fleet frame requires a blob argument")
+            return
+        self.fleet.handle(args[0], "osc")
+
+    def power_on_callback(self, client_address: tuple[str, int], address: str, *args) -> None:
         """
         OSC電源オンコマンドのコールバック
 
         Args:
+            client_address: 送信元の(IPアドレス, ポート)
             address: OSCアドレス
             args: OSCパラメータ (未使用)
         """
         logger.debug(f"[OSC {address}] Power on command received")
-        asyncio.create_task(self.controller.handle_osc_command("power_on"))
+        self.dispatch(
+            "power_on", {"source": f"osc:{client_address[0]}:{client_address[1]}", "received_at": time.time()}
+        )
 
-    def power_off_callback(self, address: str, *args) -> None:
+    def power_off_callback(self, client_address: tuple[str, int], address: str, *args) -> None:
         """
         OSC電源オフコマンドのコールバック
 
         Args:
+            client_address: 送信元の(IPアドレス, ポート)
             address: OSCアドレス
             args: OSCパラメータ (未使用)
         """
         logger.debug(f"[OSC {address}] Power off command received")
-        asyncio.create_task(self.controller.handle_osc_command("power_off"))
+        self.dispatch(
+            "power_off", {"source": f"osc:{client_address[0]}:{client_address[1]}", "received_at": time.time()}
+        )
 
-    def emergency_stop_callback(self, address: str, *args) -> None:
+    def emergency_stop_callback(self, client_address: tuple[str, int], address: str, *args) -> None:
         """
         OSC緊急停止コマンドのコールバック
 
         Args:
+            client_address: 送信元の(IPアドレス, ポート)
             address: OSCアドレス
             args: OSCパラメータ (未使用)
         """
         logger.debug(f"[OSC {address}] Emergency stop command received")
-        asyncio.create_task(self.controller.handle_osc_command("emergency_stop"))
+        self.dispatch(
+            "emergency_stop", {"source": f"osc:{client_address[0]}:{client_address[1]}", "received_at": time.time()}
+        )
+
+
+class OSCProtocol(asyncio.DatagramProtocol):
+    """受信したデータグラムを1つずつディスパッチャーへ渡す"""
+
+    def __init__(self, dispatcher: Dispatcher):
+        """
+        Args:
+            dispatcher: OSCアドレスごとのハンドラーを呼び出すディスパッチャー
+        """
+        self.dispatcher = dispatcher
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        self.dispatcher.call_handlers_for_packet(data, addr)
+
+    def error_received(self, exc: Exception) -> None:
+        logger.debug(f"OSC socket error: {exc}")
 
 
 class OSCServer:
     """OSCサーバークラス"""
 
-    def __init__(self, controller: WHILLController, ip: str, port: int):
+    def __init__(
+        self,
+        controller: WHILLController,
+        ip: str,
+        port: int,
+        *,
+        feedback_rate: float = 10.0,
+        client_timeout: float = 10.0,
+        feedback_port: int = 0,
+        fleet: FleetReceiver | None = None,
+        batch_size: int = 0,
+        reuse_port: bool = False,
+    ):
         """
         OSCサーバーを初期化
 
@@ -106,30 +339,90 @@ class OSCServer:
             controller: WHILLコントローラーインスタンス
             ip: バインドするIPアドレス
             port: バインドするポート番号
+            feedback_rate: クライアントへ状態・テレメトリを送るレート（Hz）、0以下で送信しない
+            client_timeout: この時間（秒）メッセージのないクライアントへの送信をやめる
+            feedback_port: フィードバックの送信先ポート、0の場合は送信元ポートへ返す
+            fleet: /whill/fleet のフレームを渡す受信器（Noneの場合は受け付けない）
+            batch_size: 1回の起床で読むデータグラムの上限（2以上でまとめ読みする、1以下では1つずつ処理する）
+            reuse_port: SO_REUSEPORTでバインドする（待機系が同じポートを確保して引き継げるようにする）
         """
         self.controller = controller
         self.ip = ip
         self.port = port
-        self.osc_controller = WHILLOSCController(controller)
-        self.server = None
+        self.feedback = OSCFeedback(controller, feedback_rate, client_timeout, feedback_port)
+        self.osc_controller = WHILLOSCController(controller, self.feedback, fleet)
+        self.batch_size = batch_size
+        self.reuse_port = reuse_port
         self.transport = None
         self.protocol = None
 
     async def start(self) -> bool:
         """OSCサーバーを起動する"""
         try:
-            self.server = AsyncIOOSCUDPServer(
-                (self.ip, self.port), self.osc_controller.dispatcher, asyncio.get_running_loop()
+            self.transport, self.protocol = await self._create_endpoint(self.ip, self.port)
+            self.osc_controller.transport = self.transport
+            self.feedback.transport = self.transport
+            self.feedback.start()
+            logger.info(
+                f"OSC Server started on {self.ip}:{self.port}"
+                + (f" (batched reads, up to {self.batch_size} datagrams)" if self.batching else "")
             )
-            self.transport, self.protocol = await self.server.create_serve_endpoint()
-            logger.info(f"OSC Server started on {self.ip}:{self.port}")
             return True
         except Exception as e:
             logger.error(f"Failed to start OSC server: {e}")
             return False
 
+    async def rebind(self, ip: str, port: int) -> None:
+        """
+        OSCサーバーを別のアドレスで待ち受け直す
+
+        新しいソケットのバインドに成功してから古いソケットを閉じるため、失敗時は元のアドレスで待ち受けを続ける
+
+        Args:
+            ip: バインドするIPアドレス
+            port: バインドするポート番号
+        """
+        transport, protocol = await self._create_endpoint(ip, port)
+
+        old_transport = self.transport
+        self.transport, self.protocol = transport, protocol
+        self.osc_controller.transport = transport
+        self.feedback.transport = transport
+        self.ip, self.port = ip, port
+        if old_transport:
+            old_transport.close()
+        logger.info(f"OSC Server rebound to {ip}:{port}")
+
+    @property
+    def batching(self) -> bool:
+        """データグラムをまとめ読みするかどうか"""
+        return self.batch_size > 1
+
+    async def _create_endpoint(self, ip: str, port: int) -> tuple[asyncio.DatagramTransport, asyncio.DatagramProtocol]:
+        """
+        OSCの待ち受けを作成する
+
+        Args:
+            ip: バインドするIPアドレス
+            port: バインドするポート番号
+
+        Returns:
+            tuple: (トランスポート, プロトコル)
+        """
+        sock = bind_osc_socket(ip, port, reuse_port=self.reuse_port)
+        try:
+            if self.batching:
+                return await create_batching_endpoint(sock, self.osc_controller, self.batch_size)
+            loop = asyncio.get_running_loop()
+            return await loop.create_datagram_endpoint(lambda: OSCProtocol(self.osc_controller.dispatcher), sock=sock)
+        except BaseException:
+            sock.close()
+            raise
+
     def stop(self) -> None:
         """OSCサーバーを停止する"""
+        self.feedback.stop()
+        self.osc_controller.tasks.cancel()
         if self.transport:
             self.transport.close()
             logger.info("OSC server stopped")
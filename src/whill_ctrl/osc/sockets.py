@@ -0,0 +1,56 @@
+"""
+OSCの待ち受けソケット
+
+稼働系・待機系で制御を引き継ぐ場合、稼働系はSO_REUSEPORTでバインドし、待機系は同じポートを事前に確保しておく
+待機系の確保用のソケットは自身のアドレスへ接続する。接続済みのUDPソケットは、同じポートのSO_REUSEPORTの
+振り分けから外れて接続先からのデータグラムしか受け取らないため、稼働系が動いている間のデータグラムはすべて稼働系に届く
+引き継ぎでは、確保したポートにSO_REUSEPORTで待ち受けソケットをバインドしてから確保用のソケットを閉じる
+（他のプロセスにポートを取られてバインドに失敗することがない）
+"""
+
+import socket
+
+
+def bind_osc_socket(ip: str, port: int, *, reuse_port: bool = False) -> socket.socket:
+    """
+    OSCの待ち受けソケットを作成してバインドする
+
+    Args:
+        ip: バインドするIPアドレス
+        port: バインドするポート番号
+        reuse_port: SO_REUSEPORTを設定する（待機系が同じポートを確保できるようにする）
+
+    Returns:
+        socket.socket: バインドしたノンブロッキングのソケット
+    """
+    family, _, _, _, address = socket.getaddrinfo(ip, port, type=socket.SOCK_DGRAM)[0]
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        sock.setblocking(False)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(address)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def reserve_osc_port(ip: str, port: int) -> socket.socket:
+    """
+    待機中にOSCのポートを確保する（稼働系宛てのデータグラムは受け取らない）
+
+    Args:
+        ip: 稼働系と同じバインドするIPアドレス
+        port: 稼働系と同じポート番号
+
+    Returns:
+        socket.socket: 確保用のソケット（引き継ぎで待ち受けソケットをバインドした後に閉じる）
+    """
+    sock = bind_osc_socket(ip, port, reuse_port=True)
+    try:
+        sock.connect(sock.getsockname())
+    except BaseException:
+        sock.close()
+        raise
+    return sock
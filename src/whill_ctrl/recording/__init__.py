@@ -0,0 +1,3 @@
+"""
+記録モジュール: コマンド・遅延トレースのバイナリ記録、記録済みセッションのオフライン解析、テレメトリの列指向ストア
+"""
@@ -0,0 +1,365 @@
+"""
+記録済みセッションをオフラインで解析するモジュール
+
+Recorderが出力したバイナリトレースをメモリマップで読み込み、NumPyでベクトル化して集計する
+NumPyとmatplotlib（グラフ出力）はオプション依存（`whill-ctrl[analysis]`）
+"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from .recorder import (
+    EVENT_NAMES,
+    FLAG_EXPIRED,
+    FLAG_KEEPALIVE,
+    FLAG_OUT_OF_ORDER,
+    FLAG_THROTTLED,
+    KIND_EVENT,
+    KIND_INPUT,
+    KIND_WRITE,
+    RECORD_SIZE,
+    TRANSPORT_NAMES,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def record_dtype():
+    """Recorderのレコード形式に対応するNumPyのdtypeを返す"""
+    dtype = np.dtype(
+        [
+            ("t_ingress", "<f8"),
+            ("t_serial", "<f8"),
+            ("kind", "u1"),
+            ("transport", "u1"),
+            ("code", "u1"),
+            ("flags", "u1"),
+            ("front", "i1"),
+            ("side", "i1"),
+            ("source_id", "<u2"),
+            ("seq", "<u4"),
+            ("value", "<f4"),
+        ]
+    )
+    assert dtype.itemsize == RECORD_SIZE
+    return dtype
+
+
+def load_records(paths: list[Path]):
+    """
+    トレースファイルをメモリマップで読み込む
+
+    書き込み途中で途切れた末尾の不完全なレコードは無視する
+
+    Args:
+        paths: トレースファイルのパス（複数の場合は時刻順に連結）
+
+    Returns:
+        numpy.ndarray: レコードの構造化配列
+    """
+    if np is None:
+        raise ImportError("numpy is required for analysis. Install with: uv sync --extra analysis")
+
+    dtype = record_dtype()
+    arrays = []
+    for path in paths:
+        count = Path(path).stat().st_size // RECORD_SIZE
+        if count:
+            arrays.append(np.memmap(path, dtype=dtype, mode="r", shape=(count,)))
+
+    if not arrays:
+        return np.empty(0, dtype=dtype)
+    if len(arrays) == 1:
+        return arrays[0]
+
+    records = np.concatenate(arrays)
+    return records[np.argsort(records["t_ingress"], kind="stable")]
+
+
+def _summary(values) -> dict[str, Any]:
+    """分布の要約統計を計算する"""
+    if values.size == 0:
+        return {"count": 0}
+    pct = np.percentile(values, PERCENTILES)
+    summary = {"count": int(values.size), "mean": float(values.mean()), "max": float(values.max())}
+    summary.update({f"p{p:g}": float(v) for p, v in zip(PERCENTILES, pct, strict=True)})
+    return summary
+
+
+def _source_name(transport: int, source_id: int) -> str:
+    return f"{TRANSPORT_NAMES.get(int(transport), 'unknown')}#{int(source_id):04x}"
+
+
+def inter_arrival_by_source(records) -> dict[str, Any]:
+    """
+    送信元ごとのジョイスティック入力の到着間隔を計算する
+
+    Returns:
+        dict: 送信元名をキーとする {"summary", "intervals"} の辞書
+    """
+    inputs = records[records["kind"] == KIND_INPUT]
+    if inputs.size == 0:
+        return {}
+
+    key = inputs["transport"].astype(np.uint32) << 16 | inputs["source_id"]
+    order = np.lexsort((inputs["t_ingress"], key))
+    key = key[order]
+    t = inputs["t_ingress"][order]
+
+    # 一括で差分を取り、送信元の境界をまたぐ差分は区間の切り出しで除外する
+    dt = np.diff(t)
+    boundaries = np.flatnonzero(np.diff(key)) + 1
+    starts = np.concatenate(([0], boundaries))
+
+    result = {}
+    for start, end in zip(starts, np.concatenate((boundaries, [key.size])), strict=True):
+        k = int(key[start])
+        intervals = dt[start : end - 1]
+        result[_source_name(k >> 16, k & 0xFFFF)] = {"summary": _summary(intervals), "intervals": intervals}
+    return result
+
+
+def jitter_spectrum(intervals, top: int = 5) -> dict[str, Any]:
+    """
+    到着間隔の揺らぎのスペクトルを計算する
+
+    到着間隔列の中央値からの偏差をFFTし、平均到着レートで周波数（Hz）に換算する
+
+    Args:
+        intervals: 到着間隔（秒）
+        top: 出力するピークの数
+
+    Returns:
+        dict: 主要なピークの周波数と振幅、スペクトル配列
+    """
+    if intervals.size < 8:
+        return {"peaks": []}
+
+    jitter = intervals - np.median(intervals)
+    power = np.abs(np.fft.rfft(jitter - jitter.mean())) ** 2 / intervals.size
+    freqs = np.fft.rfftfreq(intervals.size, d=float(intervals.mean()))
+
+    # 直流成分を除いた上位のピーク
+    candidates = np.argpartition(power[1:], -min(top, power.size - 1))[-top:] + 1
+    candidates = candidates[np.argsort(power[candidates])[::-1]]
+    return {
+        "rms_jitter": float(np.sqrt(np.mean(jitter**2))),
+        "peaks": [{"freq_hz": float(freqs[i]), "power": float(power[i])} for i in candidates],
+        "freqs": freqs,
+        "power": power,
+    }
+
+
+def find_stalls(records, threshold: float, window: float, top: int) -> list[dict[str, Any]]:
+    """
+    移動指令中のシリアル送信の途切れを検出し、近傍の接続イベントと対応付ける
+
+    Args:
+        records: レコード配列
+        threshold: 送信間隔がこの値（秒）を超えたものを途切れとみなす
+        window: 途切れの前後でイベントを探す範囲（秒）
+        top: 出力する件数
+
+    Returns:
+        list[dict]: 途切れの長い順の一覧
+    """
+    writes = records[records["kind"] == KIND_WRITE]
+    if writes.size < 2:
+        return []
+    writes = writes[np.argsort(writes["t_serial"], kind="stable")]
+
+    t = writes["t_serial"]
+    gaps = np.diff(t)
+    # 直前に送った値が停止（0,0）以外の場合のみ、途切れが走行に影響する
+    moving = (writes["front"][:-1] != 0) | (writes["side"][:-1] != 0)
+    candidates = np.flatnonzero((gaps > threshold) & moving)
+    if candidates.size == 0:
+        return []
+    candidates = candidates[np.argsort(gaps[candidates])[::-1][:top]]
+
+    events = records[records["kind"] == KIND_EVENT]
+    event_t = events["t_ingress"]
+    stalls = []
+    for i in candidates:
+        start, end = t[i], t[i + 1]
+        lo, hi = np.searchsorted(event_t, [start - window, end + window])
+        stalls.append(
+            {
+                "start": float(start),
+                "duration": float(gaps[i]),
+                "setpoint": [int(writes["front"][i]), int(writes["side"][i])],
+                "events": [
+                    {"event": EVENT_NAMES.get(int(events["code"][j]), "unknown"), "offset": float(event_t[j] - start)}
+                    for j in range(lo, hi)
+                ],
+            }
+        )
+    return stalls
+
+
+def analyze(records, stall_threshold: float = 0.25, event_window: float = 2.0, top: int = 10) -> dict[str, Any]:
+    """
+    記録済みセッションを解析する
+
+    Args:
+        records: レコード配列
+        stall_threshold: 送信の途切れとみなす間隔（秒）
+        event_window: 途切れと対応付ける接続イベントの探索範囲（秒）
+        top: 途切れ・スペクトルピークの出力件数
+
+    Returns:
+        dict: 解析結果（グラフ用の配列を含む）
+    """
+    kind = records["kind"]
+    flags = records["flags"]
+    inputs = kind == KIND_INPUT
+    writes = kind == KIND_WRITE
+    keepalive = writes & ((flags & FLAG_KEEPALIVE) != 0)
+    accepted = inputs & ((flags & (FLAG_EXPIRED | FLAG_OUT_OF_ORDER | FLAG_THROTTLED)) == 0)
+
+    n_accepted = int(np.count_nonzero(accepted))
+    n_updates = int(np.count_nonzero(writes & ~keepalive))
+
+    # 受信から送信完了までの遅延（キープアライブは新しい入力を伴わないため除外）
+    latency_records = records[writes & ~keepalive]
+    latency = latency_records["t_serial"] - latency_records["t_ingress"]
+    latency = latency[np.isfinite(latency)]
+
+    arrivals = inter_arrival_by_source(records)
+    t = records["t_ingress"]
+    return {
+        "records": int(records.size),
+        "duration": float(t.max() - t.min()) if records.size else 0.0,
+        "inputs": {
+            "total": int(np.count_nonzero(inputs)),
+            "accepted": n_accepted,
+            "expired": int(np.count_nonzero(inputs & ((flags & FLAG_EXPIRED) != 0))),
+            "out_of_order": int(np.count_nonzero(inputs & ((flags & FLAG_OUT_OF_ORDER) != 0))),
+            "throttled": int(np.count_nonzero(inputs & ((flags & FLAG_THROTTLED) != 0))),
+        },
+        "writes": {"updates": n_updates, "keepalives": int(np.count_nonzero(keepalive))},
+        "coalescing_ratio": n_accepted / n_updates if n_updates else None,
+        "latency": _summary(latency),
+        "write_duration": _summary(records["value"][writes].astype(np.float64)),
+        "inter_arrival": arrivals,
+        "jitter": {name: jitter_spectrum(data["intervals"], top=min(top, 5)) for name, data in arrivals.items()},
+        "stalls": find_stalls(records, stall_threshold, event_window, top),
+        "_latency": latency,
+    }
+
+
+def report_json(result: dict[str, Any]) -> dict[str, Any]:
+    """解析結果からグラフ用の配列を除き、JSONに変換できる形にする"""
+    report = {k: v for k, v in result.items() if not k.startswith("_")}
+    report["inter_arrival"] = {name: data["summary"] for name, data in result["inter_arrival"].items()}
+    report["jitter"] = {
+        name: {k: v for k, v in data.items() if k not in ("freqs", "power")} for name, data in result["jitter"].items()
+    }
+    return report
+
+
+def write_plots(result: dict[str, Any], output_dir: Path) -> list[Path]:
+    """
+    解析結果のグラフを画像として保存する
+
+    Args:
+        result: analyzeの結果
+        output_dir: 出力先ディレクトリ
+
+    Returns:
+        list[Path]: 保存した画像のパス
+    """
+    # matplotlibは読み込みが重いため、グラフを出力する場合のみ読み込む
+    try:
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        raise ImportError("matplotlib is required for plots. Install with: uv sync --extra analysis")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+
+    fig, ax = plt.subplots()
+    for name, data in result["inter_arrival"].items():
+        if data["intervals"].size:
+            ax.hist(data["intervals"] * 1000, bins=200, histtype="step", label=name)
+    ax.set_xlabel("inter-arrival [ms]")
+    ax.set_ylabel("count")
+    ax.set_yscale("log")
+    ax.legend()
+    paths.append(output_dir / "inter_arrival.png")
+    fig.savefig(paths[-1])
+    plt.close(fig)
+
+    latency = np.sort(result["_latency"])
+    if latency.size:
+        fig, ax = plt.subplots()
+        ax.plot(latency * 1000, np.arange(1, latency.size + 1) / latency.size)
+        ax.set_xlabel("ingress to serial latency [ms]")
+        ax.set_ylabel("CDF")
+        ax.set_xscale("log")
+        paths.append(output_dir / "latency_cdf.png")
+        fig.savefig(paths[-1])
+        plt.close(fig)
+
+    fig, ax = plt.subplots()
+    for name, data in result["jitter"].items():
+        if "freqs" in data:
+            ax.semilogy(data["freqs"][1:], data["power"][1:], label=name)
+    ax.set_xlabel("frequency [Hz]")
+    ax.set_ylabel("jitter power")
+    ax.legend()
+    paths.append(output_dir / "jitter_spectrum.png")
+    fig.savefig(paths[-1])
+    plt.close(fig)
+
+    return paths
+
+
+def run_analysis(
+    paths: list[Path],
+    output: Path | None = None,
+    plot_dir: Path | None = None,
+    stall_threshold: float = 0.25,
+    event_window: float = 2.0,
+    top: int = 10,
+) -> dict[str, Any]:
+    """
+    トレースファイルを解析してレポートを出力する
+
+    Args:
+        paths: トレースファイルのパス
+        output: JSONレポートの出力先（Noneの場合は出力しない）
+        plot_dir: グラフの出力先ディレクトリ（Noneの場合は出力しない）
+        stall_threshold: 送信の途切れとみなす間隔（秒）
+        event_window: 途切れと対応付ける接続イベントの探索範囲（秒）
+        top: 途切れ・スペクトルピークの出力件数
+
+    Returns:
+        dict: JSONレポート
+    """
+    records = load_records(paths)
+    logger.info(f"Loaded {records.size} records from {len(paths)} file(s)")
+
+    result = analyze(records, stall_threshold=stall_threshold, event_window=event_window, top=top)
+    report = report_json(result)
+
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2))
+        logger.info(f"Analysis report written to {output}")
+
+    if plot_dir is not None:
+        for path in write_plots(result, plot_dir):
+            logger.info(f"Plot written to {path}")
+
+    return report
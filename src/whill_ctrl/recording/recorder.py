@@ -0,0 +1,168 @@
+"""
+コマンド・遅延トレースを固定長バイナリレコードとして記録するモジュール
+
+1レコードは32バイトのリトルエンディアン形式で、解析時にメモリマップでそのまま読み込める
+標準ライブラリのみで動作し、制御経路ではバッファへの書き込みだけを行う
+"""
+
+import math
+import struct
+import time
+import zlib
+from pathlib import Path
+
+from loguru import logger
+
+# レコード形式: t_ingress, t_serial, kind, transport, code, flags, front, side, source_id, seq, value
+RECORD_STRUCT = struct.Struct("<ddBBBBbbHIf")
+RECORD_SIZE = RECORD_STRUCT.size
+
+# レコード種別
+KIND_INPUT = 1  # ジョイスティック入力
+KIND_WRITE = 2  # ジョイスティックのシリアル送信
+KIND_COMMAND = 3  # 電源・緊急停止などの個別コマンド
+KIND_EVENT = 4  # 接続状態の変化など
+
+# 入力経路
+TRANSPORTS = {"osc": 1, "mqtt": 2, "ipc": 3, "shm": 4, "api": 5}
+TRANSPORT_NAMES = {0: "unknown", **{code: name for name, code in TRANSPORTS.items()}}
+
+# 個別コマンドのコード
+COMMANDS = {"power_on": 1, "power_off": 2, "emergency_stop": 3, "change_port": 4}
+
+# イベントのコード
+EVENTS = {
+    "device_disconnected": 1,
+    "device_reconnected": 2,
+    "device_reconnect_failed": 3,
+    "mqtt_connected": 4,
+    "mqtt_disconnected": 5,
+    "link_calibrated": 6,
+}
+EVENT_NAMES = {code: name for name, code in EVENTS.items()}
+
+# フラグ
+FLAG_EXPIRED = 0x01  # 期限切れで破棄
+FLAG_OUT_OF_ORDER = 0x02  # 順序逆転で破棄
+FLAG_KEEPALIVE = 0x04  # キープアライブによる再送
+FLAG_THROTTLED = 0x08  # 送信元のレート制限で破棄
+
+
+class Recorder:
+    """トレースレコードをバッファリングしてファイルに追記する"""
+
+    def __init__(self, path: Path, buffer_records: int = 4096, flush_interval: float = 1.0):
+        """
+        レコーダーを初期化
+
+        Args:
+            path: 記録先のファイルパス（追記）
+            buffer_records: バッファに保持するレコード数
+            flush_interval: バッファをファイルへ書き出す最大間隔（秒）
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._buffer = bytearray(RECORD_SIZE * buffer_records)
+        self._offset = 0
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._source_keys: dict[str, tuple[int, int]] = {}
+        self.records = 0
+        logger.info(f"Recording command trace to {self.path}")
+
+    def source_key(self, source: str | None) -> tuple[int, int]:
+        """
+        送信元の識別子を(入力経路, 16ビットID)に変換する
+
+        Args:
+            source: 送信元の識別子（"osc:192.168.0.2:9000" など）
+
+        Returns:
+            tuple[int, int]: (入力経路コード, 送信元ID)
+        """
+        if source is None:
+            return 0, 0
+        key = self._source_keys.get(source)
+        if key is None:
+            transport = TRANSPORTS.get(source.split(":", 1)[0], 0)
+            key = (transport, zlib.crc32(source.encode()) & 0xFFFF)
+            self._source_keys[source] = key
+        return key
+
+    def record(
+        self,
+        kind: int,
+        t_ingress: float,
+        t_serial: float = math.nan,
+        *,
+        source: str | None = None,
+        code: int = 0,
+        flags: int = 0,
+        front: int = 0,
+        side: int = 0,
+        seq: int = 0,
+        value: float = 0.0,
+    ) -> None:
+        """
+        レコードを1件追加する
+
+        Args:
+            kind: レコード種別
+            t_ingress: 受信時刻（UNIX時刻）
+            t_serial: シリアル送信完了時刻（UNIX時刻）、送信していなければNaN
+            source: 送信元の識別子
+            code: コマンドまたはイベントのコード
+            flags: フラグ
+            front: 前後方向の値
+            side: 左右方向の値
+            seq: クライアントのシーケンス番号
+            value: 付加値（シリアル送信の所要時間など）
+        """
+        transport, source_id = self.source_key(source)
+        RECORD_STRUCT.pack_into(
+            self._buffer,
+            self._offset,
+            t_ingress,
+            t_serial,
+            kind,
+            transport,
+            code,
+            flags,
+            front,
+            side,
+            source_id,
+            seq & 0xFFFFFFFF,
+            value,
+        )
+        self._offset += RECORD_SIZE
+        self.records += 1
+
+        if self._offset >= len(self._buffer) or time.monotonic() - self._last_flush >= self._flush_interval:
+            self.flush()
+
+    def event(self, name: str) -> None:
+        """
+        イベントを記録する
+
+        Args:
+            name: イベント名（EVENTSのキー）
+        """
+        self.record(KIND_EVENT, time.time(), code=EVENTS[name])
+
+    def flush(self) -> None:
+        """バッファの内容をファイルへ書き出す"""
+        if self._offset:
+            try:
+                self._file.write(memoryview(self._buffer)[: self._offset])
+                self._file.flush()
+            except OSError as e:
+                logger.error(f"Failed to write command trace: {e}")
+            self._offset = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """バッファを書き出してファイルを閉じる"""
+        self.flush()
+        self._file.close()
+        logger.info(f"Command trace closed: {self.records} records written to {self.path}")
@@ -0,0 +1,356 @@
+"""
+テレメトリと統計を列指向の固定長セグメントに記録し、時間範囲で検索するモジュール
+
+1つのセグメントは、ヘッダー（32バイト）に続いて列ごとに容量分の連続領域を持つファイルで、
+書き込みはmmapへの直接書き込みのみ（標準ライブラリのみで動作）
+読み込みはNumPyのメモリマップで列をそのまま参照し、時間範囲の切り出しと間引き（バケットごとの集計）をベクトル化して行う
+セグメントが満杯になると新しいセグメントへ切り替え、上限を超えた古いセグメントは削除する
+"""
+
+import math
+import mmap
+import struct
+import time
+from pathlib import Path
+
+from loguru import logger
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ヘッダー形式: magic, version, 列数, 容量（行数）, 行数, 最初の時刻, 最後の時刻
+HEADER_STRUCT = struct.Struct("<4sHHIIdd")
+HEADER_SIZE = HEADER_STRUCT.size
+MAGIC = b"WTLM"
+VERSION = 1
+
+# 列: (名前, structの型, 間引き時の集計方法)
+# mean: 平均, min: 最小（接続状態は1度でも切断があれば0）, max: 最大, last: 最後の値（累積カウンター）
+COLUMNS = (
+    ("t", "d", "first"),
+    ("connected", "B", "min"),
+    ("front", "b", "mean"),
+    ("side", "b", "mean"),
+    ("battery_level", "f", "mean"),
+    ("battery_current", "f", "mean"),
+    ("right_speed", "f", "mean"),
+    ("left_speed", "f", "mean"),
+    ("power_status", "B", "last"),
+    ("error_code", "B", "max"),
+    ("joystick_inputs", "I", "last"),
+    ("joystick_writes", "I", "last"),
+    ("expired", "I", "last"),
+    ("throttled", "I", "last"),
+)
+COLUMN_NAMES = tuple(name for name, _, _ in COLUMNS)
+_STRUCTS = tuple(struct.Struct("<" + fmt) for _, fmt, _ in COLUMNS)
+ROW_SIZE = sum(s.size for s in _STRUCTS)
+
+# NumPyのdtype（structの型と対応）
+_DTYPES = {"d": "<f8", "f": "<f4", "B": "u1", "b": "i1", "I": "<u4"}
+
+SEGMENT_GLOB = "telemetry-*.seg"
+
+
+def _column_offsets(capacity: int) -> list[int]:
+    """容量に対する各列の先頭オフセット"""
+    offsets, offset = [], HEADER_SIZE
+    for s in _STRUCTS:
+        offsets.append(offset)
+        offset += s.size * capacity
+    return offsets
+
+
+class TelemetryStore:
+    """テレメトリと統計を一定間隔でセグメントへ追記する"""
+
+    def __init__(self, directory: Path, interval: float = 1.0, segment_rows: int = 86400, max_segments: int = 30):
+        """
+        テレメトリストアを初期化
+
+        Args:
+            directory: セグメントを保存するディレクトリ
+            interval: 記録する最小間隔（秒）
+            segment_rows: 1セグメントの行数（8の倍数に切り上げる）
+            max_segments: 保持するセグメント数の上限、0以下で削除しない
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        # 列の先頭を8バイト境界に揃えるため、容量は8の倍数にする
+        self.capacity = max(8, -(-segment_rows // 8) * 8)
+        self.max_segments = max_segments
+        self._offsets = _column_offsets(self.capacity)
+        self._size = self._offsets[-1] + _STRUCTS[-1].size * self.capacity
+
+        self._file = None
+        self._map: mmap.mmap | None = None
+        self.path: Path | None = None
+        self._count = 0
+        self._t_first = math.nan
+        self._last = -math.inf
+
+        # 統計カウンター
+        self.rows = 0
+        self.segments = 0
+        logger.info(f"Recording telemetry to {self.directory} every {interval}s")
+
+    def due(self, now: float | None = None) -> bool:
+        """
+        記録する時刻に達したかどうか
+
+        Args:
+            now: 現在時刻（UNIX時刻、省略時はtime.time()）
+
+        Returns:
+            bool: 前回の記録からinterval以上経過した場合はTrue
+        """
+        if now is None:
+            now = time.time()
+        return now - self._last >= self.interval
+
+    def append(self, row: dict) -> None:
+        """
+        1行を追記する
+
+        行数はすべての列を書き込んだ後で更新するため、読み込み側は書き込み途中の行を参照しない
+
+        Args:
+            row: 列名をキーとする値（"t" は必須、欠けている列は数値型なら0、浮動小数点型ならNaN）
+        """
+        if self._map is None or self._count >= self.capacity:
+            self._rotate()
+        t = row["t"]
+        index = self._count
+        for (name, fmt, _), s, offset in zip(COLUMNS, _STRUCTS, self._offsets, strict=True):
+            value = row.get(name)
+            if fmt in "df":
+                value = math.nan if value is None else float(value)
+            elif fmt == "I":
+                value = int(value or 0) & 0xFFFFFFFF
+            elif fmt == "b":
+                value = max(-128, min(127, int(value or 0)))
+            else:
+                value = max(0, min(255, int(value or 0)))
+            s.pack_into(self._map, offset + index * s.size, value)
+
+        self._count += 1
+        if index == 0:
+            self._t_first = t
+        HEADER_STRUCT.pack_into(
+            self._map, 0, MAGIC, VERSION, len(COLUMNS), self.capacity, self._count, self._t_first, t
+        )
+        self._last = t
+        self.rows += 1
+
+    def _rotate(self) -> None:
+        """現在のセグメントを閉じて新しいセグメントを作成し、古いセグメントを削除する"""
+        self._close_segment()
+        # ファイル名の時刻順がセグメントの順序になる（同じ時刻の場合は1ミリ秒ずらす）
+        stamp = int(time.time() * 1000)
+        if self.path is not None:
+            stamp = max(stamp, int(self.path.stem.rpartition("-")[2]) + 1)
+        path = self.directory / f"telemetry-{stamp:015d}.seg"
+        self._file = open(path, "w+b")
+        # 未使用の領域はファイルシステム上で確保しない（スパースファイル）
+        self._file.truncate(self._size)
+        self._map = mmap.mmap(self._file.fileno(), self._size)
+        HEADER_STRUCT.pack_into(self._map, 0, MAGIC, VERSION, len(COLUMNS), self.capacity, 0, math.nan, math.nan)
+        self.path = path
+        self._count = 0
+        self.segments += 1
+
+        if self.max_segments > 0:
+            for old in sorted(self.directory.glob(SEGMENT_GLOB))[: -self.max_segments]:
+                try:
+                    old.unlink()
+                except OSError as e:
+                    logger.warning(f"Failed to remove telemetry segment {old}: {e}")
+
+    def _close_segment(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+    def close(self) -> None:
+        """セグメントをディスクへ書き出して閉じる"""
+        self._close_segment()
+        logger.info(f"Telemetry store closed: {self.rows} rows in {self.segments} segments under {self.directory}")
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {"rows": self.rows, "segments": self.segments, "path": str(self.path) if self.path else None}
+
+
+def read_segment(path: Path) -> dict | None:
+    """
+    セグメントをメモリマップで読み込む
+
+    Args:
+        path: セグメントのパス
+
+    Returns:
+        dict | None: 列名をキーとする配列（書き込み済みの行のみ）、形式が異なる・空の場合はNone
+    """
+    if np is None:
+        raise ImportError("numpy is required for telemetry queries. Install with: uv sync --extra analysis")
+
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, version, ncols, capacity, count, _, _ = HEADER_STRUCT.unpack(header)
+    if magic != MAGIC or version != VERSION or ncols != len(COLUMNS) or count == 0:
+        return None
+
+    raw = np.memmap(path, dtype="u1", mode="r")
+    columns = {}
+    for (name, fmt, _), offset in zip(COLUMNS, _column_offsets(capacity), strict=True):
+        dtype = np.dtype(_DTYPES[fmt])
+        columns[name] = raw[offset : offset + dtype.itemsize * count].view(dtype)
+    return columns
+
+
+def segment_range(path: Path) -> tuple[float, float] | None:
+    """
+    セグメントの最初と最後の時刻をヘッダーから取得する
+
+    Args:
+        path: セグメントのパス
+
+    Returns:
+        tuple | None: (最初の時刻, 最後の時刻)、空・形式が異なる場合はNone
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, version, _, _, count, t_first, t_last = HEADER_STRUCT.unpack(header)
+    if magic != MAGIC or version != VERSION or count == 0:
+        return None
+    return t_first, t_last
+
+
+def _aggregate(values, method: str, starts, ends, counts):
+    """バケットごとに集計する"""
+    if method == "mean":
+        return np.add.reduceat(values.astype(np.float64), starts) / counts
+    if method == "min":
+        return np.minimum.reduceat(values, starts)
+    if method == "max":
+        return np.maximum.reduceat(values, starts)
+    if method == "first":
+        return values[starts]
+    return values[ends - 1]
+
+
+def query_telemetry(
+    directory: Path,
+    start: float | None = None,
+    end: float | None = None,
+    *,
+    step: float | None = None,
+    max_points: int = 1000,
+    columns: list[str] | None = None,
+) -> dict:
+    """
+    時間範囲のテレメトリを間引いて取得する
+
+    stepを省略した場合、行数がmax_pointsを超えるときだけ、範囲をmax_points個のバケットに分けて集計する
+    バケットの時刻はバケットの先頭の時刻、"samples" はバケットに含まれる行数
+
+    Args:
+        directory: セグメントを保存したディレクトリ
+        start: 開始時刻（UNIX時刻、省略時は最初の行）
+        end: 終了時刻（UNIX時刻、省略時は最後の行）
+        step: バケットの幅（秒）
+        max_points: stepを省略した場合の最大の点数
+        columns: 取得する列（省略時はすべて）
+
+    Returns:
+        dict: 列名をキーとするNumPy配列（"t" と "samples" を含む）
+
+    Raises:
+        ValueError: 未知の列名を指定した場合
+    """
+    if np is None:
+        raise ImportError("numpy is required for telemetry queries. Install with: uv sync --extra analysis")
+    names = [name for name in (columns or COLUMN_NAMES) if name != "t"]
+    unknown = set(names) - set(COLUMN_NAMES)
+    if unknown:
+        raise ValueError(f"Unknown telemetry columns: {', '.join(sorted(unknown))}")
+    lo = -math.inf if start is None else start
+    hi = math.inf if end is None else end
+
+    # ヘッダーの時刻で範囲外のセグメントを読まずに除外する
+    parts = []
+    for path in sorted(Path(directory).glob(SEGMENT_GLOB)):
+        span = segment_range(path)
+        if span is None or span[1] < lo or span[0] > hi:
+            continue
+        segment = read_segment(path)
+        if segment is None:
+            continue
+        t = segment["t"]
+        i, j = np.searchsorted(t, lo, "left"), np.searchsorted(t, hi, "right")
+        if i < j:
+            parts.append({name: segment[name][i:j] for name in ("t", *names)})
+
+    if not parts:
+        return {"t": np.empty(0), "samples": np.empty(0, dtype=np.int64), **{name: np.empty(0) for name in names}}
+    data = {name: np.concatenate([part[name] for part in parts]) for name in ("t", *names)}
+    t = data["t"]
+
+    if step is None:
+        if t.size <= max_points:
+            return {**data, "samples": np.ones(t.size, dtype=np.int64)}
+        step = (t[-1] - t[0]) / max(1, max_points - 1)
+    origin = t[0] if start is None else start
+
+    # 時刻順に並んでいるため、バケット番号が変わる位置が各バケットの先頭になる
+    bucket = np.floor((t - origin) / step).astype(np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+    ends = np.concatenate((starts[1:], [t.size]))
+    counts = ends - starts
+
+    methods = {name: method for name, _, method in COLUMNS}
+    result = {"t": origin + bucket[starts] * step, "samples": counts}
+    for name in names:
+        result[name] = _aggregate(data[name], methods[name], starts, ends, counts)
+    return result
+
+
+def to_compact_json(result: dict, decimals: int = 3) -> dict:
+    """
+    検索結果をJSONで送れる形式にまとめる
+
+    時刻は最初の時刻 "t0" からの差分とし、値は小数点以下decimals桁に丸める（NaNはnull）
+
+    Args:
+        result: query_telemetry() の結果
+        decimals: 丸める桁数
+
+    Returns:
+        dict: {"t0", "count", "t", "columns"}
+    """
+    t = result["t"]
+    t0 = float(t[0]) if t.size else None
+    encoded = {}
+    for name, values in result.items():
+        if name == "t":
+            continue
+        if values.dtype.kind == "f":
+            rounded = np.round(values, decimals)
+            encoded[name] = [None if math.isnan(v) else v for v in rounded.tolist()]
+        else:
+            encoded[name] = values.tolist()
+    return {
+        "t0": t0,
+        "count": int(t.size),
+        "t": np.round(t - t0, decimals).tolist() if t.size else [],
+        "columns": encoded,
+    }
@@ -0,0 +1,46 @@
+"""
+再接続待機時間を計算するユーティリティモジュール
+ジッター付き指数バックオフを提供する
+"""
+
+import random
+
+
+class Backoff:
+    """ジッター付き指数バックオフ"""
+
+    def __init__(self, initial: float, maximum: float, factor: float = 2.0, rng: random.Random | None = None):
+        """
+        バックオフを初期化
+
+        Args:
+            initial: 最初の待機時間（秒）
+            maximum: 待機時間の上限（秒）
+            factor: 失敗ごとの待機時間の倍率
+            rng: 乱数生成器（再現性が必要な場合に指定）
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.attempts = 0
+        self._rng = rng or random.Random()
+
+    def next_delay(self) -> float:
+        """
+        次の待機時間を計算する
+
+        上限付きの指数値の半分を固定分、残り半分をジッターとし、
+        同時に切断された複数クライアントの再接続が揃わないようにする
+
+        Returns:
+            float: 待機時間（秒）
+        """
+        ceiling = min(self.maximum, self.initial * (self.factor**self.attempts))
+        if ceiling < self.maximum:
+            # 上限到達後は指数を増やさない（長時間の切断で桁あふれさせない）
+            self.attempts += 1
+        return ceiling / 2 + self._rng.uniform(0, ceiling / 2)
+
+    def reset(self) -> None:
+        """接続成功時に待機時間を初期値へ戻す"""
+        self.attempts = 0
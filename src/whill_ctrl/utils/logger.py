@@ -8,15 +8,18 @@ from loguru import logger
 
 from ..config import get_settings
 
-settings = get_settings()
-
 
 def setup_logger(debug_mode: bool = False):
-    """ロガーの設定"""
+    """
+    ロガーの設定
+
+    設定の再読み込み時にも呼び出され、既存の出力先を置き換える
+    """
+    settings = get_settings()
     logger.remove()
 
     # コンソール出力の設定
-    log_level = "DEBUG" if debug_mode else "INFO"
+    log_level = "DEBUG" if debug_mode else settings.log_level
     logger.add(
         sys.stderr,
         format="<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
@@ -25,8 +28,8 @@ def setup_logger(debug_mode: bool = False):
     )
 
     # ファイル出力の設定（ログローテーション付き）
-    # debugモードの場合のみDEBUGレベル、それ以外はINFOレベル
-    file_log_level = "DEBUG" if debug_mode else "INFO"
+    # debugモードの場合のみDEBUGレベル、それ以外は設定のログレベル
+    file_log_level = "DEBUG" if debug_mode else settings.log_level
     log_file = settings.log_dir / settings.log_file_pattern
     logger.add(
         str(log_file),
@@ -34,7 +37,7 @@ def setup_logger(debug_mode: bool = False):
         retention="30 days",  # 30日間保持
         compression="zip",  # ログファイルを圧縮
         format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}",
-        level=file_log_level,  # デバッグレベルまたはINFOレベル
+        level=file_log_level,  # デバッグレベルまたは設定のログレベル
         backtrace=True,  # エラー時にトレースバックを表示
         enqueue=True,  # 非同期処理に対応
     )
@@ -0,0 +1,81 @@
+"""
+バックグラウンドタスクを参照を保持したまま管理するユーティリティモジュール
+
+asyncioはタスクへの弱参照しか持たないため、参照を保持しないタスクは実行中に回収される場合がある
+完了したタスクは自動的に削除し、実行中のタスク数に上限を設けて際限なく増えないようにする
+"""
+
+import asyncio
+from collections.abc import Coroutine
+from typing import Any
+
+from loguru import logger
+
+
+class TaskSet:
+    """参照を保持し、完了時に削除するタスクの集合"""
+
+    def __init__(self, name: str, limit: int = 256):
+        """
+        Args:
+            name: ログに表示する名前
+            limit: 同時に実行するタスクの上限（criticalでないタスクは上限を超えると破棄する）
+        """
+        self.name = name
+        self.limit = limit
+        self._tasks: set[asyncio.Task] = set()
+
+        # 統計カウンター
+        self.spawned = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def spawn(self, coro: Coroutine[Any, Any, Any], *, critical: bool = False) -> asyncio.Task | None:
+        """
+        タスクを作成して参照を保持する
+
+        Args:
+            coro: 実行するコルーチン
+            critical: Trueの場合は上限を超えても作成する（緊急停止・電源などの個別コマンド）
+
+        Returns:
+            asyncio.Task | None: 作成したタスク、上限を超えて破棄した場合はNone
+        """
+        if not critical and len(self._tasks) >= self.limit:
+            name = coro.__qualname__
+            coro.close()
+            self.dropped += 1
+            logger.debug(f"{self.name}: too many pending tasks, dropped {name}")
+            if self.dropped == 1 or self.dropped % 1000 == 0:
+                logger.warning(f"{self.name}: too many pending tasks, dropped {self.dropped} so far (last: {name})")
+            return None
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._done)
+        self.spawned += 1
+        return task
+
+    def _done(self, task: asyncio.Task) -> None:
+        """完了したタスクを削除し、例外があれば記録する"""
+        self._tasks.discard(task)
+        if task.cancelled():
+            return
+        exception = task.exception()
+        if exception is not None:
+            self.failed += 1
+            logger.error(f"{self.name}: task failed: {exception!r}")
+
+    def cancel(self) -> None:
+        """実行中のタスクをすべてキャンセルする"""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self):
+        return iter(list(self._tasks))
+
+    def get_stats(self) -> dict:
+        """統計情報を取得する"""
+        return {"pending": len(self._tasks), "spawned": self.spawned, "dropped": self.dropped, "failed": self.failed}
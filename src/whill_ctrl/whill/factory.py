@@ -5,29 +5,38 @@ WHILLデバイスのファクトリクラス
 
 from loguru import logger
 
+from .faults import FaultProfile, FaultyWHILL
 from .interface import AbstractWHILL
 from .mock import MockWHILL
 from .real import RealWHILL
 
 
-def create_whill_device(port: str, use_mock: bool = False) -> AbstractWHILL:
+def create_whill_device(port: str, use_mock: bool = False, faults: FaultProfile | str | None = None) -> AbstractWHILL:
     """
     WHILLデバイスのインスタンスを作成する
 
     Args:
         port: シリアルポート名
         use_mock: モックを使用するかどうか
+        faults: 注入する障害（FaultProfileまたは "key=value,..." 形式の文字列、Noneの場合は注入しない）
 
     Returns:
         WHILLデバイスインターフェース
     """
+    if isinstance(faults, str):
+        faults = FaultProfile.parse(faults)
+
     if use_mock:
         logger.info(f"Creating mock WHILL device for port {port}")
-        return MockWHILL(port)
+        device = MockWHILL(port)
     else:
         logger.info(f"Creating real WHILL device for port {port}")
         try:
-            return RealWHILL(port)
+            device = RealWHILL(port)
         except Exception as e:
             logger.error(f"Failed to create real WHILL device: {e}")
             raise
+
+    if faults is not None:
+        return FaultyWHILL(device, faults)
+    return device
@@ -0,0 +1,320 @@
+"""
+任意のWHILLデバイスに障害を注入するラッパー
+
+書き込みの遅延（分布を指定）、書き込みの失敗、定期的な切断、再接続の遅延と失敗を、
+シードを固定した乱数で再現可能に発生させる。実機の遅い経路・失敗する経路の動作確認とベンチマークに使用する
+
+障害の指定は "seed=1,latency=lognormal:2:0.5,failure_rate=0.01,disconnect_interval=60,reconnect_delay=uniform:500:2000"
+のようなカンマ区切りの文字列で行う（時間の単位は、分布はミリ秒、それ以外は秒）
+"""
+
+import asyncio
+import math
+import random
+import time
+from typing import Any
+
+from loguru import logger
+
+from .interface import AbstractWHILL
+
+
+class LatencyDistribution:
+    """
+    遅延の分布
+
+    - none: 遅延なし
+    - const:ms: 固定
+    - uniform:lo:hi: 一様分布
+    - normal:mean:sd: 正規分布（負の値は0）
+    - lognormal:median:sigma: 対数正規分布（裾の長い遅延）
+    - exp:mean: 指数分布
+    """
+
+    KINDS = {"none": 0, "const": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, kind: str = "none", *params: float):
+        """
+        Args:
+            kind: 分布の種類
+            *params: 分布のパラメータ（ミリ秒、lognormalのsigmaのみ無次元）
+
+        Raises:
+            ValueError: 分布の種類・パラメータの数が不正な場合
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind} (expected one of {', '.join(self.KINDS)})")
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(f"Latency distribution {kind} takes {self.KINDS[kind]} parameters")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        "lognormal:2:0.5" 形式の文字列から分布を作成する
+
+        Args:
+            spec: 分布の指定
+
+        Returns:
+            LatencyDistribution: 分布
+        """
+        kind, *params = spec.split(":")
+        return cls(kind, *(float(p) for p in params))
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        遅延を1つ生成する
+
+        Args:
+            rng: 乱数生成器
+
+        Returns:
+            float: 遅延（秒）
+        """
+        kind, p = self.kind, self.params
+        if kind == "none":
+            return 0.0
+        if kind == "const":
+            ms = p[0]
+        elif kind == "uniform":
+            ms = rng.uniform(p[0], p[1])
+        elif kind == "normal":
+            ms = rng.gauss(p[0], p[1])
+        elif kind == "lognormal":
+            ms = rng.lognormvariate(math.log(p[0]), p[1])
+        else:
+            ms = rng.expovariate(1.0 / p[0])
+        return max(0.0, ms) / 1000.0
+
+    def __str__(self) -> str:
+        return ":".join((self.kind, *(f"{p:g}" for p in self.params)))
+
+
+class FaultProfile:
+    """注入する障害の設定"""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        latency: LatencyDistribution | None = None,
+        blocking: bool = False,
+        failure_rate: float = 0.0,
+        disconnect_on_failure: bool = True,
+        disconnect_interval: float = 0.0,
+        disconnect_jitter: float = 0.0,
+        reconnect_delay: LatencyDistribution | None = None,
+        reconnect_failure_rate: float = 0.0,
+    ):
+        """
+        Args:
+            seed: 乱数のシード
+            latency: 書き込み（ジョイスティック・電源・緊急停止）の遅延の分布
+            blocking: 遅延をイベントループを止めて発生させる（同期的なシリアル書き込みの再現）
+            failure_rate: 書き込みが失敗する確率
+            disconnect_on_failure: 書き込みの失敗時に切断状態にする（実機の動作と同じ）
+            disconnect_interval: 切断を発生させる間隔（秒）、0で発生させない
+            disconnect_jitter: 切断の間隔のばらつき（秒、±の一様分布）
+            reconnect_delay: 再接続にかかる時間の分布
+            reconnect_failure_rate: 再接続が失敗する確率
+        """
+        self.seed = seed
+        self.latency = latency or LatencyDistribution()
+        self.blocking = blocking
+        self.failure_rate = failure_rate
+        self.disconnect_on_failure = disconnect_on_failure
+        self.disconnect_interval = disconnect_interval
+        self.disconnect_jitter = disconnect_jitter
+        self.reconnect_delay = reconnect_delay or LatencyDistribution()
+        self.reconnect_failure_rate = reconnect_failure_rate
+
+    @classmethod
+    def parse(cls, spec: str) -> "FaultProfile":
+        """
+        "key=value,..." 形式の文字列から設定を作成する
+
+        Args:
+            spec: 障害の指定（キーは__init__の引数名）
+
+        Returns:
+            FaultProfile: 設定
+
+        Raises:
+            ValueError: 未知のキーや不正な値が含まれる場合
+        """
+        kwargs: dict[str, Any] = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"Invalid fault option (expected key=value): {item}")
+            if key in ("latency", "reconnect_delay"):
+                kwargs[key] = LatencyDistribution.parse(value)
+            elif key == "seed":
+                kwargs[key] = int(value)
+            elif key in ("blocking", "disconnect_on_failure"):
+                kwargs[key] = value.lower() in ("1", "true", "yes", "on")
+            elif key in ("failure_rate", "disconnect_interval", "disconnect_jitter", "reconnect_failure_rate"):
+                kwargs[key] = float(value)
+            else:
+                raise ValueError(f"Unknown fault option: {key}")
+        return cls(**kwargs)
+
+    def __str__(self) -> str:
+        return (
+            f"seed={self.seed},latency={self.latency},blocking={int(self.blocking)},failure_rate={self.failure_rate:g},"
+            f"disconnect_on_failure={int(self.disconnect_on_failure)},disconnect_interval={self.disconnect_interval:g},"
+            f"disconnect_jitter={self.disconnect_jitter:g},reconnect_delay={self.reconnect_delay},"
+            f"reconnect_failure_rate={self.reconnect_failure_rate:g}"
+        )
+
+
+class FaultyWHILL(AbstractWHILL):
+    """障害を注入するWHILLデバイスのラッパー"""
+
+    def __init__(self, device: AbstractWHILL, profile: FaultProfile):
+        """
+        Args:
+            device: ラップするWHILLデバイス
+            profile: 注入する障害の設定
+        """
+        super().__init__()
+        self.device = device
+        self.profile = profile
+        self._rng = random.Random(profile.seed)
+        self._last_error: str | None = None
+        self._next_disconnect = self._schedule_disconnect(time.monotonic())
+
+        # 統計カウンター
+        self.writes = 0
+        self.failures = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.disconnects = 0
+        self.reconnects = 0
+        self.reconnect_failures = 0
+        logger.warning(f"Injecting device faults: {profile}")
+
+    def _schedule_disconnect(self, now: float) -> float:
+        """次に切断する時刻"""
+        profile = self.profile
+        if profile.disconnect_interval <= 0:
+            return math.inf
+        jitter = self._rng.uniform(-profile.disconnect_jitter, profile.disconnect_jitter)
+        return now + max(0.0, profile.disconnect_interval + jitter)
+
+    async def _maybe_disconnect(self) -> None:
+        """切断する時刻に達していれば切断する（呼び出しのたびに確認し、タスクは作らない）"""
+        now = time.monotonic()
+        if now < self._next_disconnect:
+            return
+        self._next_disconnect = self._schedule_disconnect(now)
+        if self.device.is_connected():
+            await self._inject_disconnect("injected periodic disconnect")
+
+    async def _inject_disconnect(self, reason: str) -> None:
+        self.disconnects += 1
+        self._last_error = reason
+        logger.warning(f"[Faults] {reason}")
+        await self.device.disconnect()
+
+    async def _write(self, name: str, send) -> None:
+        """
+        遅延と失敗を注入して書き込む
+
+        Args:
+            name: コマンド名（ログ用）
+            send: ラップしたデバイスの書き込みを行うコルーチン関数
+        """
+        await self._maybe_disconnect()
+        if not self.device.is_connected():
+            await send()
+            return
+
+        delay = self.profile.latency.sample(self._rng)
+        if delay > 0:
+            if self.profile.blocking:
+                time.sleep(delay)
+            else:
+                await asyncio.sleep(delay)
+            self.latency_total += delay
+            self.latency_max = max(self.latency_max, delay)
+        self.writes += 1
+
+        if self.profile.failure_rate > 0 and self._rng.random() < self.profile.failure_rate:
+            self.failures += 1
+            if self.profile.disconnect_on_failure:
+                await self._inject_disconnect(f"injected {name} write failure")
+            else:
+                self._last_error = f"injected {name} write failure"
+                logger.debug(f"[Faults] {self._last_error}")
+            return
+        await send()
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        await self._write("joystick", lambda: self.device.send_joystick(front=front, side=side))
+
+    async def send_power_on(self) -> None:
+        await self._write("power on", self.device.send_power_on)
+
+    async def send_power_off(self) -> None:
+        await self._write("power off", self.device.send_power_off)
+
+    async def send_emergency_stop(self) -> None:
+        await self._write("emergency stop", self.device.send_emergency_stop)
+
+    async def drain(self) -> None:
+        await self.device.drain()
+
+    async def read_telemetry(self) -> dict[str, Any]:
+        await self._maybe_disconnect()
+        return await self.device.read_telemetry()
+
+    async def disconnect(self) -> None:
+        await self.device.disconnect()
+
+    async def reconnect(self, port: str | None = None) -> bool:
+        """再接続の遅延と失敗を注入して再接続する"""
+        delay = self.profile.reconnect_delay.sample(self._rng)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self.profile.reconnect_failure_rate > 0 and self._rng.random() < self.profile.reconnect_failure_rate:
+            self.reconnect_failures += 1
+            self._last_error = "injected reconnect failure"
+            logger.warning("[Faults] injected reconnect failure")
+            return False
+        success = await self.device.reconnect(port)
+        if success:
+            self.reconnects += 1
+            self._next_disconnect = self._schedule_disconnect(time.monotonic())
+        return success
+
+    def get_status(self) -> dict[str, Any]:
+        status = self.device.get_status()
+        status["mode"] = self.get_mode()
+        if self._last_error and not status.get("last_error"):
+            status["last_error"] = self._last_error
+        return status
+
+    def get_mode(self) -> str:
+        return f"{self.device.get_mode()}+faults"
+
+    def is_connected(self) -> bool:
+        return self.device.is_connected()
+
+    @property
+    def port(self):
+        return self.device.port
+
+    def get_stats(self) -> dict[str, Any]:
+        """注入した障害の統計"""
+        return {
+            "profile": str(self.profile),
+            "writes": self.writes,
+            "failures": self.failures,
+            "latency_mean_ms": round(self.latency_total / self.writes * 1000, 3) if self.writes else 0.0,
+            "latency_max_ms": round(self.latency_max * 1000, 3),
+            "disconnects": self.disconnects,
+            "reconnects": self.reconnects,
+            "reconnect_failures": self.reconnect_failures,
+        }
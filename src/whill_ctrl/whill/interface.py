@@ -46,6 +46,14 @@ class AbstractWHILL(ABC):
         """Reconnect to WHILL device, optionally using a new port."""
         pass
 
+    async def drain(self) -> None:
+        """Wait until the frames written so far have left the host (no-op unless the transport buffers)."""
+        return None
+
+    async def read_telemetry(self) -> dict[str, Any]:
+        """Read the latest telemetry (battery, motor speeds, ...) reported by the device."""
+        return {}
+
     def get_status(self) -> dict[str, Any]:
         """Get the current status of the WHILL device."""
         return {"connected": self._connected, "port": self._port, "mode": self.get_mode(), "last_error": None}
@@ -55,6 +63,10 @@ class AbstractWHILL(ABC):
         """Get the mode of the WHILL interface (real or mock)."""
         pass
 
+    def get_stats(self) -> dict[str, Any]:
+        """Get device-level statistics (empty unless the implementation collects any)."""
+        return {}
+
     def is_connected(self) -> bool:
         """Check if the WHILL device is connected."""
         return self._connected
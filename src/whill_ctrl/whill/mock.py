@@ -18,10 +18,13 @@ class MockWHILL(AbstractWHILL):
         self._port = port
         self._connected = True
         self._last_error = None
+        self._front = 0
+        self._side = 0
         logger.info(f"Using mock WHILL on port {port}")
 
     async def send_joystick(self, *, front: int, side: int) -> None:
         async with self._lock:
+            self._front, self._side = front, side
             logger.debug(f"[Mock] Joystick command: front={front}, side={side}")
 
     async def send_power_on(self) -> None:
@@ -34,8 +37,25 @@ class MockWHILL(AbstractWHILL):
 
     async def send_emergency_stop(self) -> None:
         async with self._lock:
+            self._front = self._side = 0
             logger.debug("[Mock] Emergency stop command (set velocity to 0)")
 
+    async def read_telemetry(self) -> dict[str, Any]:
+        """最後のジョイスティック値から擬似的なテレメトリを生成する"""
+        if not self._connected:
+            return {}
+        # 最大約6km/h（モーター速度の単位に合わせた概算）
+        speed = self._front * 0.06
+        turn = self._side * 0.03
+        return {
+            "battery_level": 100,
+            "battery_current": 0.0,
+            "right_speed": speed - turn,
+            "left_speed": speed + turn,
+            "power_status": 1,
+            "error_code": 0,
+        }
+
     async def disconnect(self) -> None:
         async with self._lock:
             self._connected = False
@@ -2,6 +2,7 @@
 実際のWHILLデバイスに接続するための実装
 """
 
+import asyncio
 from typing import Any
 
 from loguru import logger
@@ -18,6 +19,11 @@ except ImportError:
 class RealWHILL(AbstractWHILL):
     """実機のWHILLデバイスを制御するクラス"""
 
+    # テレメトリ（データセット1）の送信間隔（ミリ秒）
+    TELEMETRY_INTERVAL_MS = 100
+    # シリアルの読み取りのタイムアウト（秒）、途中で途切れたパケットで読み取りが戻らなくならないようにする
+    READ_TIMEOUT = 0.5
+
     def __init__(self, port: str) -> None:
         super().__init__()
         if ComWHILL is None:
@@ -25,12 +31,15 @@ class RealWHILL(AbstractWHILL):
         self._port = port
         self._device = None
         self._last_error = None
+        self._streaming = False
+        self._telemetry: dict[str, Any] = {}
         self._connect(port)
 
     def _connect(self, port: str) -> None:
         """低レベル接続処理 - 例外を発生させる可能性あり"""
         try:
-            self._device = ComWHILL(port=port)
+            self._device = ComWHILL(port=port, timeout=self.READ_TIMEOUT)
+            self._streaming = False
             self._connected = True
             self._port = port
             self._last_error = None
@@ -97,6 +106,55 @@ class RealWHILL(AbstractWHILL):
                 self._connected = False
                 self._last_error = str(e)
 
+    async def drain(self) -> None:
+        """シリアルポートの送信バッファが空になるまで待機する（キャリブレーション用）"""
+        async with self._lock:
+            if not self._connected or self._device is None:
+                return
+
+            try:
+                # flush() は送信完了までブロックするため、イベントループを止めないよう別スレッドで待つ
+                await asyncio.to_thread(self._device.com.flush)
+            except Exception as e:
+                logger.error(f"Error draining serial port: {e}")
+                self._connected = False
+                self._last_error = str(e)
+
+    async def read_telemetry(self) -> dict[str, Any]:
+        """受信済みのデータセット1からテレメトリを取得する（初回にデータストリームを開始）"""
+        async with self._lock:
+            if not self._connected or self._device is None:
+                return {}
+
+            try:
+                # refresh() は受信済みのパケットを読み切るまでブロックするため、イベントループを止めないよう別スレッドで読む
+                refreshed = await asyncio.to_thread(self._refresh)
+            except Exception as e:
+                logger.error(f"Error reading telemetry: {e}")
+                self._connected = False
+                self._last_error = str(e)
+                return {}
+
+            # refresh()は新しいデータがないと電源状態などを0に戻すため、受信した時だけ更新する
+            if refreshed:
+                device = self._device
+                self._telemetry = {
+                    "battery_level": device.battery["level"],
+                    "battery_current": device.battery["current"],
+                    "right_speed": device.right_motor["speed"],
+                    "left_speed": device.left_motor["speed"],
+                    "power_status": device.power_status,
+                    "error_code": device.error_code,
+                }
+            return self._telemetry
+
+    def _refresh(self) -> bool:
+        """データストリームを開始し（初回のみ）、受信済みのデータセットを読み取る（別スレッドで実行する）"""
+        if not self._streaming:
+            self._device.start_data_stream(self.TELEMETRY_INTERVAL_MS, data_set_number=1)
+            self._streaming = True
+        return self._device.refresh()
+
     async def disconnect(self) -> None:
         async with self._lock:
             if self._device is None:
@@ -0,0 +1,82 @@
+"""
+アドミッション制御のテスト
+
+送信元・コマンド種別ごとのトークンバケットでレートを制限し、緊急停止はレート制限を受けないこと、
+1つの送信元があふれても他の送信元のコマンドは受け付けることを確認する
+"""
+
+import asyncio
+
+from whill_ctrl.controller.admission import AdmissionControl
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.whill.mock import MockWHILL
+
+
+class StopCountingWHILL(MockWHILL):
+    """緊急停止と電源オンの回数を記録するモック"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.emergency_stops = 0
+        self.power_ons = 0
+
+    async def send_emergency_stop(self) -> None:
+        self.emergency_stops += 1
+        await super().send_emergency_stop()
+
+    async def send_power_on(self) -> None:
+        self.power_ons += 1
+        await super().send_power_on()
+
+
+def test_token_bucket_allows_the_burst_then_the_rate():
+    admission = AdmissionControl(joystick_rate=10.0, joystick_burst=5.0)
+    assert [admission.admit("osc:a", "joystick", now=0.0) for _ in range(7)] == [True] * 5 + [False] * 2
+
+    # 0.25秒で2.5トークン補充される
+    assert [admission.admit("osc:a", "joystick", now=0.25) for _ in range(3)] == [True, True, False]
+
+    # 制限は送信元ごと・コマンド種別ごと
+    assert admission.admit("osc:b", "joystick", now=0.25)
+    assert admission.admit("osc:a", "power_on", now=0.25)
+
+    stats = admission.get_stats()
+    assert stats["throttled"] == 3
+    assert stats["sources"]["osc:a"] == {"accepted": 8, "throttled": 3, "rejected": 0}
+    assert stats["sources"]["osc:b"] == {"accepted": 1, "throttled": 0, "rejected": 0}
+
+
+def test_emergency_stop_is_never_throttled():
+    admission = AdmissionControl(command_rate=1.0, command_burst=1.0)
+    assert admission.admit("mqtt:x", "power_on", now=0.0)
+    assert not admission.admit("mqtt:x", "power_on", now=0.0)
+    assert all(admission.admit("mqtt:x", "emergency_stop", now=0.0) for _ in range(100))
+    assert admission.get_stats()["sources"]["mqtt:x"]["throttled"] == 1
+
+
+def test_flooding_source_does_not_block_others_or_the_emergency_stop():
+    async def scenario():
+        device = StopCountingWHILL()
+        controller = WHILLController(device, 0, control_rate=0, calibration_frames=0, telemetry_interval=0)
+        controller.admission.configure(joystick_rate=1.0, joystick_burst=1.0, command_rate=1.0, command_burst=1.0)
+        # レート制限の時計を止め、トークンが補充されないようにする
+        controller.clock = lambda: 0.0
+        await controller.start()
+        try:
+            accepted = [controller.submit_joystick(50, 0, source="osc:flood") for _ in range(100)]
+            assert accepted.count(True) == 1
+            assert controller.submit_joystick(20, 0, source="osc:other")
+
+            for _ in range(3):
+                await controller.handle_osc_command("power_on", source="osc:flood")
+            await controller.handle_osc_command("emergency_stop", source="osc:flood")
+            assert device.power_ons == 1
+            assert device.emergency_stops == 1
+
+            sources = controller.admission.get_stats()["sources"]
+            assert sources["osc:flood"]["throttled"] == 99 + 2
+            assert sources["osc:other"]["throttled"] == 0
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
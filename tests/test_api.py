@@ -0,0 +1,45 @@
+"""
+組み込みAPIのテスト
+
+from whill_ctrl import * で組み込みの open を上書きしないこと、
+Chair のプロパティから制御ループのフィルター・送信レート・イベントバスを参照できることを確認する
+"""
+
+import asyncio
+import builtins
+
+import whill_ctrl
+from whill_ctrl.controller.events import LATEST
+
+
+def test_star_import_does_not_shadow_the_builtin_open():
+    namespace: dict = {}
+    exec("from whill_ctrl import *", namespace)
+    assert "open" not in namespace
+    assert "Chair" in namespace
+    exec("from whill_ctrl.api import *", namespace)
+    assert "open" not in namespace
+    assert builtins.open is not whill_ctrl.open
+
+
+def test_chair_exposes_the_control_loop():
+    async def scenario():
+        options = {"control_rate": 0, "telemetry_interval": 0, "calibration_frames": 0}
+        async with whill_ctrl.open("test", mock=True, **options) as chair:
+            subscription = chair.events.state.subscribe(policy=LATEST)
+            try:
+                assert chair.set_joystick(30, -10)
+                # 目標値は制御ループが取り出してフィルターに渡す
+                await asyncio.sleep(0.05)
+                assert (chair.filters.target.front, chair.filters.target.side) == (30, -10)
+                assert chair.send_rate.get_stats()["max_rate"] == 0
+                assert chair.admission.get_stats()["sources"]["api"]["accepted"] == 1
+
+                await chair.calibrate(frames=5)
+                event = await asyncio.wait_for(subscription.get(), 1.0)
+                assert event.name == "link_calibrated"
+                assert chair.send_rate.calibrations == 1
+            finally:
+                subscription.close()
+
+    asyncio.run(scenario())
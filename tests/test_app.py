@@ -0,0 +1,261 @@
+"""
+アプリケーションの初期化のテスト
+
+初期化に失敗した場合に、開いたデバイス・制御タスク・リースを残さないこと、
+待機系が稼働系の停止からリースのタイムアウト以内に制御を引き継ぐこと、
+設定の再読み込みで変更された項目だけを稼働中のコンポーネントに適用することを確認する
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from whill_ctrl.config import reload_settings
+from whill_ctrl.core import app as app_module
+from whill_ctrl.core.app import Application
+from whill_ctrl.osc.sockets import bind_osc_socket, reserve_osc_port
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    """設定ファイル・ログを一時ディレクトリに置き、計測を省いて起動する"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("LINK_CALIBRATION_FRAMES", "0")
+    monkeypatch.delenv("NOTIFY_SOCKET", raising=False)
+
+
+def lease_is_free(path) -> bool:
+    """他のプロセスがリースを保持していないか"""
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def test_unsupported_shm_is_rejected_before_opening_the_device(app_env, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "shared_setpoint_supported", lambda: False)
+
+    async def scenario():
+        app = Application()
+        initialized = await app.initialize(
+            None,
+            "127.0.0.1",
+            0,
+            "localhost",
+            1883,
+            "whill/commands/#",
+            True,
+            True,
+            False,
+            shm_name="whill-test",
+            lease_path=tmp_path / "lease",
+        )
+        assert not initialized
+        assert app.controller is None
+        assert app.lease is None
+
+    asyncio.run(scenario())
+
+
+def test_failed_server_start_releases_the_device_and_the_lease(app_env, tmp_path):
+    busy = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    busy.bind(("127.0.0.1", 0))
+    lease_path = tmp_path / "lease"
+
+    async def scenario():
+        app = Application()
+        initialized = await app.initialize(
+            None,
+            "127.0.0.1",
+            busy.getsockname()[1],
+            "localhost",
+            1883,
+            "whill/commands/#",
+            True,
+            True,
+            False,
+            lease_path=lease_path,
+        )
+        assert not initialized
+        assert app.shutdown_event.is_set()
+        # 制御タスクを止めてデバイスを閉じ、リースを解放している
+        assert not app.controller.running
+        assert app.controller.control_task.done()
+        assert not app.controller.whill.is_connected()
+        assert lease_is_free(lease_path)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        busy.close()
+
+
+# リースを保持してハートビートを書き込み続け、OSCのポートをSO_REUSEPORTでバインドする稼働系
+PRIMARY = """
+import sys
+import time
+
+from whill_ctrl.core.lease import Lease
+from whill_ctrl.osc.sockets import bind_osc_socket
+
+lease = Lease(sys.argv[1])
+assert lease.try_acquire("primary-port")
+sock = bind_osc_socket("127.0.0.1", int(sys.argv[2]), reuse_port=True)
+print("ready", flush=True)
+while True:
+    lease.heartbeat("primary-port", True, 30, -10)
+    time.sleep(0.02)
+"""
+
+
+def free_udp_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_reserved_osc_port_leaves_datagrams_to_the_primary():
+    port = free_udp_port()
+    primary = bind_osc_socket("127.0.0.1", port, reuse_port=True)
+    reserved = reserve_osc_port("127.0.0.1", port)
+    try:
+        for _ in range(50):
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                client.sendto(b"x", ("127.0.0.1", port))
+        time.sleep(0.05)
+        assert drain_socket(primary) == 50
+        assert drain_socket(reserved) == 0
+    finally:
+        primary.close()
+        reserved.close()
+
+
+def drain_socket(sock: socket.socket) -> int:
+    count = 0
+    while True:
+        try:
+            sock.recv(64)
+        except BlockingIOError:
+            return count
+        count += 1
+
+
+def test_standby_takes_over_within_the_lease_timeout(app_env, tmp_path):
+    lease_path = tmp_path / "lease"
+    osc_port = free_udp_port()
+    primary = subprocess.Popen(
+        [sys.executable, "-c", PRIMARY, str(lease_path), str(osc_port)],
+        stdout=subprocess.PIPE,
+        env={**os.environ, "PYTHONPATH": str(Path(__file__).parents[1] / "src")},
+        text=True,
+    )
+
+    async def scenario():
+        assert primary.stdout.readline().strip() == "ready"
+        app = Application()
+        initialize = asyncio.create_task(
+            app.initialize(
+                None,
+                "127.0.0.1",
+                osc_port,
+                "localhost",
+                1883,
+                "whill/commands/#",
+                True,
+                True,
+                False,
+                standby=True,
+                lease_path=lease_path,
+            )
+        )
+        try:
+            # 待機中にOSCのポートを確保し、稼働系の状態をミラーしている
+            while app.standby_osc_socket is None or app.lease.read() is None:
+                assert not initialize.done()
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.1)
+            assert not initialize.done()
+
+            killed_at = time.monotonic()
+            primary.kill()
+            assert await initialize
+            elapsed = time.monotonic() - killed_at
+
+            timeout = app.settings.lease_timeout
+            assert elapsed < timeout
+            assert app.lease.takeover["ready_ms"] < timeout * 1000
+            assert app.lease.takeover["previous_pid"] == primary.pid
+            # 待ち受けは確保したポートで、稼働系のポートと送信済みの値から再開する
+            assert app.standby_osc_socket is None
+            assert app.osc_server.transport.get_extra_info("sockname")[1] == osc_port
+            assert app.controller.whill.port == "primary-port"
+            await asyncio.sleep(0.05)
+            assert (app.controller.suppressor.last_front, app.controller.suppressor.last_side) == (30, -10)
+        finally:
+            if not initialize.done():
+                initialize.cancel()
+            await app._shutdown()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        primary.kill()
+        primary.wait()
+
+
+def test_reload_applies_only_the_changed_settings(app_env):
+    async def scenario():
+        app = Application()
+        assert await app.initialize(
+            None, "127.0.0.1", free_udp_port(), "localhost", 1883, "whill/commands/#", True, True, False
+        )
+        try:
+            device = app.controller.whill
+            osc_transport = app.osc_server.transport
+
+            # 変更がなければ何も作り直さない
+            result = await app.reload_config()
+            assert result == {"ok": True, "changed": [], "error": None}
+
+            # 制御ループとレート制限だけを変更しても、OSCソケットとシリアル接続はそのまま
+            result = await app.reload_config({"control_rate": 20.0, "admission_joystick_rate": 5.0})
+            assert result == {"ok": True, "changed": ["control_rate", "admission_joystick_rate"], "error": None}
+            assert app.controller.control_rate == 20.0
+            assert app.controller.admission.limits["joystick"][0] == 5.0
+            assert app.osc_server.transport is osc_transport
+            assert app.controller.whill is device
+            assert json.loads(app.config_file.read_text())["control_rate"] == 20.0
+
+            # ポートの変更はOSCソケットだけを作り直す
+            osc_port = free_udp_port()
+            result = await app.reload_config({"osc_port": osc_port})
+            assert result["changed"] == ["osc_port"]
+            assert app.osc_server.transport is not osc_transport
+            assert app.osc_server.transport.get_extra_info("sockname")[1] == osc_port
+            assert app.controller.whill is device
+
+            # 不正な値は適用せず、現在の設定を維持する
+            result = await app.reload_config({"control_rate": "fast"})
+            assert not result["ok"] and result["changed"] == []
+            assert app.settings.control_rate == 20.0
+            assert app.controller.control_rate == 20.0
+        finally:
+            await app._shutdown()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        reload_settings({})
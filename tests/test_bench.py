@@ -0,0 +1,59 @@
+"""
+性能の予算のテスト
+
+ベンチマークの代表的な点を計測し、書き込みレートと遅延が制御レートから決まる予算に収まることを確認する
+"""
+
+import os
+
+import pytest
+
+from whill_ctrl.diagnostics.bench import BenchHarness, BenchPoint
+from whill_ctrl.mqtt.client import parse_broker_address
+
+CONTROL_RATE = 50.0
+
+# MQTTの点で使うブローカー（host:port、未指定の場合はMQTTの点を実行しない）
+MQTT_BROKER = os.environ.get("WHILL_BENCH_MQTT_BROKER")
+requires_broker = pytest.mark.skipif(not MQTT_BROKER, reason="WHILL_BENCH_MQTT_BROKER is not set")
+
+
+@pytest.mark.parametrize(
+    ("rate", "sources", "latency_ms", "transports", "ingest"),
+    [
+        pytest.param(20, 1, 0, ("osc",), "inline", id="below-control-rate"),
+        pytest.param(50, 1, 0, ("osc",), "inline", id="at-control-rate"),
+        pytest.param(200, 4, 2, ("osc",), "inline", id="contended"),
+        pytest.param(200, 16, 10, ("osc",), "inline", id="many-sources-slow-link"),
+        pytest.param(50, 1, 20, ("osc",), "inline", id="link-limited"),
+        pytest.param(50, 4, 2, ("osc",), "threaded", id="threaded"),
+        pytest.param(200, 16, 2, ("osc",), "threaded", id="threaded-many-sources"),
+        pytest.param(50, 4, 2, ("mqtt",), "inline", id="mqtt", marks=requires_broker),
+        pytest.param(50, 4, 2, ("osc", "mqtt"), "threaded", id="mqtt-threaded", marks=requires_broker),
+    ],
+)
+def test_bench_point_within_budget(rate, sources, latency_ms, transports, ingest):
+    point = BenchPoint(rate, sources, latency_ms, transports, ingest)
+    harness = BenchHarness(
+        [point],
+        duration=1.0,
+        control_rate=CONTROL_RATE,
+        mqtt_broker=parse_broker_address(MQTT_BROKER) if MQTT_BROKER else None,
+        repeat=2,
+    )
+    result = harness.measure(point)
+    assert result["failures"] == []
+    # 送信元が増えても、書き込みは送信レートの上限を超えない
+    assert result["write_rate"] <= CONTROL_RATE + 1
+
+
+def test_send_rate_limit_follows_control_rate_and_link():
+    harness = BenchHarness([], control_rate=CONTROL_RATE)
+    assert harness.send_rate_limit(0, 0.7) == CONTROL_RATE
+    assert harness.send_rate_limit(10, 0.7) == CONTROL_RATE
+    assert harness.send_rate_limit(20, 0.7) == pytest.approx(35.0)
+
+
+def test_mqtt_points_require_a_broker():
+    with pytest.raises(ValueError):
+        BenchHarness([BenchPoint(50, 1, 0, ("mqtt",))])
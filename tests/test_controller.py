@@ -0,0 +1,155 @@
+"""
+コントローラーの制御ループのテスト
+
+モックのWHILLデバイスに書き込まれた値を記録し、送信済みの値の記録・再送を確認する
+"""
+
+import asyncio
+import time
+
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.controller.filters import DuplicateSuppressor
+from whill_ctrl.whill.mock import MockWHILL
+
+
+class RecordingWHILL(MockWHILL):
+    """書き込まれたジョイスティックの値を記録するモック（failing の間は実機と同じく失敗を握りつぶして切断する）"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.writes: list[tuple[int, int]] = []
+        self.failing = False
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        if not self._connected:
+            return
+        if self.failing:
+            self._connected = False
+            return
+        self.writes.append((front, side))
+        await super().send_joystick(front=front, side=side)
+
+
+def make_controller(device: RecordingWHILL, command_deadline: float = 0.0, **kwargs) -> WHILLController:
+    """レート制限・キャリブレーション・テレメトリなしのコントローラー"""
+    kwargs.setdefault("control_rate", 0)
+    return WHILLController(device, command_deadline, calibration_frames=0, telemetry_interval=0, **kwargs)
+
+
+async def settle() -> None:
+    """制御ループが目標値を処理し終えるまで待つ"""
+    await asyncio.sleep(0.05)
+
+
+def test_should_send_does_not_record_the_value():
+    suppressor = DuplicateSuppressor(0.0)
+    assert suppressor.should_send(0, 0, 1.0)
+    assert suppressor.should_send(0, 0, 1.0)
+    assert suppressor.last_front is None and suppressor.sent == 0
+
+    suppressor.record_sent(0, 0, 1.0)
+    assert not suppressor.should_send(0, 0, 2.0)
+    assert suppressor.should_send(0, 0, 2.0, fresh=True)
+    assert suppressor.sent == 1
+
+
+def test_failed_stop_is_resent_after_reconnect():
+    async def scenario():
+        device = RecordingWHILL()
+        controller = make_controller(device)
+        await controller.start()
+        try:
+            controller.submit_joystick(50, 0, source="test")
+            await settle()
+            assert device.writes == [(50, 0)]
+
+            # 停止の書き込みが失敗して切断された値は送信済みとして扱わない
+            device.failing = True
+            controller.submit_joystick(0, 0, source="test")
+            await settle()
+            assert controller.suppressor.last_front == 50
+            assert controller.suppressor.sent == 1
+
+            device.failing = False
+            assert await controller.change_port("test")
+            await settle()
+            assert device.writes[-1] == (0, 0)
+            assert controller.suppressor.last_front == 0
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_emergency_stop_is_resent_after_reconnect():
+    async def scenario():
+        device = RecordingWHILL()
+        controller = make_controller(device)
+        await controller.start()
+        try:
+            controller.submit_joystick(0, 0, source="test")
+            await settle()
+            device.failing = True
+            device._connected = False
+            await controller.handle_api_command("emergency_stop", source="test")
+            assert controller.suppressor.last_front is None
+
+            device.failing = False
+            assert await controller.change_port("test")
+            await settle()
+            assert device.writes[-1] == (0, 0)
+            assert len(device.writes) == 2
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
+
+
+def test_setpoint_expiring_while_waiting_for_the_lock_is_not_written():
+    async def scenario():
+        device = RecordingWHILL()
+        controller = make_controller(device, command_deadline=0.1)
+        await controller.start()
+        try:
+            controller.submit_joystick(20, 0, source="test")
+            await settle()
+
+            # 他のコマンドがロックを保持している間に期限が切れる
+            async with controller.command_lock:
+                assert controller.submit_joystick(50, 0, source="test")
+                await asyncio.sleep(0.2)
+            await settle()
+            assert device.writes == [(20, 0)]
+            assert controller.freshness.expired == 1
+            assert controller.setpoint_filter.target.front == 20
+
+            # 期限内にロックが解放されれば書き込む
+            async with controller.command_lock:
+                assert controller.submit_joystick(60, 0, source="test")
+                await asyncio.sleep(0.01)
+            await settle()
+            assert device.writes == [(20, 0), (60, 0)]
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
+
+
+def test_out_of_order_and_expired_inputs_are_not_written():
+    async def scenario():
+        device = RecordingWHILL()
+        controller = make_controller(device, command_deadline=0.5)
+        await controller.start()
+        try:
+            now = time.time()
+            assert controller.submit_joystick(30, 0, source="test", seq=5, sent_at=now)
+            assert not controller.submit_joystick(40, 0, source="test", seq=4, sent_at=now)
+            assert not controller.submit_joystick(50, 0, source="test", seq=6, sent_at=now - 1.0)
+            await settle()
+            assert device.writes == [(30, 0)]
+            stats = controller.get_stats()["joystick"]
+            assert stats["out_of_order"] == 1 and stats["expired"] == 1
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,125 @@
+"""
+イベントバスのテスト
+
+あふれた場合の方針ごとに残るイベント、購読者の処理が遅れても発行が待たないこと、
+処理中・キュー内のイベントを再利用で上書きしないことを確認する
+"""
+
+import asyncio
+import threading
+import time
+
+from whill_ctrl.controller.events import DROP_NEWEST, DROP_OLDEST, LATEST, Channel, EventBus, TelemetryEvent
+
+
+def publish_range(channel: Channel, count: int) -> None:
+    for i in range(count):
+        channel.publish({"seq": i}, float(i))
+
+
+def drain(subscription) -> list[int]:
+    seqs = []
+    while (event := subscription.get_nowait()) is not None:
+        seqs.append(event.telemetry["seq"])
+    return seqs
+
+
+def test_drop_policies_keep_the_expected_events():
+    async def scenario():
+        channel = Channel("telemetry", TelemetryEvent)
+        oldest = channel.subscribe(capacity=3, policy=DROP_OLDEST)
+        newest = channel.subscribe(capacity=3, policy=DROP_NEWEST)
+        latest = channel.subscribe(policy=LATEST)
+        publish_range(channel, 10)
+
+        assert drain(oldest) == [7, 8, 9]
+        assert drain(newest) == [0, 1, 2]
+        assert drain(latest) == [9]
+        assert [s.dropped for s in (oldest, newest, latest)] == [7, 7, 9]
+        assert channel.get_stats()["dropped"] == 23
+
+    asyncio.run(scenario())
+
+
+def test_events_are_reused_unless_still_referenced():
+    async def scenario():
+        channel = Channel("telemetry", TelemetryEvent)
+        subscription = channel.subscribe(capacity=2, policy=DROP_OLDEST)
+        publish_range(channel, 2)
+        held = subscription.get_nowait()
+        # 処理中のイベントを持ったまま、リングが何周もするほど発行する
+        publish_range(channel, 50)
+        assert held.telemetry["seq"] == 0 and held.at == 0.0
+        assert drain(subscription) == [48, 49]
+        allocated = channel.allocated
+        assert allocated > 0
+
+        # 購読者が追いついていれば、発行のたびにイベントを作らない
+        del held
+        for i in range(100):
+            channel.publish({"seq": i}, float(i))
+            assert subscription.get_nowait().telemetry["seq"] == i
+        assert channel.allocated == allocated
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_does_not_delay_the_publisher():
+    async def scenario():
+        channel = Channel("telemetry", TelemetryEvent)
+        subscription = channel.subscribe(capacity=8, policy=DROP_OLDEST)
+        received = []
+
+        async def consume():
+            async for event in subscription:
+                received.append(event.telemetry["seq"])
+                await asyncio.sleep(0.01)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        for i in range(1000):
+            channel.publish({"seq": i}, float(i))
+        elapsed = time.perf_counter() - started
+        await asyncio.sleep(0.2)
+        consumer.cancel()
+
+        # 発行は購読者を待たず、遅れた購読者は上限を超えた古いイベントを捨てて最新に追いつく
+        assert elapsed < 0.1
+        assert received[-1] == 999
+        assert subscription.dropped >= 1000 - 8 - len(received)
+        assert received == sorted(received)
+
+    asyncio.run(scenario())
+
+
+def test_subscriber_on_another_thread_is_woken():
+    bus = EventBus()
+    ready = threading.Event()
+    result = []
+
+    def consume():
+        async def scenario():
+            subscription = bus.state.subscribe(policy=LATEST)
+            ready.set()
+            event = await asyncio.wait_for(subscription.get(), 2.0)
+            result.append((event.name, event.connected, event.port))
+
+        asyncio.run(scenario())
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    assert ready.wait(2.0)
+    time.sleep(0.05)
+    assert bus.state.active
+    bus.state.publish("port_changed", True, "/dev/ttyUSB0", time.time())
+    thread.join(2.0)
+    assert result == [("port_changed", True, "/dev/ttyUSB0")]
+    assert "commands" not in bus.get_stats()
+
+
+def test_publish_without_subscribers_is_skipped():
+    channel = Channel("telemetry", TelemetryEvent)
+    assert not channel.active
+    channel.publish({}, 0.0)
+    assert channel.published == 0
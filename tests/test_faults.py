@@ -0,0 +1,76 @@
+"""
+障害を注入するデバイスのテスト
+
+同じシードでは書き込みの失敗・遅延・再接続の失敗が同じ順序で発生し、シードを変えると変わること、
+文字列の指定から同じ設定を作り直せることを確認する
+"""
+
+import asyncio
+
+import pytest
+
+from whill_ctrl.whill.factory import create_whill_device
+from whill_ctrl.whill.faults import FaultProfile, FaultyWHILL, LatencyDistribution
+from whill_ctrl.whill.mock import MockWHILL
+
+
+class WriteLogWHILL(MockWHILL):
+    """書き込まれたジョイスティックの値を記録するモック"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.writes: list[int] = []
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        self.writes.append(front)
+        await super().send_joystick(front=front, side=side)
+
+
+SPEC = "seed=7,latency=uniform:0:0.2,failure_rate=0.3,disconnect_on_failure=0,reconnect_failure_rate=0.5"
+
+
+def run_session(spec: str) -> tuple[list[int], list[bool], dict]:
+    """100回の書き込みと20回の再接続を行い、届いた書き込み・再接続の結果・統計を返す"""
+
+    async def scenario():
+        inner = WriteLogWHILL()
+        device = FaultyWHILL(inner, FaultProfile.parse(spec))
+        for i in range(100):
+            await device.send_joystick(front=i % 100, side=0)
+        reconnects = [await device.reconnect() for _ in range(20)]
+        return inner.writes, reconnects, device.get_stats()
+
+    return asyncio.run(scenario())
+
+
+def test_same_seed_reproduces_the_same_faults():
+    writes, reconnects, stats = run_session(SPEC)
+    assert run_session(SPEC) == (writes, reconnects, stats)
+
+    # 失敗した書き込みはデバイスに届かない
+    assert stats["writes"] == 100
+    assert len(writes) == 100 - stats["failures"]
+    assert 0 < stats["failures"] < 100
+    assert reconnects.count(False) == stats["reconnect_failures"] > 0
+
+    other = run_session(SPEC.replace("seed=7", "seed=8"))
+    assert other[:2] != (writes, reconnects)
+
+
+def test_profile_round_trips_through_its_string_form():
+    profile = FaultProfile.parse(SPEC + ",disconnect_interval=60,disconnect_jitter=5,blocking=yes")
+    assert str(FaultProfile.parse(str(profile))) == str(profile)
+    assert str(profile.latency) == "uniform:0:0.2"
+    assert profile.blocking and not profile.disconnect_on_failure
+
+    with pytest.raises(ValueError):
+        FaultProfile.parse("jitter=1")
+    with pytest.raises(ValueError):
+        LatencyDistribution.parse("uniform:1")
+
+
+def test_factory_wraps_the_device_with_faults():
+    device = create_whill_device("test", use_mock=True, faults="seed=1,failure_rate=0.1")
+    assert isinstance(device, FaultyWHILL)
+    assert device.get_mode().endswith("+faults")
+    assert device.profile.seed == 1
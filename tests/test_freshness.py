@@ -0,0 +1,61 @@
+"""
+コマンドの鮮度ゲートのテスト
+"""
+
+import math
+
+from whill_ctrl.controller.freshness import CommandFreshness, estimate_clock_offset
+
+
+def test_expired_command_is_rejected():
+    freshness = CommandFreshness(0.5)
+    assert freshness.admit("a", None, 100.0, 100.1, now=100.2)
+    assert not freshness.admit("a", None, 100.0, 100.1, now=100.6)
+    # クライアント時刻がなければ受信時刻から判定する
+    assert not freshness.admit("a", None, None, 100.0, now=100.6)
+    assert freshness.get_stats() == {"accepted": 1, "expired": 2, "out_of_order": 0}
+
+
+def test_out_of_order_command_is_rejected_until_reset():
+    freshness = CommandFreshness(0.0, reset_after=5.0)
+    assert freshness.admit("a", 10, None, None, now=1.0)
+    assert not freshness.admit("a", 9, None, None, now=1.1)
+    assert not freshness.admit("a", 10, None, None, now=1.2)
+    # 他の送信元のシーケンス番号とは独立
+    assert freshness.admit("b", 1, None, None, now=1.3)
+    assert freshness.admit("a", 11, None, None, now=1.4)
+    # しばらく更新のない送信元は再起動したものとみなす
+    assert freshness.admit("a", 1, None, None, now=7.0)
+    assert freshness.out_of_order == 2
+
+
+def test_expires_at_uses_the_same_origin_as_admit():
+    freshness = CommandFreshness(0.5)
+    assert freshness.expires_at(100.0, 100.2) == 100.5
+    assert freshness.expires_at(None, 100.2) == 100.7
+    assert CommandFreshness(0.0).expires_at(100.0, 100.2) == math.inf
+
+
+def test_sources_are_evicted_least_recently_updated_first():
+    freshness = CommandFreshness(0.0, reset_after=5.0)
+    freshness.MAX_SOURCES = 3
+    for i, source in enumerate("abc"):
+        assert freshness.admit(source, 10, None, None, now=1.0 + i * 0.01)
+    # a を更新すると、最も長く更新のない b が先に削除される
+    assert freshness.admit("a", 11, None, None, now=1.1)
+    assert freshness.admit("d", 1, None, None, now=1.2)
+    assert len(freshness._last_seq) == 3
+    assert "b" not in freshness._last_seq
+    # 送信元がすべて有効期間内でも上限を超えない
+    for i in range(10):
+        assert freshness.admit(f"s{i}", 1, None, None, now=1.3)
+    assert len(freshness._last_seq) == 3
+    # 残っている送信元の順序逆転は引き続き破棄する
+    assert not freshness.admit("s9", 1, None, None, now=1.4)
+
+
+def test_estimate_clock_offset():
+    # サーバー時計がクライアントより10秒進み、片道0.1秒
+    offset, delay = estimate_clock_offset(0.0, 10.1, 10.2, 0.3)
+    assert math.isclose(offset, 10.0)
+    assert math.isclose(delay, 0.2)
@@ -0,0 +1,96 @@
+"""
+アイドル状態のテスト
+
+停止中にコマンドが届かなければアイドル状態へ移ってキープアライブを止め、
+最初のコマンドで通常の状態へ戻ってすぐに書き込むこと、走行中はアイドル状態へ移らないことを確認する
+"""
+
+import asyncio
+
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.controller.idle import IdleMonitor
+from whill_ctrl.whill.mock import MockWHILL
+
+QUIET_PERIOD = 0.1
+KEEPALIVE = 0.02
+
+
+class WriteLogWHILL(MockWHILL):
+    """書き込まれたジョイスティックの値を記録するモック"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.writes: list[tuple[int, int]] = []
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        self.writes.append((front, side))
+        await super().send_joystick(front=front, side=side)
+
+
+def make_controller(device: MockWHILL) -> WHILLController:
+    return WHILLController(
+        device,
+        0,
+        control_rate=0,
+        keepalive=KEEPALIVE,
+        calibration_frames=0,
+        telemetry_interval=0,
+        idle=IdleMonitor(QUIET_PERIOD, telemetry_interval=1.0, poll_interval=1.0, connection_check_interval=60.0),
+    )
+
+
+async def wait_for(condition, timeout: float = 1.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+def test_idle_stops_keepalives_and_wakes_on_the_first_command():
+    async def scenario():
+        device = WriteLogWHILL()
+        controller = make_controller(device)
+        await controller.start()
+        try:
+            controller.submit_joystick(0, 0, source="test")
+            await wait_for(lambda: controller.idle.idle)
+            assert controller.idle.entries == 1
+
+            # アイドル中はキープアライブを送らない
+            writes = len(device.writes)
+            await asyncio.sleep(KEEPALIVE * 10)
+            assert len(device.writes) == writes
+
+            # 最初のコマンドで通常の状態へ戻り、その値をすぐに書き込む
+            controller.submit_joystick(30, 0, source="test")
+            assert not controller.idle.idle
+            await wait_for(lambda: (30, 0) in device.writes, timeout=0.1)
+            await wait_for(lambda: len(controller.idle.wake_latencies) == 1)
+
+            stats = controller.idle.get_stats()
+            assert stats["state"] == "active"
+            assert stats["wakes"] == 1
+            assert stats["idle_s"] >= KEEPALIVE * 10
+            assert stats["wake_latency_ms"]["last"] < 100
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
+
+
+def test_moving_chair_does_not_enter_idle():
+    async def scenario():
+        device = WriteLogWHILL()
+        controller = make_controller(device)
+        await controller.start()
+        try:
+            controller.submit_joystick(30, 0, source="test")
+            await asyncio.sleep(QUIET_PERIOD * 3)
+            assert not controller.idle.idle
+            assert controller.idle.entries == 0
+            # 走行中はキープアライブで同じ値を送り続ける
+            assert device.writes.count((30, 0)) > 1
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
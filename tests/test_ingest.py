@@ -0,0 +1,156 @@
+"""
+入力スレッドモードの受け渡しのテスト
+
+入力スレッドからブリッジへ受け渡したジョイスティックと個別コマンドが、デバイスループで届いた順に処理されること、
+複数スレッドから同時に受け渡しても最新値が失われないことを確認する（free-threadedビルドでも同じテストで確認する）
+"""
+
+import asyncio
+import threading
+import time
+
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.ingest.handoff import IngestBridge
+from whill_ctrl.ingest.thread import IngestThread, ThreadedComponent
+from whill_ctrl.whill.mock import MockWHILL
+
+
+class CallLogWHILL(MockWHILL):
+    """デバイスへの書き込みを順に記録するモック（電源オンは失敗させる）"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.calls: list[tuple] = []
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        self.calls.append(("joystick", front, side))
+        await super().send_joystick(front=front, side=side)
+
+    async def send_power_on(self) -> None:
+        self.calls.append(("power_on",))
+        raise RuntimeError("serial write failed")
+
+    async def send_emergency_stop(self) -> None:
+        self.calls.append(("emergency_stop",))
+        await super().send_emergency_stop()
+
+
+def run_threaded(scenario) -> None:
+    """デバイスループでコントローラーとブリッジを、入力スレッドで scenario(bridge) を実行する"""
+
+    async def main():
+        device = CallLogWHILL()
+        controller = WHILLController(device, 0, control_rate=0, calibration_frames=0, telemetry_interval=0)
+        await controller.start()
+        bridge = IngestBridge(controller)
+        bridge.start()
+        thread = IngestThread("test")
+        thread.start()
+        try:
+            # 入力スレッドの1回のコールバックで受け渡すため、デバイスループは1回の受け渡しでまとめて処理する
+            await thread.call(scenario(bridge))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if bridge._backlog is None and not bridge.commands:
+                    break
+            await asyncio.sleep(0.05)
+            return device
+        finally:
+            await thread.stop()
+            bridge.stop()
+            await controller.stop()
+
+    return asyncio.run(main())
+
+
+def test_joystick_after_emergency_stop_is_applied_after_the_stop():
+    async def scenario(bridge):
+        bridge.submit_joystick(50, 0, source="b")
+        await bridge.handle_osc_command("emergency_stop", source="a")
+        bridge.submit_joystick(40, 0, source="a")
+
+    device = run_threaded(scenario)
+    # 停止より前の値は停止で破棄され、停止の後に届いた値は停止の後に書き込まれる
+    assert device.calls == [("emergency_stop",), ("joystick", 40, 0)]
+
+
+def test_emergency_stop_wins_over_earlier_joystick():
+    async def scenario(bridge):
+        bridge.submit_joystick(50, 0, source="a")
+        bridge.submit_joystick(60, 0, source="b")
+        await bridge.handle_mqtt_command("emergency_stop", source="c")
+
+    device = run_threaded(scenario)
+    assert device.calls == [("emergency_stop",)]
+
+
+def test_failing_command_does_not_drop_queued_emergency_stop():
+    async def scenario(bridge):
+        await bridge.handle_osc_command("power_on", source="a")
+        await bridge.handle_osc_command("emergency_stop", source="a")
+
+    device = run_threaded(scenario)
+    assert device.calls == [("power_on",), ("emergency_stop",)]
+
+
+def test_concurrent_producers_do_not_lose_the_latest_value():
+    threads = 8
+    puts = 2000
+
+    async def main():
+        controller = WHILLController(MockWHILL("test"), 0, calibration_frames=0, telemetry_interval=0)
+        applied: dict[str, list[int]] = {}
+
+        def submit_joystick(front, side, *, source=None, **kwargs):
+            applied.setdefault(source, []).append(front)
+            return True
+
+        controller.submit_joystick = submit_joystick
+        bridge = IngestBridge(controller)
+        bridge.start()
+        start = threading.Barrier(threads)
+
+        def produce(index: int) -> None:
+            start.wait()
+            for i in range(puts):
+                bridge.submit_joystick(i % 100, 0, source=f"s{index}", seq=i)
+                bridge.submit_joystick(index, 0, source="shared")
+
+        workers = [threading.Thread(target=produce, args=(i,)) for i in range(threads)]
+        for worker in workers:
+            worker.start()
+        while any(worker.is_alive() for worker in workers):
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.05)
+        bridge.stop()
+        return applied, bridge.get_ingest_stats()
+
+    applied, stats = asyncio.run(main())
+    for index in range(threads):
+        values = applied[f"s{index}"]
+        # 各送信元の最後の値は必ず反映され、古い値が新しい値の後に反映されることはない
+        assert values[-1] == (puts - 1) % 100
+        assert len(values) <= puts
+    assert applied["shared"]
+    assert stats["joystick_sources"] == threads + 1
+
+
+def test_threaded_component_sync_call_does_not_wait_for_the_thread():
+    class Slow:
+        def stop(self):
+            time.sleep(0.3)
+            return "stopped"
+
+    async def main():
+        thread = IngestThread("test")
+        thread.start()
+        try:
+            proxy = ThreadedComponent(Slow(), thread)
+            started = time.monotonic()
+            future = proxy.stop()
+            assert time.monotonic() - started < 0.1
+            assert await asyncio.wrap_future(future) == "stopped"
+        finally:
+            await thread.stop()
+
+    asyncio.run(main())
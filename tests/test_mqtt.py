@@ -0,0 +1,200 @@
+"""
+MQTTハンドラーのテスト
+
+時間のかかる制御コマンドが受信ループを止めないこと、
+プライマリブローカーの停止でスタンバイへ切り替わり、復旧後にプライマリへ戻ること、
+待機系のセッションを接続したまま引き継げることを確認する
+（ブローカーの切り替えのテストは mosquitto がインストールされている場合のみ実行する）
+"""
+
+import asyncio
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+from aiomqtt import Client, Message
+
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.mqtt.client import MQTTHandler
+from whill_ctrl.mqtt.standby import StandbySession
+from whill_ctrl.whill.mock import MockWHILL
+
+MOSQUITTO = shutil.which("mosquitto")
+requires_mosquitto = pytest.mark.skipif(MOSQUITTO is None, reason="mosquitto is not installed")
+
+
+class SlowReconnectWHILL(MockWHILL):
+    """ポートを開き直すのに時間がかかるモック"""
+
+    async def reconnect(self, port: str | None = None) -> bool:
+        await asyncio.sleep(0.3)
+        return await super().reconnect(port=port)
+
+
+def make_handler(controller: WHILLController, port: int = 1883, **kwargs) -> MQTTHandler:
+    return MQTTHandler(
+        controller,
+        "127.0.0.1",
+        port,
+        "whill/commands/#",
+        "whill/status",
+        "whill/ctrl/#",
+        client_id="whill-test",
+        **kwargs,
+    )
+
+
+def test_change_port_does_not_stall_the_receive_loop():
+    async def scenario():
+        controller = WHILLController(SlowReconnectWHILL("test"), 0, calibration_frames=0, telemetry_interval=0)
+        handler = make_handler(controller)
+        started = time.monotonic()
+        await handler._process_message(Message("whill/ctrl/serial/change_port", b"other", 0, False, 1, None))
+        assert time.monotonic() - started < 0.1
+        assert len(handler.tasks) == 1
+
+        # ポートの変更が終わるまで待つ
+        while len(handler.tasks):
+            await asyncio.sleep(0.01)
+        assert controller.whill.port == "other"
+        assert handler.get_stats()["tasks"]["failed"] == 0
+
+    asyncio.run(scenario())
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_broker(port: int) -> subprocess.Popen:
+    """mosquitto を起動し、接続を受け付けるまで待つ"""
+    process = subprocess.Popen([MOSQUITTO, "-p", str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError(f"mosquitto did not start on port {port}")
+
+
+def stop_broker(process: subprocess.Popen) -> None:
+    process.kill()
+    process.wait(5.0)
+
+
+async def wait_for_broker(handler: MQTTHandler, broker: tuple[str, int], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while handler.current_broker != broker:
+        if time.monotonic() > deadline:
+            raise AssertionError(f"handler is connected to {handler.current_broker}, expected {broker}")
+        await asyncio.sleep(0.02)
+
+
+async def send_joystick(port: int, front: int) -> None:
+    async with Client("127.0.0.1", port, identifier=f"whill-test-sender-{front}") as client:
+        await client.publish("whill/commands/joystick/test", f"{front},0", qos=0)
+
+
+@requires_mosquitto
+def test_failover_to_standby_and_failback_to_primary():
+    primary_port, standby_port = free_port(), free_port()
+    primary = start_broker(primary_port)
+    standby = start_broker(standby_port)
+
+    async def scenario():
+        nonlocal primary
+        device = MockWHILL("test")
+        controller = WHILLController(device, 0, control_rate=0, calibration_frames=0, telemetry_interval=0)
+        await controller.start()
+        handler = make_handler(
+            controller,
+            primary_port,
+            standby_brokers=[("127.0.0.1", standby_port)],
+            reconnect_min_delay=0.02,
+            reconnect_max_delay=0.1,
+            health_check_timeout=0.2,
+            failback_interval=0.2,
+        )
+        await handler.start()
+        try:
+            await wait_for_broker(handler, ("127.0.0.1", primary_port))
+
+            # プライマリが止まるとスタンバイへ切り替わり、スタンバイ経由のコマンドを受け付ける
+            stop_broker(primary)
+            await wait_for_broker(handler, ("127.0.0.1", standby_port))
+            await send_joystick(standby_port, 30)
+            deadline = time.monotonic() + 2.0
+            while controller.setpoint_filter.target.front != 30 and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+            assert controller.setpoint_filter.target.front == 30
+
+            # プライマリが復旧すると、プライマリへ戻る
+            primary = start_broker(primary_port)
+            await wait_for_broker(handler, ("127.0.0.1", primary_port))
+            await send_joystick(primary_port, 40)
+            deadline = time.monotonic() + 2.0
+            while controller.setpoint_filter.target.front != 40 and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+            assert controller.setpoint_filter.target.front == 40
+        finally:
+            await handler.stop()
+            await controller.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for process in (primary, standby):
+            if process.poll() is None:
+                stop_broker(process)
+
+
+@requires_mosquitto
+def test_standby_session_is_handed_over_without_reconnecting():
+    port = free_port()
+    broker = start_broker(port)
+
+    async def scenario():
+        session = StandbySession([("127.0.0.1", port)], "whill-test", [("whill/commands/#", 0)])
+        await session.start()
+        deadline = time.monotonic() + 5.0
+        while session.client is None and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        assert session.get_stats()["client_id"] == "whill-test-standby"
+
+        # 待機中に届いたコマンドは読み捨てる
+        await send_joystick(port, 20)
+        while session.discarded == 0 and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        assert session.discarded == 1
+
+        adopted = await session.handover()
+        assert adopted is not None and adopted[1] == ("127.0.0.1", port)
+        controller = WHILLController(MockWHILL("test"), 0, control_rate=0, calibration_frames=0, telemetry_interval=0)
+        await controller.start()
+        handler = make_handler(controller, port)
+        handler.adopt(*adopted)
+        await handler.start()
+        try:
+            await wait_for_broker(handler, ("127.0.0.1", port))
+            assert handler.client is adopted[0]
+            await send_joystick(port, 30)
+            deadline = time.monotonic() + 2.0
+            while controller.setpoint_filter.target.front != 30 and time.monotonic() < deadline:
+                await asyncio.sleep(0.02)
+            assert controller.setpoint_filter.target.front == 30
+        finally:
+            await handler.stop()
+            await controller.stop()
+            await session.stop()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        stop_broker(broker)
@@ -0,0 +1,153 @@
+"""
+OSCのまとめ読みのテスト
+
+1回の起床で読んだデータグラムを WHILLOSCController.handle_datagrams に渡し、
+個別コマンドが受信順に、失敗したコマンドがあっても破棄されずに実行されること、
+ジョイスティックは送信元ごとに最新の値だけを処理し、サーバーは起床ごとにソケットに溜まった分をまとめて読むことを確認する
+"""
+
+import asyncio
+import socket
+import time
+
+from pythonosc.osc_message_builder import OscMessageBuilder
+
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.osc.server import OSCServer, WHILLOSCController
+from whill_ctrl.whill.mock import MockWHILL
+
+CLIENT = ("127.0.0.1", 9000)
+
+
+class CallLogWHILL(MockWHILL):
+    """デバイスへの書き込みを順に記録するモック（電源オンは失敗させる）"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.calls: list[tuple] = []
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        self.calls.append(("joystick", front, side))
+        await super().send_joystick(front=front, side=side)
+
+    async def send_power_on(self) -> None:
+        self.calls.append(("power_on",))
+        raise RuntimeError("serial write failed")
+
+    async def send_power_off(self) -> None:
+        self.calls.append(("power_off",))
+
+    async def send_emergency_stop(self) -> None:
+        self.calls.append(("emergency_stop",))
+        await super().send_emergency_stop()
+
+
+def message(address: str, *args, client: tuple[str, int] = CLIENT) -> tuple[bytes, tuple[str, int]]:
+    """OSCメッセージのデータグラム"""
+    builder = OscMessageBuilder(address=address)
+    for arg in args:
+        builder.add_arg(arg)
+    return builder.build().dgram, client
+
+
+async def drain(osc: WHILLOSCController) -> None:
+    """まとめたコマンドの処理が終わるまで待つ"""
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if osc._backlog is None:
+            return
+    raise AssertionError("backlog was not drained")
+
+
+def run(scenario) -> None:
+    async def main():
+        device = CallLogWHILL()
+        controller = WHILLController(device, 0, control_rate=0, calibration_frames=0, telemetry_interval=0)
+        await controller.start()
+        try:
+            await scenario(device, controller, WHILLOSCController(controller))
+        finally:
+            await controller.stop()
+
+    asyncio.run(main())
+
+
+def test_failing_command_does_not_drop_queued_emergency_stop():
+    async def scenario(device, controller, osc):
+        osc.handle_datagrams([message("/whill/power_on"), message("/whill/emergency_stop")])
+        # 処理中に届いた分は同じタスクの後ろに並ぶ
+        osc.handle_datagrams([message("/whill/power_off")])
+        await drain(osc)
+        assert device.calls == [("power_on",), ("emergency_stop",), ("power_off",)]
+
+    run(scenario)
+
+
+def test_backlog_keeps_arrival_order():
+    async def scenario(device, controller, osc):
+        osc.handle_datagrams(
+            [
+                message("/whill/joystick", 0.0, 0.3),
+                message("/whill/joystick", 0.0, 0.5),
+                message("/whill/emergency_stop"),
+                message("/whill/joystick", 0.0, 0.2),
+            ]
+        )
+        await drain(osc)
+        await asyncio.sleep(0.05)
+        # 緊急停止の前の未送信のジョイスティックは停止で破棄され、停止の後の値は停止の後に書き込まれる
+        assert device.calls == [("emergency_stop",), ("joystick", 20, 0)]
+        assert osc.batch_stats.coalesced == 1
+
+    run(scenario)
+
+
+def test_batch_keeps_only_the_latest_joystick_per_sender():
+    async def scenario(device, controller, osc):
+        applied = []
+        controller.submit_joystick = lambda front, side, **kwargs: applied.append((kwargs["source"], front))
+        other = ("127.0.0.1", 9001)
+        osc.handle_datagrams(
+            [
+                message("/whill/joystick", 0.0, 0.1),
+                message("/whill/joystick", 0.0, 0.4, client=other),
+                message("/whill/joystick", 0.0, 0.2),
+                message("/whill/joystick", 0.0, 0.5, client=other),
+                message("/whill/joystick", 0.0, 0.3),
+            ]
+        )
+        # ジョイスティックだけのまとめ読みはタスクを作らずに、送信元ごとの最新の値で目標値を更新する
+        assert [front for _, front in applied] == [30, 50]
+        assert len({source for source, _ in applied}) == 2
+        stats = osc.batch_stats.get_stats()
+        assert stats["joysticks_coalesced"] == 3
+        assert stats["tasks_avoided"] == 5
+
+    run(scenario)
+
+
+def test_server_drains_pending_datagrams_per_wakeup():
+    async def scenario(device, controller, osc):
+        server = OSCServer(controller, "127.0.0.1", 0, feedback_rate=0, batch_size=64)
+        assert await server.start()
+        try:
+            address = server.transport.get_extra_info("sockname")
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                for i in range(20):
+                    client.sendto(message("/whill/joystick", 0.0, i / 100)[0], address)
+                client.sendto(message("/whill/emergency_stop")[0], address)
+                client.sendto(message("/whill/joystick", 0.0, 0.25)[0], address)
+            # ループが止まっている間に届いた分は、次の起床で1回に読む
+            time.sleep(0.05)
+            await drain(server.osc_controller)
+            await asyncio.sleep(0.05)
+
+            stats = server.osc_controller.batch_stats.get_stats()
+            assert stats["batches"] == 1
+            assert stats["datagrams"] == 22
+            assert stats["joysticks_coalesced"] == 19
+            assert device.calls == [("emergency_stop",), ("joystick", 25, 0)]
+        finally:
+            server.stop()
+
+    run(scenario)
@@ -0,0 +1,60 @@
+"""
+実機のWHILLデバイス実装のテスト
+
+ComWHILL をシリアルポートを開かない偽物に差し替え、テレメトリの読み取りがイベントループを止めないことを確認する
+"""
+
+import asyncio
+import time
+
+from whill_ctrl.whill import real
+
+# 偽物の refresh() がブロックする時間（秒）
+READ_BLOCK = 0.3
+
+
+class SlowComWHILL:
+    """途中で途切れたパケットを読むように refresh() がブロックする ComWHILL"""
+
+    def __init__(self, port, timeout=None):
+        self.timeout = timeout
+        self.battery = {"level": 80, "current": 0.0}
+        self.right_motor = {"speed": 0.0}
+        self.left_motor = {"speed": 0.0}
+        self.power_status = 1
+        self.error_code = 0
+
+    def start_data_stream(self, interval_ms, data_set_number=1):
+        pass
+
+    def refresh(self):
+        time.sleep(READ_BLOCK)
+        return True
+
+
+def test_read_telemetry_does_not_block_the_event_loop(monkeypatch):
+    monkeypatch.setattr(real, "ComWHILL", SlowComWHILL)
+
+    async def scenario():
+        device = real.RealWHILL("test")
+        assert device._device.timeout == real.RealWHILL.READ_TIMEOUT
+
+        loop = asyncio.get_running_loop()
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(loop.time())
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        try:
+            telemetry = await device.read_telemetry()
+        finally:
+            task.cancel()
+        assert telemetry["battery_level"] == 80
+        # 読み取りの間もイベントループは進み続ける
+        assert len(ticks) >= 10
+        assert max(b - a for a, b in zip(ticks, ticks[1:], strict=False)) < READ_BLOCK / 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,83 @@
+"""
+トレースの記録と解析のテスト
+
+Recorderで書き出したレコードをメモリマップで読み戻し、送信元ごとの到着間隔・まとめ率・遅延・
+接続イベントと対応付けた送信の途切れが、記録した内容どおりに集計されることを確認する
+"""
+
+import json
+
+import pytest
+
+from whill_ctrl.recording.analyzer import load_records, run_analysis
+from whill_ctrl.recording.recorder import (
+    COMMANDS,
+    EVENTS,
+    FLAG_EXPIRED,
+    FLAG_KEEPALIVE,
+    KIND_COMMAND,
+    KIND_EVENT,
+    KIND_INPUT,
+    KIND_WRITE,
+    RECORD_SIZE,
+    Recorder,
+)
+
+pytest.importorskip("numpy")
+
+
+def record_session(path) -> None:
+    """2つの送信元（100Hzと50Hz）の入力と、途中で0.5秒途切れる送信を記録する"""
+    recorder = Recorder(path, buffer_records=16)
+    t0 = 1_700_000_000.0
+    for i in range(200):
+        t = t0 + i * 0.01
+        recorder.record(KIND_INPUT, t, source="osc:10.0.0.2:9000", front=30, seq=i)
+        if i % 2 == 0:
+            recorder.record(KIND_INPUT, t + 0.001, source="mqtt:app", front=30, seq=i // 2)
+        # 2回の入力を1回の送信にまとめ、受信から送信完了まで5ミリ秒
+        if i % 2 == 1 and not 100 <= i < 150:
+            recorder.record(KIND_WRITE, t, t + 0.005, front=30, value=0.002)
+    recorder.record(KIND_WRITE, t0 + 2.0, t0 + 2.0, flags=FLAG_KEEPALIVE, front=30)
+    recorder.record(KIND_INPUT, t0 + 2.1, source="api", flags=FLAG_EXPIRED)
+    recorder.record(KIND_COMMAND, t0 + 2.2, code=COMMANDS["power_on"])
+    recorder.record(KIND_EVENT, t0 + 1.2, code=EVENTS["device_disconnected"])
+    recorder.close()
+
+
+def test_recorded_session_round_trips_through_the_analyzer(tmp_path):
+    path = tmp_path / "trace.bin"
+    record_session(path)
+    # 書き込み途中で途切れた末尾のレコードは読み飛ばす
+    with open(path, "ab") as f:
+        f.write(b"\0" * (RECORD_SIZE // 2))
+
+    records = load_records([path])
+    assert records.size == 200 + 100 + 75 + 4
+    inputs = records[records["kind"] == KIND_INPUT]
+    osc = inputs[inputs["transport"] == 1]
+    assert osc["seq"].tolist() == list(range(200))
+    assert set(osc["front"].tolist()) == {30}
+
+    output = tmp_path / "report.json"
+    report = run_analysis([path], output=output, stall_threshold=0.25, event_window=0.5)
+    assert json.loads(output.read_text()) == report
+
+    assert report["inputs"] == {"total": 301, "accepted": 300, "expired": 1, "out_of_order": 0, "throttled": 0}
+    assert report["writes"] == {"updates": 75, "keepalives": 1}
+    assert report["coalescing_ratio"] == pytest.approx(300 / 75)
+    assert report["latency"]["count"] == 75
+    assert report["latency"]["p50"] == pytest.approx(0.005, abs=1e-6)
+
+    intervals = {name.split("#")[0]: summary for name, summary in report["inter_arrival"].items()}
+    assert intervals["osc"]["count"] == 199
+    assert intervals["osc"]["p50"] == pytest.approx(0.01, abs=1e-6)
+    assert intervals["mqtt"]["count"] == 99
+    assert intervals["mqtt"]["p50"] == pytest.approx(0.02, abs=1e-6)
+
+    # 送信の途切れ（0.5秒強）は、その間に記録した切断イベントと対応付ける
+    stalls = report["stalls"]
+    assert len(stalls) == 1
+    assert stalls[0]["duration"] == pytest.approx(0.52, abs=1e-3)
+    assert stalls[0]["setpoint"] == [30, 0]
+    assert [event["event"] for event in stalls[0]["events"]] == ["device_disconnected"]
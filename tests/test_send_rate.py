@@ -0,0 +1,97 @@
+"""
+シリアルリンクのキャリブレーションと送信レートの調整のテスト
+
+キャリブレーションで計測した容量が送信レートの上限に反映されること、
+計測中の緊急停止は計測を待たずに実行され、計測を中止することを確認する
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from whill_ctrl.controller.controller import WHILLController
+from whill_ctrl.controller.send_rate import AdaptiveSendRate, LinkCalibration
+from whill_ctrl.whill.mock import MockWHILL
+
+WRITE_TIME = 0.005
+
+
+class SlowLinkWHILL(MockWHILL):
+    """ジョイスティックの書き込みに一定時間かかるモック"""
+
+    def __init__(self) -> None:
+        super().__init__("test")
+        self.joystick_writes = 0
+        self.emergency_stops = 0
+
+    async def send_joystick(self, *, front: int, side: int) -> None:
+        await asyncio.sleep(WRITE_TIME)
+        self.joystick_writes += 1
+        await super().send_joystick(front=front, side=side)
+
+    async def send_emergency_stop(self) -> None:
+        self.emergency_stops += 1
+        await super().send_emergency_stop()
+
+
+def make_controller(device: MockWHILL) -> WHILLController:
+    return WHILLController(device, 0, control_rate=100.0, calibration_frames=0, telemetry_interval=0)
+
+
+def test_calibration_caps_the_send_rate_at_the_link_capacity():
+    async def scenario():
+        controller = make_controller(SlowLinkWHILL())
+        await controller.start()
+        try:
+            result = await controller.calibrate_link(frames=20)
+        finally:
+            await controller.stop()
+        return controller, result
+
+    controller, result = asyncio.run(scenario())
+    assert result is not None and result["frames"] == 20
+    # 1フレーム5ミリ秒のリンクの容量は200Hz前後
+    assert result["capacity_hz"] == pytest.approx(1 / WRITE_TIME, rel=0.3)
+    assert controller.send_rate.calibrations == 1
+    assert controller.send_rate.rate == pytest.approx(min(100.0, result["capacity_hz"] * controller.send_rate.headroom))
+
+
+def test_emergency_stop_aborts_the_calibration():
+    async def scenario():
+        device = SlowLinkWHILL()
+        controller = make_controller(device)
+        await controller.start()
+        try:
+            calibration = asyncio.create_task(controller.calibrate_link(frames=400))
+            await asyncio.sleep(0.05)
+            assert not calibration.done()
+
+            # 緊急停止は残りのフレームを待たずに実行される
+            started = time.monotonic()
+            await controller.handle_osc_command("emergency_stop", source="test")
+            assert time.monotonic() - started < 0.1
+            assert device.emergency_stops == 1
+
+            assert await asyncio.wait_for(calibration, 1.0) is None
+            assert device.joystick_writes < 400
+            assert controller.send_rate.calibrations == 0
+        finally:
+            await controller.stop()
+
+    asyncio.run(scenario())
+
+
+def test_write_latency_climb_backs_off_the_send_rate():
+    send_rate = AdaptiveSendRate(max_rate=100.0)
+    send_rate.apply_calibration(LinkCalibration([WRITE_TIME] * 20, WRITE_TIME * 20))
+    ceiling = send_rate.rate
+    assert ceiling > 0
+
+    # 書き込み遅延が送信間隔に近づくとレートを下げ、下限は下回らない
+    now = 0.0
+    for _ in range(200):
+        now += 1.0
+        send_rate.observe(0.05, now)
+    assert send_rate.backoffs > 0
+    assert send_rate.min_rate <= send_rate.rate < ceiling
@@ -0,0 +1,117 @@
+"""
+systemdのウォッチドッグ通知のテスト
+
+$NOTIFY_SOCKET にUnixドメインのデータグラムソケットを用意してアプリケーションを起動し、
+READY=1 が届くこと、制御ループが止まると WATCHDOG=1 が止まり、再開すると戻ることを確認する
+"""
+
+import asyncio
+import os
+import socket
+
+import pytest
+
+from whill_ctrl.core.app import Application
+from whill_ctrl.core.watchdog import watchdog_interval
+
+# WatchdogSec（確認・通知はこの半分の間隔）と、停止とみなす時間
+WATCHDOG_SEC = 0.2
+STALL_TIMEOUT = 0.3
+
+
+@pytest.fixture
+def notify_socket(tmp_path, monkeypatch):
+    """systemdの代わりに通知を受け取るソケット"""
+    path = tmp_path / "notify.sock"
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.bind(str(path))
+    sock.setblocking(False)
+    monkeypatch.setenv("NOTIFY_SOCKET", str(path))
+    monkeypatch.setenv("WATCHDOG_USEC", str(int(WATCHDOG_SEC * 1e6)))
+    monkeypatch.delenv("WATCHDOG_PID", raising=False)
+    yield sock
+    sock.close()
+
+
+@pytest.fixture
+def app_env(tmp_path, monkeypatch):
+    """設定ファイル・ログを一時ディレクトリに置き、計測を省いて起動する"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("LINK_CALIBRATION_FRAMES", "0")
+    monkeypatch.setenv("WATCHDOG_STALL_TIMEOUT", str(STALL_TIMEOUT))
+
+
+async def receive(sock: socket.socket, duration: float) -> list[str]:
+    """指定した時間に届いた通知を集める"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    messages = []
+    while (remaining := deadline - loop.time()) > 0:
+        try:
+            data = await asyncio.wait_for(loop.sock_recv(sock, 4096), remaining)
+        except TimeoutError:
+            break
+        messages.append(data.decode())
+    return messages
+
+
+def count(messages: list[str], state: str) -> int:
+    """通知のうち指定した状態を含むものを数える"""
+    return sum(state in message.split("\n") for message in messages)
+
+
+def test_watchdog_stops_when_control_loop_stalls(notify_socket, app_env):
+    async def scenario():
+        app = Application()
+        initialized = await app.initialize(
+            None, "127.0.0.1", 0, "localhost", 1883, "whill/commands/#", True, True, False
+        )
+        assert initialized
+        try:
+            started = await receive(notify_socket, 1.0)
+            assert any(message.startswith("READY=1") for message in started)
+            assert count(started, "WATCHDOG=1") >= 2
+
+            # シリアルへの書き込みが戻らない状態にして、ジョイスティックで制御ループを起こす
+            release = asyncio.Event()
+
+            async def blocked_write(*, front: int, side: int) -> None:
+                await release.wait()
+
+            app.controller.whill.send_joystick = blocked_write
+            app.controller.submit_joystick(50, 0, source="test")
+
+            stalling = await receive(notify_socket, STALL_TIMEOUT + WATCHDOG_SEC)
+            assert any(message.startswith("STATUS=Stalled") for message in stalling)
+            stalled = await receive(notify_socket, 3 * WATCHDOG_SEC)
+            assert count(stalled, "WATCHDOG=1") == 0
+            assert app.watchdog.withheld > 0
+
+            # 書き込みが戻れば通知も再開する
+            release.set()
+            resumed = await receive(notify_socket, 3 * WATCHDOG_SEC)
+            assert count(resumed, "WATCHDOG=1") >= 1
+        finally:
+            await app._shutdown()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    ("usec", "pid", "expected"),
+    [
+        ("2000000", None, 2.0),
+        ("2000000", "self", 2.0),
+        ("2000000", "999999999", None),
+        ("0", None, None),
+        ("invalid", None, None),
+    ],
+)
+def test_watchdog_interval(monkeypatch, usec, pid, expected):
+    monkeypatch.setenv("WATCHDOG_USEC", usec)
+    if pid is None:
+        monkeypatch.delenv("WATCHDOG_PID", raising=False)
+    else:
+        monkeypatch.setenv("WATCHDOG_PID", str(os.getpid()) if pid == "self" else pid)
+    assert watchdog_interval() == expected